@@ -0,0 +1,16 @@
+#!/bin/bash
+#SBATCH --account=def-robertf
+#SBATCH --cpus-per-task=1
+#SBATCH --mem=16G
+#SBATCH --mail-user=christian.poitras@ircm.qc.ca
+#SBATCH --mail-type=ALL
+#SBATCH --output=callnucleosomes-%A_%a.out
+#SBATCH --error=callnucleosomes-%A_%a.out
+
+args=("$@")
+if [ ! -z "$SLURM_ARRAY_TASK_ID" ]
+then
+  args+=("-i" "$SLURM_ARRAY_TASK_ID")
+fi
+
+mnasetools callnucleosomes "${args[@]}"
@@ -1,64 +1,130 @@
+from itertools import repeat
 import logging
-import sys
 
 import click
-import pandas as pd
-import pyBigWig as pbw
 
-POSITIVE_STRAND = 1
-NEGATIVE_STRAND = -1
+from seqtools.bigwig import BigWigCache
+from seqtools.process import Jobs
+
+POSITIVE_STRAND = '+'
+NEGATIVE_STRAND = '-'
 
 
 @click.command()
 @click.option('--genes', '-g', type=click.Path(exists=True), default='genes.txt', show_default=True,
-              help='Genes information.')
-@click.option('--signal', '-s', type=click.Path(exists=True), default='signal.bw', show_default=True,
-              help='Dyad signal as a bigWig or bigBed file.')
-@click.option('--dyad', '-i', type=int, default=2, show_default=True,
-              help='Dyad index. Must be 2 right now.')
+              help='Genes information with format <spacer text> <chromosome> <Gene Name> <TSS> <Strand> <TES> <Dyad Position>.')
+@click.option('--signal', '-s', type=click.Path(exists=True), multiple=True, default=['signal.bw'], show_default=True,
+              help='Dyad signal as a bigWig or bigBed file. Can be repeated to find dyads for many signals, one output column per signal and dyad.')
+@click.option('--dyad', '-i', type=click.IntRange(min=2), default=2, show_default=True,
+              help='Index of last dyad to find, dyads are found from +2 up to this index.')
 @click.option('--mind', '-d', type=int, default=141, show_default=True,
               help='Minimum distance from previous dyad.')
 @click.option('--maxd', '-D', type=int, default=191, show_default=True,
               help='Maximum distance from previous dyad.')
 @click.option('--output', '-o', type=click.Path(), default='genes-out.txt', show_default=True,
               help='Output file.')
-def dyadposition(genes, signal, dyad, mind, maxd, output):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of signal files processed in parallel.')
+def dyadposition(genes, signal, dyad, mind, maxd, output, jobs):
     '''Finds the most plausible dyad position.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    dyad_position(genes, signal, dyad, mind, maxd, output)
+    dyad_position(genes, signal, dyad, mind, maxd, output, jobs)
 
 
-def dyad_position(genes, signal, dyad, mind, maxd, output):
+def dyad_position(genes, signals, dyad, mind, maxd, output, jobs=1):
     '''Finds the most plausible dyad position.'''
-    if dyad != 2:
-        print >> sys.stderr, 'right now, dyad parameter must be 2'
-        sys.exit(1)
+    import pandas as pd
+    if dyad < 2:
+        raise AssertionError('dyad parameter must be 2 or more')
+    if isinstance(signals, str):
+        signals = [signals]
+    signals = [str(signal) for signal in signals]
     genes_info = pd.read_csv(genes, sep='\t', comment='#')
-    bw = pbw.open(signal)
-    diffd = maxd - mind
-    next_nucleosomes = []
-    for index, columns in genes_info.iterrows():
-        chromosome = columns[1]
-        strand = columns[4] == NEGATIVE_STRAND
-        first_nucleosome = int(columns[7])
-        start = first_nucleosome + (-(mind - 1) if strand else mind)
-        end = start - diffd if strand else start + diffd
-        next_nucleosome = highest_signal(bw, chromosome, min(start, end), max(start, end))
-        next_nucleosomes.append(next_nucleosome[0])
-    genes_info['+' + str(dyad) + ' nucleosome'] = next_nucleosomes
-    genes_info.to_csv(output, sep='\t')
-
-
-def highest_signal(bw, chromosome, start, end):
-    '''Returns coordinate having the highest signal in the bigWig between specified coordinates'''
-    intervals = bw.intervals(chromosome, start, end)
-    if not intervals:
-        return None
-    max = intervals[0]
-    for interval in intervals:
-        if interval[2] > max[2]:
-            max = interval
-    return max
+    chromosomes, previous, negative = gene_dyads(genes_info)
+    count = dyad - 1
+    if jobs and jobs > 1 and len(signals) > 1:
+        with Jobs.executor(min(jobs, len(signals))) as executor:
+            signals_dyads = list(executor.map(signal_dyads, signals, repeat(chromosomes), repeat(previous), repeat(negative), repeat(mind), repeat(maxd), repeat(count)))
+    else:
+        signals_dyads = [signal_dyads(signal, chromosomes, previous, negative, mind, maxd, count) for signal in signals]
+    columns = {}
+    for signal, dyads in zip(signals, signals_dyads):
+        for step in range(count):
+            column = '+' + str(step + 2) + ' nucleosome'
+            if len(signals) > 1:
+                column = column + ' ' + signal
+            columns[column] = dyads[:, step]
+    genes_info = pd.concat([genes_info, pd.DataFrame(columns, index=genes_info.index)], axis=1)
+    genes_info.to_csv(output, sep='\t', index=False)
+
+
+def gene_dyads(genes):
+    '''Returns chromosomes, previous dyad positions and strand of genes as negative flags.'''
+    chromosomes = genes.iloc[:, 1].astype(str).values
+    previous = genes.iloc[:, 6].values.astype(int)
+    negative = genes.iloc[:, 4].astype(str).isin([NEGATIVE_STRAND, '-1']).values
+    return chromosomes, previous, negative
+
+
+def signal_dyads(signal, chromosomes, previous, negative, mind, maxd, count=1):
+    '''Returns dyads following previous dyads in signal file, see next_dyads.'''
+    logging.debug('Finding dyads in signal {}'.format(signal))
+    with BigWigCache.BigWigCache(signal) as bw:
+        return next_dyads(bw, chromosomes, previous, negative, mind, maxd, count)
+
+
+def next_dyads(bw, chromosomes, previous, negative, mind, maxd, count=1):
+    '''
+    Returns count dyads following previous dyads downstream of genes as a matrix with one row per gene and one column per dyad.
+
+    Each dyad is the coordinate having the highest signal between mind and maxd (exclusive) from the dyad before it.
+    Genes are grouped by chromosome and all dyads of a chromosome are found before moving to the next chromosome, so its signal stays in memory.
+    Dyads are -1 when the dyad before them is -1 or when signal is missing.
+    '''
+    import numpy as np
+    dyads = np.full((len(previous), count), -1, dtype=np.int64)
+    found = previous != -1
+    for chromosome in np.unique(chromosomes[found]):
+        size = bw.chroms(chromosome)
+        if not size:
+            continue
+        genes = np.flatnonzero(found & (chromosomes == chromosome))
+        dyad = previous[genes]
+        for step in range(count):
+            genes = genes[dyad != -1]
+            dyad = dyad[dyad != -1]
+            window_starts = np.where(negative[genes], dyad - maxd + 1, dyad + mind)
+            dyad = window_maxima(bw, chromosome, size, window_starts, maxd - mind)
+            dyads[genes, step] = dyad
+    return dyads
+
+
+def window_maxima(bw, chromosome, size, window_starts, width):
+    '''
+    Returns coordinates having the highest signal in windows of chromosome, the first coordinate is returned when many have the highest signal.
+
+    Windows are processed together by segments of chromosome the size of a bigWig block. Maxima are -1 for windows without signal.
+    '''
+    import numpy as np
+    maxima = np.full(len(window_starts), -1, dtype=np.int64)
+    if width <= 0 or len(window_starts) == 0:
+        return maxima
+    order = np.argsort(window_starts, kind='stable')
+    segments = window_starts[order] // BigWigCache.BLOCK_SIZE
+    for windows in np.split(order, np.flatnonzero(np.diff(segments)) + 1):
+        starts = window_starts[windows]
+        segment_start = int(starts.min())
+        segment_end = int(starts.max()) + width
+        signal = np.full(segment_end - segment_start, np.nan, dtype=np.float32)
+        start = max(segment_start, 0)
+        end = min(segment_end, size)
+        if end > start:
+            signal[start - segment_start:end - segment_start] = bw.values(chromosome, start, end)
+        values = signal[(starts - segment_start)[:, None] + np.arange(width)]
+        missing = np.isnan(values)
+        highest = np.where(missing, -np.inf, values).argmax(axis=1)
+        maxima[windows] = np.where(missing.all(axis=1), -1, starts + highest)
+    return maxima
 
 
 if __name__ == '__main__':
@@ -1,14 +1,18 @@
 import click
 
-from checseqtools import DyadPosition
+from seqtools.bigwig import BigWigCache
+from seqtools.process import LazyGroup
+from seqtools.seqtools import validate_memory
 
 
-@click.group()
-def chectools():
-    pass
+@click.group(cls=LazyGroup.LazyGroup)
+@click.option('--bigwig-mem', callback=validate_memory, default='512M', show_default=True,
+              help='Memory used to keep blocks of bigWig files read by a process, like 500M or 2G.')
+def chectools(bigwig_mem):
+    BigWigCache.MEMORY = bigwig_mem
 
 
-chectools.add_command(DyadPosition.dyadposition)
+chectools.add_lazy_command('dyadposition', 'checseqtools.DyadPosition.dyadposition')
 
 if __name__ == '__main__':
    chectools()
@@ -0,0 +1,106 @@
+from itertools import repeat
+import logging
+
+import click
+
+from mnaseseqtools import DyadCoverage
+from seqtools.bigwig import BigWigCache
+from seqtools.process import Jobs, Manifest
+from seqtools.txt import Parser
+
+
+@click.command()
+@click.option('--samples', '-s', type=click.Path(exists=True), default='samples.txt', show_default=True,
+              help='Sample names listed one sample name by line.')
+@click.option('--input-suffix', '-is', default='-cov', show_default=True,
+              help='Suffix added to sample name in coverage bigWig filename, coverage of fragment centers or dyads.')
+@click.option('--output-suffix', '-os', default='-nucleosomes', show_default=True,
+              help='Suffix added to sample name in BED filename of dyads.')
+@click.option('--smoothing', '-S', type=click.IntRange(min=0), default=20, show_default=True,
+              help='Smooth the signal by averaging on smoothing window.')
+@click.option('--spacing', type=click.IntRange(min=1), default=147, show_default=True,
+              help='Minimum distance between dyads, dyads having a lower signal are removed first.')
+@click.option('--min-signal', type=float, default=0.0, show_default=True,
+              help='Minimum smoothed signal of dyads.')
+@click.option('--index', '-i', type=int, default=None,
+              help='Index of sample to process in samples file.')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of chromosomes processed in parallel.')
+def callnucleosomes(samples, input_suffix, output_suffix, smoothing, spacing, min_signal, index, jobs):
+    '''Calls nucleosome dyads on the whole genome from coverage.'''
+    logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    call_nucleosomes_samples(samples, input_suffix, output_suffix, smoothing, spacing, min_signal, index, jobs)
+
+
+def call_nucleosomes_samples(samples='samples.txt', input_suffix='-cov', output_suffix='-nucleosomes', smoothing=20, spacing=147, min_signal=0.0, index=None, jobs=1):
+    '''Calls nucleosome dyads on the whole genome from coverage of samples.'''
+    sample_names = Parser.first(samples)
+    if index != None:
+        sample_names = [sample_names[index]]
+    Jobs.run(call_nucleosomes_sample, [(sample, input_suffix, output_suffix, smoothing, spacing, min_signal, jobs) for sample in sample_names])
+
+
+def call_nucleosomes_sample(sample, input_suffix='-cov', output_suffix='-nucleosomes', smoothing=20, spacing=147, min_signal=0.0, jobs=1):
+    '''
+    Calls nucleosome dyads on the whole genome from coverage of a single sample.
+
+    Chromosomes are processed by parallel processes when jobs is greater than 1, only the signal of chromosomes being processed is kept in memory.
+    '''
+    import pandas as pd
+    print ('Calls nucleosome dyads of sample {}'.format(sample))
+    bigwig = sample + input_suffix + '.bw'
+    output = sample + output_suffix + '.bed'
+    parameters = [smoothing, spacing, min_signal]
+    if Manifest.up_to_date([output], [bigwig], parameters):
+        return
+    with BigWigCache.BigWigCache(bigwig) as bw:
+        chromosomes = list(bw.chroms())
+    if jobs and jobs > 1 and len(chromosomes) > 1:
+        with Jobs.executor(min(jobs, len(chromosomes))) as executor:
+            chromosomes_dyads = list(executor.map(chromosome_dyads, repeat(bigwig), chromosomes, repeat(smoothing), repeat(spacing), repeat(min_signal)))
+    else:
+        chromosomes_dyads = [chromosome_dyads(bigwig, chromosome, smoothing, spacing, min_signal) for chromosome in chromosomes]
+    dyads = [pd.DataFrame({'chromosome': chromosome, 'start': positions, 'end': positions + 1, 'name': '.', 'score': scores})
+             for chromosome, (positions, scores) in zip(chromosomes, chromosomes_dyads)]
+    dyads = pd.concat(dyads) if dyads else pd.DataFrame(columns=['chromosome', 'start', 'end', 'name', 'score'])
+    dyads.to_csv(output, sep='\t', header=False, index=False, float_format='%.6g')
+    Manifest.record([output], [bigwig], parameters)
+
+
+def chromosome_dyads(bigwig, chromosome, smoothing=20, spacing=147, min_signal=0.0):
+    '''Returns positions and smoothed signal of dyads of chromosome, see call_dyads.'''
+    logging.debug('Calling dyads of chromosome {} in bigWig {}'.format(chromosome, bigwig))
+    with BigWigCache.BigWigCache(bigwig) as bw:
+        signal = chromosome_signal(bw, chromosome)
+    return call_dyads(signal, smoothing, spacing, min_signal)
+
+
+def chromosome_signal(bw, chromosome):
+    '''Returns signal of chromosome as a float32 array read block by block without the cache, missing values are 0.'''
+    import numpy as np
+    size = bw.chroms(chromosome)
+    signal = np.zeros(size, dtype=np.float32)
+    for start in range(0, size, bw.block_size):
+        end = min(start + bw.block_size, size)
+        signal[start:end] = bw.read(chromosome, start, end)
+    np.nan_to_num(signal, copy=False)
+    return signal
+
+
+def call_dyads(signal, smoothing=20, spacing=147, min_signal=0.0):
+    '''
+    Returns positions and smoothed signal of local maxima of signal having at least min_signal and being at least spacing bases apart.
+
+    Signal is averaged on a window of smoothing bases like dyadcov. When local maxima are too close, the ones having a lower signal are removed first.
+    '''
+    import numpy as np
+    from scipy.ndimage import uniform_filter1d
+    from scipy.signal import find_peaks
+    window = DyadCoverage.smoothing_window(smoothing) * 2 + 1
+    smoothed = uniform_filter1d(signal, window, mode='constant') if window > 1 else signal
+    positions, _ = find_peaks(smoothed, height=min_signal, distance=spacing)
+    return positions.astype(np.int64), smoothed[positions]
+
+
+if __name__ == '__main__':
+    callnucleosomes()
@@ -1,14 +1,13 @@
+from itertools import repeat
 import logging
 import math
 import os
 
 import click
-from numpy import mean
 
-import matplotlib.pyplot as plt
-import pandas as pd
-import pyBigWig as pbw
 import seqtools.Split as sb
+from seqtools.bigwig import BigWigCache
+from seqtools.process import Jobs, Manifest
 from seqtools.txt import Parser
 
 POSITIVE_STRAND = '+'
@@ -34,14 +33,19 @@ NEGATIVE_STRAND = '-'
               help='Suffix to append to sample name. Suffix is ignore for input if file does not exists - suffix is still applied to output.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def dyadcov(samples, genes, selection, absolute, minp, maxp, smoothing, suffix, index):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
+@click.option('--batch', is_flag=True,
+              help='Read signal of all samples and splits in parallel before writing outputs, gene windows are computed only once.')
+def dyadcov(samples, genes, selection, absolute, minp, maxp, smoothing, suffix, index, jobs, batch):
     '''Finds the distribution of ditances between fragments and dyad.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    dyad_coverage(samples, genes, selection, absolute, minp, maxp, smoothing, suffix, index)
+    dyad_coverage(samples, genes, selection, absolute, minp, maxp, smoothing, suffix, index, jobs, batch)
 
 
-def dyad_coverage(samples, genes='genes.txt', selection=None, absolute=False, minp=-75, maxp=75, smoothing=None, suffix=None, index=None):
+def dyad_coverage(samples, genes='genes.txt', selection=None, absolute=False, minp=-75, maxp=75, smoothing=None, suffix=None, index=None, jobs=1, batch=False):
     '''Finds the distribution of ditances between fragments and dyad.'''
+    import pandas as pd
     genes_info = pd.read_csv(genes, sep='\t', comment='#')
     genes_info = genes_info.loc[genes_info[genes_info.columns[6]] != -1]
     if selection:
@@ -50,58 +54,168 @@ def dyad_coverage(samples, genes='genes.txt', selection=None, absolute=False, mi
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        dyad_coverage_sample(sample, genes_info, absolute, minp, maxp, suffix, smoothing)
-        splits = sb.splits(sample)
-        for split in splits:
-            dyad_coverage_sample(split, genes_info, absolute, minp, maxp, suffix, smoothing)
+    names = sb.samples_splits(sample_names)
+    if batch:
+        dyad_coverage_batch(names, genes_info, absolute, minp, maxp, suffix, smoothing, jobs)
+    else:
+        Jobs.run(dyad_coverage_sample, [(name, genes_info, absolute, minp, maxp, suffix, smoothing) for name in names], jobs)
 
 
 def dyad_coverage_sample(sample, genes, absolute, minp, maxp, suffix=None, smoothing=None):
     '''Finds the distribution of ditances between fragments and dyad for a single sample.'''
     print ('Finds the distribution of ditances between fragments and dyad of sample {}'.format(sample))
+    coverage_bw = coverage_file(sample, suffix)
+    outputs = coverage_outputs(sample, suffix)
+    parameters = coverage_parameters(genes, absolute, minp, maxp, smoothing)
+    if Manifest.up_to_date(outputs, [coverage_bw], parameters):
+        return
+    smoothing = smoothing_window(smoothing)
+    with BigWigCache.BigWigCache(coverage_bw) as bw:
+        matrix = coverage_matrix(bw, gene_windows(genes, minp - smoothing, maxp + smoothing))
+    write_dyad_coverage(sample, genes, matrix, absolute, minp, maxp, suffix, smoothing)
+    Manifest.record(outputs, [coverage_bw], parameters)
+
+
+def dyad_coverage_batch(samples, genes, absolute, minp, maxp, suffix=None, smoothing=None, jobs=1):
+    '''
+    Finds the distribution of ditances between fragments and dyad for samples, gene windows are computed once for all samples.
+
+    Signal of samples is read by parallel processes when jobs is greater than 1 and gathered in an array of samples × genes × positions.
+    '''
+    import numpy as np
+    parameters = coverage_parameters(genes, absolute, minp, maxp, smoothing)
+    samples = [sample for sample in samples if not Manifest.up_to_date(coverage_outputs(sample, suffix), [coverage_file(sample, suffix)], parameters)]
+    if not samples:
+        return
+    print ('Finds the distribution of ditances between fragments and dyad of samples {}'.format(', '.join(samples)))
+    smoothing = smoothing_window(smoothing)
+    windows = gene_windows(genes, minp - smoothing, maxp + smoothing)
+    coverage_bws = [coverage_file(sample, suffix) for sample in samples]
+    if jobs and jobs > 1 and len(samples) > 1:
+        with Jobs.executor(min(jobs, len(samples))) as executor:
+            matrices = list(executor.map(bigwig_matrix, coverage_bws, repeat(windows)))
+    else:
+        matrices = [bigwig_matrix(coverage_bw, windows) for coverage_bw in coverage_bws]
+    tracks = np.stack(matrices)
+    for sample, coverage_bw, matrix in zip(samples, coverage_bws, tracks):
+        write_dyad_coverage(sample, genes, matrix, absolute, minp, maxp, suffix, smoothing)
+        Manifest.record(coverage_outputs(sample, suffix), [coverage_bw], parameters)
+
+
+def coverage_file(sample, suffix=None):
+    '''Returns coverage file of sample, with suffix if it exists.'''
+    if suffix and os.path.exists(sample + suffix + '-cov.bw'):
+        return sample + suffix + '-cov.bw'
+    return sample + '-cov.bw'
+
+
+def coverage_outputs(sample, suffix=None):
+    '''Returns genes, dyad and plot files of sample.'''
+    output_prefix = sample + (suffix if suffix else '')
+    return [output_prefix + '-genes.txt', output_prefix + '-dyad.txt', output_prefix + '-dyad.png']
+
+
+def coverage_parameters(genes, absolute, minp, maxp, smoothing):
+    '''Returns parameters saved in manifest of outputs.'''
+    import pandas as pd
+    return [absolute, minp, maxp, smoothing, str(pd.util.hash_pandas_object(genes).sum())]
+
+
+def smoothing_window(smoothing=None):
+    '''Returns number of positions averaged on each side of a position.'''
     if not smoothing:
         smoothing = 0
-    smoothing = math.ceil(smoothing / 2.0)
-    coverage_bw = sample + '-cov.bw'
-    if suffix and os.path.exists(sample + suffix + '-cov.bw'):
-        coverage_bw = sample + suffix + '-cov.bw'
-    bw = pbw.open(coverage_bw)
-    distances = [[] for i in range(0, maxp - minp + smoothing * 2 + 1)]
-    for index, columns in genes.iterrows():
-        chromosome = columns[1]
-        max_end = bw.chroms(chromosome)
-        if not max_end:
-            max_end = 0
-        negative = columns[4] == NEGATIVE_STRAND
-        theo_start = int(columns[6]) + minp - smoothing
-        start = max(theo_start, 0)
-        end = min(int(columns[6]) + maxp + smoothing + 1, max_end)
-        distance = signal(bw, chromosome, start, end) if end > start else []
-        if negative:
-            distance.reverse()
-        for i in range(0, maxp - minp + smoothing * 2 + 1):
-            distance_index = i - (start - theo_start)
-            value = distance[distance_index] if distance_index in range(0, len(distance)) else 0
-            distances[i].append(value if value and not math.isnan(value) else 0)
-    for i in range(0, maxp - minp + smoothing * 2 + 1):
-        genes['dyad position ' + str(i + minp - smoothing)] = distances[i]
-    genes_output = sample + (suffix if suffix else '') + '-genes.txt'
-    genes.to_csv(genes_output, sep='\t', index=False)
-    sums = pd.DataFrame(index=list(range(minp - smoothing, maxp + smoothing + 1)))
-    sums['Frequency'] = [genes['dyad position ' + str(i)].sum() for i in range(minp - smoothing, maxp + smoothing + 1)]
-    dyads = pd.DataFrame(index=list(range(minp, maxp + 1)), columns=['Frequency', 'Relative Frequency'])
-    for i in range(minp, maxp + 1):
-        dyads.at[i, 'Frequency'] = mean([sums.at[j, 'Frequency'] for j in range(i - smoothing, i + smoothing + 1)])
-    frequency_sum = dyads['Frequency'].sum()
-    for i in range(minp, maxp + 1):
-        dyads.at[i, 'Relative Frequency'] = dyads.at[i, 'Frequency'] / frequency_sum
-    dyad_output = sample + (suffix if suffix else '') + '-dyad.txt'
+    return math.ceil(smoothing / 2.0)
+
+
+def gene_windows(genes, minp, maxp):
+    '''Returns chromosomes, first position of windows from minp to maxp around dyad, strand of genes as negative flags and width of windows.'''
+    chromosomes = genes.iloc[:, 1].values
+    window_starts = genes.iloc[:, 6].values.astype(int) + minp
+    negative = genes.iloc[:, 4].values == NEGATIVE_STRAND
+    return chromosomes, window_starts, negative, maxp - minp + 1
+
+
+def bigwig_matrix(bigwig, windows):
+    '''Returns signal of bigWig in windows, see coverage_matrix.'''
+    logging.debug('Reading signal of {}'.format(bigwig))
+    with BigWigCache.BigWigCache(bigwig) as bw:
+        return coverage_matrix(bw, windows)
+
+
+def coverage_matrix(bw, windows):
+    '''
+    Returns signal in windows as a matrix with one row per gene and one column per position of windows.
+
+    Signal of genes on negative strand is reversed. Positions outside chromosome and missing values are 0.
+    Windows are grouped by chromosome and gathered from one read per chromosome segment, see windows_signal.
+    '''
+    import numpy as np
+    chromosomes, window_starts, negative, width = windows
+    matrix = np.zeros((len(chromosomes), width))
+    for chromosome in np.unique(chromosomes):
+        size = bw.chroms(chromosome)
+        if not size:
+            continue
+        rows = np.flatnonzero(chromosomes == chromosome)
+        matrix[rows] = windows_signal(bw, chromosome, size, window_starts[rows], width)
+    np.nan_to_num(matrix, copy=False)
+    matrix[negative] = matrix[negative, ::-1]
+    return matrix
+
+
+def windows_signal(bw, chromosome, size, window_starts, width):
+    '''
+    Returns signal in windows of chromosome as a matrix with one row per window, positions outside chromosome are NaN.
+
+    Windows are processed together by segments of chromosome the size of a bigWig block, each segment is read once.
+    '''
+    import numpy as np
+    values = np.full((len(window_starts), width), np.nan, dtype=np.float32)
+    if width <= 0 or len(window_starts) == 0:
+        return values
+    order = np.argsort(window_starts, kind='stable')
+    segments = np.maximum(window_starts[order], 0) // BigWigCache.BLOCK_SIZE
+    for windows in np.split(order, np.flatnonzero(np.diff(segments)) + 1):
+        starts = window_starts[windows]
+        segment_start = int(starts.min())
+        segment_end = int(starts.max()) + width
+        segment = np.full(segment_end - segment_start, np.nan, dtype=np.float32)
+        start = max(segment_start, 0)
+        end = min(segment_end, size)
+        if end > start:
+            segment[start - segment_start:end - segment_start] = signal(bw, chromosome, start, end)
+        values[windows] = segment[(starts - segment_start)[:, None] + np.arange(width)]
+    return values
+
+
+def write_dyad_coverage(sample, genes, matrix, absolute, minp, maxp, suffix=None, smoothing=0):
+    '''Writes signal of genes, distribution of signal around dyad and its plot for sample, matrix columns are positions from minp - smoothing to maxp + smoothing.'''
+    import pandas as pd
+    output_prefix = sample + (suffix if suffix else '')
+    positions = range(minp - smoothing, maxp + smoothing + 1)
+    genes_coverage = pd.DataFrame(matrix, index=genes.index, columns=['dyad position ' + str(i) for i in positions])
+    genes_output = output_prefix + '-genes.txt'
+    pd.concat([genes, genes_coverage], axis=1).to_csv(genes_output, sep='\t', index=False)
+    dyads = dyad_frequencies(matrix, minp, maxp, smoothing)
+    dyad_output = output_prefix + '-dyad.txt'
     dyads.to_csv(dyad_output, sep='\t')
     plot_dyad_coverage(sample, dyads, absolute, suffix)
 
 
+def dyad_frequencies(matrix, minp, maxp, smoothing=0):
+    '''Returns frequency and relative frequency of signal at each position from minp to maxp, averaged on a window of smoothing bases on each side.'''
+    import numpy as np
+    import pandas as pd
+    window = smoothing * 2 + 1
+    sums = np.concatenate(([0.0], np.cumsum(matrix.sum(axis=0))))
+    frequencies = (sums[window:] - sums[:-window]) / window
+    dyads = pd.DataFrame({'Frequency': frequencies, 'Relative Frequency': frequencies / frequencies.sum()}, index=list(range(minp, maxp + 1)))
+    return dyads
+
+
 def plot_dyad_coverage(sample, dyads, absolute, suffix=None):
+    import matplotlib.pyplot as plt
     x = dyads.index.values
     yheader = 'Frequency' if absolute else 'Relative Frequency'
     plt.figure()
@@ -1,9 +1,9 @@
+from itertools import repeat
 import logging
-import os
-import re
 
 import click
-import pandas as pd
+
+from seqtools.process import Jobs, Workspace
 
 
 @click.command()
@@ -15,38 +15,41 @@ import pandas as pd
               help='Output file were statistics are written.')
 @click.option('--verbose', '-v', is_flag=True,
               help='Shows file name being processed.')
-def dyadstatistics(minp, maxp, output, verbose):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of files processed in parallel.')
+def dyadstatistics(minp, maxp, output, verbose, jobs):
     '''Creates statistics file for dyads.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    dyad_statistics(minp, maxp, output, verbose)
+    dyad_statistics(minp, maxp, output, verbose, jobs)
 
 
-def dyad_statistics(minp=-75, maxp=75, output='dyad_statistics.txt', verbose=False):
+def dyad_statistics(minp=-75, maxp=75, output='dyad_statistics.txt', verbose=False, jobs=1):
     '''Creates statistics file for dyads.'''
+    import pandas as pd
     all_genes_files = genes_files()
-    statistics = pd.DataFrame(index=list(range(0, len(all_genes_files))), columns=['File', 'Reads', 'Genes'])
-    for i in range(0, len(all_genes_files)):
-        gene_file = all_genes_files[i]
-        if verbose:
-            print ('processing file {}'.format(gene_file))
-        statistics.at[i, 'File'] = gene_file
-        genes = pd.read_csv(gene_file, sep='\t', comment='#')
-        position_headers = ['dyad position ' + str(p) for p in range(minp, maxp + 1)]
-        reads = genes.loc[:, position_headers].sum(axis=1).sum()
-        statistics.at[i, 'Reads'] = reads
-        genes_with_reads = 0
-        for j in genes.index.values:
-            gene_sum = genes.loc[j, position_headers].sum()
-            if gene_sum > 0:
-                genes_with_reads += 1
-        statistics.at[i, 'Genes'] = genes_with_reads
+    if jobs and jobs > 1 and len(all_genes_files) > 1:
+        with Jobs.executor(min(jobs, len(all_genes_files))) as executor:
+            rows = list(executor.map(genes_statistics, all_genes_files, repeat(minp), repeat(maxp), repeat(verbose)))
+    else:
+        rows = [genes_statistics(gene_file, minp, maxp, verbose) for gene_file in all_genes_files]
+    statistics = pd.DataFrame(rows, columns=['File', 'Reads', 'Genes'])
     statistics.to_csv(output, sep='\t', index=False)
 
 
+def genes_statistics(gene_file, minp=-75, maxp=75, verbose=False):
+    '''Returns file, number of reads and number of genes having reads between minp and maxp.'''
+    import numpy as np
+    import pandas as pd
+    if verbose:
+        print ('processing file {}'.format(gene_file))
+    position_headers = ['dyad position ' + str(p) for p in range(minp, maxp + 1)]
+    genes = pd.read_csv(gene_file, sep='\t', comment='#', usecols=position_headers, dtype=np.float32)
+    gene_sums = genes.to_numpy().sum(axis=1, dtype=np.float64)
+    return gene_file, gene_sums.sum(), int(np.count_nonzero(gene_sums > 0))
+
+
 def genes_files():
-    regex = re.compile('.*-genes.txt')
-    files = os.listdir()
-    files = list(filter(regex.match, files))
+    files = Workspace.files_with_suffix('-genes.txt')
     files.sort()
     return files
 
@@ -1,8 +1,8 @@
 import logging
+import os
 import re
 
 import click
-import pandas as pd
 
 POSITIVE_STRAND = '+'
 NEGATIVE_STRAND = '-'
@@ -26,48 +26,66 @@ def firstdyadposition(genes, signal, mind, maxd, output):
 
 def first_dyad_position(genes, signal, mind, maxd, output):
     '''Finds the most plausible position of first dyad for genes.'''
+    import pandas as pd
     logging.basicConfig(filename='FirstDyadPositionFinder.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
     genes_info = pd.read_csv(genes, sep='\t', comment='#')
     tracks = read_tracks(signal)
     diffd = maxd - mind
     nucleosomes = []
-    for index, columns in genes_info.iterrows():
-        chromosome = columns[1]
-        gene = columns[2]
-        negative = columns[4] == NEGATIVE_STRAND
-        start = int(columns[5] if negative else columns[3]) + (-mind if negative else mind)
+    for gene, tss, strand, tes in zip(genes_info.iloc[:, 2], genes_info.iloc[:, 3], genes_info.iloc[:, 4], genes_info.iloc[:, 5]):
+        negative = strand == NEGATIVE_STRAND
+        start = int(tes if negative else tss) + (-mind if negative else mind)
         end = start - diffd if negative else start + diffd
         if gene not in tracks:
             logging.warning('no track for gene {}'.format(gene))
             nucleosomes.append(-1)
             continue
-        track = tracks[gene]
-        if negative:
-            track.reverse()
-        nucleosome = highest_signal(track, chromosome, min(start, end), max(start, end))
+        nucleosome = highest_signal(tracks[gene], min(start, end), max(start, end), negative)
         nucleosomes.append(nucleosome[0] if nucleosome else -1)
     genes_info.columns = ['spacer', 'chromosome', 'gene', 'tss', 'strand', 'tes']
     genes_info['+1 nucleosome'] = nucleosomes
-    genes_info.astype({'+1 nucleosome': 'int64'}).dtypes
     genes_info.to_csv(output, sep='\t', index=False)
 
 
 def read_tracks(wig):
-    '''Reads all tracks of wig and return an array of position/score'''
+    '''
+    Reads all tracks of wig and returns positions and scores of each track as NumPy arrays sorted by position.
+
+    Tracks are saved in a binary file next to wig and loaded from it while wig does not change.
+    '''
+    tracks = load_tracks(wig)
+    if tracks is None:
+        tracks = parse_tracks(wig)
+        save_tracks(wig, tracks)
+    return tracks
+
+
+def parse_tracks(wig):
+    '''Parses all tracks of wig and returns positions and scores of each track as NumPy arrays sorted by position.'''
+    import numpy as np
     trackname_regex = re.compile('name="([^"]*)"')
     tracks = {}
-    track = []
+    positions = []
+    scores = []
     trackname = ''
+
+    def add_track():
+        if positions:
+            track_positions = np.array(positions, dtype=np.int64)
+            order = np.argsort(track_positions, kind='stable')
+            tracks[trackname] = (track_positions[order], np.array(scores, dtype=np.float64)[order])
+
     with open(wig) as input:
         for line in input:
             if line.startswith('fixedStep'):
-                raise 'fixedStep not supported for signal file'
-            if line.startswith('#') or line.startswith('browser') or line.startswith('variableStep') or line.startswith('fixedStep'):
+                raise AssertionError('fixedStep not supported for signal file')
+            if line.startswith('#') or line.startswith('browser') or line.startswith('variableStep'):
                 continue
             if line.startswith('track'):
-                if track:
-                    tracks[trackname] = track
-                track = []
+                add_track()
+                positions = []
+                scores = []
+                trackname = ''
                 match = trackname_regex.search(line)
                 if match:
                     trackname = match.group(1)
@@ -75,25 +93,61 @@ def read_tracks(wig):
                     logging.warning('"{}" does not have a name'.format(line))
                 continue
             columns = line.rstrip('\r\n').split()
-            position = int(columns[0])
-            score = int(columns[1])
-            track.append((position, score))
+            if not columns:
+                continue
+            positions.append(int(columns[0]))
+            scores.append(float(columns[1]))
+    add_track()
     return tracks
 
 
-def highest_signal(track, chromosome, start, end):
-    '''Returns coordinate having the highest signal between specified coordinates'''
-    intervals = []
-    for (position, score) in track:
-        if position >= start and position < end:
-            intervals.append((position, score))
-    if not intervals:
+def tracks_file(wig):
+    '''Returns binary file containing tracks of wig.'''
+    directory, name = os.path.split(wig)
+    return os.path.join(directory, '.' + name + '.npz')
+
+
+def save_tracks(wig, tracks):
+    '''Saves tracks of wig in a binary file next to wig.'''
+    import numpy as np
+    names = list(tracks)
+    stat = os.stat(wig)
+    lengths = [len(tracks[name][0]) for name in names]
+    try:
+        with open(tracks_file(wig), 'wb') as outfile:
+            np.savez(outfile, state=np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64), names=np.array(names, dtype=str),
+                     offsets=np.cumsum([0] + lengths), positions=np.concatenate([tracks[name][0] for name in names] + [np.zeros(0, dtype=np.int64)]),
+                     scores=np.concatenate([tracks[name][1] for name in names] + [np.zeros(0, dtype=np.float64)]))
+    except OSError as e:
+        logging.warning('Could not save tracks of {}: {}'.format(wig, e))
+
+
+def load_tracks(wig):
+    '''Returns tracks of wig saved by save_tracks or None if they were not saved or wig changed since then.'''
+    import numpy as np
+    stat = os.stat(wig)
+    try:
+        with np.load(tracks_file(wig)) as data:
+            if data['state'].tolist() != [stat.st_size, stat.st_mtime_ns]:
+                return None
+            names, offsets, positions, scores = data['names'], data['offsets'], data['positions'], data['scores']
+    except (OSError, ValueError, KeyError):
+        return None
+    logging.debug('Loading tracks of {} from {}'.format(wig, tracks_file(wig)))
+    return {str(name): (positions[start:end], scores[start:end]) for name, start, end in zip(names, offsets[:-1], offsets[1:])}
+
+
+def highest_signal(track, start, end, last=False):
+    '''Returns position and score having the highest signal between specified coordinates, the last position is returned on ties if last is True.'''
+    import numpy as np
+    positions, scores = track
+    first = np.searchsorted(positions, start, side='left')
+    stop = np.searchsorted(positions, end, side='left')
+    if first >= stop:
         return None
-    max = intervals[0]
-    for interval in intervals:
-        if interval[1] > max[1]:
-            max = interval
-    return max
+    window = scores[first:stop]
+    index = stop - 1 - int(np.argmax(window[::-1])) if last else first + int(np.argmax(window))
+    return int(positions[index]), window[index - first]
 
 
 if __name__ == '__main__':
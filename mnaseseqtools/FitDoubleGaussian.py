@@ -1,12 +1,9 @@
 import logging
 
 import click
-from lmfit.models import GaussianModel, ConstantModel
 
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
 import seqtools.Split as sb
+from seqtools.process import Jobs
 from seqtools.txt import Parser
 
 
@@ -55,26 +52,28 @@ from seqtools.txt import Parser
               help='Suffix to append to sample name.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def fitdoublegaussian(samples, absolute, components, gaussian, svg, verbose, center1, cmin1, cmax1, amp1, amin1, sigma1, smin1, center2, cmin2, cmax2, amp2, amin2, sigma2, smin2, suffix, index):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
+def fitdoublegaussian(samples, absolute, components, gaussian, svg, verbose, center1, cmin1, cmax1, amp1, amin1, sigma1, smin1, center2, cmin2, cmax2, amp2, amin2, sigma2, smin2, suffix, index, jobs):
     '''Fits double gaussian curve to dyad coverage.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    fit_double_gaussian(samples, absolute, components, gaussian, svg, verbose, center1, cmin1, cmax1, amp1, amin1, sigma1, smin1, center2, cmin2, cmax2, amp2, amin2, sigma2, smin2, suffix, index)
+    fit_double_gaussian(samples, absolute, components, gaussian, svg, verbose, center1, cmin1, cmax1, amp1, amin1, sigma1, smin1, center2, cmin2, cmax2, amp2, amin2, sigma2, smin2, suffix, index, jobs)
 
 
-def fit_double_gaussian(samples='samples.txt', absolute=False, components=False, gaussian=False, svg=False, verbose=False, center1=None, cmin1=None, cmax1=None, amp1=None, amin1=None, sigma1=None, smin1=None, center2=None, cmin2=None, cmax2=None, amp2=None, amin2=None, sigma2=None, smin2=None, suffix=None, index=None):
+def fit_double_gaussian(samples='samples.txt', absolute=False, components=False, gaussian=False, svg=False, verbose=False, center1=None, cmin1=None, cmax1=None, amp1=None, amin1=None, sigma1=None, smin1=None, center2=None, cmin2=None, cmax2=None, amp2=None, amin2=None, sigma2=None, smin2=None, suffix=None, index=None, jobs=1):
     '''Fits double gaussian curve to dyad coverage.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        fit_double_gaussian_sample(sample, absolute, components, gaussian, svg, verbose, center1, cmin1, cmax1, amp1, amin1, sigma1, smin1, center2, cmin2, cmax2, amp2, amin2, sigma2, smin2, suffix)
-        splits = sb.splits(sample)
-        for split in splits:
-            fit_double_gaussian_sample(split, absolute, components, gaussian, svg, verbose, center1, cmin1, cmax1, amp1, amin1, sigma1, smin1, center2, cmin2, cmax2, amp2, amin2, sigma2, smin2, suffix)
+    Jobs.run(fit_double_gaussian_sample, [(name, absolute, components, gaussian, svg, verbose, center1, cmin1, cmax1, amp1, amin1, sigma1, smin1, center2, cmin2, cmax2, amp2, amin2, sigma2, smin2, suffix) for name in sb.samples_splits(sample_names)], jobs)
            
 
 def fit_double_gaussian_sample(sample, absolute=False, components=False, gaussian=False, svg=False, verbose=False, center1=None, cmin1=None, cmax1=None, amp1=None, amin1=None, sigma1=None, smin1=None, center2=None, cmin2=None, cmax2=None, amp2=None, amin2=None, sigma2=None, smin2=None, suffix=None):
     '''Fits double gaussian curve to dyad coverage for a single sample.'''
+    from lmfit.models import GaussianModel, ConstantModel
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import pandas as pd
     print ('Fits double gaussian curve to dyad coverage of sample {}'.format(sample))
     input = sample + (suffix if suffix else '') + '-dyad.txt'
     dyads = pd.read_csv(input, sep='\t', index_col=0, comment='#')
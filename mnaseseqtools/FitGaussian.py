@@ -1,12 +1,9 @@
 import logging
 
 import click
-from lmfit.models import GaussianModel, ConstantModel
 
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
 import seqtools.Split as sb
+from seqtools.process import Jobs
 from seqtools.txt import Parser
 
 
@@ -39,26 +36,28 @@ from seqtools.txt import Parser
               help='Suffix to append to sample name.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def fitgaussian(samples, absolute, components, svg, verbose, center, cmin, cmax, amp, amin, sigma, smin, suffix, index):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
+def fitgaussian(samples, absolute, components, svg, verbose, center, cmin, cmax, amp, amin, sigma, smin, suffix, index, jobs):
     '''Fits gaussian curve to dyad coverage.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    fit_gaussian(samples, absolute, components, svg, verbose, center, cmin, cmax, amp, amin, sigma, smin, suffix, index)
+    fit_gaussian(samples, absolute, components, svg, verbose, center, cmin, cmax, amp, amin, sigma, smin, suffix, index, jobs)
 
 
-def fit_gaussian(samples='samples.txt', absolute=False, components=False, svg=False, verbose=False, center=None, cmin=None, cmax=None, amp=None, amin=None, sigma=None, smin=None, suffix=None, index=None):
+def fit_gaussian(samples='samples.txt', absolute=False, components=False, svg=False, verbose=False, center=None, cmin=None, cmax=None, amp=None, amin=None, sigma=None, smin=None, suffix=None, index=None, jobs=1):
     '''Fits gaussian curve to dyad coverage.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        fit_gaussian_sample(sample, absolute, components, svg, verbose, center, cmin, cmax, amp, amin, sigma, smin, suffix)
-        splits = sb.splits(sample)
-        for split in splits:
-            fit_gaussian_sample(split, absolute, components, svg, verbose, center, cmin, cmax, amp, amin, sigma, smin, suffix)
+    Jobs.run(fit_gaussian_sample, [(name, absolute, components, svg, verbose, center, cmin, cmax, amp, amin, sigma, smin, suffix) for name in sb.samples_splits(sample_names)], jobs)
 
 
 def fit_gaussian_sample(sample, absolute=False, components=False, svg=False, verbose=False, center=None, cmin=None, cmax=None, amp=None, amin=None, sigma=None, smin=None, suffix=None):
     '''Fits gaussian curve to dyad coverage for a single sample.'''
+    from lmfit.models import GaussianModel, ConstantModel
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import pandas as pd
     print ('Fits gaussian curve to dyad coverage of sample {}'.format(sample))
     input = sample + (suffix if suffix else '') + '-dyad.txt'
     dyads = pd.read_csv(input, sep='\t', index_col=0, comment='#')
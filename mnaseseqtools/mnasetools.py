@@ -1,18 +1,26 @@
 import click
 
-from mnaseseqtools import DyadCoverage, DyadStatistics, FitDoubleGaussian, FitGaussian, FirstDyadPosition
+from seqtools.bigwig import BigWigCache
+from seqtools.process import LazyGroup, Manifest
+from seqtools.seqtools import validate_memory
 
 
-@click.group()
-def mnasetools():
-    pass
+@click.group(cls=LazyGroup.LazyGroup)
+@click.option('--bigwig-mem', callback=validate_memory, default='512M', show_default=True,
+              help='Memory used to keep blocks of bigWig files read by a process, like 500M or 2G.')
+@click.option('--force', is_flag=True,
+              help='Create outputs even if they are up to date with their inputs.')
+def mnasetools(bigwig_mem, force):
+    BigWigCache.MEMORY = bigwig_mem
+    Manifest.FORCE = force
 
 
-mnasetools.add_command(DyadCoverage.dyadcov)
-mnasetools.add_command(DyadStatistics.dyadstatistics)
-mnasetools.add_command(FitDoubleGaussian.fitdoublegaussian)
-mnasetools.add_command(FitGaussian.fitgaussian)
-mnasetools.add_command(FirstDyadPosition.firstdyadposition)
+mnasetools.add_lazy_command('callnucleosomes', 'mnaseseqtools.CallNucleosomes.callnucleosomes')
+mnasetools.add_lazy_command('dyadcov', 'mnaseseqtools.DyadCoverage.dyadcov')
+mnasetools.add_lazy_command('dyadstatistics', 'mnaseseqtools.DyadStatistics.dyadstatistics')
+mnasetools.add_lazy_command('fitdoublegaussian', 'mnaseseqtools.FitDoubleGaussian.fitdoublegaussian')
+mnasetools.add_lazy_command('fitgaussian', 'mnaseseqtools.FitGaussian.fitgaussian')
+mnasetools.add_lazy_command('firstdyadposition', 'mnaseseqtools.FirstDyadPosition.firstdyadposition')
 
 if __name__ == '__main__':
    mnasetools()
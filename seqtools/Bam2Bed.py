@@ -1,13 +1,21 @@
-from distutils.command.check import check
+import csv
+import heapq
+import io
 import logging
 import os
+import shutil
 import subprocess
 import tempfile
 
 import click
 from seqtools.bed import Bed
+from seqtools.process import Jobs, Manifest, Pipe
 from seqtools.txt import Parser
 
+BEDPE_BLOCK_SIZE = 67108864
+ENGINES = ['bedtools', 'native']
+TILE_SIZE = 10000000
+
 
 @click.command()
 @click.option('--samples', '-s', type=click.Path(exists=True), default='samples.txt', show_default=True,
@@ -20,33 +28,190 @@ from seqtools.txt import Parser
               help='Suffix added to sample name in BAM filename for input.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def bam2bed(samples, paired, threads, input_suffix, index):
+@click.option('--stream/--no-stream', default=False, show_default=True,
+              help='Merge paired reads while reading bedtools output and sort them without writing temporary files.')
+@click.option('--engine', type=click.Choice(ENGINES), default='bedtools', show_default=True,
+              help='Program used to convert BAM - native reads coordinate sorted BAM without sorting it by name.')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel - threads are divided between samples.')
+def bam2bed(samples, paired, threads, input_suffix, index, stream, engine, jobs):
     '''Converts BAM file to BED for samples.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    bam2bed_samples(samples, paired, threads, input_suffix, index)
+    bam2bed_samples(samples, paired, threads, input_suffix, index, stream, engine, jobs)
 
 
-def bam2bed_samples(samples='samples.txt', paired=True, threads=None, input_suffix='', index=None):
+def bam2bed_samples(samples='samples.txt', paired=True, threads=None, input_suffix='', index=None, stream=False, engine='bedtools', jobs=1):
     '''Converts BAM file to BED for samples.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        bam2bed_sample(sample, paired, threads, input_suffix)
+    sample_threads = Jobs.split_threads(threads, jobs)
+    Jobs.run(bam2bed_sample, [(sample, paired, sample_threads, input_suffix, stream, engine) for sample in sample_names], jobs)
 
 
-def bam2bed_sample(sample, paired, threads=None, input_suffix=''):
+def bam2bed_sample(sample, paired, threads=None, input_suffix='', stream=False, engine='bedtools'):
     '''Converts BAM file to BED for a single sample.'''
     print ('Converting BAM to BED for sample {}'.format(sample))
     bam = sample + input_suffix + '.bam'
     bed = sample + '.bed'
-    if paired:
+    if Manifest.up_to_date([bed], [bam], [paired, engine]):
+        return
+    if engine == 'native':
+        bam2bed_native(bam, bed, paired, threads)
+    elif paired and stream:
+        bam2bed_stream(bam, bed, threads)
+    elif paired:
         bedpe_o, bedpe = tempfile.mkstemp(suffix='.bedpe')
         bam2bedpe(bam, bedpe, threads)
         bedpe2bed(bedpe, bed)
         os.remove(bedpe)
     else:
         bam2bed_unpaired(bam, bed)
+    Manifest.record([bed], [bam], [paired, engine])
+
+
+def bam2bed_native(bam, bed, paired=True, threads=None):
+    '''
+    Converts coordinate sorted BAM file to BED without sorting BAM by name or sorting BED, paired reads are merged into fragments.
+
+    Output is the same as bedtools bamtobed followed by Bed.sort, except that pairs with an unmapped mate or a mate on another chromosome are skipped.
+    Regions of BAM are converted in parallel when threads is greater than 1.
+    '''
+    import pysam
+    print ('Converting BAM {} to BED {} using native engine'.format(bam, bed))
+    if not os.path.isfile(bam + '.bai') and not os.path.isfile(bam + '.csi'):
+        logging.debug('Indexing BAM {}'.format(bam))
+        pysam.index(str(bam))
+    with pysam.AlignmentFile(bam, 'rb') as infile:
+        regions = bam_regions(infile)
+    index = Bed.new_index()
+    if threads and threads > 1:
+        futures = []
+        try:
+            with Jobs.executor(threads) as executor:
+                futures = [executor.submit(region_bed, bam, reference, region_start, region_end, paired) for reference, region_start, region_end in regions]
+                with open(bed, 'w') as outfile:
+                    for future in futures:
+                        region_output, region_index = future.result()
+                        with open(region_output, 'r') as infile:
+                            shutil.copyfileobj(infile, outfile)
+                        os.remove(region_output)
+                        Bed.add_index(index, region_index)
+        finally:
+            for future in futures:
+                if future.done() and not future.cancelled() and future.exception() is None and os.path.exists(future.result()[0]):
+                    os.remove(future.result()[0])
+    else:
+        with pysam.AlignmentFile(bam, 'rb') as infile, open(bed, 'w') as outfile:
+            for reference, region_start, region_end in regions:
+                outfile.writelines(Bed.indexed(region_annotations(infile, reference, region_start, region_end, paired), index))
+    Bed.write_index(bed, index)
+
+
+def bam_regions(infile, tile_size=None):
+    '''Returns regions of BAM as (reference, start, end) tuples, references are sorted by name and split in tiles.'''
+    tile_size = tile_size if tile_size else TILE_SIZE
+    regions = []
+    for reference in sorted(infile.references):
+        length = infile.get_reference_length(reference)
+        for region_start in range(0, length, tile_size):
+            regions.append((reference, region_start, min(region_start + tile_size, length)))
+    return regions
+
+
+def region_bed(bam, reference, region_start, region_end, paired=True):
+    '''Converts a region of BAM file to a temporary BED file, returns BED file and its index.'''
+    import pysam
+    index = Bed.new_index()
+    region_output_o, region_output = tempfile.mkstemp(suffix='.bed')
+    with pysam.AlignmentFile(bam, 'rb') as infile, open(region_output_o, 'w') as outfile:
+        outfile.writelines(Bed.indexed(region_annotations(infile, reference, region_start, region_end, paired), index))
+    return region_output, index
+
+
+def region_annotations(infile, reference, region_start, region_end, paired=True):
+    '''Yields BED lines of annotations starting inside region of BAM, sorted by start and end.'''
+    if paired:
+        return paired_fragments(infile.fetch(reference, region_start), reference, region_start, region_end)
+    else:
+        return read_annotations(infile.fetch(reference, region_start, region_end), reference, region_start, region_end)
+
+
+def paired_fragments(reads, reference, region_start=None, region_end=None):
+    '''
+    Yields BED lines of fragments from coordinate sorted paired reads of a single reference, sorted by start and end.
+
+    Reads waiting for their mate are kept until the mate's position is passed. Fragments are kept until no fragment can start before them.
+    When a region is specified, only fragments starting inside region are returned.
+    '''
+    pending = {}
+    expected_mates = []
+    fragments = []
+    orphans = 0
+    for read in reads:
+        if read.is_unmapped or read.is_secondary or read.is_supplementary or not read.is_paired:
+            continue
+        start = read.reference_start
+        if region_start is not None and start < region_start:
+            continue
+        while expected_mates and expected_mates[0][0] < start:
+            key = heapq.heappop(expected_mates)[1]
+            if key in pending:
+                del pending[key]
+                orphans += 1
+        after_region = region_end is not None and start >= region_end
+        if after_region and not pending:
+            break
+        if read.mate_is_unmapped or read.next_reference_id != read.reference_id:
+            orphans += 0 if after_region else 1
+            continue
+        mate_start = read.next_reference_start
+        mate = pending.pop((read.query_name, mate_start, start), None)
+        if mate is not None:
+            read1 = read if read.is_read1 or not mate.is_read1 else mate
+            end = max(mate.reference_end, read.reference_end)
+            line = '{}\t{}\t{}\t{}\t{}\t{}\n'.format(reference, mate.reference_start, end, read.query_name, min(mate.mapping_quality, read.mapping_quality), '-' if read1.is_reverse else '+')
+            heapq.heappush(fragments, (mate.reference_start, end, line))
+        elif after_region or (region_start is not None and mate_start < region_start):
+            pass
+        elif mate_start < start:
+            orphans += 1
+        else:
+            key = (read.query_name, start, mate_start)
+            pending[key] = read
+            heapq.heappush(expected_mates, (mate_start, key))
+        limit = start
+        if pending:
+            limit = min(limit, next(iter(pending.values())).reference_start)
+        while fragments and fragments[0][0] < limit:
+            yield heapq.heappop(fragments)[2]
+    orphans += len(pending)
+    while fragments:
+        yield heapq.heappop(fragments)[2]
+    if orphans:
+        logging.warning('Skipped {} reads on {} without a mate on the same chromosome'.format(orphans, reference))
+
+
+def read_annotations(reads, reference, region_start=None, region_end=None):
+    '''Yields BED lines of coordinate sorted reads of a single reference, sorted by start and end. When a region is specified, only reads starting inside region are returned.'''
+    annotations = []
+    for read in reads:
+        if read.is_unmapped:
+            continue
+        start = read.reference_start
+        if (region_start is not None and start < region_start) or (region_end is not None and start >= region_end):
+            continue
+        while annotations and annotations[0][0] < start:
+            yield heapq.heappop(annotations)[2]
+        name = read.query_name
+        if read.is_paired and read.is_read1:
+            name += '/1'
+        if read.is_paired and read.is_read2:
+            name += '/2'
+        line = '{}\t{}\t{}\t{}\t{}\t{}\n'.format(reference, start, read.reference_end, name, read.mapping_quality, '-' if read.is_reverse else '+')
+        heapq.heappush(annotations, (start, read.reference_end, line))
+    while annotations:
+        yield heapq.heappop(annotations)[2]
 
 
 def bam2bed_unpaired(bam, bed):
@@ -77,6 +242,53 @@ def bam2bedpe(bam, bedpe, threads=None):
     os.remove(sort_output)
 
 
+def bam2bed_stream(bam, bed, threads=None):
+    '''Converts BAM file to BED by merging the paired reads without writing temporary files.'''
+    print ('Converting BAM {} to BED {} by merging the paired reads'.format(bam, bed))
+    sort_cmd = ['samtools', 'sort', '-n', '-u']
+    if not threads is None and threads > 1:
+        sort_cmd.extend(['--threads', str(threads - 1)])
+    sort_cmd.append(bam)
+    bamtobed_cmd = ['bedtools', 'bamtobed', '-bedpe', '-mate1', '-i', 'stdin']
+    with Pipe.pipe_output([sort_cmd, bamtobed_cmd]) as bedpe:
+        Bed.sort_blocks(bedpe2bed_blocks(bedpe), bed)
+
+
+def bedpe2bed_blocks(bedpe, block_size=BEDPE_BLOCK_SIZE):
+    '''Reads BEDPE binary stream by blocks and yields BED text of merged paired reads.'''
+    remainder = b''
+    while True:
+        block = bedpe.read(block_size)
+        if not block:
+            break
+        block = remainder + block
+        last_line = block.rfind(b'\n') + 1
+        remainder = block[last_line:]
+        if last_line > 0:
+            yield bedpe2bed_block(block[:last_line])
+    if remainder.strip():
+        yield bedpe2bed_block(remainder + b'\n')
+
+
+def bedpe2bed_block(block):
+    '''Converts complete lines of BEDPE to BED by merging the paired reads.'''
+    import numpy as np
+    import pandas as pd
+    try:
+        bedpe = pd.read_csv(io.BytesIO(block), sep='\t', header=None, dtype=str, na_filter=False, quoting=csv.QUOTE_NONE)
+    except pd.errors.EmptyDataError:
+        return ''
+    bed = bedpe.drop(columns=[3, 4, 5, 9])
+    bed[1] = np.minimum(bedpe[1].astype(np.int64).values, bedpe[4].astype(np.int64).values)
+    bed[2] = np.maximum(bedpe[2].astype(np.int64).values, bedpe[5].astype(np.int64).values)
+    output = io.StringIO()
+    bed.to_csv(output, sep='\t', header=False, index=False, quoting=csv.QUOTE_NONE)
+    text = output.getvalue()
+    if os.linesep != '\n':
+        text = text.replace(os.linesep, '\n')
+    return text
+
+
 def bedpe2bed(bedpe, bed):
     '''Converts BEDPE file to BED by merging the paired reads.'''
     print ('Converting BAM BEDPE {} to BED {} by merging the paired reads'.format(bedpe, bed))
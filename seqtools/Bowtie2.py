@@ -1,10 +1,10 @@
-from distutils.command.check import check
 import logging
 import os
 import subprocess
 import tempfile
 
 import click
+from seqtools.process import Jobs, Manifest, Pipe
 from seqtools.seq import Fastq
 from seqtools.txt import Parser
 
@@ -20,23 +20,27 @@ from seqtools.txt import Parser
               help='Suffix added to sample name in BAM filename for output.')
 @click.option('--index', type=int, default=None,
               help='Index of sample to process in samples file.')
+@click.option('--stream/--no-stream', default=False, show_default=True,
+              help='Pipe bowtie2 output directly into samtools sort without intermediate files.')
+@click.option('--jobs', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel - threads are divided between samples.')
 @click.argument('bowtie_args', nargs=-1, type=click.UNPROCESSED)
-def bowtie2(samples, threads, output_suffix, index, bowtie_args):
+def bowtie2(samples, threads, output_suffix, index, stream, jobs, bowtie_args):
     '''Align samples using bowtie2 program.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    bowtie_samples(samples, threads, output_suffix, index, bowtie_args)
+    bowtie_samples(samples, threads, output_suffix, index, bowtie_args, stream, jobs)
 
 
-def bowtie_samples(samples='samples.txt', threads=None, output_suffix='', index=None, bowtie_args=()):
+def bowtie_samples(samples='samples.txt', threads=None, output_suffix='', index=None, bowtie_args=(), stream=False, jobs=1):
     '''Align samples using bowtie2 program.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        bowtie_sample(sample, threads, output_suffix, bowtie_args)
+    sample_threads = Jobs.split_threads(threads, jobs)
+    Jobs.run(bowtie_sample, [(sample, sample_threads, output_suffix, bowtie_args, stream) for sample in sample_names], jobs)
 
 
-def bowtie_sample(sample, threads=None, output_suffix='', bowtie_args=()):
+def bowtie_sample(sample, threads=None, output_suffix='', bowtie_args=(), stream=False):
     '''Align one sample using bowtie2 program.'''
     print ('Running bowtie2 on sample {}'.format(sample))
     fastq1 = Fastq.fastq(sample, 1)
@@ -45,11 +49,18 @@ def bowtie_sample(sample, threads=None, output_suffix='', bowtie_args=()):
     fastq2 = Fastq.fastq(sample, 2)
     paired = fastq2 is not None and os.path.isfile(fastq2)
     bam = sample + output_suffix + '.bam'
-    run_bowtie(fastq1, fastq2, bam, threads, bowtie_args)
+    fastqs = [fastq1, fastq2] if paired else [fastq1]
+    if Manifest.up_to_date([bam], fastqs, bowtie_args):
+        return
+    run_bowtie(fastq1, fastq2, bam, threads, bowtie_args, stream)
+    Manifest.record([bam], fastqs, bowtie_args)
 
 
-def run_bowtie(fastq1, fastq2, bam_output, threads=None, bowtie_args=()):
+def run_bowtie(fastq1, fastq2, bam_output, threads=None, bowtie_args=(), stream=False):
     '''Run bowtie2 on FASTQ files.'''
+    if stream:
+        run_bowtie_stream(fastq1, fastq2, bam_output, threads, bowtie_args)
+        return
     sam_output_o, sam_output = tempfile.mkstemp(suffix='.sam')
     cmd = ['bowtie2'] + list(bowtie_args)
     if not threads is None and threads > 1:
@@ -72,6 +83,23 @@ def run_bowtie(fastq1, fastq2, bam_output, threads=None, bowtie_args=()):
     sort(view_bam, bam_output, threads)
 
 
+def run_bowtie_stream(fastq1, fastq2, bam_output, threads=None, bowtie_args=()):
+    '''Run bowtie2 on FASTQ files and pipe alignments into samtools sort without writing intermediate files.'''
+    bowtie_threads, sort_threads = Pipe.split_threads(threads)
+    cmd = ['bowtie2'] + list(bowtie_args)
+    if bowtie_threads > 1:
+        cmd.extend(['-p', str(bowtie_threads)])
+    if fastq2 is not None and os.path.isfile(fastq2):
+        cmd.extend(['-1', fastq1, '-2', fastq2])
+    else:
+        cmd.extend(['-U', fastq1])
+    sort_cmd = ['samtools', 'sort']
+    if sort_threads > 0:
+        sort_cmd.extend(['--threads', str(sort_threads)])
+    sort_cmd.extend(['-o', bam_output, '-'])
+    Pipe.pipe([cmd, sort_cmd])
+
+
 def sort(bam_input, bam_output, threads=None):
     '''Sort BAM file.'''
     cmd = ['samtools', 'sort']
@@ -1,10 +1,10 @@
-from distutils.command.check import check
 import logging
 import os
 import subprocess
 import tempfile
 
 import click
+from seqtools.process import Jobs, Manifest, Pipe
 from seqtools.seq import Fastq
 from seqtools.txt import Parser
 
@@ -22,23 +22,27 @@ from seqtools.txt import Parser
               help='Suffix added to sample name in BAM filename for output.')
 @click.option('--index', type=int, default=None,
               help='Index of sample to process in samples file.')
+@click.option('--stream/--no-stream', default=False, show_default=True,
+              help='Pipe bwa output directly into samtools sort without intermediate files.')
+@click.option('--jobs', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel - threads are divided between samples.')
 @click.argument('bwa_args', nargs=-1, type=click.UNPROCESSED)
-def bwa(samples, fasta, threads, output_suffix, index, bwa_args):
+def bwa(samples, fasta, threads, output_suffix, index, stream, jobs, bwa_args):
     '''Align samples using bwa program.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    bwa_samples(samples, fasta, threads, output_suffix, index, bwa_args)
+    bwa_samples(samples, fasta, threads, output_suffix, index, bwa_args, stream, jobs)
 
 
-def bwa_samples(samples='samples.txt', fasta='sacCer3.fa', threads=None, output_suffix='', index=None, bwa_args=()):
+def bwa_samples(samples='samples.txt', fasta='sacCer3.fa', threads=None, output_suffix='', index=None, bwa_args=(), stream=False, jobs=1):
     '''Align samples using bwa program.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        bwa_sample(sample, fasta, threads, output_suffix, bwa_args)
+    sample_threads = Jobs.split_threads(threads, jobs)
+    Jobs.run(bwa_sample, [(sample, fasta, sample_threads, output_suffix, bwa_args, stream) for sample in sample_names], jobs)
 
 
-def bwa_sample(sample, fasta, threads=None, output_suffix='', bwa_args=()):
+def bwa_sample(sample, fasta, threads=None, output_suffix='', bwa_args=(), stream=False):
     '''Align one sample using bwa program.'''
     print ('Running BWA on sample {}'.format(sample))
     fastq1 = Fastq.fastq(sample, 1)
@@ -47,7 +51,11 @@ def bwa_sample(sample, fasta, threads=None, output_suffix='', bwa_args=()):
     fastq2 = Fastq.fastq(sample, 2)
     paired = fastq2 is not None and os.path.isfile(fastq2)
     bam = sample + output_suffix + '.bam'
-    run_bwa(fastq1, fastq2, fasta, bam, threads, bwa_args)
+    inputs = [fasta, fastq1, fastq2] if paired else [fasta, fastq1]
+    if Manifest.up_to_date([bam], inputs, bwa_args):
+        return
+    run_bwa(fastq1, fastq2, fasta, bam, threads, bwa_args, stream)
+    Manifest.record([bam], inputs, bwa_args)
 
 
 def bwa_index(fasta):
@@ -57,8 +65,11 @@ def bwa_index(fasta):
     subprocess.run(bwa_index_cmd, check=True)
 
 
-def run_bwa(fastq1, fastq2, fasta, bam_output, threads=None, bwa_args=()):
+def run_bwa(fastq1, fastq2, fasta, bam_output, threads=None, bwa_args=(), stream=False):
     '''Run BWA on FASTQ files.'''
+    if stream:
+        run_bwa_stream(fastq1, fastq2, fasta, bam_output, threads, bwa_args)
+        return
     sam_output_o, sam_output = tempfile.mkstemp(suffix='.sam')
     cmd = ['bwa', 'mem'] + list(bwa_args)
     if not threads is None and threads > 1:
@@ -80,6 +91,22 @@ def run_bwa(fastq1, fastq2, fasta, bam_output, threads=None, bwa_args=()):
     os.remove(view_bam)
 
 
+def run_bwa_stream(fastq1, fastq2, fasta, bam_output, threads=None, bwa_args=()):
+    '''Run BWA on FASTQ files and pipe alignments into samtools sort without writing intermediate files.'''
+    bwa_threads, sort_threads = Pipe.split_threads(threads)
+    cmd = ['bwa', 'mem'] + list(bwa_args)
+    if bwa_threads > 1:
+        cmd.extend(['-t', str(bwa_threads)])
+    cmd.extend([fasta, fastq1])
+    if fastq2 is not None and os.path.isfile(fastq2):
+        cmd.append(fastq2)
+    sort_cmd = ['samtools', 'sort']
+    if sort_threads > 0:
+        sort_cmd.extend(['--threads', str(sort_threads)])
+    sort_cmd.extend(['-o', bam_output, '-'])
+    Pipe.pipe([cmd, sort_cmd])
+
+
 def sort(bam_input, bam_output, threads=None):
     '''Sort BAM file.'''
     cmd = ['samtools', 'sort']
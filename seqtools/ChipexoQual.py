@@ -1,9 +1,9 @@
-from distutils.command.check import check
 import logging
 import os
 import subprocess
 
 import click
+from seqtools.process import Jobs
 from seqtools.txt import Parser
 
 
@@ -16,22 +16,21 @@ from seqtools.txt import Parser
               help='Suffix added to sample name in BAM filename for input.')
 @click.option('--index', type=int, default=None,
               help='Index of sample to process in samples file.')
+@click.option('--jobs', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
 @click.argument('chipexoqual_args', nargs=-1, type=click.UNPROCESSED)
-def chipexoqual(datasets, suffix, index, chipexoqual_args):
+def chipexoqual(datasets, suffix, index, jobs, chipexoqual_args):
     '''Run ChIPexoQual on datasets.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    chipexoqual_datasets(datasets, suffix, index, chipexoqual_args)
+    chipexoqual_datasets(datasets, suffix, index, chipexoqual_args, jobs)
 
 
-def chipexoqual_datasets(datasets='dataset.txt', suffix='', index=None, chipexoqual_args=()):
+def chipexoqual_datasets(datasets='dataset.txt', suffix='', index=None, chipexoqual_args=(), jobs=1):
     '''Run ChIPexoQual on datasets.'''
     datasets_columns = Parser.columns(datasets)
     if index != None:
         datasets_columns = [datasets_columns[index]]
-    for columns in datasets_columns:
-        name = columns[0]
-        samples = [sample for sample in columns[1:]]
-        chipexoqual_dataset(name, samples, suffix, chipexoqual_args)
+    Jobs.run(chipexoqual_dataset, [(columns[0], [sample for sample in columns[1:]], suffix, chipexoqual_args) for columns in datasets_columns], jobs)
 
 
 def chipexoqual_dataset(dataset, samples, suffix='', chipexoqual_args=()):
@@ -1,9 +1,9 @@
-from distutils.command.check import check
 import logging
 import os
 import subprocess
 
 import click
+from seqtools.process import Jobs
 from seqtools.seq import Fastq
 from seqtools.txt import Parser
 
@@ -20,21 +20,26 @@ from seqtools.txt import Parser
               help='Memory allocated for sorting download.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def download(samples, fast, threads, mem, index):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel - threads are divided between samples.')
+def download(samples, fast, threads, mem, index, jobs):
     '''Download reads of all samples.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    download_samples(samples, fast, threads, mem, index)
+    download_samples(samples, fast, threads, mem, index, jobs)
 
 
-def download_samples(samples='samples.txt', fast=True, threads=None, mem='100MB', index=None):
+def download_samples(samples='samples.txt', fast=True, threads=None, mem='100MB', index=None, jobs=1):
     '''Download reads of all samples.'''
     sample_columns = Parser.columns(samples)
     if index != None:
         sample_columns = [sample_columns[index]]
+    sample_threads = Jobs.split_threads(threads, jobs)
+    tasks = []
     for columns in sample_columns:
         sample = columns[0]
         srr = columns[1] if len(columns) > 1 else None
-        download_sample(sample, srr, fast, threads, mem)
+        tasks.append((sample, srr, fast, sample_threads, mem))
+    Jobs.run(download_sample, tasks, jobs)
 
 
 def download_sample(sample, srr, fast, threads, mem):
@@ -1,12 +1,15 @@
-from distutils.command.check import check
 import logging
 import os
 import subprocess
 import tempfile
 
 import click
+from seqtools.process import Jobs, Manifest, Pipe
 from seqtools.txt import Parser
 
+# Share of threads of sort -n, fixmate, sort and markdup when removing duplicates with piped commands.
+STREAM_WEIGHTS = (3, 1, 3, 1)
+
 
 @click.command()
 @click.option('--samples', '-s', type=click.Path(exists=True), default='samples.txt', show_default=True,
@@ -23,34 +26,45 @@ from seqtools.txt import Parser
               help='Suffix added to sample name in BAM filename for output.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def filterbam(samples, paired, dedup, threads, input_suffix, output_suffix, index):
+@click.option('--stream/--no-stream', default=False, show_default=True,
+              help='Pipe samtools commands together using uncompressed intermediates instead of temporary BAM files.')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel - threads are divided between samples.')
+def filterbam(samples, paired, dedup, threads, input_suffix, output_suffix, index, stream, jobs):
     '''Filter BAM file to keep only properly paired reads and remove supplementary alignments and duplicates.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    filter_bam(samples, paired, dedup, threads, input_suffix, output_suffix, index)
+    filter_bam(samples, paired, dedup, threads, input_suffix, output_suffix, index, stream, jobs)
 
 
-def filter_bam(samples='samples.txt', paired=True, dedup=True, threads=None, input_suffix='', output_suffix='', index=None):
+def filter_bam(samples='samples.txt', paired=True, dedup=True, threads=None, input_suffix='', output_suffix='', index=None, stream=False, jobs=1):
     '''Filter BAM file to keep only properly paired reads and remove supplementary alignments and duplicates.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        filter_bam_sample(sample, paired, dedup, threads, input_suffix, output_suffix)
+    sample_threads = Jobs.split_threads(threads, jobs)
+    Jobs.run(filter_bam_sample, [(sample, paired, dedup, sample_threads, input_suffix, output_suffix, stream) for sample in sample_names], jobs)
 
 
-def filter_bam_sample(sample, paired, dedup, threads=None, input_suffix='', output_suffix=''):
+def filter_bam_sample(sample, paired, dedup, threads=None, input_suffix='', output_suffix='', stream=False):
     '''Filter BAM file to keep only properly paired reads and remove supplementary alignments and duplicates.'''
     print ('Filtering BAM for sample {}'.format(sample))
     bam = sample + input_suffix + '.bam'
     bam_filtered = sample + output_suffix + '-filtered.bam'
-    filter_mapped(bam, bam_filtered, paired, threads)
+    bam_dedup = sample + output_suffix + '-dedup.bam'
+    outputs = [bam_filtered, bam_dedup] if dedup else [bam_filtered]
+    if Manifest.up_to_date(outputs, [bam], [paired]):
+        return
+    filter_mapped(bam, bam_filtered, paired, threads, stream)
     if dedup:
-        bam_dedup = sample + output_suffix + '-dedup.bam'
-        remove_duplicates(bam_filtered, bam_dedup, threads)
+        remove_duplicates(bam_filtered, bam_dedup, threads, stream)
+    Manifest.record(outputs, [bam], [paired])
 
 
-def filter_mapped(bam_input, bam_output, paired, threads=None):
+def filter_mapped(bam_input, bam_output, paired, threads=None, stream=False):
     '''Filter BAM file to remove poorly mapped sequences.'''
+    if stream:
+        filter_mapped_stream(bam_input, bam_output, paired, threads)
+        return
     print ('Filtering BAM {} to remove poorly mapped sequences'.format(bam_input))
     temp_o, temp = tempfile.mkstemp(suffix='.bam')
     cmd = ['samtools', 'view', '-b', '-F', '2048']
@@ -67,8 +81,27 @@ def filter_mapped(bam_input, bam_output, paired, threads=None):
     os.remove(temp)
 
 
-def remove_duplicates(bam_input, bam_output, threads=None):
+def filter_mapped_stream(bam_input, bam_output, paired, threads=None):
+    '''Filter BAM file to remove poorly mapped sequences, piping uncompressed output of samtools view into samtools sort.'''
+    print ('Filtering BAM {} to remove poorly mapped sequences'.format(bam_input))
+    cmd = ['samtools', 'view', '-u', '-F', '2048']
+    if bool(paired):
+        cmd.extend(['-f', '2'])
+    else:
+        cmd.extend(['-F', '4'])
+    cmd.append(bam_input)
+    sort_cmd = ['samtools', 'sort']
+    if not threads is None and threads > 1:
+        sort_cmd.extend(['--threads', str(threads - 1)])
+    sort_cmd.extend(['-o', bam_output, '-'])
+    Pipe.pipe([cmd, sort_cmd])
+
+
+def remove_duplicates(bam_input, bam_output, threads=None, stream=False):
     '''Remove duplicated sequences from BAM file.'''
+    if stream:
+        remove_duplicates_stream(bam_input, bam_output, threads)
+        return
     print ('Removing duplicated sequences from BAM {}'.format(bam_input))
     sort_bam_o, sort_bam = tempfile.mkstemp(suffix='.bam')
     cmd = ['samtools', 'sort', '-n']
@@ -100,6 +133,26 @@ def remove_duplicates(bam_input, bam_output, threads=None):
     os.remove(markdup)
 
 
+def remove_duplicates_stream(bam_input, bam_output, threads=None):
+    '''
+    Remove duplicated sequences from BAM file using piped samtools commands - markdup output is already sorted.
+
+    All commands run concurrently and share threads, sorts receive most of them.
+    '''
+    print ('Removing duplicated sequences from BAM {}'.format(bam_input))
+    sort_name_threads, fixmate_threads, sort_threads, markdup_threads = Pipe.split_stages_threads(threads, STREAM_WEIGHTS)
+    sort_name_cmd = ['samtools', 'sort', '-n', '-u'] + threads_args(sort_name_threads) + [bam_input]
+    fixmate_cmd = ['samtools', 'fixmate', '-m', '-u'] + threads_args(fixmate_threads) + ['-', '-']
+    sort_cmd = ['samtools', 'sort', '-u'] + threads_args(sort_threads) + ['-']
+    markdup_cmd = ['samtools', 'markdup', '-r'] + threads_args(markdup_threads) + ['-', bam_output]
+    Pipe.pipe([sort_name_cmd, fixmate_cmd, sort_cmd, markdup_cmd])
+
+
+def threads_args(threads):
+    '''Returns samtools arguments for additional threads.'''
+    return ['--threads', str(threads)] if threads > 0 else []
+
+
 def sort(bam_input, bam_output, threads=None):
     '''Sort BAM file.'''
     cmd = ['samtools', 'sort']
@@ -1,4 +1,3 @@
-from distutils.command.check import check
 import logging
 import os
 import subprocess
@@ -8,9 +7,13 @@ import click
 
 from seqtools import Split
 from seqtools.bed import Bed
+from seqtools.process import Jobs, Manifest
 from seqtools.txt import Parser
 
 BASE_SCALE = 1000000
+# Number of BED lines read at once by native engine.
+CHUNK_SIZE = 1000000
+ENGINES = ['bedtools', 'native']
 
 
 def validate_output_suffix(ctx, param, value):
@@ -63,8 +66,14 @@ def validate_control_suffix(ctx, param, value):
               help='Suffix added to sample name of BED file containing control(input) reads.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
+@click.option('--engine', type=click.Choice(ENGINES), default='bedtools', show_default=True,
+              help='Program used to compute coverage - native supports -5, -3, -fs and -du genomecov arguments.')
+@click.option('--single-pass', is_flag=True,
+              help='Compute coverage of samples and their splits by reading samples BED once, intervals are assigned to splits by their length - requires native engine, cannot be used with --input-suffix. Splits are found from their BED files, split must be run first.')
+@click.option('--jobs', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
 @click.argument('genomecov_args', nargs=-1, type=click.UNPROCESSED)
-def genomecov(samples, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, index, genomecov_args):
+def genomecov(samples, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, index, engine, single_pass, jobs, genomecov_args):
     '''
     Compute genome coverage on samples.
 
@@ -79,46 +88,126 @@ def genomecov(samples, genome, scale, strand, input_suffix, output_suffix, spike
           1000000 * spiked reads / (reads * control reads).
     '''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    genome_coverage_samples(samples, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, index, genomecov_args)
+    if single_pass and engine != 'native':
+        raise click.BadParameter('--single-pass requires native engine', param_hint='--single-pass')
+    if single_pass and input_suffix:
+        raise click.BadParameter('--single-pass assigns intervals to splits by their length and cannot be used with --input-suffix', param_hint='--single-pass')
+    genome_coverage_samples(samples, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, index, genomecov_args, engine, single_pass, jobs)
 
 
-def genome_coverage_samples(samples='samples.txt', genome='sacCer3.chrom.sizes', scale=None, strand=None, input_suffix='', output_suffix='-cov', spike_suffix=None, control_suffix=None, index=None, genomecov_args=()):
+def genome_coverage_samples(samples='samples.txt', genome='sacCer3.chrom.sizes', scale=None, strand=None, input_suffix='', output_suffix='-cov', spike_suffix=None, control_suffix=None, index=None, genomecov_args=(), engine='bedtools', single_pass=False, jobs=1):
     '''Compute genome coverage on samples.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        sample_splits_genome_coverage(sample, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, genomecov_args)
+    if jobs > 1 and not single_pass:
+        Jobs.run(genome_coverage, [(name, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, genomecov_args, engine) for name in Split.samples_splits(sample_names)], jobs)
+    else:
+        Jobs.run(sample_splits_genome_coverage, [(sample, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, genomecov_args, engine, single_pass) for sample in sample_names], jobs)
 
 
-def sample_splits_genome_coverage(sample, genome, scale=None, strand=None, input_suffix='', output_suffix='-cov', spike_suffix=None, control_suffix=None, genomecov_args=()):
+def sample_splits_genome_coverage(sample, genome, scale=None, strand=None, input_suffix='', output_suffix='-cov', spike_suffix=None, control_suffix=None, genomecov_args=(), engine='bedtools', single_pass=False):
     '''Compute genome coverage on a single sample.'''
     print ('Computing genome coverage on sample {}'.format(sample))
-    genome_coverage(sample, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, genomecov_args)
+    if single_pass:
+        sample_splits_native_coverage(sample, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, genomecov_args)
+        return
+    genome_coverage(sample, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, genomecov_args, engine)
     splits = Split.splits(sample)
     for split in splits:
-        genome_coverage(split, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, genomecov_args)
+        genome_coverage(split, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, genomecov_args, engine)
 
 
-def genome_coverage(sample, genome, scale=None, strand=None, input_suffix='', output_suffix='-cov', spike_suffix=None, control_suffix=None, genomecov_args=()):
+def genome_coverage(sample, genome, scale=None, strand=None, input_suffix='', output_suffix='-cov', spike_suffix=None, control_suffix=None, genomecov_args=(), engine='bedtools'):
     bed_source = sample + input_suffix + '.bed'
     print ('Computing genome coverage on BED {}'.format(bed_source))
+    bed, bigwig = coverage_outputs(sample, output_suffix, strand)
+    inputs = [bed_source, genome] + scale_inputs(sample, spike_suffix, control_suffix)
+    parameters = [scale, strand, genomecov_args]
+    if Manifest.up_to_date([bed, bigwig], inputs, parameters):
+        return
     if not scale or spike_suffix or control_suffix:
-        count = Bed.count_bed(bed_source)
-        scale = BASE_SCALE / max(count, 1)
-        if spike_suffix:
-            spiked_count = Bed.count_bed(sample + spike_suffix + '.bed')
-            scale = scale * spiked_count
-        if control_suffix:
-            control_count = Bed.count_bed(sample + control_suffix + '.bed')
-            scale = scale / control_count
-    bed = sample + output_suffix + '.bed'
-    bigwig = sample + output_suffix + '.bw'
+        scale = sample_scale(sample, Bed.count_bed(bed_source), spike_suffix, control_suffix)
+    if engine == 'native':
+        native_coverage(bed_source, bed, bigwig, genome, sample, scale, strand, genomecov_args)
+    else:
+        coverage(bed_source, bed, genome, sample, scale, strand, genomecov_args)
+        Bed.bedgraph_to_bigwig(bed, bigwig, genome)
+    Manifest.record([bed, bigwig], inputs, parameters)
+
+
+def sample_splits_native_coverage(sample, genome, scale=None, strand=None, input_suffix='', output_suffix='-cov', spike_suffix=None, control_suffix=None, genomecov_args=()):
+    '''
+    Compute genome coverage on a single sample and all its splits by reading sample BED once.
+
+    Splits are those whose BED files exist. Intervals are assigned to splits by their length, so input BED must not be resized.
+    '''
+    if input_suffix:
+        raise AssertionError('Single pass coverage cannot be used with input suffix {}, intervals are assigned to splits by their length'.format(input_suffix))
+    bed_source = sample + input_suffix + '.bed'
+    print ('Computing genome coverage on BED {} and its splits in a single pass'.format(bed_source))
+    splits = Split.splits(sample)
+    if not splits:
+        logging.warning('No split found for sample {}, computing coverage of sample only'.format(sample))
+    names = [sample] + splits
+    bins = [Split.splitrange(split) for split in splits]
+    outputs = [coverage_outputs(name, output_suffix, strand) for name in names]
+    output_files = [output for name_outputs in outputs for output in name_outputs]
+    inputs = [bed_source, genome] + [scale_input for name in names for scale_input in scale_inputs(name, spike_suffix, control_suffix)]
+    parameters = [scale, strand, genomecov_args, bins]
+    if Manifest.up_to_date(output_files, inputs, parameters):
+        return
+    bins_native_coverage(bed_source, names, bins, outputs, genome, scale, strand, spike_suffix, control_suffix, genomecov_args)
+    Manifest.record(output_files, inputs, parameters)
+
+
+def bins_native_coverage(bed_input, names, bins, outputs, genome, scale=None, strand=None, spike_suffix=None, control_suffix=None, genomecov_args=(), center=False):
+    '''
+    Compute genome coverage of BED and of its intervals assigned to bins by length, by reading BED once.
+
+    Names and outputs contain one element for all intervals followed by one element per bin, outputs are (bedGraph, bigWig) tuples.
+    When center is True, intervals are resized to 1 base positioned at their center, like centerannotations.
+    '''
+    position = coverage_position(genomecov_args)
+    sizes = chromosome_sizes(genome)
+    differences, counts = read_differences_bins(bed_input, sizes, bins, strand, position, center)
+    for i, (name, (bed, bigwig), count) in enumerate(zip(names, outputs, counts)):
+        name_scale = scale
+        if not scale or spike_suffix or control_suffix:
+            name_scale = sample_scale(name, count, spike_suffix, control_suffix)
+        coverages = {chromosome: coverage_runs(difference, name_scale) for chromosome, difference in differences[i].items()}
+        differences[i] = None
+        write_bedgraph(bed, track(name, strand), coverages)
+        write_bigwig(bigwig, sizes, coverages)
+
+
+def sample_scale(sample, count, spike_suffix=None, control_suffix=None):
+    '''Returns scale of sample based on number of reads, spiked reads and control reads.'''
+    scale = BASE_SCALE / max(count, 1)
+    if spike_suffix:
+        spiked_count = Bed.count_bed(sample + spike_suffix + '.bed')
+        scale = scale * spiked_count
+    if control_suffix:
+        control_count = Bed.count_bed(sample + control_suffix + '.bed')
+        scale = scale / control_count
+    return scale
+
+
+def scale_inputs(sample, spike_suffix=None, control_suffix=None):
+    '''Returns BED files of sample read by sample_scale, other than sample BED.'''
+    inputs = []
+    if spike_suffix:
+        inputs.append(sample + spike_suffix + '.bed')
+    if control_suffix:
+        inputs.append(sample + control_suffix + '.bed')
+    return inputs
+
+
+def coverage_outputs(sample, output_suffix='-cov', strand=None):
+    '''Returns bedGraph and bigWig output files of sample.'''
     if strand:
-        bed = sample + output_suffix + ('-neg' if strand == '-' else '-pos') + '.bed'
-        bigwig = sample + output_suffix + ('-neg' if strand == '-' else '-pos') + '.bw'
-    coverage(bed_source, bed, genome, sample, scale, strand, genomecov_args)
-    Bed.bedgraph_to_bigwig(bed, bigwig, genome)
+        output_suffix = output_suffix + ('-neg' if strand == '-' else '-pos')
+    return sample + output_suffix + '.bed', sample + output_suffix + '.bw'
 
 
 def coverage(bed_input, bed_output, genome, sample, scale=None, strand=None, genomecov_args=()):
@@ -135,15 +224,256 @@ def coverage(bed_input, bed_output, genome, sample, scale=None, strand=None, gen
     sort_output_o, sort_output = tempfile.mkstemp(suffix='.bed')
     Bed.sort(coverage_output, sort_output)
     os.remove(coverage_output)
-    track = 'track type=bedGraph name="' + sample
-    if strand:
-        track += ' Minus' if strand == '-' else ' Plus'
-    track += '"'
     with open(sort_output_o, 'r') as infile, open(bed_output, 'w') as outfile:
-        outfile.write(track + '\n')
+        outfile.write(track(sample, strand) + '\n')
         outfile.writelines(infile)
     os.remove(sort_output)
 
 
+def native_coverage(bed_input, bed_output, bigwig_output, genome, sample, scale=None, strand=None, genomecov_args=()):
+    '''Compute genome coverage without bedtools, the output is the same as bedtools genomecov -bg.'''
+    print ('Computing genome coverage of BED {} using native engine'.format(bed_input))
+    position = coverage_position(genomecov_args)
+    sizes = chromosome_sizes(genome)
+    differences = read_differences(bed_input, sizes, strand, position)
+    coverages = {chromosome: coverage_runs(difference, scale) for chromosome, difference in differences.items()}
+    if bed_output:
+        write_bedgraph(bed_output, track(sample, strand), coverages)
+    if bigwig_output:
+        write_bigwig(bigwig_output, sizes, coverages)
+
+
+def coverage_position(genomecov_args=()):
+    '''Returns the position of intervals used by genomecov arguments, either None for whole interval, '-5' or '-3'.'''
+    position = None
+    i = 0
+    while i < len(genomecov_args):
+        arg = genomecov_args[i]
+        if arg in ['-5', '-3']:
+            position = arg
+        elif arg == '-fs':
+            i += 1
+            logging.warning('-fs genomecov argument is ignored for BED files, as in bedtools')
+        elif arg == '-du':
+            logging.warning('-du genomecov argument is ignored for BED files, as in bedtools')
+        elif arg != '-bg':
+            raise AssertionError('genomecov argument {} is not supported by native engine'.format(arg))
+        i += 1
+    return position
+
+
+def chromosome_sizes(genome):
+    '''Returns size of chromosomes in genome file as a dictionary.'''
+    return {columns[0]: int(columns[1]) for columns in Parser.columns(genome)}
+
+
+def read_differences(bed, sizes, strand=None, position=None):
+    '''Reads intervals of BED counted for coverage, returns a difference array for each chromosome.'''
+    differences, counts = read_differences_bins(bed, sizes, [], strand, position)
+    return differences[0]
+
+
+def read_differences_bins(bed, sizes, bins, strand=None, position=None, center=False):
+    '''
+    Reads intervals of BED counted for coverage and assigns them to bins by length.
+
+    Bins are (minimum length, maximum length) tuples, minimum included and maximum excluded.
+    Returns a list of difference arrays for each chromosome and a list of counts, both starting with all intervals followed by one element per bin.
+    BED is read by chunks processed as NumPy arrays, see read_bed. Each chunk is added to difference arrays, intervals are not kept.
+    '''
+    import numpy as np
+    import pandas as pd
+    differences = [{} for i in range(0, len(bins) + 1)]
+    counts = [0] * (len(bins) + 1)
+    missing_chromosomes = set()
+    for chromosomes, starts, ends, strands in read_bed(bed):
+        invalid = np.flatnonzero(starts > ends)
+        if len(invalid):
+            raise AssertionError('Start is greater than end for interval {}:{}-{} of BED {}'.format(chromosomes[invalid[0]], starts[invalid[0]], ends[invalid[0]], bed))
+        lengths = ends - starts
+        selections = [np.ones(len(lengths), dtype=bool)] + [(lengths >= bin_start) & (lengths < bin_end) for bin_start, bin_end in bins]
+        for i, selection in enumerate(selections):
+            counts[i] += int(np.count_nonzero(selection))
+        kept = np.ones(len(lengths), dtype=bool)
+        if strand:
+            invalid = np.flatnonzero(~np.isin(strands, ['+', '-']))
+            if len(invalid):
+                raise AssertionError('Invalid strand "{}" for interval {}:{}-{} of BED {}'.format(strands[invalid[0]], chromosomes[invalid[0]], starts[invalid[0]], ends[invalid[0]], bed))
+            kept = strands == strand
+        codes, names = pd.factorize(chromosomes)
+        codes = codes.astype(np.min_scalar_type(len(names)))
+        known = np.isin(names, list(sizes))
+        for chromosome in names[~known]:
+            if not chromosome in missing_chromosomes:
+                logging.warning('chromosome {} of BED {} not found in genome file, skipping'.format(chromosome, bed))
+                missing_chromosomes.add(chromosome)
+        kept &= known[codes]
+        starts, ends = covered_bases(starts, ends, strands, position, center)
+        for i, selection in enumerate(selections):
+            for chromosome, rows in group_by_chromosome(names, codes, np.flatnonzero(selection & kept)):
+                if not chromosome in differences[i]:
+                    differences[i][chromosome] = DifferenceArray()
+                size = sizes[chromosome]
+                differences[i][chromosome].add(np.minimum(starts[rows], size), np.minimum(ends[rows], size))
+    return differences, counts
+
+
+class DifferenceArray:
+    '''
+    Changes of coverage depth of a chromosome, a sparse difference array that only contains positions where depth changes.
+
+    Intervals are added by chunks. Chunks are merged into the changes once they have more positions than them,
+    so memory is bounded by the number of positions where depth changes rather than by the number of intervals.
+    '''
+
+    def __init__(self):
+        import numpy as np
+        self.positions = np.empty(0, dtype=np.int64)
+        self.changes = np.empty(0, dtype=np.int64)
+        self.pending = []
+        self.pending_size = 0
+
+    def add(self, starts, ends):
+        '''Adds intervals from starts to ends (exclusive).'''
+        import numpy as np
+        self.pending.append((np.concatenate((starts, ends)), np.concatenate((np.ones(len(starts), dtype=np.int64), np.full(len(ends), -1, dtype=np.int64)))))
+        self.pending_size += len(starts) + len(ends)
+        if self.pending_size > len(self.positions):
+            self.merge()
+
+    def merge(self):
+        '''Merges added intervals into changes.'''
+        import numpy as np
+        if not self.pending:
+            return
+        positions = np.concatenate([self.positions] + [pending[0] for pending in self.pending])
+        changes = np.concatenate([self.changes] + [pending[1] for pending in self.pending])
+        self.pending = []
+        self.pending_size = 0
+        order = np.argsort(positions)
+        positions = positions[order]
+        firsts = np.flatnonzero(np.concatenate(([True], positions[1:] != positions[:-1])))
+        merged = np.add.reduceat(changes[order], firsts) if len(firsts) else changes
+        changed = merged != 0
+        self.positions = positions[firsts][changed]
+        self.changes = merged[changed]
+
+
+def read_bed(bed, chunksize=None):
+    '''
+    Yields chromosomes, starts, ends and strands of intervals of BED as NumPy arrays, by chunks of at most chunksize lines - defaults to CHUNK_SIZE.
+
+    Track, browser, comment and blank lines are skipped. Strands are empty when BED has less than 6 columns.
+    '''
+    import csv
+    import numpy as np
+    import pandas as pd
+    headers, columns = bed_layout(bed)
+    if not columns:
+        return
+    if columns < 3:
+        raise AssertionError('BED {} must have at least 3 columns'.format(bed))
+    usecols = [0, 1, 2, 5] if columns >= 6 else [0, 1, 2]
+    try:
+        for chunk in pd.read_csv(bed, sep='\t', header=None, skiprows=headers, usecols=usecols, dtype={0: str, 5: str}, na_filter=False,
+                                 quoting=csv.QUOTE_NONE, chunksize=chunksize if chunksize else CHUNK_SIZE):
+            if not pd.api.types.is_integer_dtype(chunk[1]) or not pd.api.types.is_integer_dtype(chunk[2]):
+                chunk = chunk[~chunk[0].str.startswith(('track', 'browser', '#'))]
+            starts = chunk[1].values.astype(np.int64)
+            ends = chunk[2].values.astype(np.int64)
+            strands = chunk[5].values.astype(str) if columns >= 6 else np.full(len(chunk), '')
+            yield chunk[0].values.astype(str), starts, ends, strands
+    except (ValueError, pd.errors.ParserError) as e:
+        raise AssertionError('Invalid interval in BED {}: {}'.format(bed, e)) from e
+
+
+def bed_layout(bed):
+    '''Returns number of track, browser, comment and blank lines at the beginning of BED and number of columns of its first interval.'''
+    headers = 0
+    with open(bed, 'r') as infile:
+        for line in infile:
+            if line.startswith(('track', 'browser', '#')) or line.isspace():
+                headers += 1
+                continue
+            return headers, len(line.rstrip('\r\n').split('\t'))
+    return headers, 0
+
+
+def covered_bases(starts, ends, strands, position=None, center=False):
+    '''Returns first and last (exclusive) base of intervals counted for coverage, see coverage_position.'''
+    import numpy as np
+    if center:
+        starts = starts + (ends - starts) // 2
+        ends = starts + 1
+    if position == '-5':
+        starts = np.where(strands == '+', starts, ends - 1)
+        ends = starts + 1
+    elif position == '-3':
+        starts = np.where(strands == '-', starts, ends - 1)
+        ends = starts + 1
+    return starts, ends
+
+
+def group_by_chromosome(names, codes, rows):
+    '''Yields chromosome and rows of intervals on that chromosome, codes are indexes of chromosomes of intervals in names.'''
+    import numpy as np
+    if len(rows) == 0:
+        return
+    rows = rows[np.argsort(codes[rows], kind='stable')]
+    row_codes = codes[rows]
+    for group in np.split(rows, np.flatnonzero(row_codes[1:] != row_codes[:-1]) + 1):
+        yield str(names[codes[group[0]]]), group
+
+
+def coverage_runs(difference, scale=None):
+    '''Returns starts, ends and depths of covered regions of a difference array, bases outside chromosome are handled like bedtools genomecov.'''
+    import numpy as np
+    difference.merge()
+    positions = difference.positions
+    depths = np.cumsum(difference.changes)
+    covered = np.flatnonzero(depths[:-1] > 0)
+    values = depths[covered] * (scale if scale else 1.0)
+    return positions[covered], positions[covered + 1], values
+
+
+def track(sample, strand=None):
+    '''Returns track line of bedGraph.'''
+    line = 'track type=bedGraph name="' + sample
+    if strand:
+        line += ' Minus' if strand == '-' else ' Plus'
+    line += '"'
+    return line
+
+
+def write_bedgraph(bed_output, track_line, coverages):
+    '''Writes coverage of chromosomes to bedGraph, chromosomes sorted by name.'''
+    with open(bed_output, 'w') as outfile:
+        outfile.write(track_line + '\n')
+        for chromosome in sorted(coverages):
+            starts, ends, values = coverages[chromosome]
+            outfile.writelines(['{}\t{}\t{}\t{}\n'.format(chromosome, start, end, value) for start, end, value in zip(starts.tolist(), ends.tolist(), formatted_values(values).tolist())])
+
+
+def write_bigwig(bigwig_output, sizes, coverages):
+    '''Writes coverage of chromosomes to bigWig, values are rounded like in bedGraph.'''
+    import pyBigWig as pbw
+    chromosomes = sorted(sizes)
+    bw = pbw.open(bigwig_output, 'w')
+    bw.addHeader([(chromosome, sizes[chromosome]) for chromosome in chromosomes])
+    for chromosome in chromosomes:
+        if not chromosome in coverages or len(coverages[chromosome][0]) == 0:
+            continue
+        starts, ends, values = coverages[chromosome]
+        bw.addEntries([chromosome] * len(starts), starts.tolist(), ends=ends.tolist(), values=formatted_values(values).astype(float).tolist())
+    bw.close()
+
+
+def formatted_values(values):
+    '''Returns values formatted like in bedGraph, each distinct value is formatted once.'''
+    import numpy as np
+    uniques, inverse = np.unique(values, return_inverse=True)
+    return np.array(['{:g}'.format(value) for value in uniques.tolist()], dtype=object)[inverse.reshape(-1)]
+
+
 if __name__ == '__main__':
     genomecov()
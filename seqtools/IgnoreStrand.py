@@ -5,6 +5,7 @@ import subprocess
 import click
 
 import seqtools.Split as sb
+from seqtools.process import Jobs, Manifest
 from seqtools.txt import Parser
 
 
@@ -26,19 +27,24 @@ def validate_output_suffix(ctx, param, value):
               help='Suffix added to sample name in BED filename for output.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def ignorestrand(samples, input_suffix, output_suffix, index):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
+def ignorestrand(samples, input_suffix, output_suffix, index, jobs):
     '''Prepare BED file used for genome coverage on samples.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    ignore_strand_samples(samples, input_suffix, output_suffix, index)
+    ignore_strand_samples(samples, input_suffix, output_suffix, index, jobs)
 
 
-def ignore_strand_samples(samples='samples.txt', input_suffix='', output_suffix='-forcov', index=None):
+def ignore_strand_samples(samples='samples.txt', input_suffix='', output_suffix='-forcov', index=None, jobs=1):
     '''Prepare BED file used for genome coverage on samples.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        ignore_strand_sample_splits(sample, input_suffix, output_suffix)
+    if jobs > 1:
+        Jobs.run(ignore_strand_sample, [(name, input_suffix, output_suffix) for name in sb.samples_splits(sample_names)], jobs)
+    else:
+        for sample in sample_names:
+            ignore_strand_sample_splits(sample, input_suffix, output_suffix)
 
 
 def ignore_strand_sample_splits(sample, input_suffix='', output_suffix='-forcov'):
@@ -53,7 +59,10 @@ def ignore_strand_sample_splits(sample, input_suffix='', output_suffix='-forcov'
 def ignore_strand_sample(sample, input_suffix='', output_suffix='-forcov'):
     bed = sample + input_suffix + '.bed'
     bed_forcoverage = sample + output_suffix + '.bed'
+    if Manifest.up_to_date([bed_forcoverage], [bed]):
+        return
     ignore_strand(bed, bed_forcoverage)
+    Manifest.record([bed_forcoverage], [bed])
 
 
 def ignore_strand(bed, output):
@@ -1,4 +1,3 @@
-from distutils.command.check import check
 import logging
 import os
 import subprocess
@@ -6,8 +5,7 @@ import tempfile
 
 import click
 from seqtools.bed import Bed
-
-import pandas as pd
+from seqtools.process import Jobs, Manifest
 
 
 @click.command()
@@ -19,22 +17,27 @@ import pandas as pd
               help='Keep reads for which their center is located on specified annotations.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def intersect(samples, annotations, index):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
+def intersect(samples, annotations, index, jobs):
     '''Keep only reads that intersects specified annotations.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    intersect_samples(samples, annotations, index)
+    intersect_samples(samples, annotations, index, jobs)
 
 
-def intersect_samples(samples='samples-filter.txt', annotations='annotations.bed', index=None):
+def intersect_samples(samples='samples-filter.txt', annotations='annotations.bed', index=None, jobs=1):
     '''Keep only reads that intersects specified annotations.'''
+    import pandas as pd
     annot_length = annotations_length(annotations)
     sample_columns = pd.read_csv(samples, header=None, sep='\t', comment='#')
     if index != None:
         sample_columns = sample_columns.iloc[index:index + 1]
+    tasks = []
     for index, columns in sample_columns.iterrows():
         tag = columns[0]
         sample = columns[1] if len(columns) > 1 else None
-        intersect_sample(sample, tag, annotations, annot_length)
+        tasks.append((sample, tag, annotations, annot_length))
+    Jobs.run(intersect_sample, tasks, jobs)
 
 
 def annotations_length(annotations):
@@ -50,6 +53,8 @@ def intersect_sample(sample, tag, annotations, annot_length):
     print ('Keep only reads that intersects specified annotations for sample {}'.format(sample))
     bed = sample + '.bed'
     bed_tag = tag + '.bed'
+    if Manifest.up_to_date([bed_tag], [bed, annotations]):
+        return
     intersect_temp_o, intersect_temp = tempfile.mkstemp(suffix='.bed')
     sort_temp_o, sort_temp = tempfile.mkstemp(suffix='.bed')
     cmd = ['bedtools', 'intersect', '-a', annotations, '-b', bed, '-wb']
@@ -70,6 +75,7 @@ def intersect_sample(sample, tag, annotations, annot_length):
     os.remove(intersect_temp)
     Bed.sort(sort_temp, bed_tag)
     os.remove(sort_temp)
+    Manifest.record([bed_tag], [bed, annotations])
 
     
 if __name__ == '__main__':
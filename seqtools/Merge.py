@@ -6,6 +6,7 @@ import tempfile
 
 import click
 from seqtools.bed import Bed
+from seqtools.process import Jobs, Manifest
 from seqtools.txt import Parser
 
 
@@ -14,26 +15,29 @@ from seqtools.txt import Parser
               help='Dataset name if first columns and sample names on following columns - tab delimited.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def merge(datasets, index):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
+def merge(datasets, index, jobs):
     '''Merge BED files related to samples.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    merge_datasets(datasets, index)
+    merge_datasets(datasets, index, jobs)
 
 
-def merge_datasets(datasets='dataset.txt', index=None):
+def merge_datasets(datasets='dataset.txt', index=None, jobs=1):
     '''Merge BED files related to samples.'''
     datasets_columns = Parser.columns(datasets)
     if index != None:
         datasets_columns = [datasets_columns[index]]
-    for columns in datasets_columns:
-        name = columns[0]
-        samples = [sample for sample in columns[1:]]
-        merge_dataset(name, samples)
+    Jobs.run(merge_dataset, [(columns[0], [sample for sample in columns[1:]]) for columns in datasets_columns], jobs)
 
 
 def merge_dataset(name, samples):
     '''Merge BED files related to samples.'''
     print ('Merging samples {} into a single sample {}'.format(samples, name))
+    sample_beds = [sample + '.bed' for sample in samples]
+    merged_bed = name + '.bed'
+    if Manifest.up_to_date([merged_bed], sample_beds):
+        return
     merge_temp_o, merge_temp = tempfile.mkstemp(suffix='.bed')
     with open(merge_temp_o, 'w') as outfile:
         for sample in samples:
@@ -43,9 +47,9 @@ def merge_dataset(name, samples):
                     if line.startswith('browser') or line.startswith('track'):
                         continue
                     outfile.write(line)
-    merged_bed = name + '.bed'
     Bed.sort(merge_temp, merged_bed)
     os.remove(merge_temp)
+    Manifest.record([merged_bed], sample_beds)
 
 
 if __name__ == '__main__':
@@ -2,6 +2,7 @@ import logging
 import subprocess
 
 import click
+from seqtools.process import Jobs, Manifest
 from seqtools.txt import Parser
 
 
@@ -14,26 +15,30 @@ from seqtools.txt import Parser
               help='Number of threads used to process data per sample.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def mergebam(datasets, suffix, threads, index):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel - threads are divided between samples.')
+def mergebam(datasets, suffix, threads, index, jobs):
     '''Merge BAM files related to samples.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    merge_datasets(datasets, suffix, threads, index)
+    merge_datasets(datasets, suffix, threads, index, jobs)
 
 
-def merge_datasets(datasets='dataset.txt', suffix='', threads=1, index=None):
+def merge_datasets(datasets='dataset.txt', suffix='', threads=1, index=None, jobs=1):
     '''Merge BAM files related to samples.'''
     datasets_columns = Parser.columns(datasets)
     if index != None:
         datasets_columns = [datasets_columns[index]]
-    for columns in datasets_columns:
-        name = columns[0]
-        samples = [sample for sample in columns[1:]]
-        merge_dataset(name, samples, suffix, threads)
+    dataset_threads = Jobs.split_threads(threads, jobs)
+    Jobs.run(merge_dataset, [(columns[0], [sample for sample in columns[1:]], suffix, dataset_threads) for columns in datasets_columns], jobs)
 
 
 def merge_dataset(name, samples, suffix='', threads=1):
     '''Merge BAM files related to samples.'''
     print ('Merging samples {} into a single sample {}'.format(samples, name))
+    bams_input = [sample + suffix + '.bam' for sample in samples]
+    bam_output = name + suffix + '.bam'
+    if Manifest.up_to_date([bam_output], bams_input):
+        return
     for sample in samples:
         bam_input = sample + suffix + '.bam'
         cmd = ['samtools', 'index']
@@ -42,8 +47,6 @@ def merge_dataset(name, samples, suffix='', threads=1):
         cmd.extend([bam_input])
         logging.debug('Running {}'.format(cmd))
         subprocess.run(cmd, check=True)
-    bams_input = [sample + suffix + '.bam' for sample in samples]
-    bam_output = name + suffix + '.bam'
     cmd = ['samtools', 'merge', '-f']
     if not threads is None and threads > 1:
         cmd.extend(['--threads', str(threads - 1)])
@@ -51,6 +54,7 @@ def merge_dataset(name, samples, suffix='', threads=1):
     cmd.extend(bams_input)
     logging.debug('Running {}'.format(cmd))
     subprocess.run(cmd, check=True)
+    Manifest.record([bam_output], bams_input)
 
 
 if __name__ == '__main__':
@@ -1,72 +1,132 @@
+from itertools import repeat
 import logging
-import math
-import os
-import tempfile
 
 import click
 
-import pyBigWig as pbw
-from seqtools.bed import Bed
+from seqtools.bigwig import BigWigCache
+from seqtools.process import Jobs, Manifest
 from seqtools.txt import Parser
 
+BLOCK_SIZE = 10000000
+
 
 @click.command()
 @click.option('--datasets', '-d', type=click.Path(exists=True), default='dataset.txt', show_default=True,
               help='Dataset name if first columns and sample names on following columns - tab delimited.')
 @click.option('--sizes', '-S', type=click.Path(exists=True), default='sacCer3.chrom.sizes', show_default=True,
               help='Size of chromosomes.')
+@click.option('--block-size', '-b', type=click.IntRange(min=1), default=BLOCK_SIZE, show_default=True,
+              help='Number of bases of a chromosome loaded in memory at once.')
+@click.option('--threads', '-t', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of processes used to merge chromosomes in parallel.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def mergebw(datasets, sizes, index):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel - threads are divided between samples.')
+def mergebw(datasets, sizes, block_size, threads, index, jobs):
     '''Merge bigWig files related to samples.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    merge_datasets(datasets, sizes, index)
+    merge_datasets(datasets, sizes, index, block_size, threads, jobs)
 
 
-def merge_datasets(datasets='dataset.txt', sizes='sacCer3.chrom.sizes', index=None):
+def merge_datasets(datasets='dataset.txt', sizes='sacCer3.chrom.sizes', index=None, block_size=BLOCK_SIZE, threads=1, jobs=1):
     '''Merge bigWig files related to samples.'''
     datasets_columns = Parser.columns(datasets)
     if index != None:
         datasets_columns = [datasets_columns[index]]
-    for columns in datasets_columns:
-        name = columns[0]
-        samples = [sample for sample in columns[1:]]
-        merge_dataset(name, samples, sizes)
+    dataset_threads = Jobs.split_threads(threads, jobs)
+    Jobs.run(merge_dataset, [(columns[0], [sample for sample in columns[1:]], sizes, block_size, dataset_threads) for columns in datasets_columns], jobs)
 
     
-def merge_dataset(name, samples, sizes):
+def merge_dataset(name, samples, sizes, block_size=BLOCK_SIZE, threads=1):
     '''Merge bigWig files related to samples.'''
     print ('Merging samples {} into dataset {}'.format(samples, name))
     sizes_columns = Parser.columns(sizes)
-    bws = [pbw.open(sample + '.bw') for sample in samples]
-    merge_temp_o, merge_temp = tempfile.mkstemp(suffix='.bed')
-    with open(merge_temp_o, 'w') as output:
-        output.write('track type=bedGraph name="' + name + '"\n')
-        for size_columns in sizes_columns:
-            chromosome = size_columns[0]
-            size = size_columns[1]
-            sums = [0] * size
-            for bw in bws:
-                bw_size = bw.chroms(chromosome) if bw.chroms(chromosome) else 0
-                if bw_size == 0:
-                    continue
-                values = bw.values(chromosome, 0, min(size, bw_size))
-                sums = [sums[i] + (values[i] if not math.isnan(values[i]) else 0) for i in range(0, min(size, bw_size))]
-            for i in range(0, len(sums)):
-                output.write(chromosome)
-                output.write('\t')
-                output.write(str(i))
-                output.write('\t')
-                output.write(str(i + 1))
-                output.write('\t')
-                output.write(str(sums[i]))
-                output.write('\n')
-    sort_temp_o, sort_temp = tempfile.mkstemp(suffix='.bed')
-    Bed.sort(merge_temp, sort_temp)
+    chromosomes = [size_columns[0] for size_columns in sizes_columns]
+    chromosome_sizes = [int(size_columns[1]) for size_columns in sizes_columns]
+    bw_files = [sample + '.bw' for sample in samples]
     merged_bw = name + '.bw'
-    Bed.bedgraph_to_bigwig(sort_temp, merged_bw, sizes)
-    os.remove(sort_temp)
-    os.remove(merge_temp)
+    if Manifest.up_to_date([merged_bw], bw_files + [sizes]):
+        return
+    if not threads is None and threads > 1:
+        # All tasks are submitted, and so all workers are started, before the output is opened for writing.
+        with Jobs.executor(threads) as executor:
+            chromosomes_blocks = executor.map(merge_chromosome_files, repeat(bw_files), chromosomes, chromosome_sizes, repeat(block_size))
+            write_bigwig(merged_bw, chromosomes, chromosome_sizes, chromosomes_blocks)
+    else:
+        bws = [BigWigCache.BigWigCache(bw_file) for bw_file in bw_files]
+        chromosomes_blocks = (merge_chromosome(bws, chromosome, size, block_size) for chromosome, size in zip(chromosomes, chromosome_sizes))
+        write_bigwig(merged_bw, chromosomes, chromosome_sizes, chromosomes_blocks)
+        for bw in bws:
+            bw.close()
+    Manifest.record([merged_bw], bw_files + [sizes])
+
+
+def write_bigwig(bigwig, chromosomes, sizes, chromosomes_blocks):
+    '''Writes runs of each chromosome to bigWig, chromosomes_blocks must be in the same order as chromosomes.'''
+    import pyBigWig as pbw
+    logging.debug('Writing merged bigWig {}'.format(bigwig))
+    output = pbw.open(bigwig, 'w')
+    output.addHeader(list(zip(chromosomes, sizes)))
+    for chromosome, blocks in zip(chromosomes, chromosomes_blocks):
+        for starts, ends, values in blocks:
+            add_entries(output, chromosome, starts, ends, values)
+    output.close()
+
+
+def merge_chromosome_files(bw_files, chromosome, size, block_size=BLOCK_SIZE):
+    '''Returns all runs of summed signal for a chromosome, opening bigWig files in the current process.'''
+    bws = [BigWigCache.BigWigCache(bw_file) for bw_file in bw_files]
+    blocks = list(merge_chromosome(bws, chromosome, size, block_size))
+    for bw in bws:
+        bw.close()
+    return blocks
+
+
+def merge_chromosome(bws, chromosome, size, block_size=BLOCK_SIZE):
+    '''
+    Yields runs of equal summed signal for a chromosome, one block of at most block_size bases at a time.
+
+    Each base is read once, so blocks are read directly from bigWig files instead of being kept in the cache.
+    '''
+    import numpy as np
+    bw_sizes = [bw.chroms(chromosome) if bw.chroms(chromosome) else 0 for bw in bws]
+    pending = None
+    for block_start in range(0, size, block_size):
+        block_end = min(block_start + block_size, size)
+        sums = np.zeros(block_end - block_start)
+        for bw, bw_size in zip(bws, bw_sizes):
+            end = min(block_end, bw_size)
+            if end <= block_start:
+                continue
+            sums[:end - block_start] += np.nan_to_num(bw.read(chromosome, block_start, end))
+        starts, ends, values = runs(sums, block_start)
+        if pending is not None:
+            if values[0] == pending[2]:
+                starts[0] = pending[0]
+            else:
+                starts = np.insert(starts, 0, pending[0])
+                ends = np.insert(ends, 0, pending[1])
+                values = np.insert(values, 0, pending[2])
+        pending = (starts[-1], ends[-1], values[-1])
+        if len(starts) > 1:
+            yield starts[:-1], ends[:-1], values[:-1]
+    if pending is not None:
+        yield np.array([pending[0]]), np.array([pending[1]]), np.array([pending[2]])
+
+
+def runs(values, offset=0):
+    '''Collapses consecutive equal values into runs, returns starts, ends and values of runs.'''
+    import numpy as np
+    changes = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = np.concatenate(([0], changes)) + offset
+    ends = np.concatenate((changes, [len(values)])) + offset
+    return starts, ends, values[starts - offset]
+
+
+def add_entries(bw, chromosome, starts, ends, values):
+    '''Adds runs to a bigWig opened for writing.'''
+    bw.addEntries([chromosome] * len(starts), starts.tolist(), ends=ends.tolist(), values=values.tolist())
 
 
 if __name__ == '__main__':
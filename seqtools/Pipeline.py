@@ -0,0 +1,177 @@
+import logging
+import os
+import shutil
+import tempfile
+
+import click
+
+from seqtools import Bam2Bed, Bowtie2, Bwa, FilterBam, GenomeCoverage, Split
+from seqtools.bed import Bed
+from seqtools.process import Jobs, Manifest
+from seqtools.seq import Fastq
+from seqtools.txt import Parser
+
+ALIGNERS = ['bowtie2', 'bwa']
+COVERAGES = ['fragment', 'center', '5', '3']
+
+
+@click.command(context_settings=dict(
+    ignore_unknown_options=True,
+))
+@click.option('--samples', '-s', type=click.Path(exists=True), default='samples.txt', show_default=True,
+              help='Sample names listed one sample name by line.')
+@click.option('--aligner', type=click.Choice(ALIGNERS), default='bowtie2', show_default=True,
+              help='Program used to align reads.')
+@click.option('--fasta', type=click.Path(), default='sacCer3.fa', show_default=True,
+              help='FASTA file used for alignment with bwa.')
+@click.option('--paired/--unpaired', '-p/-u', default=True, show_default=True,
+              help='Sample reads are paired')
+@click.option('--dedup/--no-dedup', '-d/-nd', default=True, show_default=True,
+              help='Remove duplicates')
+@click.option('--threads', '-t', default=1, show_default=True,
+              help='Number of threads used to process data per sample.')
+@click.option('--genome', '-g', type=click.Path(exists=True), default='sacCer3.chrom.sizes', show_default=True,
+              help='Size of chromosome.')
+@click.option('--coverage', type=click.Choice(COVERAGES), default='fragment', show_default=True,
+              help='Part of fragments counted for coverage - center is like centerannotations, 5 and 3 are like -5 and -3 genomecov arguments.')
+@click.option('--binLength', '-b', type=int, default=None,
+              help='Split reads in bins by their length. Defaults to no split')
+@click.option('--binMinLength', '-l', type=int, default=100, show_default=True,
+              help='First bin minimum length.')
+@click.option('--binMaxLength', '-L', type=int, default=500, show_default=True,
+              help='Last bin maximum length.')
+@click.option('--scratch', type=click.Path(exists=True, file_okay=False), default=None,
+              help='Directory for intermediate files. Defaults to SLURM_TMPDIR environment variable, if defined, or to system temporary directory.')
+@click.option('--keep-bam', is_flag=True,
+              help='Keep filtered BAM of samples.')
+@click.option('--index', type=int, default=None,
+              help='Index of sample to process in samples file.')
+@click.option('--jobs', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel - threads are divided between samples.')
+@click.argument('aligner_args', nargs=-1, type=click.UNPROCESSED)
+def pipeline(samples, aligner, fasta, paired, dedup, threads, genome, coverage, binlength, binminlength, binmaxlength, scratch, keep_bam, index, jobs, aligner_args):
+    '''
+    Align, filter, convert to BED, split and compute genome coverage of samples.
+
+    Intermediate files are written in scratch directory, only BED, split and coverage files are written in current directory.
+    Arguments not recognized are passed to the aligner, like -x for bowtie2.
+    '''
+    logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    if not scratch:
+        scratch = os.getenv('SLURM_TMPDIR')
+    pipeline_samples(samples, aligner, fasta, paired, dedup, threads, genome, coverage, binlength, binminlength, binmaxlength, scratch, keep_bam, index, aligner_args, jobs)
+
+
+def pipeline_samples(samples='samples.txt', aligner='bowtie2', fasta='sacCer3.fa', paired=True, dedup=True, threads=None, genome='sacCer3.chrom.sizes', coverage='fragment', binlength=None, binminlength=100, binmaxlength=500, scratch=None, keep_bam=False, index=None, aligner_args=(), jobs=1):
+    '''Align, filter, convert to BED, split and compute genome coverage of samples.'''
+    sample_names = Parser.first(samples)
+    if index != None:
+        sample_names = [sample_names[index]]
+    sample_threads = Jobs.split_threads(threads, jobs)
+    Jobs.run(pipeline_sample, [(sample, aligner, fasta, paired, dedup, sample_threads, genome, coverage, binlength, binminlength, binmaxlength, scratch, keep_bam, aligner_args) for sample in sample_names], jobs)
+
+
+def pipeline_sample(sample, aligner='bowtie2', fasta='sacCer3.fa', paired=True, dedup=True, threads=None, genome='sacCer3.chrom.sizes', coverage='fragment', binlength=None, binminlength=100, binmaxlength=500, scratch=None, keep_bam=False, aligner_args=()):
+    '''
+    Align, filter, convert to BED, split and compute genome coverage of a single sample.
+
+    The sample is skipped if its final outputs are up to date with FASTQ files, genome and parameters.
+    '''
+    print ('Running pipeline on sample {}'.format(sample))
+    fastq1 = Fastq.fastq(sample, 1)
+    if fastq1 is None:
+        raise AssertionError('Cannot find FASTQ files for sample ' + sample)
+    fastq2 = Fastq.fastq(sample, 2)
+    bins = Split.bins(binlength, binminlength, binmaxlength) if binlength else []
+    names = [sample] + ['{}-{}-{}'.format(sample, bin_start, bin_end) for bin_start, bin_end in bins]
+    final_outputs = pipeline_outputs(names, dedup, keep_bam)
+    inputs = [fastq for fastq in [fastq1, fastq2] if fastq] + [genome] + ([fasta] if aligner == 'bwa' else [])
+    parameters = [aligner, paired, dedup, coverage, bins, aligner_args]
+    if Manifest.up_to_date(final_outputs, inputs, parameters):
+        return
+    work = tempfile.mkdtemp(prefix=sample + '-', dir=scratch)
+    try:
+        prefix = os.path.join(work, sample)
+        bam = align(fastq1, fastq2, prefix, aligner, fasta, threads, aligner_args)
+        bam = filter_bam(bam, prefix, paired, dedup, threads)
+        bed = prefix + '.bed'
+        print ('Converting BAM to BED for sample {}'.format(sample))
+        if paired:
+            Bam2Bed.bam2bed_stream(bam, bed, threads)
+        else:
+            Bam2Bed.bam2bed_unpaired(bam, bed)
+        outputs = split_coverage(bed, work, names, bins, genome, coverage, threads)
+        if keep_bam:
+            move_output(bam, os.path.basename(bam))
+        move_output(bed, sample + '.bed')
+        for output in outputs:
+            move_output(output, os.path.basename(output))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    Manifest.record(final_outputs, inputs, parameters)
+
+
+def pipeline_outputs(names, dedup=True, keep_bam=False):
+    '''Returns files written in current directory by pipeline, names are the sample followed by its splits.'''
+    sample = names[0]
+    outputs = [sample + '.bed'] + [name + '.bed' for name in names[1:]]
+    outputs.extend([output for name in names for output in GenomeCoverage.coverage_outputs(name)])
+    if keep_bam:
+        outputs.append(sample + ('-dedup.bam' if dedup else '-filtered.bam'))
+    return outputs
+
+
+def align(fastq1, fastq2, prefix, aligner='bowtie2', fasta='sacCer3.fa', threads=None, aligner_args=()):
+    '''Aligns FASTQ files and returns BAM file.'''
+    bam = prefix + '.bam'
+    print ('Running {} on FASTQ {}'.format(aligner, fastq1))
+    if aligner == 'bwa':
+        Bwa.run_bwa(fastq1, fastq2, fasta, bam, threads, aligner_args, True)
+    else:
+        Bowtie2.run_bowtie(fastq1, fastq2, bam, threads, aligner_args, True)
+    return bam
+
+
+def filter_bam(bam, prefix, paired=True, dedup=True, threads=None):
+    '''Filters BAM, removes intermediate BAM files and returns filtered BAM file.'''
+    print ('Filtering BAM {}'.format(bam))
+    filtered = prefix + '-filtered.bam'
+    FilterBam.filter_mapped(bam, filtered, paired, threads, True)
+    os.remove(bam)
+    if not dedup:
+        return filtered
+    bam_dedup = prefix + '-dedup.bam'
+    FilterBam.remove_duplicates(filtered, bam_dedup, threads, True)
+    os.remove(filtered)
+    return bam_dedup
+
+
+def split_coverage(bed, work, names, bins, genome, coverage='fragment', threads=None):
+    '''Splits BED and computes genome coverage of BED and splits concurrently, returns files created in work directory.'''
+    split_outputs = [(os.path.join(work, name + '.bed'), bin_start, bin_end) for name, (bin_start, bin_end) in zip(names[1:], bins)]
+    coverage_outputs = [GenomeCoverage.coverage_outputs(os.path.join(work, name)) for name in names]
+    genomecov_args = ('-' + coverage,) if coverage in ['5', '3'] else ()
+    coverage_args = (bed, names, bins, coverage_outputs, genome, None, None, None, None, genomecov_args, coverage == 'center')
+    if split_outputs and threads and threads > 1:
+        with Jobs.executor(2) as executor:
+            split_future = executor.submit(Bed.split_by_length, bed, split_outputs)
+            coverage_future = executor.submit(GenomeCoverage.bins_native_coverage, *coverage_args)
+            split_future.result()
+            coverage_future.result()
+    else:
+        if split_outputs:
+            Bed.split_by_length(bed, split_outputs)
+        GenomeCoverage.bins_native_coverage(*coverage_args)
+    return [output[0] for output in split_outputs] + [output for outputs in coverage_outputs for output in outputs]
+
+
+def move_output(source, target):
+    '''Moves file and its BED index, if any.'''
+    logging.debug('Moving {} to {}'.format(source, target))
+    shutil.move(source, target)
+    if os.path.exists(Bed.index_file(source)):
+        shutil.move(Bed.index_file(source), Bed.index_file(target))
+
+
+if __name__ == '__main__':
+    pipeline()
@@ -1,4 +1,3 @@
-from distutils.command.check import check
 import logging
 import os
 from pathlib import Path
@@ -6,6 +5,7 @@ import subprocess
 
 import click
 
+from seqtools.process import Jobs
 from seqtools.txt import Parser
 
 
@@ -18,21 +18,22 @@ from seqtools.txt import Parser
               help='Suffix added to sample name in BED filename for input.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
+@click.option('--jobs', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
 @click.argument('plot2do_args', nargs=-1, type=click.UNPROCESSED)
-def plot2do(file, input_suffix, index, plot2do_args):
+def plot2do(file, input_suffix, index, jobs, plot2do_args):
     '''Run plot2DO on samples.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    plot2do_samples(file, input_suffix, index, plot2do_args)
+    plot2do_samples(file, input_suffix, index, plot2do_args, jobs)
 
 
-def plot2do_samples(file, input_suffix='', index=None, plot2do_args=()):
+def plot2do_samples(file, input_suffix='', index=None, plot2do_args=(), jobs=1):
     '''Run plot2DO on samples.'''
     file_parent = Path(file).parent
     sample_names = Parser.first(file)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        plot2do_sample(str(file_parent / sample), input_suffix, plot2do_args)
+    Jobs.run(plot2do_sample, [(str(file_parent / sample), input_suffix, plot2do_args) for sample in sample_names], jobs)
 
 
 def plot2do_sample(sample, input_suffix='', plot2do_args=()):
@@ -3,6 +3,7 @@ import os
 import subprocess
 
 import click
+from seqtools.process import Jobs, Manifest
 from seqtools.txt import Parser
 
 import seqtools.Split as sb
@@ -19,19 +20,21 @@ import seqtools.Split as sb
               help='Number of threads used to process data per sample.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def removesecondmate(samples, input_suffix, output_suffix, threads, index):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel - threads are divided between samples.')
+def removesecondmate(samples, input_suffix, output_suffix, threads, index, jobs):
     '''Removes second mate from BAM.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    removesecondmate_samples(samples, input_suffix, output_suffix, threads, index)
+    removesecondmate_samples(samples, input_suffix, output_suffix, threads, index, jobs)
 
 
-def removesecondmate_samples(samples='samples.txt', input_suffix='-dedup', output_suffix='-mate1', threads=None, index=None):
+def removesecondmate_samples(samples='samples.txt', input_suffix='-dedup', output_suffix='-mate1', threads=None, index=None, jobs=1):
     '''Removes second mate from BAM.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        removesecondmate_sample(sample, input_suffix, output_suffix, threads)
+    sample_threads = Jobs.split_threads(threads, jobs)
+    Jobs.run(removesecondmate_sample, [(sample, input_suffix, output_suffix, sample_threads) for sample in sample_names], jobs)
 
 
 def removesecondmate_sample(sample, input_suffix='-dedup', output_suffix='-mate1', threads=None):
@@ -39,12 +42,15 @@ def removesecondmate_sample(sample, input_suffix='-dedup', output_suffix='-mate1
     print ('Removes second mate from BAM for sample {}'.format(sample))
     bam = sample + input_suffix + '.bam'
     mate1_bam = sample + output_suffix + '.bam'
+    if Manifest.up_to_date([mate1_bam], [bam]):
+        return
     cmd = ['samtools', 'view']
     if not threads is None and threads > 1:
         cmd.extend(['--threads', str(threads - 1)])
     cmd.extend(['-f', '64', '-b', '-o', mate1_bam, bam])
     logging.debug('Running {}'.format(cmd))
     subprocess.run(cmd, check=True)
+    Manifest.record([mate1_bam], [bam])
 
 
 if __name__ == '__main__':
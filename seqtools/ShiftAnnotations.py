@@ -5,6 +5,7 @@ import subprocess
 import click
 
 import seqtools.Split as sb
+from seqtools.process import Jobs, Manifest
 from seqtools.txt import Parser
 
 
@@ -28,20 +29,21 @@ def validate_output_suffix(ctx, param, value):
               help='Suffix added to sample name in BED filename for output.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
+@click.option('--jobs', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
 @click.argument('bedtools_args', nargs=-1, type=click.UNPROCESSED)
-def shiftannotations(samples, input_suffix, output_suffix, index, bedtools_args):
+def shiftannotations(samples, input_suffix, output_suffix, index, jobs, bedtools_args):
     '''Moves annotations contained in BED files.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    shift_annotations_samples(samples, input_suffix, output_suffix, index, bedtools_args)
+    shift_annotations_samples(samples, input_suffix, output_suffix, index, bedtools_args, jobs)
 
 
-def shift_annotations_samples(samples='samples.txt', input_suffix='', output_suffix='-forcov', index=None, bedtools_args=()):
+def shift_annotations_samples(samples='samples.txt', input_suffix='', output_suffix='-forcov', index=None, bedtools_args=(), jobs=1):
     '''Moves annotations contained in BED files.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        shift_annotations_sample(sample, input_suffix, output_suffix, bedtools_args)
+    Jobs.run(shift_annotations_sample, [(sample, input_suffix, output_suffix, bedtools_args) for sample in sample_names], jobs)
 
 
 def shift_annotations_sample(sample, input_suffix='', output_suffix='-forcov', bedtools_args=()):
@@ -49,10 +51,13 @@ def shift_annotations_sample(sample, input_suffix='', output_suffix='-forcov', b
     print ('Moves annotations contained in BED file of sample {}'.format(sample))
     bed = sample + input_suffix + '.bed'
     moved = sample + output_suffix + '.bed'
+    if Manifest.up_to_date([moved], [bed], bedtools_args):
+        return
     cmd = ['bedtools', 'shift', '-i', bed] + list(bedtools_args)
     logging.debug('Running {}'.format(cmd))
     with open(moved, 'w') as outfile:
         subprocess.run(cmd, stdout=outfile, check=True)
+    Manifest.record([moved], [bed], bedtools_args)
 
 
 if __name__ == '__main__':
@@ -1,8 +1,8 @@
 import logging
-import os
-import re
 
 import click
+from seqtools.bed import Bed
+from seqtools.process import Jobs, Manifest
 from seqtools.txt import Parser
 
 
@@ -17,19 +17,20 @@ from seqtools.txt import Parser
               help='First bin minimum length.')
 @click.option('--binMaxLength', '-L', type=int, default=500, show_default=True,
               help='Last bin maximum length.')
-def slowsplit(samples, index, binlength, binminlength, binmaxlength):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
+def slowsplit(samples, index, binlength, binminlength, binmaxlength, jobs):
     '''Split BED files from samples based on lenght of annotations.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    split_samples(samples, index, binlength, binminlength, binmaxlength)
+    split_samples(samples, index, binlength, binminlength, binmaxlength, jobs)
 
 
-def split_samples(samples='samples.txt', index=None, binlength=10, binminlength=100, binmaxlength=500):
+def split_samples(samples='samples.txt', index=None, binlength=10, binminlength=100, binmaxlength=500, jobs=1):
     '''Split BED files from samples based on lenght of annotations.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        split_sample(sample, binlength, binminlength, binmaxlength)
+    Jobs.run(split_sample, [(sample, binlength, binminlength, binmaxlength) for sample in sample_names], jobs)
 
 
 def split_sample(sample, binlength, binminlength, binmaxlength):
@@ -37,28 +38,20 @@ def split_sample(sample, binlength, binminlength, binmaxlength):
     print ('Split BED file of sample {}'.format(sample))
     if binlength is not None:
         bed = sample + '.bed'
+        bins = []
         for bin_start in range(binminlength, binmaxlength, binlength):
             bin_end = min(bin_start + binlength, binmaxlength)
             sample_bin = '{}-{}-{}'.format(sample, bin_start, bin_end)
             bed_bin = sample_bin + '.bed'
+            bins.append((bed_bin, bin_start, bin_end))
+        outputs = [bin[0] for bin in bins]
+        parameters = [binlength, binminlength, binmaxlength]
+        if Manifest.up_to_date(outputs, [bed], parameters):
+            return
+        for bed_bin in outputs:
             print ('Splitting BED {} to BIN {}'.format(bed, bed_bin))
-            filter_bed_by_length(bed, bed_bin, bin_start, bin_end)
-
-
-def filter_bed_by_length(bed, output, minLength, maxLength):
-    '''Filter BED file and keep only annotations that have specified size. Minimum size is included but max size is excluded.'''
-    with open(bed, 'r') as infile, open(output, 'w') as outfile:
-        for line in infile:
-            if line.startswith('track') or line.startswith('browser') or line.startswith('#'):
-                outfile.write(line)
-                continue
-            columns = line.rstrip('\r\n').split('\t')
-            if len(columns) >= 3:
-                start = int(columns[1])
-                end = int(columns[2])
-                length = end - start
-                if length >= minLength and length < maxLength:
-                    outfile.write(line)
+        Bed.split_by_length(bed, bins)
+        Manifest.record(outputs, [bed], parameters)
 
 
 if __name__ == '__main__':
@@ -1,12 +1,11 @@
-import datetime
 import logging
 import os
 import re
-import subprocess
 import tempfile
 
 import click
 from seqtools.bed import Bed
+from seqtools.process import Jobs, Manifest, Workspace
 from seqtools.txt import Parser
 
 
@@ -21,26 +20,42 @@ from seqtools.txt import Parser
               help='First bin minimum length.')
 @click.option('--binMaxLength', '-L', type=int, default=500, show_default=True,
               help='Last bin maximum length.')
-def split(samples, index, binlength, binminlength, binmaxlength):
+@click.option('--stream/--no-stream', default=False, show_default=True,
+              help='Split BED in a single pass without sorting it - BED must be sorted by coordinates.')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
+def split(samples, index, binlength, binminlength, binmaxlength, stream, jobs):
     '''Split BED files from samples based on lenght of annotations.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    split_samples(samples, index, binlength, binminlength, binmaxlength)
+    split_samples(samples, index, binlength, binminlength, binmaxlength, stream, jobs)
 
 
-def split_samples(samples='samples.txt', index=None, binlength=10, binminlength=100, binmaxlength=500):
+def split_samples(samples='samples.txt', index=None, binlength=10, binminlength=100, binmaxlength=500, stream=False, jobs=1):
     '''Split BED files from samples based on lenght of annotations.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        split_sample(sample, binlength, binminlength, binmaxlength)
+    Jobs.run(split_sample, [(sample, binlength, binminlength, binmaxlength, stream) for sample in sample_names], jobs)
 
 
-def split_sample(sample, binlength, binminlength, binmaxlength):
+def split_sample(sample, binlength, binminlength, binmaxlength, stream=False):
     '''Split BED file from a single sample based on lenght of annotations.'''
     print ('Split BED file of sample {}'.format(sample))
-    if binlength is not None:
-        bed = sample + '.bed'
+    if binlength is None:
+        return
+    bed = sample + '.bed'
+    outputs = ['{}-{}-{}.bed'.format(sample, bin_start, bin_end) for bin_start, bin_end in bins(binlength, binminlength, binmaxlength)]
+    parameters = [binlength, binminlength, binmaxlength]
+    if Manifest.up_to_date(outputs, [bed], parameters):
+        return
+    if stream:
+        bin_files = []
+        for bin_start, bin_end in bins(binlength, binminlength, binmaxlength):
+            bin_file = '{}-{}-{}.bed'.format(sample, bin_start, bin_end)
+            print ('Splitting BED {} to BIN {}'.format(bed, bin_file))
+            bin_files.append((bin_file, bin_start, bin_end))
+        Bed.split_by_length(bed, bin_files)
+    else:
         bed_sort_o, bed_sort = tempfile.mkstemp(suffix='.bed')
         Bed.sort_bysize(bed, bed_sort)
         with open(bed_sort, 'r') as infile:
@@ -60,6 +75,12 @@ def split_sample(sample, binlength, binminlength, binmaxlength):
                 Bed.sort(bin_temp, bin_file)
                 os.remove(bin_temp)
         os.remove(bed_sort)
+    Manifest.record(outputs, [bed], parameters)
+
+
+def bins(binlength, binminlength, binmaxlength):
+    '''Returns minimum and maximum length of annotations of each bin.'''
+    return [(bin_start, min(bin_start + binlength, binmaxlength)) for bin_start in range(binminlength, binmaxlength, binlength)]
 
 
 def annotation_length(line):
@@ -72,17 +93,23 @@ def annotation_length(line):
 
 def splits(sample):
     '''Returns all splits for sample, sorted.'''
-    regex = re.compile(sample + '-(\\d+)-\\d+\\.bed')
-    files = os.listdir()
-    beds = filter(regex.match, files)
-    sample_splits = [bed[:-4] for bed in beds]
-    sample_splits.sort(key=splitkey)
-    return sample_splits
+    return Workspace.splits(sample)
+
+
+def samples_splits(samples):
+    '''Returns samples, each sample followed by its splits.'''
+    return [name for sample in samples for name in [sample] + splits(sample)]
 
 
 def splitkey(split):
     return int(re.search('(\\d+)-\\d+$', split).group(1))
 
 
+def splitrange(split):
+    '''Returns minimum and maximum length of annotations in split.'''
+    match = re.search('(\\d+)-(\\d+)$', split)
+    return int(match.group(1)), int(match.group(2))
+
+
 if __name__ == '__main__':
     split()
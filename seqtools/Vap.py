@@ -1,4 +1,3 @@
-from distutils.command.check import check
 import glob
 import logging
 import os
@@ -8,6 +7,7 @@ import subprocess
 import click
 
 from seqtools import Split
+from seqtools.process import Jobs
 from seqtools.txt import Parser
 
 
@@ -20,19 +20,20 @@ from seqtools.txt import Parser
               help='VAP selection_path file.')
 @click.option('--index', '-i', type=int, default=None,
               help='Index of sample to process in samples file.')
-def vap(samples, parameters, selection, index):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of samples processed in parallel.')
+def vap(samples, parameters, selection, index, jobs):
     '''Run VAP on samples.'''
     logging.basicConfig(filename='seqtools.log', level=logging.DEBUG, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    vap_samples(samples, parameters, selection, index)
+    vap_samples(samples, parameters, selection, index, jobs)
 
 
-def vap_samples(samples='samples.txt', parameters='parameters.txt', selection=None, index=None):
+def vap_samples(samples='samples.txt', parameters='parameters.txt', selection=None, index=None, jobs=1):
     '''Run VAP on samples.'''
     sample_names = Parser.first(samples)
     if index != None:
         sample_names = [sample_names[index]]
-    for sample in sample_names:
-        vap_sample(sample, parameters, selection)
+    Jobs.run(vap_sample, [(sample, parameters, selection) for sample in sample_names], jobs)
 
 
 def vap_sample(sample, parameters, selection):
@@ -1,23 +1,139 @@
-from distutils.command.check import check
+from contextlib import ExitStack
+import heapq
+import itertools
+import json
 import logging
 import os
+import re
 import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+from seqtools.process import Jobs, Workspace
+
+SORT_MEMORY = None
+SORT_THREADS = 1
+SORT_TMPDIR = None
+MERGE_FILES = 256
+LINE_OVERHEAD = 150
+MEMORY_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
 
 
 def count_bed(bed, *, strand=None):
     '''Counts number of entry in BED, can be limited to a specific strand.'''
-    count = 0
-    with open(bed, 'r') as infile:
-        for line in infile:
-            if line.startswith('track') or line.startswith('browser') or line.startswith('#'):
-                continue
-            if strand is None:
-                count += 1
-            else:
-                columns = line.rstrip('\r\n').split('\t')
-                if len(columns) >= 6 and columns[5] == strand:
-                    count += 1
-    return count
+    index = bed_index(bed)
+    if strand is None:
+        return index['count']
+    else:
+        return index['strands'].get(strand, 0)
+
+
+def bed_index(bed):
+    '''
+    Returns number of entries, number of entries per strand and number of entries per length of BED.
+
+    The index is saved in a file next to BED and is only computed again when BED's size or modification time changes.
+    BED modified too recently to be distinguished from a later modification by its timestamp is also checked by its checksum, see read_index.
+    '''
+    index = read_index(bed)
+    if index is None:
+        index = new_index()
+        with open(bed, 'r') as infile:
+            for line in infile:
+                add_to_index(index, line)
+        write_index(bed, index)
+    return index
+
+
+def index_file(bed):
+    '''Returns file containing index of BED.'''
+    directory, name = os.path.split(bed)
+    return os.path.join(directory, '.' + name + '.count')
+
+
+def new_index():
+    '''Returns an empty BED index.'''
+    return {'count': 0, 'strands': {}, 'lengths': {}}
+
+
+def add_to_index(index, line):
+    '''Adds BED line to index, blank lines are ignored.'''
+    if line.startswith('track') or line.startswith('browser') or line.startswith('#') or line.isspace():
+        return
+    index['count'] += 1
+    columns = line.rstrip('\r\n').split('\t')
+    if len(columns) >= 6:
+        index['strands'][columns[5]] = index['strands'].get(columns[5], 0) + 1
+    if len(columns) >= 3:
+        try:
+            length = int(columns[2]) - int(columns[1])
+            index['lengths'][length] = index['lengths'].get(length, 0) + 1
+        except ValueError:
+            pass
+
+
+def add_index(index, other):
+    '''Adds counts of other index to index.'''
+    index['count'] += other['count']
+    for strand, count in other['strands'].items():
+        index['strands'][strand] = index['strands'].get(strand, 0) + count
+    for length, count in other['lengths'].items():
+        index['lengths'][length] = index['lengths'].get(length, 0) + count
+
+
+def read_index(bed):
+    '''
+    Returns index of BED if it exists and is up to date, otherwise returns None.
+
+    An index saved less than RACY_DELAY of Workspace after BED was modified could miss a later modification of the same size within the timestamp granularity.
+    Such index is only returned if BED's checksum did not change, and is saved again without checksum once BED is old enough.
+    '''
+    try:
+        with open(index_file(bed), 'r') as infile:
+            index = json.load(infile)
+        stat = os.stat(bed)
+        if index['size'] != stat.st_size or index['mtime'] != stat.st_mtime_ns:
+            return None
+        index['lengths'] = {int(length): count for length, count in index['lengths'].items()}
+        if 'checksum' in index:
+            if index['checksum'] != checksum(bed):
+                return None
+            if not racy(stat):
+                write_index(bed, index)
+        return index
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+
+
+def write_index(bed, index):
+    '''Saves index of BED next to BED, with BED's checksum if BED was modified too recently, see read_index.'''
+    try:
+        stat = os.stat(bed)
+        index['size'] = stat.st_size
+        index['mtime'] = stat.st_mtime_ns
+        index.pop('checksum', None)
+        if racy(stat):
+            index['checksum'] = checksum(bed)
+        with open(index_file(bed), 'w') as outfile:
+            json.dump(index, outfile)
+    except OSError as e:
+        logging.warning('Could not save index of BED {}: {}'.format(bed, e))
+
+
+def racy(stat):
+    '''Returns True if file was modified too recently for its modification time to detect following modifications.'''
+    return stat.st_mtime_ns >= time.time_ns() - Workspace.RACY_DELAY
+
+
+def checksum(bed):
+    '''Returns CRC-32 checksum of BED.'''
+    crc = 0
+    with open(bed, 'rb') as infile:
+        for block in iter(lambda: infile.read(1048576), b''):
+            crc = zlib.crc32(block, crc)
+    return crc
 
 
 def empty_bed(bed_output, sample, *, strand=None):
@@ -32,10 +148,14 @@ def empty_bed(bed_output, sample, *, strand=None):
 
 def sort(input, output):
     '''Sort BED file by chromosome and start'''
-    if os.name == 'posix':
+    if SORT_MEMORY:
+        external_sort(input, output, SORT_MEMORY, SORT_THREADS, SORT_TMPDIR)
+    elif os.name == 'posix':
         cmd = ['sort', '-k', '1,1', '-k', '2,2n', '-k', '3,3n', '-o', output, input]
+        if SORT_TMPDIR:
+            cmd[1:1] = ['-T', SORT_TMPDIR]
         logging.debug('Running {}'.format(cmd))
-        subprocess.run(cmd, check=True)
+        subprocess.run(cmd, env=sort_environment(), check=True)
     else:
         cmd = ['bedtools', 'sort', '-i', input]
         logging.debug('Running {}'.format(cmd))
@@ -43,6 +163,168 @@ def sort(input, output):
             subprocess.run(cmd, stdout=outfile, check=True)
 
 
+def sort_blocks(blocks, output):
+    '''Sort BED text blocks by chromosome and start, each block must contain complete lines.'''
+    if SORT_MEMORY:
+        lines = itertools.chain.from_iterable(block.splitlines(True) for block in blocks)
+        external_sort_lines(lines, output, SORT_MEMORY, SORT_THREADS, SORT_TMPDIR)
+        return
+    if os.name == 'posix':
+        cmd = ['sort', '-k', '1,1', '-k', '2,2n', '-k', '3,3n', '-o', output]
+        if SORT_TMPDIR:
+            cmd[1:1] = ['-T', SORT_TMPDIR]
+        outfile = None
+    else:
+        cmd = ['bedtools', 'sort', '-i', 'stdin']
+        outfile = open(output, 'w')
+    logging.debug('Running {}'.format(cmd))
+    try:
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=outfile, universal_newlines=True, env=sort_environment())
+        try:
+            for block in blocks:
+                process.stdin.write(block)
+        except BrokenPipeError:
+            # Sort exited before reading all lines, its return code reports the error.
+            pass
+        except:
+            process.kill()
+            raise
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            process.wait()
+    finally:
+        if outfile is not None:
+            outfile.close()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+
+
+def sort_environment():
+    '''Returns environment of sort commands, the C locale compares bytes like external_sort.'''
+    return dict(os.environ, LC_ALL='C')
+
+
+def external_sort(input, output, memory, threads=1, tmpdir=None):
+    '''Sort BED file by chromosome, start and end without using external programs.'''
+    with open(input, 'r') as infile:
+        external_sort_lines(infile, output, memory, threads, tmpdir)
+
+
+def external_sort_lines(infile, output, memory, threads=1, tmpdir=None):
+    '''
+    Sort BED lines by chromosome, start and end without using external programs.
+
+    Chunks of lines that fit in memory are sorted in parallel and saved in temporary files that are merged into output.
+    Lines are compared by bytes like sort with the C locale. Header and blank lines are kept at the beginning of output in their original order.
+    '''
+    logging.debug('Sorting to {} using {} bytes of memory and {} threads'.format(output, memory, threads))
+    threads = max(threads if threads else 1, 1)
+    chunk_memory = max(memory // (2 * threads) if threads > 1 else memory, 1)
+    headers = []
+    spills = []
+    index = new_index()
+    try:
+        chunks = read_chunks(infile, chunk_memory, headers)
+        lines = next(chunks, [])
+        next_lines = next(chunks, None)
+        if next_lines is None:
+            lines.sort(key=sort_key)
+            with open(output, 'w') as outfile:
+                outfile.writelines(headers)
+                outfile.writelines(indexed(lines, index))
+            write_index(output, index)
+            return
+        if threads > 1:
+            with Jobs.executor(threads) as executor:
+                futures = []
+                for chunk in itertools.chain([lines, next_lines], chunks):
+                    if len(futures) >= threads:
+                        spills.append(futures.pop(0).result())
+                    futures.append(executor.submit(sort_chunk, chunk, tmpdir))
+                for future in futures:
+                    spills.append(future.result())
+        else:
+            for chunk in itertools.chain([lines, next_lines], chunks):
+                spills.append(sort_chunk(chunk, tmpdir))
+        while len(spills) > MERGE_FILES:
+            merged = merge_spills(spills[:MERGE_FILES], tmpdir)
+            spills = spills[MERGE_FILES:] + [merged]
+        with open(output, 'w') as outfile, ExitStack() as stack:
+            outfile.writelines(headers)
+            spill_files = [stack.enter_context(open(spill, 'r')) for spill in spills]
+            outfile.writelines(indexed(heapq.merge(*spill_files, key=sort_key), index))
+        write_index(output, index)
+    finally:
+        for spill in spills:
+            if os.path.exists(spill):
+                os.remove(spill)
+
+
+def indexed(lines, index):
+    '''Yields lines after adding them to index.'''
+    for line in lines:
+        add_to_index(index, line)
+        yield line
+
+
+def read_chunks(infile, memory, headers):
+    '''Yields lists of BED lines using approximately specified memory, header and blank lines are added to headers.'''
+    lines = []
+    size = 0
+    for line in infile:
+        if line.startswith('track') or line.startswith('browser') or line.startswith('#') or line.isspace():
+            headers.append(line)
+            continue
+        lines.append(line)
+        size += sys.getsizeof(line) + LINE_OVERHEAD
+        if size >= memory:
+            yield lines
+            lines = []
+            size = 0
+    if lines:
+        yield lines
+
+
+def sort_chunk(lines, tmpdir=None):
+    '''Sort BED lines and saves them in a temporary file, returns the temporary file.'''
+    lines.sort(key=sort_key)
+    spill_o, spill = tempfile.mkstemp(suffix='.bed', dir=tmpdir)
+    with open(spill_o, 'w') as outfile:
+        outfile.writelines(lines)
+    return spill
+
+
+def merge_spills(spills, tmpdir=None):
+    '''Merge sorted temporary files into a new temporary file and deletes merged files.'''
+    merged_o, merged = tempfile.mkstemp(suffix='.bed', dir=tmpdir)
+    with open(merged_o, 'w') as outfile, ExitStack() as stack:
+        spill_files = [stack.enter_context(open(spill, 'r')) for spill in spills]
+        outfile.writelines(heapq.merge(*spill_files, key=sort_key))
+    for spill in spills:
+        os.remove(spill)
+    return merged
+
+
+def sort_key(line):
+    '''Returns key used to sort BED lines by chromosome, start and end.'''
+    columns = line.split('\t', 3)
+    try:
+        return columns[0], int(columns[1]), int(columns[2]), line
+    except (IndexError, ValueError):
+        raise AssertionError('Cannot sort BED line {!r}, chromosome, start and end must be separated by tabs and coordinates must be integers'.format(line.rstrip('\r\n'))) from None
+
+
+def memory_size(value):
+    '''Returns number of bytes of memory size like 500M or 2G.'''
+    match = re.fullmatch('(\\d+)([KMGT]?)B?', str(value).strip().upper())
+    if not match:
+        raise AssertionError('Memory size {} is invalid, use a number optionally followed by K, M, G or T'.format(value))
+    return int(match.group(1)) * MEMORY_UNITS[match.group(2)]
+
+
 def sort_bysize(input, output):
     '''Sort BED file by size'''
     cmd = ['bedtools', 'sort', '-sizeA', '-i', input]
@@ -51,6 +333,35 @@ def sort_bysize(input, output):
         subprocess.run(cmd, stdout=outfile, check=True)
 
 
+def split_by_length(input, outputs):
+    '''
+    Split BED file in a single pass based on length of annotations.
+
+    Outputs are (output, minimum length, maximum length) tuples, minimum length is included and maximum length is excluded.
+    Order of annotations is preserved, so outputs are sorted if input is sorted.
+    '''
+    length_outputs = {}
+    indexes = [new_index() for output in outputs]
+    with open(input, 'r') as infile, ExitStack() as stack:
+        outfiles = [stack.enter_context(open(output[0], 'w')) for output in outputs]
+        for line in infile:
+            if line.startswith('track') or line.startswith('browser') or line.startswith('#'):
+                for outfile in outfiles:
+                    outfile.write(line)
+                continue
+            columns = line.rstrip('\r\n').split('\t')
+            if len(columns) < 3:
+                continue
+            length = int(columns[2]) - int(columns[1])
+            if not length in length_outputs:
+                length_outputs[length] = [i for i in range(0, len(outputs)) if length >= outputs[i][1] and length < outputs[i][2]]
+            for i in length_outputs[length]:
+                outfiles[i].write(line)
+                add_to_index(indexes[i], line)
+    for output, index in zip(outputs, indexes):
+        write_index(output[0], index)
+
+
 def bedgraph_to_bigwig(bed, bigwig, sizes):
     '''Converts bedgraph file to bigwig.'''
     cmd = ['bedGraphToBigWig', bed, sizes, bigwig]
@@ -0,0 +1,140 @@
+from collections import OrderedDict
+import itertools
+import logging
+
+# Maximum memory used by blocks of all bigWig files opened by the current process, in bytes.
+MEMORY = 512 * 1024 ** 2
+BLOCK_SIZE = 4194304
+BLOCKS = OrderedDict()
+IDS = itertools.count()
+used = 0
+
+
+class BigWigCache:
+    '''
+    Reads signal of a bigWig by large blocks kept in memory as NumPy arrays.
+
+    bigBed files are also supported, the signal of a base is the sum of scores of entries covering it, entries without score count as 1.
+
+    Blocks of all opened bigWig files share the MEMORY budget, least recently used blocks are evicted first.
+    Arrays returned by values are views of blocks and must not be modified.
+    Sequential scans that read each base once should use read, which bypasses the blocks.
+    '''
+
+    def __init__(self, bigwig, block_size=BLOCK_SIZE):
+        import pyBigWig as pbw
+        self.bigwig = bigwig
+        self.bw = pbw.open(bigwig)
+        self.block_size = block_size
+        self.id = next(IDS)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        '''Closes bigWig and evicts its blocks.'''
+        for key in [key for key in BLOCKS if key[0] == self.id]:
+            evict(key)
+        self.bw.close()
+
+    def chroms(self, chromosome=None):
+        '''Returns size of chromosome or size of all chromosomes when chromosome is None, like pyBigWig.'''
+        if chromosome is None:
+            return self.bw.chroms()
+        return self.bw.chroms(chromosome)
+
+    def values(self, chromosome, start, end):
+        '''Returns signal of bases from start to end (exclusive) of chromosome as a NumPy array, missing values are NaN.'''
+        import numpy as np
+        size = self.check_bounds(chromosome, start, end)
+        first_block = start // self.block_size
+        last_block = max((end - 1) // self.block_size, first_block)
+        parts = []
+        for block_index in range(first_block, last_block + 1):
+            block_start = block_index * self.block_size
+            block = self.block(chromosome, block_index, size)
+            parts.append(block[max(start - block_start, 0):end - block_start])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def read(self, chromosome, start, end):
+        '''Returns signal of bases from start to end (exclusive) of chromosome read from bigWig without keeping it in memory, missing values are NaN.'''
+        import numpy as np
+        self.check_bounds(chromosome, start, end)
+        if self.bw.isBigBed():
+            return bigbed_values(self.bw.entries(chromosome, start, end), start, end)
+        return np.asarray(self.bw.values(chromosome, start, end, numpy=True), dtype='float32')
+
+    def check_bounds(self, chromosome, start, end):
+        '''Returns size of chromosome, raises a RuntimeError like pyBigWig if interval is not within chromosome.'''
+        size = self.chroms(chromosome)
+        if not size or start < 0 or end > size or start > end:
+            raise RuntimeError('Invalid interval bounds for {}:{}-{} in bigWig {}'.format(chromosome, start, end, self.bigwig))
+        return size
+
+    def intervals(self, chromosome, start, end):
+        '''Returns runs of equal signal from start to end (exclusive) of chromosome as (start, end, value) tuples, runs are clipped to start and end.'''
+        import numpy as np
+        values = self.values(chromosome, start, end)
+        if len(values) == 0:
+            return ()
+        missing = np.isnan(values)
+        changes = np.flatnonzero((values[1:] != values[:-1]) & ~(missing[1:] & missing[:-1])) + 1
+        starts = np.concatenate(([0], changes))
+        ends = np.concatenate((changes, [len(values)]))
+        covered = ~missing[starts]
+        return tuple((int(run_start) + start, int(run_end) + start, float(values[run_start])) for run_start, run_end in zip(starts[covered], ends[covered]))
+
+    def block(self, chromosome, block_index, size):
+        '''Returns block of chromosome, reading it from bigWig if it is not in memory.'''
+        global used
+        key = (self.id, chromosome, block_index)
+        block = BLOCKS.get(key)
+        if block is not None:
+            BLOCKS.move_to_end(key)
+            return block
+        block_start = block_index * self.block_size
+        block_end = min(block_start + self.block_size, size)
+        logging.debug('Reading block {}:{}-{} of bigWig {}'.format(chromosome, block_start, block_end, self.bigwig))
+        block = self.read(chromosome, block_start, block_end)
+        block.flags.writeable = False
+        BLOCKS[key] = block
+        used += block.nbytes
+        while used > MEMORY and len(BLOCKS) > 1:
+            evict(next(iter(BLOCKS)))
+        return block
+
+
+def bigbed_values(entries, start, end):
+    '''Returns signal of bigBed entries from start to end (exclusive), bases not covered by any entry are NaN.'''
+    import numpy as np
+    signal = np.zeros(end - start + 1)
+    coverage = np.zeros(end - start + 1, dtype=int)
+    if entries:
+        entry_starts = np.clip([entry[0] for entry in entries], start, end) - start
+        entry_ends = np.clip([entry[1] for entry in entries], start, end) - start
+        scores = [entry_score(entry) for entry in entries]
+        np.add.at(signal, entry_starts, scores)
+        np.subtract.at(signal, entry_ends, scores)
+        np.add.at(coverage, entry_starts, 1)
+        np.subtract.at(coverage, entry_ends, 1)
+    signal = np.cumsum(signal[:-1]).astype('float32')
+    signal[np.cumsum(coverage[:-1]) == 0] = np.nan
+    return signal
+
+
+def entry_score(entry):
+    '''Returns score of bigBed entry, which is the second field following coordinates, or 1 if entry has no score.'''
+    fields = entry[2].split('\t') if len(entry) > 2 and entry[2] else []
+    try:
+        return float(fields[1])
+    except (IndexError, ValueError):
+        return 1.0
+
+
+def evict(key):
+    '''Removes block from memory.'''
+    global used
+    used -= BLOCKS.pop(key).nbytes
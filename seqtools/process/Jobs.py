@@ -0,0 +1,97 @@
+from concurrent.futures import ProcessPoolExecutor
+import importlib
+import logging
+import logging.handlers
+import multiprocessing
+
+# Module attributes set by options of command groups, copied to worker processes whatever their start method.
+SETTINGS = [('seqtools.process.Manifest', 'FORCE'),
+            ('seqtools.bed.Bed', 'SORT_MEMORY'),
+            ('seqtools.bed.Bed', 'SORT_THREADS'),
+            ('seqtools.bed.Bed', 'SORT_TMPDIR'),
+            ('seqtools.bigwig.BigWigCache', 'MEMORY')]
+
+
+def run(function, tasks, jobs=1):
+    '''Calls function once per task using task as arguments, tasks are processed by parallel processes when jobs is greater than 1.
+
+    The first argument of a task is the sample name used to report failures.
+    All tasks are processed even if some fail, an AssertionError listing failed samples and caused by the first failure is raised at the end.
+    When there is a single task, it is processed by the current process and its exception is raised unchanged.
+    When jobs is greater than 1, log records of worker processes are written by the current process to prevent interleaved lines.
+    '''
+    if len(tasks) == 1:
+        function(*tasks[0])
+        return
+    if jobs is None or jobs <= 1 or not tasks:
+        failures = []
+        for task in tasks:
+            try:
+                function(*task)
+            except Exception as exception:
+                report_failure(task, exception, failures)
+        raise_failures(failures)
+        return
+    root = logging.getLogger()
+    queue = multiprocessing.Queue()
+    listener = logging.handlers.QueueListener(queue, *root.handlers, respect_handler_level=True)
+    listener.start()
+    failures = []
+    try:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), initializer=init_worker, initargs=(queue, root.level, settings())) as executor:
+            futures = [executor.submit(function, *task) for task in tasks]
+            for task, future in zip(tasks, futures):
+                try:
+                    future.result()
+                except Exception as exception:
+                    report_failure(task, exception, failures)
+    finally:
+        listener.stop()
+        queue.close()
+    raise_failures(failures)
+
+
+def report_failure(task, exception, failures):
+    '''Logs and prints failure of task and adds it to failures.'''
+    logging.error('Processing of sample {} failed'.format(task[0]), exc_info=exception)
+    print ('Processing of sample {} failed: {}'.format(task[0], exception))
+    failures.append((str(task[0]), exception))
+
+
+def raise_failures(failures):
+    '''Raises an AssertionError listing failed samples, if any, caused by the first failure.'''
+    if failures:
+        raise AssertionError('Processing failed for samples {}'.format(', '.join([failure[0] for failure in failures]))) from failures[0][1]
+
+
+def executor(max_workers, mp_context=None):
+    '''Returns a ProcessPoolExecutor whose workers use the same settings as the current process.'''
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context, initializer=apply_settings, initargs=(settings(),))
+
+
+def settings():
+    '''Returns values of SETTINGS in the current process.'''
+    return [(module, attribute, getattr(importlib.import_module(module), attribute)) for module, attribute in SETTINGS]
+
+
+def apply_settings(values):
+    '''Sets values returned by settings in the current process.'''
+    for module, attribute, value in values:
+        setattr(importlib.import_module(module), attribute, value)
+
+
+def init_worker(queue, level, values=()):
+    '''Sends log records of worker process to queue and applies settings of parent process.'''
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(queue))
+    root.setLevel(level)
+    apply_settings(values)
+
+
+def split_threads(threads=None, jobs=1):
+    '''Splits threads between concurrent jobs, returns threads available to each job.'''
+    if threads is None or jobs is None or jobs <= 1:
+        return threads
+    return max(threads // jobs, 1)
@@ -0,0 +1,32 @@
+import importlib
+import logging
+
+import click
+
+
+class LazyGroup(click.Group):
+    '''Group of commands whose modules are imported only when a command is needed.'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = {}
+
+    def add_lazy_command(self, name, command):
+        '''Registers command, given as module followed by attribute like seqtools.Merge.merge, under name.'''
+        self.lazy_commands[name] = command
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            self.add_command(load_command(self.lazy_commands[cmd_name]), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+
+def load_command(command):
+    '''Imports module of command and returns command.'''
+    module_name, attribute = command.rsplit('.', 1)
+    logging.debug('Importing command {}'.format(command))
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute)
@@ -0,0 +1,58 @@
+import json
+import logging
+import os
+
+FORCE = False
+
+
+def manifest_file(output):
+    '''Returns file containing manifest of output.'''
+    directory, name = os.path.split(output)
+    return os.path.join(directory, '.' + name + '.manifest')
+
+
+def up_to_date(outputs, inputs, parameters=None):
+    '''
+    Returns True if outputs were created from inputs using parameters and none of the files changed since then.
+
+    The manifest is saved next to first output by record. Always returns False when FORCE is True.
+    '''
+    if FORCE or not outputs:
+        return False
+    try:
+        with open(manifest_file(outputs[0]), 'r') as infile:
+            manifest = json.load(infile)
+        current = {'inputs': files_state(inputs), 'outputs': files_state(outputs), 'parameters': normalize(parameters)}
+    except (OSError, ValueError):
+        return False
+    if manifest != current:
+        return False
+    logging.debug('Skipping creation of {}, outputs are up to date'.format(outputs))
+    print ('Skipping creation of {}, outputs are up to date'.format(', '.join([str(output) for output in outputs])))
+    return True
+
+
+def record(outputs, inputs, parameters=None):
+    '''Saves a manifest of outputs next to first output containing state of inputs, outputs and parameters.'''
+    if not outputs:
+        return
+    try:
+        manifest = {'inputs': files_state(inputs), 'outputs': files_state(outputs), 'parameters': normalize(parameters)}
+        with open(manifest_file(outputs[0]), 'w') as outfile:
+            json.dump(manifest, outfile)
+    except OSError as e:
+        logging.warning('Could not save manifest of {}: {}'.format(outputs, e))
+
+
+def files_state(files):
+    '''Returns size and modification time of files.'''
+    state = []
+    for file in files:
+        stat = os.stat(file)
+        state.append([str(file), stat.st_size, stat.st_mtime_ns])
+    return state
+
+
+def normalize(parameters):
+    '''Returns parameters as they are after being saved in a manifest.'''
+    return json.loads(json.dumps(parameters, default=str))
@@ -0,0 +1,99 @@
+from contextlib import contextmanager
+import logging
+import signal
+import subprocess
+
+
+class PipeError(subprocess.CalledProcessError):
+    '''Raised when commands of a pipe fail, cmd and returncode are those of the first command that failed, failures lists all failed commands with their return code.'''
+
+    def __init__(self, failures):
+        super().__init__(failures[0][1], failures[0][0])
+        self.failures = failures
+
+    def __str__(self):
+        return 'Pipe failed: ' + '; '.join(['command {} returned exit status {}'.format(cmd, returncode) for cmd, returncode in self.failures])
+
+
+def pipe(cmds, stdout=None):
+    '''Runs commands connected by pipes, standard output of each command is the standard input of the next command.'''
+    processes = start(cmds, stdout)
+    wait(cmds, processes)
+
+
+@contextmanager
+def pipe_output(cmds):
+    '''Runs commands connected by pipes and yields standard output of the last command as a binary stream.'''
+    processes = start(cmds, subprocess.PIPE)
+    try:
+        yield processes[-1].stdout
+    except:
+        kill(processes)
+        raise
+    finally:
+        processes[-1].stdout.close()
+    wait(cmds, processes)
+
+
+def start(cmds, stdout=None):
+    '''Starts commands connected by pipes, returns processes.'''
+    logging.debug('Running {}'.format(' | '.join([str(cmd) for cmd in cmds])))
+    processes = []
+    try:
+        stdin = None
+        for i in range(0, len(cmds)):
+            last = i == len(cmds) - 1
+            process = subprocess.Popen(cmds[i], stdin=stdin, stdout=stdout if last else subprocess.PIPE)
+            if stdin is not None:
+                stdin.close()
+            stdin = process.stdout
+            processes.append(process)
+    except:
+        kill(processes)
+        raise
+    return processes
+
+
+def wait(cmds, processes):
+    '''
+    Waits for processes to complete and raises a PipeError listing all commands that failed.
+
+    The error reports first the first command that failed in pipe order. Commands killed by a broken pipe come last because they failed only when a following command exited.
+    '''
+    for process in processes:
+        process.wait()
+    failures = [(cmd, process.returncode) for cmd, process in zip(cmds, processes) if process.returncode != 0]
+    if failures:
+        failures.sort(key=lambda failure: failure[1] == -signal.SIGPIPE)
+        raise PipeError(failures)
+
+
+def kill(processes):
+    '''Kills processes.'''
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def split_threads(threads=None):
+    '''Splits threads between a producer command and a samtools consumer, returns producer threads and additional samtools threads.'''
+    if threads is None or threads <= 1:
+        return 1, 0
+    consumer_threads = threads // 4
+    return threads - consumer_threads, consumer_threads
+
+
+def split_stages_threads(threads=None, weights=(1,)):
+    '''
+    Splits threads between concurrent commands of a pipe, returns additional threads of each command.
+
+    Each command has one main thread, the remaining threads are divided in proportion to weights.
+    '''
+    if threads is None or threads <= len(weights):
+        return [0] * len(weights)
+    extra = threads - len(weights)
+    total = sum(weights)
+    stages = [extra * weight // total for weight in weights]
+    for i in sorted(range(len(weights)), key=lambda i: -weights[i])[:extra - sum(stages)]:
+        stages[i] += 1
+    return stages
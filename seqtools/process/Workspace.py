@@ -0,0 +1,71 @@
+import logging
+import os
+import re
+import time
+
+FASTQ_REGEX = re.compile(r'^(.*)_R?(\d+)\.fastq(\.gz)?$')
+SPLIT_REGEX = re.compile(r'^(.*)-(\d+)-(\d+)\.bed$')
+# Listings of directories modified less than this many nanoseconds before being listed are not reused.
+RACY_DELAY = 2000000000
+CACHE = {}
+
+
+def index(directory='.'):
+    '''Returns index of files in directory, the directory is listed again only when its modification time changes.
+
+    The index is a dictionary with the following keys:
+    files: names of all files, in the order of os.listdir
+    fastq: FASTQ files for each (sample, read)
+    splits: split names for each sample, as (split, minimum length, maximum length)
+    suffixes: names of files for each suffix starting at last '-' of name
+    '''
+    path = os.path.abspath(directory)
+    mtime = os.stat(path).st_mtime_ns
+    cached = CACHE.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    logging.debug('Listing files of directory {}'.format(path))
+    listed = time.time_ns()
+    workspace = parse(os.listdir(path))
+    if mtime < listed - RACY_DELAY:
+        CACHE[path] = (mtime, workspace)
+    else:
+        CACHE.pop(path, None)
+    return workspace
+
+
+def parse(files):
+    '''Parses names of files into an index.'''
+    workspace = {'files': files, 'fastq': {}, 'splits': {}, 'suffixes': {}}
+    for file in files:
+        match = FASTQ_REGEX.match(file)
+        if match:
+            workspace['fastq'].setdefault((match.group(1), match.group(2)), []).append(file)
+        match = SPLIT_REGEX.match(file)
+        if match:
+            workspace['splits'].setdefault(match.group(1), []).append((file[:-4], int(match.group(2)), int(match.group(3))))
+        hyphen = file.rfind('-')
+        if hyphen != -1:
+            workspace['suffixes'].setdefault(file[hyphen:], []).append(file)
+    return workspace
+
+
+def fastq(sample, read=1, directory='.'):
+    '''Returns FASTQ files of sample for read.'''
+    return list(index(directory)['fastq'].get((sample, str(read)), []))
+
+
+def splits(sample, directory='.'):
+    '''Returns split names of sample, sorted by minimum length.'''
+    sample_splits = sorted(index(directory)['splits'].get(sample, []), key=lambda split: split[1])
+    return [split[0] for split in sample_splits]
+
+
+def files_with_suffix(suffix, directory='.'):
+    '''Returns names of files ending with suffix, suffix must start with '-' and contain no other '-'.'''
+    return list(index(directory)['suffixes'].get(suffix, []))
+
+
+def clear():
+    '''Forgets all directory listings.'''
+    CACHE.clear()
@@ -1,10 +1,9 @@
-import os
-import re
+from seqtools.process import Workspace
 
 
 def fastq(sample, read=1):
     '''Returns existing FASTQ file for sample - read 1 or read 2, defaults to read 1.'''
-    files = [f for f in os.listdir('.') if re.match('^' + re.escape(sample) + r'_R?' + str(read) + r'\.fastq(\.gz)?$', f)]
+    files = Workspace.fastq(sample, read)
     if len(files) == 0:
         return None
     else:
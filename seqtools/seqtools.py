@@ -1,36 +1,63 @@
 import click
 
-from seqtools import Bam2Bed, Bowtie2, Bwa, CenterAnnotations, ChipexoQual, Download, FilterBam, Fixmd5, GenomeCoverage, IgnoreStrand, Intersect, IntersectAnnotations, Merge, MergeBam, MergeBigwigs, Plot2do, RemoveSecondMate, Rename, ShiftAnnotations, SlowSplit, Split, Statistics, Vap
-
-
-@click.group()
-def seqtools():
-    pass
-
-
-seqtools.add_command(Bam2Bed.bam2bed)
-seqtools.add_command(Bowtie2.bowtie2)
-seqtools.add_command(Bwa.bwa)
-seqtools.add_command(CenterAnnotations.centerannotations)
-seqtools.add_command(ChipexoQual.chipexoqual)
-seqtools.add_command(Download.download)
-seqtools.add_command(FilterBam.filterbam)
-seqtools.add_command(Fixmd5.fixmd5)
-seqtools.add_command(GenomeCoverage.genomecov)
-seqtools.add_command(IgnoreStrand.ignorestrand)
-seqtools.add_command(Intersect.intersect)
-seqtools.add_command(IntersectAnnotations.intersectannotations)
-seqtools.add_command(Merge.merge)
-seqtools.add_command(MergeBam.mergebam)
-seqtools.add_command(MergeBigwigs.mergebw)
-seqtools.add_command(Plot2do.plot2do)
-seqtools.add_command(RemoveSecondMate.removesecondmate)
-seqtools.add_command(Rename.rename)
-seqtools.add_command(ShiftAnnotations.shiftannotations)
-seqtools.add_command(SlowSplit.slowsplit)
-seqtools.add_command(Split.split)
-seqtools.add_command(Statistics.statistics)
-seqtools.add_command(Vap.vap)
+from seqtools.bed import Bed
+from seqtools.bigwig import BigWigCache
+from seqtools.process import LazyGroup, Manifest
+
+
+def validate_memory(ctx, param, value):
+    '''Validates that memory is a valid memory size.'''
+    if value is None:
+        return value
+    try:
+        return Bed.memory_size(value)
+    except AssertionError as e:
+        raise click.BadParameter(str(e))
+
+
+@click.group(cls=LazyGroup.LazyGroup)
+@click.option('--sort-mem', callback=validate_memory, default=None,
+              help='Sort BED files without external programs using at most this memory, like 500M or 2G.')
+@click.option('--sort-threads', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of processes used to sort chunks of BED files when --sort-mem is used.')
+@click.option('--sort-tmpdir', type=click.Path(exists=True, file_okay=False), default=None,
+              help='Directory for temporary files created when sorting BED files.')
+@click.option('--bigwig-mem', callback=validate_memory, default='512M', show_default=True,
+              help='Memory used to keep blocks of bigWig files read by a process, like 500M or 2G.')
+@click.option('--force', is_flag=True,
+              help='Create outputs even if they are up to date with their inputs.')
+def seqtools(sort_mem, sort_threads, sort_tmpdir, bigwig_mem, force):
+    Bed.SORT_MEMORY = sort_mem
+    Bed.SORT_THREADS = sort_threads
+    Bed.SORT_TMPDIR = sort_tmpdir
+    BigWigCache.MEMORY = bigwig_mem
+    Manifest.FORCE = force
+
+
+seqtools.add_lazy_command('bam2bed', 'seqtools.Bam2Bed.bam2bed')
+seqtools.add_lazy_command('bowtie2', 'seqtools.Bowtie2.bowtie2')
+seqtools.add_lazy_command('bwa', 'seqtools.Bwa.bwa')
+seqtools.add_lazy_command('centerannotations', 'seqtools.CenterAnnotations.centerannotations')
+seqtools.add_lazy_command('chipexoqual', 'seqtools.ChipexoQual.chipexoqual')
+seqtools.add_lazy_command('download', 'seqtools.Download.download')
+seqtools.add_lazy_command('filterbam', 'seqtools.FilterBam.filterbam')
+seqtools.add_lazy_command('fixmd5', 'seqtools.Fixmd5.fixmd5')
+seqtools.add_lazy_command('genomecov', 'seqtools.GenomeCoverage.genomecov')
+seqtools.add_lazy_command('ignorestrand', 'seqtools.IgnoreStrand.ignorestrand')
+seqtools.add_lazy_command('intersect', 'seqtools.Intersect.intersect')
+seqtools.add_lazy_command('intersectannotations', 'seqtools.IntersectAnnotations.intersectannotations')
+seqtools.add_lazy_command('merge', 'seqtools.Merge.merge')
+seqtools.add_lazy_command('mergebam', 'seqtools.MergeBam.mergebam')
+seqtools.add_lazy_command('mergebw', 'seqtools.MergeBigwigs.mergebw')
+seqtools.add_lazy_command('pipeline', 'seqtools.Pipeline.pipeline')
+seqtools.add_lazy_command('plot2do', 'seqtools.Plot2do.plot2do')
+seqtools.add_lazy_command('removesecondmate', 'seqtools.RemoveSecondMate.removesecondmate')
+seqtools.add_lazy_command('rename', 'seqtools.Rename.rename')
+seqtools.add_lazy_command('shiftannotations', 'seqtools.ShiftAnnotations.shiftannotations')
+seqtools.add_lazy_command('slowsplit', 'seqtools.SlowSplit.slowsplit')
+seqtools.add_lazy_command('split', 'seqtools.Split.split')
+seqtools.add_lazy_command('statistics', 'seqtools.Statistics.statistics')
+seqtools.add_lazy_command('vap', 'seqtools.Vap.vap')
 
 if __name__ == '__main__':
    seqtools()
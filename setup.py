@@ -17,6 +17,7 @@ setup(
         'click>=7.0',
         'pandas>=0.25.0',
         'pyBigWig>=0.3.17',
+        'pysam>=0.15.0',
         'matplotlib>=3.1.1',
         'scipy>=1.3.2',
         'lmfit>=1.0.0'
@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pyBigWig as pbw
+import pytest
+
+from checseqtools import DyadPosition
+from seqtools.bigwig import BigWigCache
+
+
+@pytest.fixture
+def mock_testclass():
+    block_size = BigWigCache.BLOCK_SIZE
+    yield
+    BigWigCache.BLOCK_SIZE = block_size
+
+
+def create_bigwig(bw, chromosomes):
+    output = pbw.open(bw, 'w')
+    output.addHeader([(chromosome, len(values)) for chromosome, values in chromosomes])
+    for chromosome, values in chromosomes:
+        for start, value in enumerate(values):
+            if value is not None:
+                output.addEntries([chromosome], [start], ends=[start + 1], values=[float(value)])
+    output.close()
+
+
+def create_genes(genes_file, genes):
+    genes = pd.DataFrame([[i, chromosome, 'G' + str(i), 0, strand, 0, dyad] for i, (chromosome, strand, dyad) in enumerate(genes)],
+                         columns=['', 'Chr', 'ORF', 'TSS', 'Strand', 'TTS', '+1 nucleosome'])
+    genes.to_csv(genes_file, sep='\t', index=False)
+
+
+def test_dyad_position(testdir, mock_testclass):
+    create_bigwig('signal.bw', [('chrI', [1, 2, 3, 9, 5, 6, 7, 8, 9, 4, 3, 2, 1, 2, 3, 4, 5, 6, 7, 8]), ('chrII', [1, 2, 3, 4])])
+    create_genes('genes.txt', [('chrI', '+', 0), ('chrI', '-', 12), ('chrI', '+', -1), ('chrIII', '+', 0), ('chrII', '+', 10)])
+    DyadPosition.dyad_position('genes.txt', 'signal.bw', 2, 3, 9, 'output.txt')
+    output = pd.read_csv('output.txt', sep='\t')
+    assert output.columns.tolist() == ['Unnamed: 0', 'Chr', 'ORF', 'TSS', 'Strand', 'TTS', '+1 nucleosome', '+2 nucleosome']
+    assert output['+2 nucleosome'].tolist() == [3, 8, -1, -1, -1]
+
+
+def test_dyad_position_signals(testdir, mock_testclass):
+    create_bigwig('signal1.bw', [('chrI', [1, 2, 3, 9, 5, 6, 7, 8, 9, 4])])
+    create_bigwig('signal2.bw', [('chrI', [1, 2, 3, 4, 5, 6, 7, 8, 9, 4])])
+    create_genes('genes.txt', [('chrI', '+', 0)])
+    DyadPosition.dyad_position('genes.txt', ['signal1.bw', 'signal2.bw'], 2, 3, 9, 'output.txt', jobs=2)
+    output = pd.read_csv('output.txt', sep='\t')
+    assert output['+2 nucleosome signal1.bw'].tolist() == [3]
+    assert output['+2 nucleosome signal2.bw'].tolist() == [8]
+
+
+def test_dyad_position_chained(testdir, mock_testclass):
+    create_bigwig('signal.bw', [('chrI', [1, 2, 3, 9, 5, 6, 7, 8, 9, 4, 3, 2, 1, 2, 3, 4, 5, 6, 7, 8])])
+    create_genes('genes.txt', [('chrI', '+', 0), ('chrI', '-', 19), ('chrI', '+', -1), ('chrI', '+', 9)])
+    DyadPosition.dyad_position('genes.txt', 'signal.bw', 4, 3, 9, 'output.txt')
+    output = pd.read_csv('output.txt', sep='\t')
+    assert output.columns.tolist()[6:] == ['+1 nucleosome', '+2 nucleosome', '+3 nucleosome', '+4 nucleosome']
+    assert output['+2 nucleosome'].tolist() == [3, 16, -1, 17]
+    assert output['+3 nucleosome'].tolist() == [8, 8, -1, -1]
+    assert output['+4 nucleosome'].tolist() == [16, 3, -1, -1]
+
+
+def test_dyad_position_dyad(testdir, mock_testclass):
+    create_genes('genes.txt', [('chrI', '+', 0)])
+    with pytest.raises(AssertionError):
+        DyadPosition.dyad_position('genes.txt', 'signal.bw', 1, 3, 9, 'output.txt')
+
+
+def test_window_maxima(testdir, mock_testclass):
+    BigWigCache.BLOCK_SIZE = 4
+    create_bigwig('signal.bw', [('chrI', [1, 2, 3, 9, 5, None, None, None, 9, 4, 3, 2, 1, 2, 3, 4, 5, 6, 7, 8])])
+    with BigWigCache.BigWigCache('signal.bw') as bw:
+        bw.values = MagicMock(wraps=bw.values)
+        maxima = DyadPosition.window_maxima(bw, 'chrI', 20, np.array([16, 0, 4, -2, 18, 9, 1]), 3)
+        assert maxima.tolist() == [18, 2, 4, 0, 19, 9, 3]
+        assert bw.values.call_count == 5
+
+
+def test_window_maxima_missing(testdir, mock_testclass):
+    create_bigwig('signal.bw', [('chrI', [1, 2, None, None, None, 6])])
+    with BigWigCache.BigWigCache('signal.bw') as bw:
+        maxima = DyadPosition.window_maxima(bw, 'chrI', 6, np.array([2, 6, -5, 0]), 3)
+        assert maxima.tolist() == [-1, -1, -1, 1]
@@ -7,13 +7,16 @@ from click.testing import CliRunner
 import pytest
 
 from checseqtools import chectools, DyadPosition
+from seqtools.bigwig import BigWigCache
 
 
 @pytest.fixture
 def mock_testclass():
     dyad_position = DyadPosition.dyad_position
+    bigwig_memory = BigWigCache.MEMORY
     yield
     DyadPosition.dyad_position = dyad_position
+    BigWigCache.MEMORY = bigwig_memory
 
 
 def test_dyadposition(testdir, mock_testclass):
@@ -27,4 +30,53 @@ def test_dyadposition(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(chectools.chectools, ['dyadposition', '--genes', genes, '--signal', signal, '--output', output])
     assert result.exit_code == 0
-    DyadPosition.dyad_position.assert_called_once_with(genes, signal, dyad, mind, maxd, output)
+    DyadPosition.dyad_position.assert_called_once_with(genes, (signal,), dyad, mind, maxd, output, 1)
+
+
+def test_dyadposition_signals(testdir, mock_testclass):
+    genes = Path(__file__).parent.joinpath('firstdyad.txt')
+    signal = Path(__file__).parent.joinpath('sample.bed')
+    signal2 = Path(__file__).parent.joinpath('firstdyad.txt')
+    dyad = 2
+    mind = 141
+    maxd = 191
+    output = 'output.txt'
+    DyadPosition.dyad_position = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(chectools.chectools, ['dyadposition', '--genes', genes, '--signal', signal, '--signal', signal2, '--output', output, '--jobs', 2])
+    assert result.exit_code == 0
+    DyadPosition.dyad_position.assert_called_once_with(genes, (signal, signal2), dyad, mind, maxd, output, 2)
+
+
+def test_dyadposition_chained(testdir, mock_testclass):
+    genes = Path(__file__).parent.joinpath('firstdyad.txt')
+    signal = Path(__file__).parent.joinpath('sample.bed')
+    dyad = 5
+    mind = 141
+    maxd = 191
+    output = 'output.txt'
+    DyadPosition.dyad_position = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(chectools.chectools, ['dyadposition', '--genes', genes, '--signal', signal, '--dyad', dyad, '--output', output])
+    assert result.exit_code == 0
+    DyadPosition.dyad_position.assert_called_once_with(genes, (signal,), dyad, mind, maxd, output, 1)
+
+
+def test_dyadposition_dyad_invalid(testdir, mock_testclass):
+    genes = Path(__file__).parent.joinpath('firstdyad.txt')
+    signal = Path(__file__).parent.joinpath('sample.bed')
+    DyadPosition.dyad_position = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(chectools.chectools, ['dyadposition', '--genes', genes, '--signal', signal, '--dyad', 1])
+    assert result.exit_code != 0
+    DyadPosition.dyad_position.assert_not_called()
+
+
+def test_chectools_bigwig_memory(testdir, mock_testclass):
+    genes = Path(__file__).parent.joinpath('firstdyad.txt')
+    signal = Path(__file__).parent.joinpath('sample.bed')
+    DyadPosition.dyad_position = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(chectools.chectools, ['--bigwig-mem', '1G', 'dyadposition', '--genes', genes, '--signal', signal])
+    assert result.exit_code == 0
+    assert BigWigCache.MEMORY == 1024 ** 3
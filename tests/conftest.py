@@ -1 +1,11 @@
+# Modules with C extensions cannot be loaded twice, import them before testdir saves sys.modules.
+import lmfit
+import matplotlib.pyplot
+import numpy
+import pandas
+import pyBigWig
+import pysam
+import scipy.ndimage
+import scipy.signal
+
 pytest_plugins = "pytester"
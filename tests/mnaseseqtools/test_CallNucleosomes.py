@@ -0,0 +1,136 @@
+import os
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pyBigWig as pbw
+import pytest
+
+from mnaseseqtools import CallNucleosomes as cn
+from seqtools.bigwig import BigWigCache
+from seqtools.process import Manifest
+
+
+@pytest.fixture
+def mock_testclass():
+    call_nucleosomes_sample = cn.call_nucleosomes_sample
+    chromosome_dyads = cn.chromosome_dyads
+    bigwig_cache = BigWigCache.BigWigCache
+    force = Manifest.FORCE
+    yield
+    cn.call_nucleosomes_sample = call_nucleosomes_sample
+    cn.chromosome_dyads = chromosome_dyads
+    BigWigCache.BigWigCache = bigwig_cache
+    Manifest.FORCE = force
+
+
+def create_bigwig(bw, chromosomes):
+    output = pbw.open(bw, 'w')
+    output.addHeader([(chromosome, len(values)) for chromosome, values in chromosomes])
+    for chromosome, values in chromosomes:
+        output.addEntries(chromosome, 0, values=[float(value) for value in values], span=1, step=1)
+    output.close()
+
+
+def nucleosomes(size, dyads):
+    signal = np.zeros(size)
+    for dyad, height in dyads:
+        signal[dyad - 20:dyad + 21] += height * (1 - np.abs(np.arange(-20, 21)) / 21)
+    return signal
+
+
+def fail_sample(sample, *args):
+    if sample == 'ASDURF':
+        raise ValueError('cannot call nucleosomes of ' + sample)
+
+
+def test_call_nucleosomes_samples(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    cn.call_nucleosomes_sample = MagicMock()
+    cn.call_nucleosomes_samples(samples, '-cov', '-nucleosomes', 10, 120, 1.0, None, 2)
+    cn.call_nucleosomes_sample.assert_any_call('POLR2A', '-cov', '-nucleosomes', 10, 120, 1.0, 2)
+    cn.call_nucleosomes_sample.assert_any_call('ASDURF', '-cov', '-nucleosomes', 10, 120, 1.0, 2)
+    cn.call_nucleosomes_sample.assert_any_call('POLR1C', '-cov', '-nucleosomes', 10, 120, 1.0, 2)
+    assert cn.call_nucleosomes_sample.call_count == 3
+
+
+def test_call_nucleosomes_samples_index(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    cn.call_nucleosomes_sample = MagicMock()
+    cn.call_nucleosomes_samples(samples, index=1)
+    cn.call_nucleosomes_sample.assert_called_once_with('ASDURF', '-cov', '-nucleosomes', 20, 147, 0.0, 1)
+
+
+def test_call_nucleosomes_samples_failure(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    cn.call_nucleosomes_sample = MagicMock(side_effect=fail_sample)
+    with pytest.raises(AssertionError) as exception:
+        cn.call_nucleosomes_samples(samples)
+    assert 'ASDURF' in str(exception.value)
+    assert isinstance(exception.value.__cause__, ValueError)
+    assert cn.call_nucleosomes_sample.call_count == 3
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_call_nucleosomes_sample(testdir, mock_testclass, jobs):
+    create_bigwig('POLR2A-cov.bw', [('chrI', nucleosomes(1000, [(100, 10), (260, 8), (330, 3), (600, 5)])), ('chrII', nucleosomes(500, [(200, 4)]))])
+    cn.call_nucleosomes_sample('POLR2A', smoothing=10, spacing=147, jobs=jobs)
+    assert os.path.exists('POLR2A-nucleosomes.bed')
+    dyads = pd.read_csv('POLR2A-nucleosomes.bed', sep='\t', header=None)
+    assert dyads[0].tolist() == ['chrI', 'chrI', 'chrI', 'chrII']
+    assert dyads[1].tolist() == [100, 260, 600, 200]
+    assert dyads[2].tolist() == [101, 261, 601, 201]
+    assert dyads[3].tolist() == ['.', '.', '.', '.']
+    assert dyads[4].tolist() == pytest.approx([8.7013, 6.9610, 4.3506, 3.4805], abs=1e-4)
+
+
+def test_call_nucleosomes_sample_nochromosomes(testdir, mock_testclass):
+    create_bigwig('POLR2A-cov.bw', [('chrI', nucleosomes(1000, [(100, 10)]))])
+    bw = MagicMock()
+    bw.__enter__.return_value = bw
+    bw.chroms.return_value = {}
+    BigWigCache.BigWigCache = MagicMock(return_value=bw)
+    cn.chromosome_dyads = MagicMock()
+    cn.call_nucleosomes_sample('POLR2A')
+    cn.chromosome_dyads.assert_not_called()
+    with open('POLR2A-nucleosomes.bed', 'r') as infile:
+        assert infile.read() == ''
+
+
+def test_call_nucleosomes_sample_uptodate(testdir, mock_testclass):
+    create_bigwig('POLR2A-cov.bw', [('chrI', nucleosomes(1000, [(100, 10)]))])
+    cn.call_nucleosomes_sample('POLR2A')
+    cn.chromosome_dyads = MagicMock(return_value=(np.array([], dtype=int), np.array([])))
+    cn.call_nucleosomes_sample('POLR2A')
+    cn.chromosome_dyads.assert_not_called()
+    cn.call_nucleosomes_sample('POLR2A', spacing=100)
+    cn.chromosome_dyads.assert_called_once_with('POLR2A-cov.bw', 'chrI', 20, 100, 0.0)
+
+
+def test_chromosome_signal(testdir, mock_testclass):
+    output = pbw.open('test.bw', 'w')
+    output.addHeader([('chrI', 10)])
+    output.addEntries('chrI', 2, values=[1.0, 2.0, 3.0], span=1, step=1)
+    output.addEntries('chrI', 7, values=[4.0], span=1, step=1)
+    output.close()
+    from seqtools.bigwig import BigWigCache
+    with BigWigCache.BigWigCache('test.bw', block_size=4) as bw:
+        signal = cn.chromosome_signal(bw, 'chrI')
+        assert len(BigWigCache.BLOCKS) == 0
+    assert signal.dtype == np.float32
+    assert signal.tolist() == [0.0, 0.0, 1.0, 2.0, 3.0, 0.0, 0.0, 4.0, 0.0, 0.0]
+
+
+def test_call_dyads(testdir, mock_testclass):
+    signal = np.array([0, 1, 5, 1, 0, 2, 0, 0, 3, 4, 3, 0], dtype=np.float32)
+    positions, scores = cn.call_dyads(signal, 0, 1)
+    assert positions.tolist() == [2, 5, 9]
+    assert scores.tolist() == [5.0, 2.0, 4.0]
+    positions, scores = cn.call_dyads(signal, 0, 4)
+    assert positions.tolist() == [2, 9]
+    positions, scores = cn.call_dyads(signal, 0, 1, 3.0)
+    assert positions.tolist() == [2, 9]
+    positions, scores = cn.call_dyads(signal, 2, 1)
+    assert positions.tolist() == [2, 9]
+    assert scores.tolist() == pytest.approx([7 / 3, 10 / 3])
@@ -0,0 +1,202 @@
+import os
+from pathlib import Path
+from unittest.mock import MagicMock, ANY
+
+import click
+from click.testing import CliRunner
+import numpy as np
+import pandas as pd
+import pyBigWig as pbw
+import pytest
+
+from mnaseseqtools import DyadCoverage as dc
+from seqtools import Split as sb
+from seqtools.bigwig import BigWigCache
+from seqtools.process import Jobs
+from seqtools.txt import Parser
+
+
+@pytest.fixture
+def mock_testclass():
+    dyad_coverage = dc.dyad_coverage
+    dyad_coverage_sample = dc.dyad_coverage_sample
+    dyad_coverage_batch = dc.dyad_coverage_batch
+    plot_dyad_coverage = dc.plot_dyad_coverage
+    splits = sb.splits
+    first = Parser.first
+    run = Jobs.run
+    yield
+    dc.dyad_coverage = dyad_coverage
+    dc.dyad_coverage_sample = dyad_coverage_sample
+    dc.dyad_coverage_batch = dyad_coverage_batch
+    dc.plot_dyad_coverage = plot_dyad_coverage
+    sb.splits = splits
+    Parser.first = first
+    Jobs.run = run
+
+
+def create_genes(rows):
+    return pd.DataFrame(rows, columns=['Spacer', 'Chromosome', 'Gene', 'TSS', 'Strand', 'TES', 'Dyad'])
+
+
+def create_bigwig(bw, chromosome, values):
+    output = pbw.open(bw, 'w')
+    output.addHeader([(chromosome, len(values))])
+    output.addEntries(chromosome, 0, values=[float(value) for value in values], span=1, step=1)
+    output.close()
+
+
+def test_dyadcov(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genes = Path(__file__).parent.joinpath('firstdyad.txt')
+    dc.dyad_coverage = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(dc.dyadcov, ['-s', samples, '-g', genes])
+    assert result.exit_code == 0
+    dc.dyad_coverage.assert_called_once_with(samples, genes, None, False, -75, 75, None, None, None, 1, False)
+
+
+def test_dyad_coverage(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genes = Path(__file__).parent.joinpath('firstdyad.txt')
+    Parser.first = MagicMock(return_value=['POLR2A', 'ASDURF'])
+    sb.splits = MagicMock(side_effect=[['POLR2A-100-110'], []])
+    Jobs.run = MagicMock()
+    dc.dyad_coverage(samples, genes)
+    Jobs.run.assert_called_once_with(dc.dyad_coverage_sample, [('POLR2A', ANY, False, -75, 75, None, None), ('POLR2A-100-110', ANY, False, -75, 75, None, None), ('ASDURF', ANY, False, -75, 75, None, None)], 1)
+
+
+def test_dyadcov_batch(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genes = Path(__file__).parent.joinpath('firstdyad.txt')
+    dc.dyad_coverage = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(dc.dyadcov, ['-s', samples, '-g', genes, '--batch', '-j', 4])
+    assert result.exit_code == 0
+    dc.dyad_coverage.assert_called_once_with(samples, genes, None, False, -75, 75, None, None, None, 4, True)
+
+
+def test_dyad_coverage_batch_mode(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genes = Path(__file__).parent.joinpath('firstdyad.txt')
+    Parser.first = MagicMock(return_value=['POLR2A', 'ASDURF'])
+    sb.splits = MagicMock(side_effect=[['POLR2A-100-110'], []])
+    Jobs.run = MagicMock()
+    dc.dyad_coverage_batch = MagicMock()
+    dc.dyad_coverage(samples, genes, jobs=2, batch=True)
+    dc.dyad_coverage_batch.assert_called_once_with(['POLR2A', 'POLR2A-100-110', 'ASDURF'], ANY, False, -75, 75, None, None, 2)
+    Jobs.run.assert_not_called()
+
+
+def test_coverage_matrix(testdir, mock_testclass):
+    bw = MagicMock()
+    bw.chroms = MagicMock(return_value=100)
+    bw.values = MagicMock(return_value=np.array([1.0, 2.0, np.nan, 4.0, 5.0]))
+    genes = create_genes([['x', 'chrI', 'YAL001C', 40, '+', 60, 50]])
+    matrix = dc.coverage_matrix(bw, dc.gene_windows(genes, -2, 2))
+    bw.values.assert_called_once_with('chrI', 48, 53)
+    assert matrix.tolist() == [[1.0, 2.0, 0.0, 4.0, 5.0]]
+
+
+def test_coverage_matrix_negative(testdir, mock_testclass):
+    bw = MagicMock()
+    bw.chroms = MagicMock(return_value=100)
+    bw.values = MagicMock(return_value=np.array([1.0, 2.0, 3.0, 4.0, 5.0]))
+    genes = create_genes([['x', 'chrI', 'YAL001C', 60, '-', 40, 50]])
+    matrix = dc.coverage_matrix(bw, dc.gene_windows(genes, -2, 2))
+    assert matrix.tolist() == [[5.0, 4.0, 3.0, 2.0, 1.0]]
+
+
+def test_coverage_matrix_edges(testdir, mock_testclass):
+    bw = MagicMock()
+    bw.chroms = MagicMock(return_value=10)
+    bw.values = MagicMock(return_value=np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0]))
+    genes = create_genes([['x', 'chrI', 'YAL001C', 10, '-', 0, 0], ['x', 'chrI', 'YAL002C', 0, '+', 10, 9]])
+    matrix = dc.coverage_matrix(bw, dc.gene_windows(genes, -2, 2))
+    bw.values.assert_called_once_with('chrI', 0, 10)
+    assert matrix.tolist() == [[3.0, 2.0, 1.0, 0.0, 0.0], [8.0, 9.0, 10.0, 0.0, 0.0]]
+
+
+def test_coverage_matrix_chromosomes(testdir, mock_testclass):
+    bw = MagicMock()
+    bw.chroms = MagicMock(return_value=100)
+    bw.values = MagicMock(side_effect=lambda chromosome, start, end: np.arange(start, end, dtype=float))
+    genes = create_genes([['x', 'chrII', 'YBL001C', 40, '+', 60, 50], ['x', 'chrI', 'YAL002C', 40, '+', 60, 70], ['x', 'chrI', 'YAL001C', 40, '-', 60, 20]])
+    matrix = dc.coverage_matrix(bw, dc.gene_windows(genes, -2, 2))
+    assert [call.args for call in bw.values.call_args_list] == [('chrI', 18, 73), ('chrII', 48, 53)]
+    assert matrix.tolist() == [[48.0, 49.0, 50.0, 51.0, 52.0], [68.0, 69.0, 70.0, 71.0, 72.0], [22.0, 21.0, 20.0, 19.0, 18.0]]
+
+
+def test_windows_signal_segments(testdir, mock_testclass):
+    bw = MagicMock()
+    bw.values = MagicMock(side_effect=lambda chromosome, start, end: np.arange(start, end, dtype=float))
+    block_size = BigWigCache.BLOCK_SIZE
+    values = dc.windows_signal(bw, 'chrI', block_size * 2, np.array([block_size + 5, 10, block_size - 2]), 4)
+    assert [call.args for call in bw.values.call_args_list] == [('chrI', 10, block_size + 2), ('chrI', block_size + 5, block_size + 9)]
+    assert values[:, 0].tolist() == [block_size + 5, 10, block_size - 2]
+    assert values[2].tolist() == [block_size - 2, block_size - 1, block_size, block_size + 1]
+
+
+def test_coverage_matrix_missingchromosome(testdir, mock_testclass):
+    bw = MagicMock()
+    bw.chroms = MagicMock(return_value=None)
+    genes = create_genes([['x', 'chrM', 'Q0010', 40, '+', 60, 50]])
+    matrix = dc.coverage_matrix(bw, dc.gene_windows(genes, -2, 2))
+    bw.values.assert_not_called()
+    assert matrix.tolist() == [[0.0, 0.0, 0.0, 0.0, 0.0]]
+
+
+def test_dyad_frequencies(testdir, mock_testclass):
+    matrix = np.array([[1.0, 2.0, 3.0], [3.0, 2.0, 5.0]])
+    dyads = dc.dyad_frequencies(matrix, -1, 1)
+    assert dyads.index.tolist() == [-1, 0, 1]
+    assert dyads['Frequency'].tolist() == [4.0, 4.0, 8.0]
+    assert dyads['Relative Frequency'].tolist() == [0.25, 0.25, 0.5]
+
+
+def test_dyad_frequencies_smoothing(testdir, mock_testclass):
+    matrix = np.array([[1.0, 2.0, 3.0, 4.0, 5.0], [2.0, 1.0, 3.0, 5.0, 4.0]])
+    dyads = dc.dyad_frequencies(matrix, -1, 1, 1)
+    assert dyads.index.tolist() == [-1, 0, 1]
+    assert dyads['Frequency'].tolist() == [4.0, 6.0, 8.0]
+
+
+def test_dyad_coverage_sample(testdir, mock_testclass):
+    sample = 'POLR2A'
+    create_bigwig(sample + '-cov.bw', 'chrI', range(0, 20))
+    genes = create_genes([['x', 'chrI', 'YAL001C', 5, '+', 15, 10], ['x', 'chrI', 'YAL002C', 15, '-', 5, 5]])
+    dc.plot_dyad_coverage = MagicMock()
+    dc.dyad_coverage_sample(sample, genes, False, -2, 2)
+    genes_output = pd.read_csv(sample + '-genes.txt', sep='\t')
+    assert genes_output['Gene'].tolist() == ['YAL001C', 'YAL002C']
+    assert genes_output[['dyad position ' + str(i) for i in range(-2, 3)]].values.tolist() == [[8.0, 9.0, 10.0, 11.0, 12.0], [7.0, 6.0, 5.0, 4.0, 3.0]]
+    dyads = pd.read_csv(sample + '-dyad.txt', sep='\t', index_col=0)
+    assert dyads.index.tolist() == [-2, -1, 0, 1, 2]
+    assert dyads['Frequency'].tolist() == [15.0, 15.0, 15.0, 15.0, 15.0]
+    assert dyads['Relative Frequency'].tolist() == [0.2, 0.2, 0.2, 0.2, 0.2]
+    dc.plot_dyad_coverage.assert_called_once_with(sample, ANY, False, None)
+
+
+def test_dyad_coverage_batch(testdir, mock_testclass):
+    samples = ['POLR2A', 'POLR2A-100-110', 'ASDURF']
+    for i, sample in enumerate(samples):
+        create_bigwig(sample + '-cov.bw', 'chrI', [value * (i + 1) for value in range(0, 20)])
+    genes = create_genes([['x', 'chrI', 'YAL001C', 5, '+', 15, 10], ['x', 'chrI', 'YAL002C', 15, '-', 5, 5]])
+    dc.plot_dyad_coverage = MagicMock()
+    dc.dyad_coverage_batch(samples, genes, False, -2, 2, jobs=2)
+    for i, sample in enumerate(samples):
+        genes_output = pd.read_csv(sample + '-genes.txt', sep='\t')
+        assert genes_output[['dyad position ' + str(p) for p in range(-2, 3)]].values.tolist() == [[v * (i + 1) for v in [8.0, 9.0, 10.0, 11.0, 12.0]], [v * (i + 1) for v in [7.0, 6.0, 5.0, 4.0, 3.0]]]
+        dyads = pd.read_csv(sample + '-dyad.txt', sep='\t', index_col=0)
+        assert dyads['Frequency'].tolist() == [15.0 * (i + 1)] * 5
+        dc.plot_dyad_coverage.assert_any_call(sample, ANY, False, None)
+
+
+def test_dyad_coverage_batch_uptodate(testdir, mock_testclass):
+    sample = 'POLR2A'
+    create_bigwig(sample + '-cov.bw', 'chrI', range(0, 20))
+    genes = create_genes([['x', 'chrI', 'YAL001C', 5, '+', 15, 10]])
+    dc.dyad_coverage_batch([sample], genes, False, -2, 2)
+    dc.plot_dyad_coverage = MagicMock()
+    dc.dyad_coverage_batch([sample], genes, False, -2, 2)
+    dc.plot_dyad_coverage.assert_not_called()
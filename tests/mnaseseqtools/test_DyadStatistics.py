@@ -0,0 +1,65 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from click.testing import CliRunner
+import pandas as pd
+import pytest
+
+from mnaseseqtools import DyadStatistics as ds
+from seqtools.process import Workspace
+
+
+@pytest.fixture
+def mock_testclass():
+    dyad_statistics = ds.dyad_statistics
+    Workspace.clear()
+    yield
+    ds.dyad_statistics = dyad_statistics
+    Workspace.clear()
+
+
+def create_genes(genes_file, signals, minp=-2, maxp=2):
+    columns = ['Chromosome', 'Gene'] + ['dyad position ' + str(p) for p in range(minp, maxp + 1)]
+    rows = [['chrI', 'YAL00' + str(i) + 'C'] + signal for i, signal in enumerate(signals)]
+    pd.DataFrame(rows, columns=columns).to_csv(genes_file, sep='\t', index=False)
+
+
+def test_dyadstatistics(testdir, mock_testclass):
+    ds.dyad_statistics = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(ds.dyadstatistics, ['-p', -2, '-P', 2, '-o', 'stats.txt', '-j', 2])
+    assert result.exit_code == 0
+    ds.dyad_statistics.assert_called_once_with(-2, 2, 'stats.txt', False, 2)
+
+
+def test_genes_statistics(testdir, mock_testclass):
+    create_genes('POLR2A-genes.txt', [[1.0, 2.0, 0.0, 0.0, 1.5], [0.0, 0.0, 0.0, 0.0, 0.0], [0.0, 0.0, 3.0, 0.0, 0.0]])
+    assert ds.genes_statistics('POLR2A-genes.txt', -2, 2) == ('POLR2A-genes.txt', 7.5, 2)
+
+
+def test_genes_statistics_positions(testdir, mock_testclass):
+    create_genes('POLR2A-genes.txt', [[1.0, 2.0, 0.0, 0.0, 1.5], [0.0, 0.0, 0.0, 0.0, 0.0], [0.0, 0.0, 3.0, 0.0, 0.0]])
+    assert ds.genes_statistics('POLR2A-genes.txt', -1, 0) == ('POLR2A-genes.txt', 5.0, 2)
+    assert ds.genes_statistics('POLR2A-genes.txt', 1, 2) == ('POLR2A-genes.txt', 1.5, 1)
+
+
+def test_dyad_statistics(testdir, mock_testclass):
+    create_genes('POLR2A-genes.txt', [[1.0, 2.0, 0.0, 0.0, 1.5], [0.0, 0.0, 0.0, 0.0, 0.0]])
+    create_genes('ASDURF-genes.txt', [[1.0, 0.0, 0.0, 0.0, 0.0], [0.0, 0.0, 2.0, 0.0, 0.0]])
+    Path('POLR2A-dyad.txt').touch()
+    ds.dyad_statistics(-2, 2, 'stats.txt')
+    statistics = pd.read_csv('stats.txt', sep='\t')
+    assert statistics['File'].tolist() == ['ASDURF-genes.txt', 'POLR2A-genes.txt']
+    assert statistics['Reads'].tolist() == [3.0, 4.5]
+    assert statistics['Genes'].tolist() == [2, 1]
+
+
+def test_dyad_statistics_jobs(testdir, mock_testclass):
+    create_genes('POLR2A-genes.txt', [[1.0, 2.0, 0.0, 0.0, 1.5], [0.0, 0.0, 0.0, 0.0, 0.0]])
+    create_genes('ASDURF-genes.txt', [[1.0, 0.0, 0.0, 0.0, 0.0], [0.0, 0.0, 2.0, 0.0, 0.0]])
+    create_genes('POLR1C-genes.txt', [[0.0, 0.0, 0.0, 0.0, 0.0]])
+    ds.dyad_statistics(-2, 2, 'stats.txt', jobs=2)
+    statistics = pd.read_csv('stats.txt', sep='\t')
+    assert statistics['File'].tolist() == ['ASDURF-genes.txt', 'POLR1C-genes.txt', 'POLR2A-genes.txt']
+    assert statistics['Reads'].tolist() == [3.0, 0.0, 4.5]
+    assert statistics['Genes'].tolist() == [2, 0, 1]
@@ -0,0 +1,89 @@
+import os
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mnaseseqtools import FirstDyadPosition as f
+
+
+@pytest.fixture
+def mock_testclass():
+    parse_tracks = f.parse_tracks
+    yield
+    f.parse_tracks = parse_tracks
+
+
+def create_wig(wig):
+    with open(wig, 'w') as outfile:
+        outfile.write('browser position chrI:1-1000\n')
+        outfile.write('track type=wiggle_0 name="YAL001C"\n')
+        outfile.write('variableStep chrom=chrI\n')
+        outfile.write('100 2\n')
+        outfile.write('140 5\n')
+        outfile.write('120 1\n')
+        outfile.write('160 5\n')
+        outfile.write('track type=wiggle_0 name="YAL002W"\n')
+        outfile.write('variableStep chrom=chrI\n')
+        outfile.write('500 3\n')
+        outfile.write('520 7\n')
+
+
+def test_parse_tracks(testdir, mock_testclass):
+    create_wig('signal.wig')
+    tracks = f.parse_tracks('signal.wig')
+    assert sorted(tracks) == ['YAL001C', 'YAL002W']
+    assert tracks['YAL001C'][0].tolist() == [100, 120, 140, 160]
+    assert tracks['YAL001C'][1].tolist() == [2.0, 1.0, 5.0, 5.0]
+    assert tracks['YAL002W'][0].tolist() == [500, 520]
+    assert tracks['YAL002W'][1].tolist() == [3.0, 7.0]
+
+
+def test_parse_tracks_fixedstep(testdir, mock_testclass):
+    with open('signal.wig', 'w') as outfile:
+        outfile.write('track type=wiggle_0 name="YAL001C"\n')
+        outfile.write('fixedStep chrom=chrI start=1 step=1\n')
+    with pytest.raises(AssertionError):
+        f.parse_tracks('signal.wig')
+
+
+def test_read_tracks_cached(testdir, mock_testclass):
+    create_wig('signal.wig')
+    tracks = f.read_tracks('signal.wig')
+    assert os.path.exists('.signal.wig.npz')
+    f.parse_tracks = MagicMock()
+    cached = f.read_tracks('signal.wig')
+    f.parse_tracks.assert_not_called()
+    assert sorted(cached) == sorted(tracks)
+    for name in tracks:
+        assert cached[name][0].tolist() == tracks[name][0].tolist()
+        assert cached[name][1].tolist() == tracks[name][1].tolist()
+
+
+def test_read_tracks_changed(testdir, mock_testclass):
+    create_wig('signal.wig')
+    f.read_tracks('signal.wig')
+    with open('signal.wig', 'a') as outfile:
+        outfile.write('540 8\n')
+    tracks = f.read_tracks('signal.wig')
+    assert tracks['YAL002W'][0].tolist() == [500, 520, 540]
+
+
+def test_highest_signal(testdir, mock_testclass):
+    track = (np.array([100, 120, 140, 160]), np.array([2.0, 1.0, 5.0, 5.0]))
+    assert f.highest_signal(track, 100, 130) == (100, 2.0)
+    assert f.highest_signal(track, 100, 200) == (140, 5.0)
+    assert f.highest_signal(track, 100, 200, True) == (160, 5.0)
+    assert f.highest_signal(track, 100, 160) == (140, 5.0)
+    assert f.highest_signal(track, 161, 200) is None
+
+
+def test_first_dyad_position(testdir, mock_testclass):
+    create_wig('signal.wig')
+    genes = pd.DataFrame([[0, 'chrI', 'YAL001C', 300, '-', 220], [1, 'chrI', 'YAL002W', 450, '+', 900], [2, 'chrI', 'YAL003W', 450, '+', 900]], columns=['', 'Chr', 'ORF', 'TSS', 'Strand', 'TTS'])
+    genes.to_csv('genes.txt', sep='\t', index=False)
+    f.first_dyad_position('genes.txt', 'signal.wig', 20, 150, 'output.txt')
+    output = pd.read_csv('output.txt', sep='\t')
+    assert output.columns.tolist() == ['spacer', 'chromosome', 'gene', 'tss', 'strand', 'tes', '+1 nucleosome']
+    assert output['+1 nucleosome'].tolist() == [160, 520, -1]
@@ -33,7 +33,7 @@ def test_fitdoublegaussian(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(f.fitdoublegaussian, ['-s', samples])
     assert result.exit_code == 0
-    f.fit_double_gaussian.assert_called_once_with(samples, False, False, False, False, False, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None)
+    f.fit_double_gaussian.assert_called_once_with(samples, False, False, False, False, False, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, 1)
 
 
 def test_fitdoublegaussian_parameters(testdir, mock_testclass):
@@ -57,7 +57,7 @@ def test_fitdoublegaussian_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(f.fitdoublegaussian, ['-s', samples, '--absolute', '--components', '--gaussian', '--svg', '--verbose', '--center1', center1, '--cmin1', cmin1, '--cmax1', cmax1, '--amp1', amp1, '--amin1', amin1, '--sigma1', sigma1, '--smin1', smin1, '--center2', center2, '--cmin2', cmin2, '--cmax2', cmax2, '--amp2', amp2, '--amin2', amin2, '--sigma2', sigma2, '--smin2', smin2, '--suffix', suffix])
     assert result.exit_code == 0
-    f.fit_double_gaussian.assert_called_once_with(samples, True, True, True, True, True, center1, cmin1, cmax1, amp1, amin1, sigma1, smin1, center2, cmin2, cmax2, amp2, amin2, sigma2, smin2, suffix, None)
+    f.fit_double_gaussian.assert_called_once_with(samples, True, True, True, True, True, center1, cmin1, cmax1, amp1, amin1, sigma1, smin1, center2, cmin2, cmax2, amp2, amin2, sigma2, smin2, suffix, None, 1)
 
 
 def test_fitdoublegaussian_second(testdir, mock_testclass):
@@ -67,7 +67,7 @@ def test_fitdoublegaussian_second(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(f.fitdoublegaussian, ['-s', samples, '-i', index])
     assert result.exit_code == 0
-    f.fit_double_gaussian.assert_called_once_with(samples, False, False, False, False, False, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, index)
+    f.fit_double_gaussian.assert_called_once_with(samples, False, False, False, False, False, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, index, 1)
 
 
 def test_fitdoublegaussian_samplesnotexists(testdir, mock_testclass):
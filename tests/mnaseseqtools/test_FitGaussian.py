@@ -33,7 +33,7 @@ def test_fitgaussian(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(f.fitgaussian, ['-s', samples])
     assert result.exit_code == 0
-    f.fit_gaussian.assert_called_once_with(samples, False, False, False, False, None, None, None, None, None, None, None, None, None)
+    f.fit_gaussian.assert_called_once_with(samples, False, False, False, False, None, None, None, None, None, None, None, None, None, 1)
 
 
 def test_fitgaussian_parameters(testdir, mock_testclass):
@@ -50,7 +50,7 @@ def test_fitgaussian_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(f.fitgaussian, ['-s', samples, '--absolute', '--components', '--svg', '--verbose', '--center', center, '--cmin', cmin, '--cmax', cmax, '--amp', amp, '--amin', amin, '--sigma', sigma, '--smin', smin, '--suffix', suffix])
     assert result.exit_code == 0
-    f.fit_gaussian.assert_called_once_with(samples, True, True, True, True, center, cmin, cmax, amp, amin, sigma, smin, suffix, None)
+    f.fit_gaussian.assert_called_once_with(samples, True, True, True, True, center, cmin, cmax, amp, amin, sigma, smin, suffix, None, 1)
 
 
 def test_fitgaussian_second(testdir, mock_testclass):
@@ -60,7 +60,7 @@ def test_fitgaussian_second(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(f.fitgaussian, ['-s', samples, '-i', index])
     assert result.exit_code == 0
-    f.fit_gaussian.assert_called_once_with(samples, False, False, False, False, None, None, None, None, None, None, None, None, index)
+    f.fit_gaussian.assert_called_once_with(samples, False, False, False, False, None, None, None, None, None, None, None, None, index, 1)
 
 
 def test_fitgaussian_samplesnotexists(testdir, mock_testclass):
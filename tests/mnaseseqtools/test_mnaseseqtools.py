@@ -6,22 +6,39 @@ import click
 from click.testing import CliRunner
 import pytest
 
-from mnaseseqtools import mnasetools, DyadCoverage, DyadStatistics, FirstDyadPosition, FitDoubleGaussian, FitGaussian
+from mnaseseqtools import mnasetools, CallNucleosomes, DyadCoverage, DyadStatistics, FirstDyadPosition, FitDoubleGaussian, FitGaussian
+from seqtools.bigwig import BigWigCache
+from seqtools.process import Manifest
 
 
 @pytest.fixture
 def mock_testclass():
+    call_nucleosomes_samples = CallNucleosomes.call_nucleosomes_samples
     dyad_coverage = DyadCoverage.dyad_coverage
     dyad_statistics = DyadStatistics.dyad_statistics
     first_dyad_position = FirstDyadPosition.first_dyad_position
     fit_double_gaussian = FitDoubleGaussian.fit_double_gaussian
     fit_gaussian = FitGaussian.fit_gaussian
+    force = Manifest.FORCE
+    bigwig_memory = BigWigCache.MEMORY
     yield
+    CallNucleosomes.call_nucleosomes_samples = call_nucleosomes_samples
     DyadCoverage.dyad_coverage = dyad_coverage
     DyadStatistics.dyad_statistics = dyad_statistics
     FirstDyadPosition.first_dyad_position = first_dyad_position
     FitDoubleGaussian.fit_double_gaussian = fit_double_gaussian
     FitGaussian.fit_gaussian = fit_gaussian
+    Manifest.FORCE = force
+    BigWigCache.MEMORY = bigwig_memory
+
+
+def test_callnucleosomes(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    CallNucleosomes.call_nucleosomes_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(mnasetools.mnasetools, ['callnucleosomes', '--samples', samples, '--spacing', 120, '--jobs', 4])
+    assert result.exit_code == 0
+    CallNucleosomes.call_nucleosomes_samples.assert_called_once_with(samples, '-cov', '-nucleosomes', 20, 120, 0.0, None, 4)
 
 
 def test_dyadcov(testdir, mock_testclass):
@@ -35,7 +52,7 @@ def test_dyadcov(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(mnasetools.mnasetools, ['dyadcov', '--samples', samples, '--genes', genes, '--minp', minp, '--maxp', maxp])
     assert result.exit_code == 0
-    DyadCoverage.dyad_coverage.assert_called_once_with(samples, genes, None, False, minp, maxp, None, None, None)
+    DyadCoverage.dyad_coverage.assert_called_once_with(samples, genes, None, False, minp, maxp, None, None, None, 1, False)
 
 
 def test_dyadstatistics(testdir, mock_testclass):
@@ -43,7 +60,7 @@ def test_dyadstatistics(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(mnasetools.mnasetools, ['dyadstatistics'])
     assert result.exit_code == 0
-    DyadStatistics.dyad_statistics.assert_called_once_with(-75, 75, 'dyad_statistics.txt', False)
+    DyadStatistics.dyad_statistics.assert_called_once_with(-75, 75, 'dyad_statistics.txt', False, 1)
 
 
 def test_firstdyadposition(testdir, mock_testclass):
@@ -65,7 +82,7 @@ def test_fitdoublegaussian(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(mnasetools.mnasetools, ['fitdoublegaussian', '--samples', samples])
     assert result.exit_code == 0
-    FitDoubleGaussian.fit_double_gaussian.assert_called_once_with(samples, False, False, False, False, False, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None)
+    FitDoubleGaussian.fit_double_gaussian.assert_called_once_with(samples, False, False, False, False, False, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, 1)
 
 
 def test_fitgaussian(testdir, mock_testclass):
@@ -74,4 +91,25 @@ def test_fitgaussian(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(mnasetools.mnasetools, ['fitgaussian', '--samples', samples])
     assert result.exit_code == 0
-    FitGaussian.fit_gaussian.assert_called_once_with(samples, False, False, False, False, None, None, None, None, None, None, None, None, None)
+    FitGaussian.fit_gaussian.assert_called_once_with(samples, False, False, False, False, None, None, None, None, None, None, None, None, None, 1)
+
+
+def test_mnasetools_force(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genes = Path(__file__).parent.joinpath('firstdyad.txt')
+    DyadCoverage.dyad_coverage = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(mnasetools.mnasetools, ['--force', 'dyadcov', '--samples', samples, '--genes', genes])
+    assert result.exit_code == 0
+    assert Manifest.FORCE == True
+    DyadCoverage.dyad_coverage.assert_called_once()
+
+
+def test_mnasetools_bigwig_memory(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genes = Path(__file__).parent.joinpath('firstdyad.txt')
+    DyadCoverage.dyad_coverage = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(mnasetools.mnasetools, ['--bigwig-mem', '100M', 'dyadcov', '--samples', samples, '--genes', genes])
+    assert result.exit_code == 0
+    assert BigWigCache.MEMORY == 100 * 1024 ** 2
@@ -1,21 +1,47 @@
 import logging
 import os
 from pathlib import Path
+from shutil import copyfile
 import subprocess
+import time
+import unittest.mock
 from unittest.mock import MagicMock, ANY
 
 import pytest
 
 from seqtools.bed import Bed
+from seqtools.process import Workspace
 
 
 @pytest.fixture
 def mock_testclass():
     os_name = os.name
     run = subprocess.run
+    sort_memory = Bed.SORT_MEMORY
+    sort_threads = Bed.SORT_THREADS
+    sort_tmpdir = Bed.SORT_TMPDIR
+    merge_files = Bed.MERGE_FILES
+    external_sort = Bed.external_sort
+    racy_delay = Workspace.RACY_DELAY
     yield
+    Workspace.RACY_DELAY = racy_delay
     os.name = os_name
     subprocess.run = run
+    Bed.SORT_MEMORY = sort_memory
+    Bed.SORT_THREADS = sort_threads
+    Bed.SORT_TMPDIR = sort_tmpdir
+    Bed.MERGE_FILES = merge_files
+    Bed.external_sort = external_sort
+
+
+def write_unsorted_bed(bed):
+    lines = []
+    for i in range(0, 200):
+        lines.append('chr{}\t{}\t{}\ttest{}\t{}\t{}\n'.format(i % 7 + 1, (i * 7919) % 1000, (i * 7919) % 1000 + i % 3 + 1, i, i, '+' if i % 2 else '-'))
+    with open(bed, 'w') as outfile:
+        outfile.write('track type=bed name="test"\n')
+        outfile.writelines(lines)
+    return sorted(lines, key=lambda line: (line.split('\t')[0], int(line.split('\t')[1]), int(line.split('\t')[2]), line))
 
 
 def create_file(*args, **kwargs):
@@ -29,13 +55,110 @@ def create_file(*args, **kwargs):
 
 
 def test_count_bed(testdir, mock_testclass):
-    bed = Path(__file__).parent.parent.joinpath('sample.bed')
+    bed = 'sample.bed'
+    copyfile(Path(__file__).parent.parent.joinpath('sample.bed'), bed)
     assert 8 == Bed.count_bed(bed)
+    assert os.path.isfile('.sample.bed.count')
+
+
+def test_count_bed_blanklines(testdir, mock_testclass):
+    bed = 'sample.bed'
+    with open(bed, 'w') as outfile:
+        outfile.write('track name=test\n')
+        outfile.write('chrI\t2\t8\ttest1\t1\t+\n')
+        outfile.write('\n')
+        outfile.write('chrI\t5\t10\ttest2\t1\t-\n')
+        outfile.write('  \n')
+    assert 2 == Bed.count_bed(bed)
 
 
 def test_count_bed_strand(testdir, mock_testclass):
-    bed = Path(__file__).parent.parent.joinpath('sample.bed')
+    bed = 'sample.bed'
+    copyfile(Path(__file__).parent.parent.joinpath('sample.bed'), bed)
     assert 4 == Bed.count_bed(bed, strand='+')
+    assert 0 == Bed.count_bed(bed, strand='.')
+
+
+def test_count_bed_index(testdir, mock_testclass):
+    bed = 'sample.bed'
+    copyfile(Path(__file__).parent.parent.joinpath('sample.bed'), bed)
+    os.utime(bed, ns=(time.time_ns() - 10000000000, time.time_ns() - 10000000000))
+    assert 8 == Bed.count_bed(bed)
+    assert 'checksum' not in Bed.read_index(bed)
+    os_open = open
+    with unittest.mock.patch('builtins.open', side_effect=os_open) as mock_open:
+        assert 8 == Bed.count_bed(bed)
+        assert 4 == Bed.count_bed(bed, strand='-')
+        for call in mock_open.call_args_list:
+            assert call.args[0] != bed
+
+
+def test_count_bed_racyindex(testdir, mock_testclass):
+    bed = 'sample.bed'
+    copyfile(Path(__file__).parent.parent.joinpath('sample.bed'), bed)
+    assert 8 == Bed.count_bed(bed)
+    assert 'checksum' in Bed.read_index(bed)
+    stat = os.stat(bed)
+    with open(bed, 'r') as infile:
+        content = infile.read()
+    with open(bed, 'w') as outfile:
+        outfile.write(content.replace('+', '-'))
+    os.utime(bed, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert 8 == Bed.count_bed(bed, strand='-')
+
+
+def test_count_bed_racyindex_aged(testdir, mock_testclass):
+    bed = 'sample.bed'
+    copyfile(Path(__file__).parent.parent.joinpath('sample.bed'), bed)
+    assert 8 == Bed.count_bed(bed)
+    Workspace.RACY_DELAY = -10000000000
+    assert 8 == Bed.count_bed(bed)
+    assert 'checksum' not in Bed.read_index(bed)
+
+
+def test_count_bed_staleindex(testdir, mock_testclass):
+    bed = 'sample.bed'
+    copyfile(Path(__file__).parent.parent.joinpath('sample.bed'), bed)
+    assert 8 == Bed.count_bed(bed)
+    with open(bed, 'a') as outfile:
+        outfile.write('chr9\t100\t150\ttest9\t1\t+\n')
+    assert 9 == Bed.count_bed(bed)
+    assert 5 == Bed.count_bed(bed, strand='+')
+
+
+def test_count_bed_invalidindex(testdir, mock_testclass):
+    bed = 'sample.bed'
+    copyfile(Path(__file__).parent.parent.joinpath('sample.bed'), bed)
+    with open('.sample.bed.count', 'w') as outfile:
+        outfile.write('invalid')
+    assert 8 == Bed.count_bed(bed)
+
+
+def test_bed_index(testdir, mock_testclass):
+    bed = 'sample.bed'
+    with open(bed, 'w') as outfile:
+        outfile.write('track type=bed name="test"\n')
+        outfile.write('chr1\t100\t250\ttest1\t1\t+\n')
+        outfile.write('chr1\t300\t450\ttest2\t1\t-\n')
+        outfile.write('chr2\t100\t200\ttest3\t1\t+\n')
+        outfile.write('chr2\t300\n')
+    index = Bed.bed_index(bed)
+    assert index['count'] == 4
+    assert index['strands'] == {'+': 2, '-': 1}
+    assert index['lengths'] == {150: 2, 100: 1}
+    index = Bed.bed_index(bed)
+    assert index['lengths'] == {150: 2, 100: 1}
+
+
+def test_add_index(testdir, mock_testclass):
+    index = {'count': 3, 'strands': {'+': 2, '-': 1}, 'lengths': {150: 2, 100: 1}}
+    Bed.add_index(index, {'count': 2, 'strands': {'+': 1, '.': 1}, 'lengths': {150: 1, 200: 1}})
+    assert index == {'count': 5, 'strands': {'+': 3, '-': 1, '.': 1}, 'lengths': {150: 3, 100: 1, 200: 1}}
+
+
+def test_index_file(testdir, mock_testclass):
+    assert Bed.index_file('sample.bed') == '.sample.bed.count'
+    assert Bed.index_file(os.path.join('dir', 'sample.bed')) == os.path.join('dir', '.sample.bed.count')
 
 
 def test_empty_bed(testdir, mock_testclass):
@@ -87,10 +210,180 @@ def test_sort_linux(testdir, mock_testclass):
     subprocess.run = MagicMock(side_effect=create_file)
     Bed.sort(bed, output)
     logging.warning(Bed.sort)
-    subprocess.run.assert_called_with(['sort', '-k', '1,1', '-k', '2,2n', '-k', '3,3n', '-o', output, bed], check=True)
+    subprocess.run.assert_called_with(['sort', '-k', '1,1', '-k', '2,2n', '-k', '3,3n', '-o', output, bed], env=ANY, check=True)
+    assert subprocess.run.call_args[1]['env']['LC_ALL'] == 'C'
     assert os.path.exists(output)
 
 
+def test_sort_linux_tmpdir(testdir, mock_testclass):
+    bed = Path(__file__).parent.parent.joinpath('sample.bed')
+    os.name = 'posix'
+    output = 'test.bed'
+    Bed.SORT_TMPDIR = 'tmp'
+    subprocess.run = MagicMock(side_effect=create_file)
+    Bed.sort(bed, output)
+    subprocess.run.assert_called_with(['sort', '-T', 'tmp', '-k', '1,1', '-k', '2,2n', '-k', '3,3n', '-o', output, bed], env=ANY, check=True)
+
+
+def test_sort_memory(testdir, mock_testclass):
+    bed = Path(__file__).parent.parent.joinpath('sample.bed')
+    output = 'test.bed'
+    Bed.SORT_MEMORY = 1024
+    Bed.SORT_THREADS = 2
+    Bed.SORT_TMPDIR = 'tmp'
+    Bed.external_sort = MagicMock()
+    subprocess.run = MagicMock()
+    Bed.sort(bed, output)
+    Bed.external_sort.assert_called_once_with(bed, output, 1024, 2, 'tmp')
+    subprocess.run.assert_not_called()
+
+
+def test_sort_blocks(testdir, mock_testclass):
+    output = 'test.bed'
+    bed = 'input.bed'
+    expected = write_unsorted_bed(bed)
+    with open(bed, 'r') as infile:
+        lines = infile.readlines()[1:]
+    Bed.sort_blocks([''.join(lines[:50]), ''.join(lines[50:])], output)
+    with open(output, 'r') as infile:
+        assert infile.readlines() == expected
+
+
+def test_sort_blocks_memory(testdir, mock_testclass):
+    output = 'test.bed'
+    bed = 'input.bed'
+    expected = write_unsorted_bed(bed)
+    with open(bed, 'r') as infile:
+        lines = infile.readlines()[1:]
+    Bed.SORT_MEMORY = 2000
+    Bed.sort_blocks([''.join(lines[:50]), ''.join(lines[50:])], output)
+    with open(output, 'r') as infile:
+        assert infile.readlines() == expected
+    assert Bed.read_index(output)['count'] == 200
+
+
+def test_sort_blocks_fails(testdir, mock_testclass):
+    os.name = 'posix'
+    with pytest.raises(subprocess.CalledProcessError):
+        Bed.sort_blocks(['chr1\t100\t200\n'], os.path.join('missing', 'test.bed'))
+
+
+def test_sort_blocks_brokenpipe(testdir, mock_testclass):
+    os.name = 'posix'
+    process = MagicMock(returncode=2)
+    process.stdin.write.side_effect = BrokenPipeError()
+    process.stdin.close.side_effect = BrokenPipeError()
+    with unittest.mock.patch('subprocess.Popen', return_value=process):
+        with pytest.raises(subprocess.CalledProcessError):
+            Bed.sort_blocks(['chr1\t100\t200\n', 'chr1\t300\t400\n'], 'test.bed')
+    process.wait.assert_called_once_with()
+
+
+def test_external_sort(testdir, mock_testclass):
+    bed = 'input.bed'
+    output = 'test.bed'
+    expected = write_unsorted_bed(bed)
+    Bed.external_sort(bed, output, 1024 ** 3)
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'track type=bed name="test"\n'
+        assert infile.readlines() == expected
+    assert Bed.read_index(output)['count'] == 200
+
+
+def test_external_sort_chunks(testdir, mock_testclass):
+    bed = 'input.bed'
+    output = 'test.bed'
+    os.mkdir('tmp')
+    expected = write_unsorted_bed(bed)
+    Bed.MERGE_FILES = 3
+    Bed.external_sort(bed, output, 2000, tmpdir='tmp')
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'track type=bed name="test"\n'
+        assert infile.readlines() == expected
+    assert Bed.read_index(output)['count'] == 200
+    assert Bed.read_index(output)['strands'] == {'+': 100, '-': 100}
+    assert os.listdir('tmp') == []
+
+
+def test_external_sort_threads(testdir, mock_testclass):
+    bed = 'input.bed'
+    output = 'test.bed'
+    os.mkdir('tmp')
+    expected = write_unsorted_bed(bed)
+    Bed.external_sort(bed, output, 4000, 3, 'tmp')
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'track type=bed name="test"\n'
+        assert infile.readlines() == expected
+    assert os.listdir('tmp') == []
+
+
+def test_external_sort_empty(testdir, mock_testclass):
+    bed = 'input.bed'
+    output = 'test.bed'
+    Path(bed).touch()
+    Bed.external_sort(bed, output, 1024)
+    with open(output, 'r') as infile:
+        assert infile.readline() == ''
+
+
+def test_external_sort_same_as_sort(testdir, mock_testclass):
+    bed = 'input.bed'
+    with open(bed, 'w') as outfile:
+        for chromosome in ['chr2', 'Chr1', 'chr10', 'chr_X', 'chrM', 'chr1', 'CHR3']:
+            for start in [300, 20, 100]:
+                outfile.write('{}\t{}\t{}\ttest\t1\t+\n'.format(chromosome, start, start + 50))
+    os.name = 'posix'
+    Bed.sort(bed, 'sort.bed')
+    Bed.external_sort(bed, 'external.bed', 1024 ** 3)
+    with open('sort.bed', 'r') as expected, open('external.bed', 'r') as infile:
+        assert infile.read() == expected.read()
+
+
+def test_external_sort_blanklines(testdir, mock_testclass):
+    bed = 'input.bed'
+    output = 'test.bed'
+    with open(bed, 'w') as outfile:
+        outfile.write('chr2\t10\t20\n')
+        outfile.write('\n')
+        outfile.write('track name=test\n')
+        outfile.write('chr1\t10\t20\n')
+    Bed.external_sort(bed, output, 1024 ** 3)
+    with open(output, 'r') as infile:
+        assert infile.readlines() == ['\n', 'track name=test\n', 'chr1\t10\t20\n', 'chr2\t10\t20\n']
+
+
+def test_external_sort_invalid(testdir, mock_testclass):
+    bed = 'input.bed'
+    output = 'test.bed'
+    with open(bed, 'w') as outfile:
+        outfile.write('chr2\t10\t20\n')
+        outfile.write('chr1 10 20\n')
+    with pytest.raises(AssertionError) as error:
+        Bed.external_sort(bed, output, 1024 ** 3)
+    assert 'chr1 10 20' in str(error.value)
+
+
+def test_external_sort_invalid_coordinates(testdir, mock_testclass):
+    bed = 'input.bed'
+    output = 'test.bed'
+    with open(bed, 'w') as outfile:
+        outfile.write('chr2\t10\t20\n')
+        outfile.write('chr1\tstart\t20\n')
+    with pytest.raises(AssertionError) as error:
+        Bed.external_sort(bed, output, 1024 ** 3)
+    assert repr('chr1\tstart\t20') in str(error.value)
+
+
+def test_memory_size(testdir, mock_testclass):
+    assert Bed.memory_size('1024') == 1024
+    assert Bed.memory_size('2K') == 2048
+    assert Bed.memory_size('500M') == 500 * 1024 ** 2
+    assert Bed.memory_size('2g') == 2 * 1024 ** 3
+    assert Bed.memory_size('2GB') == 2 * 1024 ** 3
+    with pytest.raises(AssertionError):
+        Bed.memory_size('2X')
+
+
 def test_sort_bysize(testdir, mock_testclass):
     bed = Path(__file__).parent.parent.joinpath('sample.bed')
     output = 'test.bed'
@@ -100,6 +393,45 @@ def test_sort_bysize(testdir, mock_testclass):
     assert os.path.exists(output)
 
 
+def test_split_by_length(testdir, mock_testclass):
+    bed = Path(__file__).parent.parent.joinpath('sample-slowsplit.bed')
+    Bed.split_by_length(bed, [('out-100-110.bed', 100, 110), ('out-110-120.bed', 110, 120), ('out-120-130.bed', 120, 130)])
+    with open('out-100-110.bed', 'r') as infile:
+        assert infile.readline() == 'chr4\t800\t900\ttest4\t4\t+\n'
+        assert infile.readline() == ''
+    with open('out-110-120.bed', 'r') as infile:
+        assert infile.readline() == 'chr8\t800\t910\ttest8\t4\t-\n'
+        assert infile.readline() == ''
+    with open('out-120-130.bed', 'r') as infile:
+        assert infile.readline() == 'chr1\t100\t229\ttest1\t1\t+\n'
+        assert infile.readline() == 'chr5\t100\t220\ttest5\t1\t-\n'
+        assert infile.readline() == ''
+    assert Bed.read_index('out-120-130.bed') == {'count': 2, 'strands': {'+': 1, '-': 1}, 'lengths': {129: 1, 120: 1}, 'size': ANY, 'mtime': ANY, 'checksum': ANY}
+
+
+def test_split_by_length_overlapping(testdir, mock_testclass):
+    bed = 'in.bed'
+    with open(bed, 'w') as outfile:
+        outfile.write('track type=bed name="test"\n')
+        outfile.write('chr1\t100\t229\ttest1\t1\t+\n')
+        outfile.write('chr2\t400\n')
+        outfile.write('chr4\t800\t900\ttest4\t4\t+\n')
+    Bed.split_by_length(bed, [('out-100-200.bed', 100, 200), ('out-0-1000.bed', 0, 1000), ('out-1000-2000.bed', 1000, 2000)])
+    with open('out-100-200.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bed name="test"\n'
+        assert infile.readline() == 'chr1\t100\t229\ttest1\t1\t+\n'
+        assert infile.readline() == 'chr4\t800\t900\ttest4\t4\t+\n'
+        assert infile.readline() == ''
+    with open('out-0-1000.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bed name="test"\n'
+        assert infile.readline() == 'chr1\t100\t229\ttest1\t1\t+\n'
+        assert infile.readline() == 'chr4\t800\t900\ttest4\t4\t+\n'
+        assert infile.readline() == ''
+    with open('out-1000-2000.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bed name="test"\n'
+        assert infile.readline() == ''
+
+
 def test_bedgraph_to_bigwig(testdir, mock_testclass):
     bed = Path(__file__).parent.parent.joinpath('sample.bed')
     sizes = Path(__file__).parent.parent.joinpath('sizes.txt')
@@ -0,0 +1,151 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pyBigWig as pbw
+import pytest
+
+from seqtools.bigwig import BigWigCache
+
+
+@pytest.fixture
+def mock_testclass():
+    memory = BigWigCache.MEMORY
+    BigWigCache.BLOCKS.clear()
+    BigWigCache.used = 0
+    yield
+    BigWigCache.MEMORY = memory
+    BigWigCache.BLOCKS.clear()
+    BigWigCache.used = 0
+
+
+def create_bigwig(bw, chromosomes):
+    output = pbw.open(bw, 'w')
+    output.addHeader([(chromosome, len(values)) for chromosome, values in chromosomes])
+    for chromosome, values in chromosomes:
+        for start, value in enumerate(values):
+            if value is not None:
+                output.addEntries([chromosome], [start], ends=[start + 1], values=[float(value)])
+    output.close()
+
+
+def test_values(testdir, mock_testclass):
+    create_bigwig('test.bw', [('chrI', [1, 2, 3, None, 5, 6, 7, 8, 9, 10])])
+    with BigWigCache.BigWigCache('test.bw', block_size=4) as bw:
+        assert bw.values('chrI', 1, 3).tolist() == [2.0, 3.0]
+        values = bw.values('chrI', 2, 9)
+        assert np.isnan(values[1])
+        assert np.nan_to_num(values).tolist() == [3.0, 0.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+        assert bw.values('chrI', 0, 10).tolist()[4:] == [5.0, 6.0, 7.0, 8.0, 9.0, 10.0]
+        assert bw.values('chrI', 4, 4).tolist() == []
+
+
+def test_values_readonce(testdir, mock_testclass):
+    create_bigwig('test.bw', [('chrI', list(range(1, 11)))])
+    with BigWigCache.BigWigCache('test.bw', block_size=4) as bw:
+        bw.bw = MagicMock(wraps=bw.bw)
+        bw.values('chrI', 1, 3)
+        bw.values('chrI', 0, 4)
+        bw.values('chrI', 2, 6)
+        assert bw.bw.values.call_count == 2
+        bw.bw.values.assert_any_call('chrI', 0, 4, numpy=True)
+        bw.bw.values.assert_any_call('chrI', 4, 8, numpy=True)
+
+
+def test_read(testdir, mock_testclass):
+    create_bigwig('test.bw', [('chrI', [1, 2, 3, None, 5, 6, 7, 8, 9, 10])])
+    with BigWigCache.BigWigCache('test.bw', block_size=4) as bw:
+        values = bw.read('chrI', 2, 9)
+        assert values.dtype == np.float32
+        assert np.isnan(values[1])
+        assert np.nan_to_num(values).tolist() == [3.0, 0.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+        assert len(BigWigCache.BLOCKS) == 0
+        assert BigWigCache.used == 0
+        with pytest.raises(RuntimeError):
+            bw.read('chrI', 5, 11)
+
+
+def test_values_readonly(testdir, mock_testclass):
+    create_bigwig('test.bw', [('chrI', list(range(1, 11)))])
+    with BigWigCache.BigWigCache('test.bw', block_size=4) as bw:
+        with pytest.raises(ValueError):
+            np.nan_to_num(bw.values('chrI', 1, 3), copy=False)
+
+
+def test_values_invalid(testdir, mock_testclass):
+    create_bigwig('test.bw', [('chrI', list(range(1, 11)))])
+    with BigWigCache.BigWigCache('test.bw') as bw:
+        with pytest.raises(RuntimeError):
+            bw.values('chrI', 5, 11)
+        with pytest.raises(RuntimeError):
+            bw.values('chrII', 0, 5)
+
+
+def test_eviction(testdir, mock_testclass):
+    create_bigwig('test.bw', [('chrI', list(range(1, 11)))])
+    BigWigCache.MEMORY = 32
+    with BigWigCache.BigWigCache('test.bw', block_size=4) as bw:
+        bw.bw = MagicMock(wraps=bw.bw)
+        bw.values('chrI', 0, 1)
+        bw.values('chrI', 4, 5)
+        bw.values('chrI', 0, 1)
+        assert bw.bw.values.call_count == 2
+        bw.values('chrI', 8, 9)
+        assert BigWigCache.used == 24
+        bw.values('chrI', 0, 1)
+        assert bw.bw.values.call_count == 3
+        bw.values('chrI', 4, 5)
+        assert bw.bw.values.call_count == 4
+        assert BigWigCache.used == 32
+        bw.values('chrI', 8, 9)
+        assert bw.bw.values.call_count == 5
+
+
+def test_close(testdir, mock_testclass):
+    create_bigwig('test.bw', [('chrI', list(range(1, 11)))])
+    create_bigwig('other.bw', [('chrI', list(range(1, 11)))])
+    other = BigWigCache.BigWigCache('other.bw', block_size=4)
+    other.values('chrI', 0, 1)
+    with BigWigCache.BigWigCache('test.bw', block_size=4) as bw:
+        bw.values('chrI', 0, 6)
+        assert len(BigWigCache.BLOCKS) == 3
+    assert len(BigWigCache.BLOCKS) == 1
+    assert BigWigCache.used == 16
+    other.close()
+    assert len(BigWigCache.BLOCKS) == 0
+    assert BigWigCache.used == 0
+
+
+def test_chroms(testdir, mock_testclass):
+    create_bigwig('test.bw', [('chrI', list(range(1, 11))), ('chrII', [1, 2])])
+    with BigWigCache.BigWigCache('test.bw') as bw:
+        assert bw.chroms() == {'chrI': 10, 'chrII': 2}
+        assert bw.chroms('chrII') == 2
+        assert bw.chroms('chrIII') is None
+
+
+def test_intervals(testdir, mock_testclass):
+    create_bigwig('test.bw', [('chrI', [1, 1, 3, None, None, 6, 6, 6, 9, 10])])
+    with BigWigCache.BigWigCache('test.bw', block_size=4) as bw:
+        assert bw.intervals('chrI', 1, 9) == ((1, 2, 1.0), (2, 3, 3.0), (5, 8, 6.0), (8, 9, 9.0))
+        assert bw.intervals('chrI', 3, 5) == ()
+
+
+def test_values_bigbed(testdir, mock_testclass):
+    create_bigwig('test.bw', [('chrI', [0] * 10)])
+    with BigWigCache.BigWigCache('test.bw', block_size=8) as bw:
+        bw.bw = MagicMock()
+        bw.bw.chroms.return_value = 10
+        bw.bw.isBigBed.return_value = True
+        bw.bw.entries.side_effect = [[(1, 3, 'dyad1\t5\t+'), (2, 9, 'dyad2'), (6, 12, 'dyad3\t2.5\t-')], None]
+        values = bw.values('chrI', 0, 10)
+        bw.bw.entries.assert_any_call('chrI', 0, 8)
+        bw.bw.entries.assert_any_call('chrI', 8, 10)
+        assert np.isnan(values[0])
+        assert np.isnan(values[8:]).all()
+        assert values[1:8].tolist() == [5.0, 6.0, 1.0, 1.0, 1.0, 3.5, 3.5]
+
+
+def test_bigbed_values(testdir, mock_testclass):
+    values = BigWigCache.bigbed_values([(0, 2, ''), (1, 4, 'name\t3'), (3, 6, 'name\tNA')], 1, 5)
+    assert values.tolist() == [4.0, 3.0, 4.0, 1.0]
+    assert np.isnan(BigWigCache.bigbed_values(None, 1, 5)).all()
@@ -0,0 +1,168 @@
+import logging
+import multiprocessing
+import os
+
+import pytest
+
+from seqtools.bed import Bed
+from seqtools.bigwig import BigWigCache
+from seqtools.process import Jobs, Manifest
+
+
+@pytest.fixture
+def mock_testclass():
+    force = Manifest.FORCE
+    sort_memory = Bed.SORT_MEMORY
+    sort_threads = Bed.SORT_THREADS
+    sort_tmpdir = Bed.SORT_TMPDIR
+    bigwig_memory = BigWigCache.MEMORY
+    yield
+    Manifest.FORCE = force
+    Bed.SORT_MEMORY = sort_memory
+    Bed.SORT_THREADS = sort_threads
+    Bed.SORT_TMPDIR = sort_tmpdir
+    BigWigCache.MEMORY = bigwig_memory
+
+
+def change_settings():
+    Manifest.FORCE = True
+    Bed.SORT_MEMORY = 1024
+    Bed.SORT_THREADS = 3
+    Bed.SORT_TMPDIR = 'tmp'
+    BigWigCache.MEMORY = 2048
+
+
+def expected_settings():
+    return [('seqtools.process.Manifest', 'FORCE', True),
+            ('seqtools.bed.Bed', 'SORT_MEMORY', 1024),
+            ('seqtools.bed.Bed', 'SORT_THREADS', 3),
+            ('seqtools.bed.Bed', 'SORT_TMPDIR', 'tmp'),
+            ('seqtools.bigwig.BigWigCache', 'MEMORY', 2048)]
+
+
+def write_sample(sample, content):
+    logging.info('Writing sample {}'.format(sample))
+    with open(sample + '.txt', 'w') as outfile:
+        outfile.write(content)
+        outfile.write('\n')
+        outfile.write(str(os.getpid()))
+
+
+def fail_sample(sample, content):
+    if sample == 'ASDURF':
+        raise ValueError('cannot process ' + sample)
+    write_sample(sample, content)
+
+
+def test_run(testdir):
+    samples = ['POLR2A', 'ASDURF', 'POLR1C']
+    Jobs.run(write_sample, [(sample, sample + '-content') for sample in samples])
+    for sample in samples:
+        with open(sample + '.txt', 'r') as infile:
+            assert infile.readline() == sample + '-content\n'
+            assert infile.readline() == str(os.getpid())
+
+
+def test_run_jobs(testdir):
+    samples = ['POLR2A', 'ASDURF', 'POLR1C']
+    Jobs.run(write_sample, [(sample, sample + '-content') for sample in samples], 2)
+    for sample in samples:
+        with open(sample + '.txt', 'r') as infile:
+            assert infile.readline() == sample + '-content\n'
+            assert infile.readline() != str(os.getpid())
+
+
+def test_run_jobs_single(testdir):
+    Jobs.run(write_sample, [('POLR2A', 'POLR2A-content')], 2)
+    with open('POLR2A.txt', 'r') as infile:
+        assert infile.readline() == 'POLR2A-content\n'
+        assert infile.readline() == str(os.getpid())
+
+
+def test_run_jobs_empty(testdir):
+    Jobs.run(write_sample, [], 2)
+
+
+def test_run_jobs_logging(testdir):
+    samples = ['POLR2A', 'ASDURF', 'POLR1C']
+    root = logging.getLogger()
+    level = root.level
+    handler = logging.FileHandler('seqtools.log')
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+    try:
+        Jobs.run(write_sample, [(sample, sample + '-content') for sample in samples], 2)
+    finally:
+        root.removeHandler(handler)
+        root.setLevel(level)
+        handler.close()
+    with open('seqtools.log', 'r') as infile:
+        lines = sorted(infile)
+    assert lines == ['Writing sample ASDURF\n', 'Writing sample POLR1C\n', 'Writing sample POLR2A\n']
+
+
+def test_run_failure(testdir):
+    samples = ['POLR2A', 'ASDURF', 'POLR1C']
+    with pytest.raises(AssertionError) as exception:
+        Jobs.run(fail_sample, [(sample, sample + '-content') for sample in samples])
+    assert 'ASDURF' in str(exception.value)
+    assert 'POLR2A' not in str(exception.value)
+    assert isinstance(exception.value.__cause__, ValueError)
+    assert os.path.exists('POLR2A.txt')
+    assert os.path.exists('POLR1C.txt')
+
+
+def test_run_jobs_failure(testdir):
+    samples = ['POLR2A', 'ASDURF', 'POLR1C']
+    with pytest.raises(AssertionError) as exception:
+        Jobs.run(fail_sample, [(sample, sample + '-content') for sample in samples], 2)
+    assert 'ASDURF' in str(exception.value)
+    assert 'POLR2A' not in str(exception.value)
+    assert isinstance(exception.value.__cause__, ValueError)
+    assert os.path.exists('POLR2A.txt')
+    assert os.path.exists('POLR1C.txt')
+
+
+def test_run_single_failure(testdir):
+    with pytest.raises(ValueError):
+        Jobs.run(fail_sample, [('ASDURF', 'ASDURF-content')], 2)
+
+
+def test_executor_spawn(testdir, mock_testclass):
+    change_settings()
+    with Jobs.executor(1, multiprocessing.get_context('spawn')) as executor:
+        assert executor.submit(Jobs.settings).result() == expected_settings()
+
+
+def test_init_worker(testdir, mock_testclass):
+    change_settings()
+    values = Jobs.settings()
+    Manifest.FORCE = False
+    Bed.SORT_MEMORY = None
+    BigWigCache.MEMORY = 1
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    level = root.level
+    queue = multiprocessing.Queue()
+    try:
+        Jobs.init_worker(queue, logging.DEBUG, values)
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+        queue.close()
+    assert Jobs.settings() == expected_settings()
+
+
+def test_split_threads():
+    assert Jobs.split_threads(8, 1) == 8
+    assert Jobs.split_threads(8, 2) == 4
+    assert Jobs.split_threads(8, 3) == 2
+    assert Jobs.split_threads(2, 4) == 1
+
+
+def test_split_threads_none():
+    assert Jobs.split_threads(None, 4) == None
+    assert Jobs.split_threads(4, None) == 4
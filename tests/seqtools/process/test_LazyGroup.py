@@ -0,0 +1,81 @@
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+import click
+from click.testing import CliRunner
+
+from seqtools.process import LazyGroup as lg
+
+HEAVY_MODULES = ['lmfit', 'matplotlib', 'numpy', 'pandas', 'pyBigWig', 'pysam', 'scipy']
+IMPORT_TIME_BUDGET = 1.0
+
+
+@click.group(cls=lg.LazyGroup)
+def group():
+    pass
+
+
+group.add_lazy_command('merge', 'seqtools.Merge.merge')
+group.add_lazy_command('rename', 'seqtools.Rename.rename')
+
+
+def startup(code):
+    '''Runs code in a new interpreter, returns elapsed time and modules imported by code.'''
+    root = str(Path(__file__).parent.parent.parent.parent)
+    env = dict(os.environ)
+    env['PYTHONPATH'] = root + os.pathsep + env.get('PYTHONPATH', '')
+    script = 'import sys, time\nstart = time.perf_counter()\n' + code + '\nprint(time.perf_counter() - start)\nprint(" ".join(sys.modules))\n'
+    output = subprocess.run([sys.executable, '-c', script], env=env, stdout=subprocess.PIPE, check=True).stdout.decode('utf-8')
+    lines = output.splitlines()
+    return float(lines[-2]), set(module.split('.')[0] for module in lines[-1].split())
+
+
+def test_list_commands():
+    runner = CliRunner()
+    result = runner.invoke(group, ['--help'])
+    assert result.exit_code == 0
+    assert 'merge' in result.output
+    assert 'rename' in result.output
+    assert group.list_commands(None) == ['merge', 'rename']
+
+
+def test_get_command():
+    command = group.get_command(None, 'merge')
+    from seqtools import Merge
+    assert command == Merge.merge
+    assert group.get_command(None, 'merge') == command
+
+
+def test_get_command_unknown():
+    assert group.get_command(None, 'unknown') is None
+
+
+def test_load_command():
+    from seqtools import Rename
+    assert lg.load_command('seqtools.Rename.rename') == Rename.rename
+
+
+def test_seqtools_startup():
+    elapsed, modules = startup('from seqtools import seqtools')
+    assert elapsed < IMPORT_TIME_BUDGET
+    assert not modules & set(HEAVY_MODULES)
+
+
+def test_seqtools_help_startup():
+    elapsed, modules = startup('from click.testing import CliRunner\nfrom seqtools import seqtools\nCliRunner().invoke(seqtools.seqtools, ["--help"])')
+    assert elapsed < IMPORT_TIME_BUDGET
+    assert not modules & set(HEAVY_MODULES)
+
+
+def test_mnasetools_startup():
+    elapsed, modules = startup('from click.testing import CliRunner\nfrom mnaseseqtools import mnasetools\nCliRunner().invoke(mnasetools.mnasetools, ["--help"])')
+    assert elapsed < IMPORT_TIME_BUDGET
+    assert not modules & set(HEAVY_MODULES)
+
+
+def test_chectools_startup():
+    elapsed, modules = startup('from click.testing import CliRunner\nfrom checseqtools import chectools\nCliRunner().invoke(chectools.chectools, ["--help"])')
+    assert elapsed < IMPORT_TIME_BUDGET
+    assert not modules & set(HEAVY_MODULES)
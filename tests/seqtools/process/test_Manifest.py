@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from seqtools.process import Manifest
+
+
+@pytest.fixture
+def mock_testclass():
+    force = Manifest.FORCE
+    yield
+    Manifest.FORCE = force
+
+
+def write(file, content):
+    with open(file, 'w') as outfile:
+        outfile.write(content)
+
+
+def test_manifest_file():
+    assert Manifest.manifest_file('POLR2A.bed') == '.POLR2A.bed.manifest'
+    assert Manifest.manifest_file('data/POLR2A.bed') == os.path.join('data', '.POLR2A.bed.manifest')
+
+
+def test_up_to_date(testdir, mock_testclass):
+    write('POLR2A.bed', 'input')
+    write('POLR2A-forcov.bed', 'output')
+    Manifest.record(['POLR2A-forcov.bed'], ['POLR2A.bed'], [10, ('-5',)])
+    assert os.path.exists('.POLR2A-forcov.bed.manifest')
+    assert Manifest.up_to_date(['POLR2A-forcov.bed'], ['POLR2A.bed'], [10, ('-5',)])
+
+
+def test_up_to_date_nomanifest(testdir, mock_testclass):
+    write('POLR2A.bed', 'input')
+    write('POLR2A-forcov.bed', 'output')
+    assert not Manifest.up_to_date(['POLR2A-forcov.bed'], ['POLR2A.bed'])
+
+
+def test_up_to_date_missingoutput(testdir, mock_testclass):
+    write('POLR2A.bed', 'input')
+    write('POLR2A-forcov.bed', 'output')
+    write('POLR2A-dyad.bed', 'output')
+    Manifest.record(['POLR2A-forcov.bed', 'POLR2A-dyad.bed'], ['POLR2A.bed'])
+    os.remove('POLR2A-dyad.bed')
+    assert not Manifest.up_to_date(['POLR2A-forcov.bed', 'POLR2A-dyad.bed'], ['POLR2A.bed'])
+
+
+def test_up_to_date_changedinput(testdir, mock_testclass):
+    write('POLR2A.bed', 'input')
+    write('POLR2A-forcov.bed', 'output')
+    Manifest.record(['POLR2A-forcov.bed'], ['POLR2A.bed'])
+    write('POLR2A.bed', 'changed input')
+    assert not Manifest.up_to_date(['POLR2A-forcov.bed'], ['POLR2A.bed'])
+
+
+def test_up_to_date_changedoutput(testdir, mock_testclass):
+    write('POLR2A.bed', 'input')
+    write('POLR2A-forcov.bed', 'output')
+    Manifest.record(['POLR2A-forcov.bed'], ['POLR2A.bed'])
+    write('POLR2A-forcov.bed', 'changed output')
+    assert not Manifest.up_to_date(['POLR2A-forcov.bed'], ['POLR2A.bed'])
+
+
+def test_up_to_date_changedparameters(testdir, mock_testclass):
+    write('POLR2A.bed', 'input')
+    write('POLR2A-forcov.bed', 'output')
+    Manifest.record(['POLR2A-forcov.bed'], ['POLR2A.bed'], [10])
+    assert not Manifest.up_to_date(['POLR2A-forcov.bed'], ['POLR2A.bed'], [20])
+
+
+def test_up_to_date_force(testdir, mock_testclass):
+    write('POLR2A.bed', 'input')
+    write('POLR2A-forcov.bed', 'output')
+    Manifest.record(['POLR2A-forcov.bed'], ['POLR2A.bed'])
+    Manifest.FORCE = True
+    assert not Manifest.up_to_date(['POLR2A-forcov.bed'], ['POLR2A.bed'])
+
+
+def test_up_to_date_nooutputs(testdir, mock_testclass):
+    assert not Manifest.up_to_date([], [])
+
+
+def test_record_missingoutput(testdir, mock_testclass):
+    write('POLR2A.bed', 'input')
+    Manifest.record(['POLR2A-forcov.bed'], ['POLR2A.bed'])
+    assert not os.path.exists('.POLR2A-forcov.bed.manifest')
@@ -0,0 +1,122 @@
+import logging
+import subprocess
+import sys
+
+import pytest
+
+from seqtools.process import Pipe
+
+
+def test_pipe(testdir):
+    output = 'output.txt'
+    cmd1 = [sys.executable, '-c', 'print("b"); print("a"); print("c")']
+    cmd2 = [sys.executable, '-c', 'import sys; sys.stdout.writelines(sorted(sys.stdin))']
+    with open(output, 'w') as outfile:
+        Pipe.pipe([cmd1, cmd2], stdout=outfile)
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'a\n'
+        assert infile.readline() == 'b\n'
+        assert infile.readline() == 'c\n'
+        assert infile.readline() == ''
+
+
+def test_pipe_single(testdir):
+    output = 'output.txt'
+    cmd = [sys.executable, '-c', 'print("a")']
+    with open(output, 'w') as outfile:
+        Pipe.pipe([cmd], stdout=outfile)
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'a\n'
+        assert infile.readline() == ''
+
+
+def test_pipe_firstfails(testdir):
+    cmd1 = [sys.executable, '-c', 'import sys; sys.exit(3)']
+    cmd2 = [sys.executable, '-c', 'import sys; sys.stdin.read()']
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        Pipe.pipe([cmd1, cmd2])
+    assert error.value.returncode == 3
+    assert error.value.cmd == cmd1
+
+
+def test_pipe_output(testdir):
+    cmd1 = [sys.executable, '-c', 'print("b"); print("a"); print("c")']
+    cmd2 = [sys.executable, '-c', 'import sys; sys.stdout.writelines(sorted(sys.stdin))']
+    with Pipe.pipe_output([cmd1, cmd2]) as infile:
+        assert infile.read() == b'a\nb\nc\n'
+
+
+def test_pipe_output_firstfails(testdir):
+    cmd1 = [sys.executable, '-c', 'import sys; sys.exit(3)']
+    cmd2 = [sys.executable, '-c', 'import sys; sys.stdout.write(sys.stdin.read())']
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        with Pipe.pipe_output([cmd1, cmd2]) as infile:
+            assert infile.read() == b''
+    assert error.value.returncode == 3
+    assert error.value.cmd == cmd1
+
+
+def test_pipe_output_readerfails(testdir):
+    cmd = [sys.executable, '-c', 'import sys, time; print("a"); sys.stdout.flush(); time.sleep(60)']
+    with pytest.raises(ValueError):
+        with Pipe.pipe_output([cmd]) as infile:
+            infile.readline()
+            raise ValueError()
+
+
+def test_pipe_lastfails(testdir):
+    cmd1 = [sys.executable, '-c', 'import signal; signal.signal(signal.SIGPIPE, signal.SIG_DFL); print("a")']
+    cmd2 = [sys.executable, '-c', 'import sys; sys.exit(2)']
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        Pipe.pipe([cmd1, cmd2])
+    assert error.value.returncode == 2
+    assert error.value.cmd == cmd2
+
+
+def test_pipe_notfound(testdir):
+    cmd1 = [sys.executable, '-c', 'import time; time.sleep(10)']
+    cmd2 = ['seqtools-command-not-found']
+    with pytest.raises(FileNotFoundError):
+        Pipe.pipe([cmd1, cmd2])
+
+
+def test_split_threads():
+    assert Pipe.split_threads(None) == (1, 0)
+    assert Pipe.split_threads(1) == (1, 0)
+    assert Pipe.split_threads(2) == (2, 0)
+    assert Pipe.split_threads(4) == (3, 1)
+    assert Pipe.split_threads(8) == (6, 2)
+    assert Pipe.split_threads(12) == (9, 3)
+
+
+def test_split_stages_threads():
+    assert Pipe.split_stages_threads(None, (3, 1, 3, 1)) == [0, 0, 0, 0]
+    assert Pipe.split_stages_threads(4, (3, 1, 3, 1)) == [0, 0, 0, 0]
+    assert Pipe.split_stages_threads(5, (3, 1, 3, 1)) == [1, 0, 0, 0]
+    assert Pipe.split_stages_threads(8, (3, 1, 3, 1)) == [2, 0, 2, 0]
+    assert Pipe.split_stages_threads(16, (3, 1, 3, 1)) == [5, 1, 5, 1]
+    assert Pipe.split_stages_threads(32, (3, 1, 3, 1)) == [11, 3, 11, 3]
+    assert Pipe.split_stages_threads(3) == [2]
+
+
+def test_pipe_allfail(testdir):
+    cmd1 = [sys.executable, '-c', 'import sys; sys.exit(4)']
+    cmd2 = [sys.executable, '-c', 'import sys; sys.stdin.read(); sys.exit(5)']
+    cmd3 = [sys.executable, '-c', 'import sys; sys.stdin.read(); sys.exit(6)']
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        Pipe.pipe([cmd1, cmd2, cmd3])
+    assert error.value.returncode == 4
+    assert error.value.cmd == cmd1
+    assert error.value.failures == [(cmd1, 4), (cmd2, 5), (cmd3, 6)]
+    assert str(cmd1) in str(error.value)
+    assert str(cmd3) in str(error.value)
+
+
+def test_pipe_brokenpipe(testdir):
+    cmd1 = [sys.executable, '-c', 'import os, signal; signal.signal(signal.SIGPIPE, signal.SIG_DFL); os.kill(os.getpid(), signal.SIGPIPE)']
+    cmd2 = [sys.executable, '-c', 'import sys; sys.exit(2)']
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        Pipe.pipe([cmd1, cmd2])
+    assert error.value.returncode == 2
+    assert error.value.cmd == cmd2
+    assert error.value.failures[1][0] == cmd1
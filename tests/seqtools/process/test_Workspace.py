@@ -0,0 +1,88 @@
+import os
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from seqtools.process import Workspace
+
+
+@pytest.fixture
+def mock_testclass():
+    listdir = os.listdir
+    Workspace.clear()
+    yield
+    os.listdir = listdir
+    Workspace.clear()
+
+
+def age_directory(directory='.'):
+    '''Sets modification time of directory far enough in the past for its listing to be reused.'''
+    mtime = os.stat(directory).st_mtime_ns - 10 * Workspace.RACY_DELAY
+    os.utime(directory, ns=(mtime, mtime))
+
+
+def test_parse():
+    files = ['POLR2A_R1.fastq.gz', 'POLR2A_R2.fastq.gz', 'POLR2A.bed', 'POLR2A-100-110.bed', 'POLR2A-100-110-cov.bw', 'POLR2A-genes.txt']
+    workspace = Workspace.parse(files)
+    assert workspace['files'] == files
+    assert workspace['fastq'] == {('POLR2A', '1'): ['POLR2A_R1.fastq.gz'], ('POLR2A', '2'): ['POLR2A_R2.fastq.gz']}
+    assert workspace['splits'] == {'POLR2A': [('POLR2A-100-110', 100, 110)]}
+    assert workspace['suffixes']['-genes.txt'] == ['POLR2A-genes.txt']
+    assert workspace['suffixes']['-cov.bw'] == ['POLR2A-100-110-cov.bw']
+    assert workspace['suffixes']['-110.bed'] == ['POLR2A-100-110.bed']
+
+
+def test_fastq(testdir, mock_testclass):
+    Path('POLR2A_1.fastq').touch()
+    Path('POLR2A_2.fastq').touch()
+    Path('POLR2A-dedup_1.fastq').touch()
+    assert Workspace.fastq('POLR2A', 1) == ['POLR2A_1.fastq']
+    assert Workspace.fastq('POLR2A', 2) == ['POLR2A_2.fastq']
+    assert Workspace.fastq('POLR2A-dedup', 1) == ['POLR2A-dedup_1.fastq']
+    assert Workspace.fastq('ASDURF', 1) == []
+
+
+def test_splits(testdir, mock_testclass):
+    Path('POLR2A-200-250.bed').touch()
+    Path('POLR2A-50-100.bed').touch()
+    Path('POLR2A-100-150.bed').touch()
+    Path('POLR2A-1-50-100.bed').touch()
+    Path('POLR2A-100-150-forcov.bed').touch()
+    assert Workspace.splits('POLR2A') == ['POLR2A-50-100', 'POLR2A-100-150', 'POLR2A-200-250']
+    assert Workspace.splits('POLR2A-1') == ['POLR2A-1-50-100']
+    assert Workspace.splits('ASDURF') == []
+
+
+def test_files_with_suffix(testdir, mock_testclass):
+    Path('POLR2A-genes.txt').touch()
+    Path('POLR2A-100-110-genes.txt').touch()
+    Path('POLR2A-dyad.txt').touch()
+    assert sorted(Workspace.files_with_suffix('-genes.txt')) == ['POLR2A-100-110-genes.txt', 'POLR2A-genes.txt']
+    assert Workspace.files_with_suffix('-cov.bw') == []
+
+
+def test_index_cached(testdir, mock_testclass):
+    Path('POLR2A-100-110.bed').touch()
+    age_directory()
+    os.listdir = MagicMock(wraps=os.listdir)
+    assert Workspace.splits('POLR2A') == ['POLR2A-100-110']
+    assert Workspace.splits('POLR2A') == ['POLR2A-100-110']
+    assert Workspace.fastq('POLR2A') == []
+    os.listdir.assert_called_once()
+
+
+def test_index_directorychanged(testdir, mock_testclass):
+    Path('POLR2A-100-110.bed').touch()
+    age_directory()
+    assert Workspace.splits('POLR2A') == ['POLR2A-100-110']
+    Path('POLR2A-110-120.bed').touch()
+    assert Workspace.splits('POLR2A') == ['POLR2A-100-110', 'POLR2A-110-120']
+
+
+def test_index_racy(testdir, mock_testclass):
+    Path('POLR2A-100-110.bed').touch()
+    os.listdir = MagicMock(wraps=os.listdir)
+    assert Workspace.splits('POLR2A') == ['POLR2A-100-110']
+    assert Workspace.splits('POLR2A') == ['POLR2A-100-110']
+    assert os.listdir.call_count == 2
@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+import io
 import logging
 import os
 from pathlib import Path
@@ -7,10 +9,13 @@ from unittest.mock import MagicMock, ANY
 
 import click
 from click.testing import CliRunner
+import pysam
 import pytest
 
 from seqtools import Bam2Bed as bb
 from seqtools.bed import Bed
+from seqtools.process import Jobs
+from seqtools.process import Pipe
 
 
 @pytest.fixture
@@ -20,16 +25,28 @@ def mock_testclass():
     bam2bed_unpaired = bb.bam2bed_unpaired
     bam2bedpe = bb.bam2bedpe
     bedpe2bed = bb.bedpe2bed
+    bam2bed_stream = bb.bam2bed_stream
+    bam2bed_native = bb.bam2bed_native
+    tile_size = bb.TILE_SIZE
     sort = Bed.sort
+    sort_blocks = Bed.sort_blocks
+    pipe_output = Pipe.pipe_output
     run = subprocess.run
+    jobs_run = Jobs.run
     yield 
     bb.bam2bed_samples = bam2bed_samples
     bb.bam2bed_sample = bam2bed_sample
     bb.bam2bed_unpaired = bam2bed_unpaired
     bb.bam2bedpe = bam2bedpe
     bb.bedpe2bed = bedpe2bed
+    bb.bam2bed_stream = bam2bed_stream
+    bb.bam2bed_native = bam2bed_native
+    bb.TILE_SIZE = tile_size
     Bed.sort = sort
+    Bed.sort_blocks = sort_blocks
+    Pipe.pipe_output = pipe_output
     subprocess.run = run
+    Jobs.run = jobs_run
     
     
 def create_file(*args, **kwargs):
@@ -61,7 +78,7 @@ def test_bam2bed(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(bb.bam2bed, ['-s', samples])
     assert result.exit_code == 0
-    bb.bam2bed_samples.assert_called_once_with(samples, True, threads, '-dedup', None)
+    bb.bam2bed_samples.assert_called_once_with(samples, True, threads, '-dedup', None, False, 'bedtools', 1)
 
 
 def test_bam2bed_parameters(testdir, mock_testclass):
@@ -73,16 +90,34 @@ def test_bam2bed_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(bb.bam2bed, ['-s', samples, '--unpaired', '--threads', threads, '-is', input_suffix, '--index', index])
     assert result.exit_code == 0
-    bb.bam2bed_samples.assert_called_once_with(samples, False, threads, input_suffix, index)
+    bb.bam2bed_samples.assert_called_once_with(samples, False, threads, input_suffix, index, False, 'bedtools', 1)
+
+
+def test_bam2bed_stream(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    bb.bam2bed_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(bb.bam2bed, ['-s', samples, '--stream'])
+    assert result.exit_code == 0
+    bb.bam2bed_samples.assert_called_once_with(samples, True, 1, '-dedup', None, True, 'bedtools', 1)
+
+
+def test_bam2bed_native(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    bb.bam2bed_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(bb.bam2bed, ['-s', samples, '--engine', 'native'])
+    assert result.exit_code == 0
+    bb.bam2bed_samples.assert_called_once_with(samples, True, 1, '-dedup', None, False, 'native', 1)
 
 
 def test_bam2bed_samples(testdir, mock_testclass):
     samples = Path(__file__).parent.joinpath('samples.txt')
     bb.bam2bed_sample = MagicMock()
     bb.bam2bed_samples(samples)
-    bb.bam2bed_sample.assert_any_call('POLR2A', True, None, '')
-    bb.bam2bed_sample.assert_any_call('ASDURF', True, None, '')
-    bb.bam2bed_sample.assert_any_call('POLR1C', True, None, '')
+    bb.bam2bed_sample.assert_any_call('POLR2A', True, None, '', False, 'bedtools')
+    bb.bam2bed_sample.assert_any_call('ASDURF', True, None, '', False, 'bedtools')
+    bb.bam2bed_sample.assert_any_call('POLR1C', True, None, '', False, 'bedtools')
 
 
 def test_bam2bed_samples_all_threads(testdir, mock_testclass):
@@ -91,9 +126,17 @@ def test_bam2bed_samples_all_threads(testdir, mock_testclass):
     input_suffix = '-test'
     bb.bam2bed_sample = MagicMock()
     bb.bam2bed_samples(samples, threads=threads, input_suffix=input_suffix)
-    bb.bam2bed_sample.assert_any_call('POLR2A', True, threads, input_suffix)
-    bb.bam2bed_sample.assert_any_call('ASDURF', True, threads, input_suffix)
-    bb.bam2bed_sample.assert_any_call('POLR1C', True, threads, input_suffix)
+    bb.bam2bed_sample.assert_any_call('POLR2A', True, threads, input_suffix, False, 'bedtools')
+    bb.bam2bed_sample.assert_any_call('ASDURF', True, threads, input_suffix, False, 'bedtools')
+    bb.bam2bed_sample.assert_any_call('POLR1C', True, threads, input_suffix, False, 'bedtools')
+
+
+def test_bam2bed_samples_jobs(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    bb.bam2bed_sample = MagicMock()
+    Jobs.run = MagicMock()
+    bb.bam2bed_samples(samples, threads=8, jobs=3)
+    Jobs.run.assert_called_once_with(bb.bam2bed_sample, [(sample, True, 2, '', False, 'bedtools') for sample in ['POLR2A', 'ASDURF', 'POLR1C']], 3)
 
 
 def test_bam2bed_samples_all_notpaired(testdir, mock_testclass):
@@ -102,9 +145,9 @@ def test_bam2bed_samples_all_notpaired(testdir, mock_testclass):
     input_suffix = '-test'
     bb.bam2bed_sample = MagicMock()
     bb.bam2bed_samples(samples, False, threads, input_suffix)
-    bb.bam2bed_sample.assert_any_call('POLR2A', False, threads, input_suffix)
-    bb.bam2bed_sample.assert_any_call('ASDURF', False, threads, input_suffix)
-    bb.bam2bed_sample.assert_any_call('POLR1C', False, threads, input_suffix)
+    bb.bam2bed_sample.assert_any_call('POLR2A', False, threads, input_suffix, False, 'bedtools')
+    bb.bam2bed_sample.assert_any_call('ASDURF', False, threads, input_suffix, False, 'bedtools')
+    bb.bam2bed_sample.assert_any_call('POLR1C', False, threads, input_suffix, False, 'bedtools')
 
 
 def test_bam2bed_samples_second_threads(testdir, mock_testclass):
@@ -113,7 +156,7 @@ def test_bam2bed_samples_second_threads(testdir, mock_testclass):
     input_suffix = '-test'
     bb.bam2bed_sample = MagicMock()
     bb.bam2bed_samples(samples, True, threads, input_suffix, 1)
-    bb.bam2bed_sample.assert_called_once_with('ASDURF', True, threads, input_suffix)
+    bb.bam2bed_sample.assert_called_once_with('ASDURF', True, threads, input_suffix, False, 'bedtools')
 
     
 def test_bam2bed_sample_paired(testdir, mock_testclass):
@@ -143,6 +186,44 @@ def test_bam2bed_sample_paired_inputsuffix(testdir, mock_testclass):
     assert bb.bam2bedpe.call_args.args[1] == bb.bedpe2bed.call_args.args[0]
 
 
+def test_bam2bed_sample_paired_stream(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bam = sample + '.bam'
+    bed = sample + '.bed'
+    threads = 2
+    bb.bam2bedpe = MagicMock()
+    bb.bedpe2bed = MagicMock()
+    bb.bam2bed_stream = MagicMock()
+    bb.bam2bed_sample(sample, True, threads, stream=True)
+    bb.bam2bed_stream.assert_called_once_with(bam, bed, threads)
+    bb.bam2bedpe.assert_not_called()
+    bb.bedpe2bed.assert_not_called()
+
+
+def test_bam2bed_sample_notpaired_stream(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bam = sample + '.bam'
+    bed = sample + '.bed'
+    bb.bam2bed_unpaired = MagicMock()
+    bb.bam2bed_stream = MagicMock()
+    bb.bam2bed_sample(sample, False, stream=True)
+    bb.bam2bed_unpaired.assert_called_with(bam, bed)
+    bb.bam2bed_stream.assert_not_called()
+
+
+def test_bam2bed_sample_native(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bam = sample + '-dedup.bam'
+    bed = sample + '.bed'
+    bb.bam2bedpe = MagicMock()
+    bb.bam2bed_unpaired = MagicMock()
+    bb.bam2bed_native = MagicMock()
+    bb.bam2bed_sample(sample, False, 2, '-dedup', True, 'native')
+    bb.bam2bed_native.assert_called_once_with(bam, bed, False, 2)
+    bb.bam2bedpe.assert_not_called()
+    bb.bam2bed_unpaired.assert_not_called()
+
+
 def test_bam2bed_sample_notpaired(testdir, mock_testclass):
     sample = 'POLR2A'
     bam = sample + '.bam'
@@ -219,3 +300,199 @@ def test_bedpe2bed(testdir, mock_testclass):
         assert infile.readline() == 'chr7\t500\t650\ttest7\t3\t-\t6\ttest6\n'
         assert infile.readline() == 'chr8\t700\t850\ttest8\t4\t-\t7\ttest7\n'
         assert infile.readline() == ''
+
+
+def sort_blocks(blocks, output):
+    with open(output, 'w') as outfile:
+        for block in blocks:
+            outfile.write(block)
+
+
+@contextmanager
+def pipe_output_bedpe(cmds):
+    with open(Path(__file__).parent.joinpath('sample.bedpe'), 'rb') as infile:
+        yield infile
+
+
+def test_bam2bed_stream_sample(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    bed = 'POLR2A.bed'
+    threads = 2
+    Pipe.pipe_output = MagicMock(side_effect=pipe_output_bedpe)
+    Bed.sort_blocks = MagicMock(side_effect=sort_blocks)
+    bb.bam2bed_stream(bam, bed, threads)
+    Pipe.pipe_output.assert_called_once_with([['samtools', 'sort', '-n', '-u', '--threads', str(threads - 1), bam], ['bedtools', 'bamtobed', '-bedpe', '-mate1', '-i', 'stdin']])
+    Bed.sort_blocks.assert_called_once_with(ANY, bed)
+    with open(bed, 'r') as infile:
+        assert infile.readline() == 'chr1\t100\t250\ttest1\t1\t+\t0\ttest0\n'
+        assert infile.readline() == 'chr2\t300\t450\ttest2\t2\t+\t1\ttest1\n'
+        assert infile.readline() == 'chr3\t500\t650\ttest3\t3\t+\t2\ttest2\n'
+        assert infile.readline() == 'chr4\t700\t850\ttest4\t4\t+\t3\ttest3\n'
+        assert infile.readline() == 'chr5\t100\t250\ttest5\t1\t-\t4\ttest4\n'
+        assert infile.readline() == 'chr6\t300\t450\ttest6\t2\t-\t5\ttest5\n'
+        assert infile.readline() == 'chr7\t500\t650\ttest7\t3\t-\t6\ttest6\n'
+        assert infile.readline() == 'chr8\t700\t850\ttest8\t4\t-\t7\ttest7\n'
+        assert infile.readline() == ''
+
+
+def test_bam2bed_stream_singlethread(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    bed = 'POLR2A.bed'
+    Pipe.pipe_output = MagicMock(side_effect=pipe_output_bedpe)
+    Bed.sort_blocks = MagicMock(side_effect=sort_blocks)
+    bb.bam2bed_stream(bam, bed, 1)
+    Pipe.pipe_output.assert_called_once_with([['samtools', 'sort', '-n', '-u', bam], ['bedtools', 'bamtobed', '-bedpe', '-mate1', '-i', 'stdin']])
+
+
+def test_bedpe2bed_blocks(testdir, mock_testclass):
+    bedpe = 'POLR2A.bedpe'
+    copyfile(Path(__file__).parent.joinpath('sample.bedpe'), bedpe)
+    bed = 'POLR2A.bed'
+    Bed.sort = MagicMock(side_effect=copyfile)
+    bb.bedpe2bed(bedpe, bed)
+    with open(bedpe, 'rb') as infile, open(bed, 'r') as expected:
+        assert ''.join(bb.bedpe2bed_blocks(infile, 7)) == expected.read()
+
+
+def test_bedpe2bed_blocks_nonewline(testdir, mock_testclass):
+    bedpe = io.BytesIO(b'chr1\t100\t150\tchr1\t200\t250\ttest1\t1\t+\t-')
+    assert ''.join(bb.bedpe2bed_blocks(bedpe)) == 'chr1\t100\t250\ttest1\t1\t+\n'
+
+
+def test_bedpe2bed_blocks_empty(testdir, mock_testclass):
+    assert ''.join(bb.bedpe2bed_blocks(io.BytesIO(b''))) == ''
+    assert ''.join(bb.bedpe2bed_blocks(io.BytesIO(b'\n\n'))) == ''
+
+
+def write_bam(bam, reads):
+    header = {'HD': {'VN': '1.6', 'SO': 'coordinate'}, 'SQ': [{'SN': 'chrII', 'LN': 2000}, {'SN': 'chrI', 'LN': 2000}, {'SN': 'chrM', 'LN': 2000}]}
+    references = [sq['SN'] for sq in header['SQ']]
+    reads = sorted(reads, key=lambda read: (references.index(read[2]), read[3]))
+    with pysam.AlignmentFile(bam, 'wb', header=header) as outfile:
+        for name, flag, reference, start, length, mapq, mate_reference, mate_start in reads:
+            read = pysam.AlignedSegment(outfile.header)
+            read.query_name = name
+            read.flag = flag
+            read.reference_name = reference
+            read.reference_start = start
+            read.mapping_quality = mapq
+            read.cigarstring = '{}M'.format(length)
+            read.query_sequence = 'A' * length
+            read.next_reference_name = mate_reference
+            read.next_reference_start = mate_start
+            outfile.write(read)
+
+
+def paired_reads():
+    return [
+        ('p3', 99, 'chrII', 100, 50, 30, 'chrII', 400),
+        ('p1', 163, 'chrI', 100, 50, 40, 'chrI', 120),
+        ('p2', 99, 'chrI', 110, 50, 20, 'chrI', 110),
+        ('p2', 147, 'chrI', 110, 30, 10, 'chrI', 110),
+        ('p1', 83, 'chrI', 120, 50, 30, 'chrI', 100),
+        ('o1', 97, 'chrI', 130, 50, 30, 'chrI', 140),
+        ('u1', 73, 'chrI', 150, 50, 30, 'chrI', 150),
+        ('x1', 97, 'chrI', 160, 50, 30, 'chrM', 100),
+        ('o2', 145, 'chrI', 300, 50, 30, 'chrI', 250),
+        ('p3', 147, 'chrII', 400, 50, 35, 'chrII', 100),
+        ('x1', 145, 'chrM', 100, 50, 30, 'chrI', 160),
+    ]
+
+
+def test_bam2bed_native_paired(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    bed = 'POLR2A.bed'
+    write_bam(bam, paired_reads())
+    bb.bam2bed_native(bam, bed, True, 2)
+    with open(bed, 'r') as infile:
+        assert infile.readline() == 'chrI\t100\t170\tp1\t30\t-\n'
+        assert infile.readline() == 'chrI\t110\t160\tp2\t10\t+\n'
+        assert infile.readline() == 'chrII\t100\t450\tp3\t30\t+\n'
+        assert infile.readline() == ''
+    assert Bed.count_bed(bed) == 3
+    assert os.path.isfile(bam + '.bai')
+
+
+def test_bam2bed_native_unpaired(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    bed = 'POLR2A.bed'
+    write_bam(bam, paired_reads() + [('s1', 16, 'chrM', 200, 20, 5, '*', -1)])
+    bb.bam2bed_native(bam, bed, False)
+    with open(bed, 'r') as infile:
+        assert infile.readline() == 'chrI\t100\t150\tp1/2\t40\t+\n'
+        assert infile.readline() == 'chrI\t110\t140\tp2/2\t10\t-\n'
+        assert infile.readline() == 'chrI\t110\t160\tp2/1\t20\t+\n'
+        assert infile.readline() == 'chrI\t120\t170\tp1/1\t30\t-\n'
+        assert infile.readline() == 'chrI\t130\t180\to1/1\t30\t+\n'
+        assert infile.readline() == 'chrI\t150\t200\tu1/1\t30\t+\n'
+        assert infile.readline() == 'chrI\t160\t210\tx1/1\t30\t+\n'
+        assert infile.readline() == 'chrI\t300\t350\to2/2\t30\t-\n'
+        assert infile.readline() == 'chrII\t100\t150\tp3/1\t30\t+\n'
+        assert infile.readline() == 'chrII\t400\t450\tp3/2\t35\t-\n'
+        assert infile.readline() == 'chrM\t100\t150\tx1/2\t30\t-\n'
+        assert infile.readline() == 'chrM\t200\t220\ts1\t5\t-\n'
+        assert infile.readline() == ''
+
+
+def test_paired_fragments_order(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    reads = []
+    for i in range(0, 50):
+        reads.append(('r{}'.format(i), 99, 'chrI', i * 10, 50, 30, 'chrI', i * 10 + (i % 5) * 40))
+        reads.append(('r{}'.format(i), 147, 'chrI', i * 10 + (i % 5) * 40, 50, 30, 'chrI', i * 10))
+    reads.sort(key=lambda read: read[3])
+    write_bam(bam, reads)
+    pysam.index(bam)
+    with pysam.AlignmentFile(bam, 'rb') as infile:
+        lines = list(bb.paired_fragments(infile.fetch('chrI'), 'chrI'))
+    assert len(lines) == 50
+    keys = [(int(line.split('\t')[1]), int(line.split('\t')[2]), line) for line in lines]
+    assert keys == sorted(keys)
+
+
+def many_paired_reads():
+    reads = []
+    for i in range(0, 150):
+        reference = 'chrI' if i % 3 else 'chrII'
+        start = (i * 37) % 1800
+        mate_start = min(start + (i % 7) * 20, 1900)
+        reads.append(('r{}'.format(i), 99, reference, start, 30 + i % 11, i % 40, reference, mate_start))
+        if i % 13:
+            reads.append(('r{}'.format(i), 147, reference, mate_start, 30 + i % 5, i % 30, reference, start))
+    return reads
+
+
+def test_bam2bed_native_paired_tiles(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    write_bam(bam, many_paired_reads())
+    bb.bam2bed_native(bam, 'expected.bed', True)
+    bb.TILE_SIZE = 100
+    bb.bam2bed_native(bam, 'serial.bed', True)
+    bb.bam2bed_native(bam, 'parallel.bed', True, 3)
+    with open('expected.bed', 'r') as expected, open('serial.bed', 'r') as serial, open('parallel.bed', 'r') as parallel:
+        expected_lines = expected.readlines()
+        assert len(expected_lines) > 100
+        assert serial.readlines() == expected_lines
+        assert parallel.readlines() == expected_lines
+    assert Bed.read_index('parallel.bed')['count'] == len(expected_lines)
+    assert Bed.read_index('parallel.bed')['lengths'] == Bed.read_index('expected.bed')['lengths']
+
+
+def test_bam2bed_native_unpaired_tiles(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    write_bam(bam, many_paired_reads())
+    bb.bam2bed_native(bam, 'expected.bed', False)
+    bb.TILE_SIZE = 100
+    bb.bam2bed_native(bam, 'parallel.bed', False, 2)
+    with open('expected.bed', 'r') as expected, open('parallel.bed', 'r') as parallel:
+        expected_lines = expected.readlines()
+        assert len(expected_lines) > 200
+        assert parallel.readlines() == expected_lines
+
+
+def test_bam_regions(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    write_bam(bam, [])
+    with pysam.AlignmentFile(bam, 'rb') as infile:
+        assert bb.bam_regions(infile, 800) == [('chrI', 0, 800), ('chrI', 800, 1600), ('chrI', 1600, 2000), ('chrII', 0, 800), ('chrII', 800, 1600), ('chrII', 1600, 2000), ('chrM', 0, 800), ('chrM', 800, 1600), ('chrM', 1600, 2000)]
+        assert bb.bam_regions(infile) == [('chrI', 0, 2000), ('chrII', 0, 2000), ('chrM', 0, 2000)]
@@ -12,6 +12,7 @@ from more_itertools.more import side_effect
 import pytest
 
 from seqtools import Bowtie2 as b
+from seqtools.process import Pipe
 from seqtools.seq import Fastq
 
 
@@ -21,14 +22,18 @@ def mock_testclass():
     bowtie_sample = b.bowtie_sample
     run_bowtie = b.run_bowtie
     sort = b.sort
+    run_bowtie_stream = b.run_bowtie_stream
     fastq = Fastq.fastq
+    pipe = Pipe.pipe
     run = subprocess.run
     yield
     b.bowtie_samples = bowtie_samples
     b.bowtie_sample = bowtie_sample
     b.run_bowtie = run_bowtie
     b.sort = sort
+    b.run_bowtie_stream = run_bowtie_stream
     Fastq.fastq = fastq
+    Pipe.pipe = pipe
     subprocess.run = run
     
 
@@ -52,7 +57,7 @@ def test_bowtie2(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(b.bowtie2, ['--samples', samples])
     assert result.exit_code == 0
-    b.bowtie_samples.assert_called_once_with(samples, 1, '', None, ())
+    b.bowtie_samples.assert_called_once_with(samples, 1, '', None, (), False, 1)
 
 
 def test_bowtie2_parameters(testdir, mock_testclass):
@@ -64,7 +69,7 @@ def test_bowtie2_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(b.bowtie2, ['--samples', samples, '-x', 'sacCer3.fa', '--threads', threads, '--output-suffix', output_suffix, '--index', index])
     assert result.exit_code == 0
-    b.bowtie_samples.assert_called_once_with(samples, threads, output_suffix, index, ('-x', 'sacCer3.fa',))
+    b.bowtie_samples.assert_called_once_with(samples, threads, output_suffix, index, ('-x', 'sacCer3.fa',), False, 1)
 
 
 def test_bowtie2_filenotexists(testdir, mock_testclass):
@@ -80,16 +85,16 @@ def test_bowtie_samples(testdir, mock_testclass):
     samples = Path(__file__).parent.joinpath('samples.txt')
     b.bowtie_sample = MagicMock()
     b.bowtie_samples(samples)
-    b.bowtie_sample.assert_any_call('POLR2A', None, '', ())
-    b.bowtie_sample.assert_any_call('ASDURF', None, '', ())
-    b.bowtie_sample.assert_any_call('POLR1C', None, '', ())
+    b.bowtie_sample.assert_any_call('POLR2A', None, '', (), False)
+    b.bowtie_sample.assert_any_call('ASDURF', None, '', (), False)
+    b.bowtie_sample.assert_any_call('POLR1C', None, '', (), False)
 
 
 def test_bowtie_samples_second(testdir, mock_testclass):
     samples = Path(__file__).parent.joinpath('samples.txt')
     b.bowtie_sample = MagicMock()
     b.bowtie_samples(samples, index=1)
-    b.bowtie_sample.assert_called_once_with('ASDURF', None, '', ())
+    b.bowtie_sample.assert_called_once_with('ASDURF', None, '', (), False)
 
 
 def test_bowtie_samples_parameters(testdir, mock_testclass):
@@ -99,9 +104,9 @@ def test_bowtie_samples_parameters(testdir, mock_testclass):
     bowtie_args = ('-x', 'sacCer3.fa',)
     b.bowtie_sample = MagicMock()
     b.bowtie_samples(samples, threads, output_suffix, bowtie_args=bowtie_args)
-    b.bowtie_sample.assert_any_call('POLR2A', threads, output_suffix, bowtie_args)
-    b.bowtie_sample.assert_any_call('ASDURF', threads, output_suffix, bowtie_args)
-    b.bowtie_sample.assert_any_call('POLR1C', threads, output_suffix, bowtie_args)
+    b.bowtie_sample.assert_any_call('POLR2A', threads, output_suffix, bowtie_args, False)
+    b.bowtie_sample.assert_any_call('ASDURF', threads, output_suffix, bowtie_args, False)
+    b.bowtie_sample.assert_any_call('POLR1C', threads, output_suffix, bowtie_args, False)
 
 
 def test_bowtie_sample(testdir, mock_testclass):
@@ -114,7 +119,7 @@ def test_bowtie_sample(testdir, mock_testclass):
     b.bowtie_sample(sample)
     Fastq.fastq.assert_any_call(sample, 1)
     Fastq.fastq.assert_any_call(sample, 2)
-    b.run_bowtie.assert_called_once_with(fastq, fastq2, bam, None, ())
+    b.run_bowtie.assert_called_once_with(fastq, fastq2, bam, None, (), False)
 
 
 def test_bowtie_sample_parameters(testdir, mock_testclass):
@@ -130,7 +135,7 @@ def test_bowtie_sample_parameters(testdir, mock_testclass):
     b.bowtie_sample(sample, threads, output_suffix, bowtie_args=bowtie_args)
     Fastq.fastq.assert_any_call(sample, 1)
     Fastq.fastq.assert_any_call(sample, 2)
-    b.run_bowtie.assert_called_once_with(fastq, fastq2, bam, threads, bowtie_args)
+    b.run_bowtie.assert_called_once_with(fastq, fastq2, bam, threads, bowtie_args, False)
 
 
 def test_bowtie_sample_single(testdir, mock_testclass):
@@ -142,7 +147,7 @@ def test_bowtie_sample_single(testdir, mock_testclass):
     b.bowtie_sample(sample)
     Fastq.fastq.assert_any_call(sample, 1)
     Fastq.fastq.assert_any_call(sample, 2)
-    b.run_bowtie.assert_called_once_with(fastq, None, bam, None, ())
+    b.run_bowtie.assert_called_once_with(fastq, None, bam, None, (), False)
 
 
 def test_run_bowtie(testdir, mock_testclass):
@@ -244,3 +249,60 @@ def test_run_bowtie_fastq2notexists(testdir, mock_testclass):
     subprocess.run.assert_has_calls([call(call1, check=True), call(call2, check=True), call(call3, check=True)], True)
     assert subprocess.run.call_args_list[0].args[0][2] == subprocess.run.call_args_list[1].args[0][5]
     assert subprocess.run.call_args_list[1].args[0][4] == subprocess.run.call_args_list[2].args[0][4]
+
+
+def test_bowtie2_stream(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    b.bowtie_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(b.bowtie2, ['--samples', samples, '--stream', '-x', 'sacCer3.fa'])
+    assert result.exit_code == 0
+    b.bowtie_samples.assert_called_once_with(samples, 1, '', None, ('-x', 'sacCer3.fa',), True, 1)
+
+
+def test_run_bowtie_stream(testdir, mock_testclass):
+    sample = 'PORL2A'
+    bam = sample + '.bam'
+    fastq = sample + '_1.fastq'
+    fastq2 = sample + '_2.fastq'
+    b.run_bowtie_stream = MagicMock()
+    subprocess.run = MagicMock()
+    b.run_bowtie(fastq, fastq2, bam, None, (), True)
+    b.run_bowtie_stream.assert_called_once_with(fastq, fastq2, bam, None, ())
+    subprocess.run.assert_not_called()
+
+
+def test_run_bowtie_stream_pipe(testdir, mock_testclass):
+    sample = 'PORL2A'
+    bam = sample + '.bam'
+    fastq = sample + '_1.fastq'
+    copyfile(Path(__file__).parent.joinpath('samples.txt'), fastq)
+    fastq2 = sample + '_2.fastq'
+    copyfile(Path(__file__).parent.joinpath('samples.txt'), fastq2)
+    Pipe.pipe = MagicMock()
+    b.run_bowtie_stream(fastq, fastq2, bam, None, ())
+    Pipe.pipe.assert_called_once_with([['bowtie2', '-1', fastq, '-2', fastq2], ['samtools', 'sort', '-o', bam, '-']])
+
+
+def test_run_bowtie_stream_parameters(testdir, mock_testclass):
+    sample = 'PORL2A'
+    bam = sample + '.bam'
+    fastq = sample + '_1.fastq'
+    copyfile(Path(__file__).parent.joinpath('samples.txt'), fastq)
+    fastq2 = sample + '_2.fastq'
+    copyfile(Path(__file__).parent.joinpath('samples.txt'), fastq2)
+    threads = 8
+    bowtie_args = ('-x', 'sacCer3.fa',)
+    Pipe.pipe = MagicMock()
+    b.run_bowtie_stream(fastq, fastq2, bam, threads, bowtie_args)
+    Pipe.pipe.assert_called_once_with([['bowtie2', '-x', 'sacCer3.fa', '-p', '6', '-1', fastq, '-2', fastq2], ['samtools', 'sort', '--threads', '2', '-o', bam, '-']])
+
+
+def test_run_bowtie_stream_single(testdir, mock_testclass):
+    sample = 'PORL2A'
+    bam = sample + '.bam'
+    fastq = sample + '_1.fastq'
+    copyfile(Path(__file__).parent.joinpath('samples.txt'), fastq)
+    Pipe.pipe = MagicMock()
+    b.run_bowtie_stream(fastq, None, bam, 2, ())
+    Pipe.pipe.assert_called_once_with([['bowtie2', '-p', '2', '-U', fastq], ['samtools', 'sort', '-o', bam, '-']])
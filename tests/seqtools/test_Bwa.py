@@ -12,6 +12,7 @@ from more_itertools.more import side_effect
 import pytest
 
 from seqtools import Bwa as b
+from seqtools.process import Pipe
 from seqtools.seq import Fastq
 
 
@@ -20,13 +21,17 @@ def mock_testclass():
     bwa_samples = b.bwa_samples
     bwa_sample = b.bwa_sample
     run_bwa = b.run_bwa
+    run_bwa_stream = b.run_bwa_stream
     fastq = Fastq.fastq
+    pipe = Pipe.pipe
     run = subprocess.run
     yield
     b.bwa_samples = bwa_samples
     b.bwa_sample = bwa_sample
     b.run_bwa = run_bwa
+    b.run_bwa_stream = run_bwa_stream
     Fastq.fastq = fastq
+    Pipe.pipe = pipe
     subprocess.run = run
     
 
@@ -47,7 +52,7 @@ def test_bwa(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(b.bwa, ['--samples', samples, '--fasta', fasta])
     assert result.exit_code == 0
-    b.bwa_samples.assert_called_once_with(samples, fasta, 1, '', None, ())
+    b.bwa_samples.assert_called_once_with(samples, fasta, 1, '', None, (), False, 1)
 
 
 def test_bwa_parameters(testdir, mock_testclass):
@@ -60,7 +65,7 @@ def test_bwa_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(b.bwa, ['--samples', samples, '--fasta', fasta, '-x', 'sacCer3.fa', '--threads', threads, '--output-suffix', output_suffix, '--index', index])
     assert result.exit_code == 0
-    b.bwa_samples.assert_called_once_with(samples, fasta, threads, output_suffix, index, ('-x', 'sacCer3.fa',))
+    b.bwa_samples.assert_called_once_with(samples, fasta, threads, output_suffix, index, ('-x', 'sacCer3.fa',), False, 1)
 
 
 def test_bwa_samplesnotexists(testdir, mock_testclass):
@@ -88,9 +93,9 @@ def test_bwa_samples(testdir, mock_testclass):
     fasta = Path(__file__).parent.joinpath('sacCer3.fa')
     b.bwa_sample = MagicMock()
     b.bwa_samples(samples, fasta)
-    b.bwa_sample.assert_any_call('POLR2A', fasta, None, '', ())
-    b.bwa_sample.assert_any_call('ASDURF', fasta, None, '', ())
-    b.bwa_sample.assert_any_call('POLR1C', fasta, None, '', ())
+    b.bwa_sample.assert_any_call('POLR2A', fasta, None, '', (), False)
+    b.bwa_sample.assert_any_call('ASDURF', fasta, None, '', (), False)
+    b.bwa_sample.assert_any_call('POLR1C', fasta, None, '', (), False)
 
 
 def test_bwa_samples_second(testdir, mock_testclass):
@@ -98,7 +103,7 @@ def test_bwa_samples_second(testdir, mock_testclass):
     fasta = Path(__file__).parent.joinpath('sacCer3.fa')
     b.bwa_sample = MagicMock()
     b.bwa_samples(samples, fasta, index=1)
-    b.bwa_sample.assert_called_once_with('ASDURF', fasta, None, '', ())
+    b.bwa_sample.assert_called_once_with('ASDURF', fasta, None, '', (), False)
 
 
 def test_bwa_samples_parameters(testdir, mock_testclass):
@@ -109,9 +114,9 @@ def test_bwa_samples_parameters(testdir, mock_testclass):
     bwa_args = ('-x', 'sacCer3.fa',)
     b.bwa_sample = MagicMock()
     b.bwa_samples(samples, fasta, threads, output_suffix, bwa_args=bwa_args)
-    b.bwa_sample.assert_any_call('POLR2A', fasta, threads, output_suffix, bwa_args)
-    b.bwa_sample.assert_any_call('ASDURF', fasta, threads, output_suffix, bwa_args)
-    b.bwa_sample.assert_any_call('POLR1C', fasta, threads, output_suffix, bwa_args)
+    b.bwa_sample.assert_any_call('POLR2A', fasta, threads, output_suffix, bwa_args, False)
+    b.bwa_sample.assert_any_call('ASDURF', fasta, threads, output_suffix, bwa_args, False)
+    b.bwa_sample.assert_any_call('POLR1C', fasta, threads, output_suffix, bwa_args, False)
 
 
 def test_bwa_sample(testdir, mock_testclass):
@@ -125,7 +130,7 @@ def test_bwa_sample(testdir, mock_testclass):
     b.bwa_sample(sample, fasta)
     Fastq.fastq.assert_any_call(sample, 1)
     Fastq.fastq.assert_any_call(sample, 2)
-    b.run_bwa.assert_called_once_with(fastq, fastq2, fasta, bam, None, ())
+    b.run_bwa.assert_called_once_with(fastq, fastq2, fasta, bam, None, (), False)
 
 
 def test_bwa_sample_parameters(testdir, mock_testclass):
@@ -142,7 +147,7 @@ def test_bwa_sample_parameters(testdir, mock_testclass):
     b.bwa_sample(sample, fasta, threads, output_suffix, bwa_args=bwa_args)
     Fastq.fastq.assert_any_call(sample, 1)
     Fastq.fastq.assert_any_call(sample, 2)
-    b.run_bwa.assert_called_once_with(fastq, fastq2, fasta, bam, threads, bwa_args)
+    b.run_bwa.assert_called_once_with(fastq, fastq2, fasta, bam, threads, bwa_args, False)
 
 
 def test_bwa_sample_single(testdir, mock_testclass):
@@ -155,7 +160,7 @@ def test_bwa_sample_single(testdir, mock_testclass):
     b.bwa_sample(sample, fasta)
     Fastq.fastq.assert_any_call(sample, 1)
     Fastq.fastq.assert_any_call(sample, 2)
-    b.run_bwa.assert_called_once_with(fastq, None, fasta, bam, None, ())
+    b.run_bwa.assert_called_once_with(fastq, None, fasta, bam, None, (), False)
 
 
 def test_bwa_index(testdir, mock_testclass):
@@ -269,3 +274,65 @@ def test_run_bwa_fastq2notexists(testdir, mock_testclass):
     subprocess.run.assert_has_calls([call(call1, check=True), call(call2, check=True), call(call3, check=True)], True)
     assert subprocess.run.call_args_list[0].args[0][3] == subprocess.run.call_args_list[1].args[0][5]
     assert subprocess.run.call_args_list[1].args[0][4] == subprocess.run.call_args_list[2].args[0][4]
+
+
+def test_bwa_stream(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    fasta = Path(__file__).parent.joinpath('sacCer3.fa')
+    b.bwa_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(b.bwa, ['--samples', samples, '--fasta', fasta, '--stream'])
+    assert result.exit_code == 0
+    b.bwa_samples.assert_called_once_with(samples, fasta, 1, '', None, (), True, 1)
+
+
+def test_run_bwa_stream(testdir, mock_testclass):
+    sample = 'PORL2A'
+    fasta = 'sacCer3.fa'
+    bam = sample + '.bam'
+    fastq = sample + '_1.fastq'
+    fastq2 = sample + '_2.fastq'
+    b.run_bwa_stream = MagicMock()
+    subprocess.run = MagicMock()
+    b.run_bwa(fastq, fastq2, fasta, bam, None, (), True)
+    b.run_bwa_stream.assert_called_once_with(fastq, fastq2, fasta, bam, None, ())
+    subprocess.run.assert_not_called()
+
+
+def test_run_bwa_stream_pipe(testdir, mock_testclass):
+    sample = 'PORL2A'
+    fasta = 'sacCer3.fa'
+    bam = sample + '.bam'
+    fastq = sample + '_1.fastq'
+    copyfile(Path(__file__).parent.joinpath('samples.txt'), fastq)
+    fastq2 = sample + '_2.fastq'
+    copyfile(Path(__file__).parent.joinpath('samples.txt'), fastq2)
+    Pipe.pipe = MagicMock()
+    b.run_bwa_stream(fastq, fastq2, fasta, bam, None, ())
+    Pipe.pipe.assert_called_once_with([['bwa', 'mem', fasta, fastq, fastq2], ['samtools', 'sort', '-o', bam, '-']])
+
+
+def test_run_bwa_stream_parameters(testdir, mock_testclass):
+    sample = 'PORL2A'
+    fasta = 'sacCer3.fa'
+    bam = sample + '.bam'
+    fastq = sample + '_1.fastq'
+    copyfile(Path(__file__).parent.joinpath('samples.txt'), fastq)
+    fastq2 = sample + '_2.fastq'
+    copyfile(Path(__file__).parent.joinpath('samples.txt'), fastq2)
+    threads = 8
+    bwa_args = ('-x', 'sacCer3.fa',)
+    Pipe.pipe = MagicMock()
+    b.run_bwa_stream(fastq, fastq2, fasta, bam, threads, bwa_args)
+    Pipe.pipe.assert_called_once_with([['bwa', 'mem', '-x', 'sacCer3.fa', '-t', '6', fasta, fastq, fastq2], ['samtools', 'sort', '--threads', '2', '-o', bam, '-']])
+
+
+def test_run_bwa_stream_single(testdir, mock_testclass):
+    sample = 'PORL2A'
+    fasta = 'sacCer3.fa'
+    bam = sample + '.bam'
+    fastq = sample + '_1.fastq'
+    copyfile(Path(__file__).parent.joinpath('samples.txt'), fastq)
+    Pipe.pipe = MagicMock()
+    b.run_bwa_stream(fastq, None, fasta, bam, 2, ())
+    Pipe.pipe.assert_called_once_with([['bwa', 'mem', '-t', '2', fasta, fastq], ['samtools', 'sort', '-o', bam, '-']])
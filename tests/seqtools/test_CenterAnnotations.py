@@ -8,6 +8,7 @@ import pytest
 
 from seqtools import CenterAnnotations as ca
 from seqtools import Split as sb
+from seqtools.process import Jobs, Manifest
 from seqtools.txt import Parser
 
 
@@ -19,6 +20,7 @@ def mock_testclass():
     center_annotations = ca.center_annotations
     splits = sb.splits
     first = Parser.first
+    run = Jobs.run
     yield
     ca.center_annotations_samples = center_annotations_samples
     ca.center_annotations_sample_splits = center_annotations_sample_splits
@@ -26,6 +28,7 @@ def mock_testclass():
     ca.center_annotations = center_annotations
     sb.splits = splits
     Parser.first = first
+    Jobs.run = run
     
     
 def test_centerannotations(testdir, mock_testclass):
@@ -34,7 +37,7 @@ def test_centerannotations(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(ca.centerannotations, ['-s', samples])
     assert result.exit_code == 0
-    ca.center_annotations_samples.assert_called_once_with(samples, '', '-forcov', None)
+    ca.center_annotations_samples.assert_called_once_with(samples, '', '-forcov', None, 1)
 
 
 def test_centerannotations_parameters(testdir, mock_testclass):
@@ -45,7 +48,7 @@ def test_centerannotations_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(ca.centerannotations, ['-s', samples, '-is', input_suffix, '-os', output_suffix])
     assert result.exit_code == 0
-    ca.center_annotations_samples.assert_called_once_with(samples, input_suffix, output_suffix, None)
+    ca.center_annotations_samples.assert_called_once_with(samples, input_suffix, output_suffix, None, 1)
 
 
 def test_centerannotations_samesuffix(testdir, mock_testclass):
@@ -66,7 +69,7 @@ def test_centerannotations_onlyoutputsuffix(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(ca.centerannotations, ['-s', samples, '-os', output_suffix])
     assert result.exit_code == 0
-    ca.center_annotations_samples.assert_called_once_with(samples, '', output_suffix, None)
+    ca.center_annotations_samples.assert_called_once_with(samples, '', output_suffix, None, 1)
 
 
 def test_centerannotations_second(testdir, mock_testclass):
@@ -76,7 +79,16 @@ def test_centerannotations_second(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(ca.centerannotations, ['-s', samples, '-i', index])
     assert result.exit_code == 0
-    ca.center_annotations_samples.assert_called_once_with(samples, '', '-forcov', index)
+    ca.center_annotations_samples.assert_called_once_with(samples, '', '-forcov', index, 1)
+
+
+def test_centerannotations_jobs(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    ca.center_annotations_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(ca.centerannotations, ['-s', samples, '-j', 4])
+    assert result.exit_code == 0
+    ca.center_annotations_samples.assert_called_once_with(samples, '', '-forcov', None, 4)
 
 
 def test_centerannotations_samplesnotexists(testdir, mock_testclass):
@@ -121,6 +133,19 @@ def test_center_annotations_samples_second(testdir, mock_testclass):
     Parser.first.assert_called_once_with(samples_file)
     ca.center_annotations_sample_splits.assert_called_once_with(samples[1], '', '-forcov')
 
+
+
+def test_center_annotations_samples_jobs(testdir, mock_testclass):
+    samples_file = Path(__file__).parent.joinpath('samples.txt')
+    samples = ['POLR2A', 'ASDURF']
+    splits = {'POLR2A': ['POLR2A-100-110', 'POLR2A-120-130'], 'ASDURF': []}
+    Parser.first = MagicMock(return_value=samples)
+    sb.splits = MagicMock(side_effect=lambda sample: splits[sample])
+    Jobs.run = MagicMock()
+    ca.center_annotations_samples(samples_file, jobs=2)
+    Parser.first.assert_called_once_with(samples_file)
+    Jobs.run.assert_called_once_with(ca.center_annotations_sample, [('POLR2A', '', '-forcov'), ('POLR2A-100-110', '', '-forcov'), ('POLR2A-120-130', '', '-forcov'), ('ASDURF', '', '-forcov')], 2)
+
     
 def test_center_annotations_sample_splits(testdir, mock_testclass):
     sample = 'POLR2A'
@@ -164,6 +189,18 @@ def test_center_annotations_sample(testdir, mock_testclass):
     ca.center_annotations.assert_called_once_with(bed, forcov)
 
 
+def test_center_annotations_sample_uptodate(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    forcov = sample + '-forcov.bed'
+    Path(bed).touch()
+    Path(forcov).touch()
+    Manifest.record([forcov], [bed])
+    ca.center_annotations = MagicMock()
+    ca.center_annotations_sample(sample)
+    ca.center_annotations.assert_not_called()
+
+
 def test_center_annotations_sample_split(testdir, mock_testclass):
     split = 'POLR2A-100-110'
     bed = split + '.bed'
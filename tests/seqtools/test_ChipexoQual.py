@@ -33,7 +33,7 @@ def test_chipexoqual(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(cq.chipexoqual, ['--datasets', datasets])
     assert result.exit_code == 0
-    cq.chipexoqual_datasets.assert_called_once_with(datasets, '', None, ())
+    cq.chipexoqual_datasets.assert_called_once_with(datasets, '', None, (), 1)
 
 
 def test_chipexoqual_parameters(testdir, mock_testclass):
@@ -43,7 +43,7 @@ def test_chipexoqual_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(cq.chipexoqual, ['--datasets', datasets, '--suffix', '-test', '--index', index, '-s', '1000000'])
     assert result.exit_code == 0
-    cq.chipexoqual_datasets.assert_called_once_with(datasets, '-test', 1, ('-s', '1000000',))
+    cq.chipexoqual_datasets.assert_called_once_with(datasets, '-test', 1, ('-s', '1000000',), 1)
 
 
 def test_chipexoqual_datasetsnotexists(testdir, mock_testclass):
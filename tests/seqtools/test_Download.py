@@ -36,7 +36,7 @@ def test_download(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(d.download, ['-s', samples])
     assert result.exit_code == 0
-    d.download_samples.assert_called_once_with(samples, True, threads, mem, None)
+    d.download_samples.assert_called_once_with(samples, True, threads, mem, None, 1)
 
 
 def test_download_parameters(testdir, mock_testclass):
@@ -48,7 +48,7 @@ def test_download_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(d.download, ['-s', samples, '--slow', '--threads', threads, '--mem', mem, '--index', index])
     assert result.exit_code == 0
-    d.download_samples.assert_called_once_with(samples, False, threads, mem, 1)
+    d.download_samples.assert_called_once_with(samples, False, threads, mem, 1, 1)
 
 
 def test_download_samples(testdir, mock_testclass):
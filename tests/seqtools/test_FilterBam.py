@@ -9,6 +9,7 @@ from click.testing import CliRunner
 import pytest
 
 from seqtools import FilterBam as fb
+from seqtools.process import Pipe
 
 
 @pytest.fixture
@@ -18,6 +19,7 @@ def mock_testclass():
     filter_mapped = fb.filter_mapped
     remove_duplicates = fb.remove_duplicates
     sort = fb.sort
+    pipe = Pipe.pipe
     run = subprocess.run
     yield
     fb.filter_bam = filter_bam
@@ -25,6 +27,7 @@ def mock_testclass():
     fb.filter_mapped = filter_mapped
     fb.remove_duplicates = remove_duplicates
     fb.sort = sort
+    Pipe.pipe = pipe
     subprocess.run = run
     
     
@@ -57,7 +60,7 @@ def test_filterbam(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(fb.filterbam, ['-s', samples])
     assert result.exit_code == 0
-    fb.filter_bam.assert_called_once_with(samples, True, True, threads, '', '', None)
+    fb.filter_bam.assert_called_once_with(samples, True, True, threads, '', '', None, False, 1)
 
 
 def test_filterbam_parameters(testdir, mock_testclass):
@@ -70,16 +73,16 @@ def test_filterbam_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(fb.filterbam, ['-s', samples, '--unpaired', '--no-dedup', '--threads', threads, '--input-suffix', input_suffix, '--output-suffix', output_suffix, '--index', index])
     assert result.exit_code == 0
-    fb.filter_bam.assert_called_once_with(samples, False, False, threads, input_suffix, output_suffix, index)
+    fb.filter_bam.assert_called_once_with(samples, False, False, threads, input_suffix, output_suffix, index, False, 1)
 
 
 def test_filter_bam(testdir, mock_testclass):
     samples = Path(__file__).parent.joinpath('samples.txt')
     fb.filter_bam_sample = MagicMock()
     fb.filter_bam(samples)
-    fb.filter_bam_sample.assert_any_call('POLR2A', True, True, None, '', '')
-    fb.filter_bam_sample.assert_any_call('ASDURF', True, True, None, '', '')
-    fb.filter_bam_sample.assert_any_call('POLR1C', True, True, None, '', '')
+    fb.filter_bam_sample.assert_any_call('POLR2A', True, True, None, '', '', False)
+    fb.filter_bam_sample.assert_any_call('ASDURF', True, True, None, '', '', False)
+    fb.filter_bam_sample.assert_any_call('POLR1C', True, True, None, '', '', False)
 
 
 def test_filter_bam_parameters(testdir, mock_testclass):
@@ -89,9 +92,9 @@ def test_filter_bam_parameters(testdir, mock_testclass):
     output_suffix = '-sacCer'
     fb.filter_bam_sample = MagicMock()
     fb.filter_bam(samples, False, False, threads, input_suffix, output_suffix)
-    fb.filter_bam_sample.assert_any_call('POLR2A', False, False, threads, input_suffix, output_suffix)
-    fb.filter_bam_sample.assert_any_call('ASDURF', False, False, threads, input_suffix, output_suffix)
-    fb.filter_bam_sample.assert_any_call('POLR1C', False, False, threads, input_suffix, output_suffix)
+    fb.filter_bam_sample.assert_any_call('POLR2A', False, False, threads, input_suffix, output_suffix, False)
+    fb.filter_bam_sample.assert_any_call('ASDURF', False, False, threads, input_suffix, output_suffix, False)
+    fb.filter_bam_sample.assert_any_call('POLR1C', False, False, threads, input_suffix, output_suffix, False)
 
 
 def test_filter_bam_second(testdir, mock_testclass):
@@ -99,7 +102,7 @@ def test_filter_bam_second(testdir, mock_testclass):
     threads = 2
     fb.filter_bam_sample = MagicMock()
     fb.filter_bam(samples, False, True, threads, index=1)
-    fb.filter_bam_sample.assert_called_once_with('ASDURF', False, True, threads, '', '')
+    fb.filter_bam_sample.assert_called_once_with('ASDURF', False, True, threads, '', '', False)
 
 
 def test_filter_bam_sample_single(testdir, mock_testclass):
@@ -110,8 +113,8 @@ def test_filter_bam_sample_single(testdir, mock_testclass):
     fb.filter_mapped = MagicMock(create_file(['-o', bam_filtered]))
     fb.remove_duplicates = MagicMock(create_file(['-o', bam_dedup]))
     fb.filter_bam_sample(sample, False, True)
-    fb.filter_mapped.assert_called_with(bam, bam_filtered, False, None)
-    fb.remove_duplicates.assert_called_with(bam_filtered, bam_dedup, None)
+    fb.filter_mapped.assert_called_with(bam, bam_filtered, False, None, False)
+    fb.remove_duplicates.assert_called_with(bam_filtered, bam_dedup, None, False)
     assert os.path.exists(bam_filtered)
     assert os.path.exists(bam_dedup)
 
@@ -124,7 +127,7 @@ def test_filter_bam_sample_single_nodedup(testdir, mock_testclass):
     fb.filter_mapped = MagicMock(create_file(['-o', bam_filtered]))
     fb.remove_duplicates = MagicMock()
     fb.filter_bam_sample(sample, False, False)
-    fb.filter_mapped.assert_called_with(bam, bam_filtered, False, None)
+    fb.filter_mapped.assert_called_with(bam, bam_filtered, False, None, False)
     fb.remove_duplicates.assert_not_called()
     assert os.path.exists(bam_filtered)
     assert not os.path.exists(bam_dedup)
@@ -141,8 +144,8 @@ def test_filter_bam_sample_single_parameters(testdir, mock_testclass):
     fb.filter_mapped = MagicMock(create_file(['-o', bam_filtered]))
     fb.remove_duplicates = MagicMock(create_file(['-o', bam_dedup]))
     fb.filter_bam_sample(sample, False, True, threads, input_suffix, output_suffix)
-    fb.filter_mapped.assert_called_with(bam, bam_filtered, False, threads)
-    fb.remove_duplicates.assert_called_with(bam_filtered, bam_dedup, threads)
+    fb.filter_mapped.assert_called_with(bam, bam_filtered, False, threads, False)
+    fb.remove_duplicates.assert_called_with(bam_filtered, bam_dedup, threads, False)
     assert os.path.exists(bam_filtered)
     assert os.path.exists(bam_dedup)
 
@@ -155,8 +158,8 @@ def test_filter_bam_sample_paired(testdir, mock_testclass):
     fb.filter_mapped = MagicMock(create_file(['-o', bam_filtered]))
     fb.remove_duplicates = MagicMock(create_file(['-o', bam_dedup]))
     fb.filter_bam_sample(sample, True, True)
-    fb.filter_mapped.assert_called_with(bam, bam_filtered, True, None)
-    fb.remove_duplicates.assert_called_with(bam_filtered, bam_dedup, None)
+    fb.filter_mapped.assert_called_with(bam, bam_filtered, True, None, False)
+    fb.remove_duplicates.assert_called_with(bam_filtered, bam_dedup, None, False)
     assert os.path.exists(bam_filtered)
     assert os.path.exists(bam_dedup)
 
@@ -169,7 +172,7 @@ def test_filter_bam_sample_paired_nodedup(testdir, mock_testclass):
     fb.filter_mapped = MagicMock(create_file(['-o', bam_filtered]))
     fb.remove_duplicates = MagicMock()
     fb.filter_bam_sample(sample, True, False)
-    fb.filter_mapped.assert_called_with(bam, bam_filtered, True, None)
+    fb.filter_mapped.assert_called_with(bam, bam_filtered, True, None, False)
     fb.remove_duplicates.assert_not_called()
     assert os.path.exists(bam_filtered)
     assert not os.path.exists(bam_dedup)
@@ -186,8 +189,8 @@ def test_filter_bam_sample_paired_parameters(testdir, mock_testclass):
     fb.filter_mapped = MagicMock(create_file(['-o', bam_filtered]))
     fb.remove_duplicates = MagicMock(create_file(['-o', bam_dedup]))
     fb.filter_bam_sample(sample, True, True, threads, input_suffix, output_suffix)
-    fb.filter_mapped.assert_called_with(bam, bam_filtered, True, threads)
-    fb.remove_duplicates.assert_called_with(bam_filtered, bam_dedup, threads)
+    fb.filter_mapped.assert_called_with(bam, bam_filtered, True, threads, False)
+    fb.remove_duplicates.assert_called_with(bam_filtered, bam_dedup, threads, False)
     assert os.path.exists(bam_filtered)
     assert os.path.exists(bam_dedup)
 
@@ -330,3 +333,80 @@ def test_sort_singlethread(testdir, mock_testclass):
     subprocess.run = MagicMock()
     fb.sort(bam, output, threads)
     subprocess.run.assert_any_call(['samtools', 'sort', '-o', output, bam], check=True)
+
+
+def test_filterbam_stream(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    threads = 1
+    fb.filter_bam = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(fb.filterbam, ['-s', samples, '--stream'])
+    assert result.exit_code == 0
+    fb.filter_bam.assert_called_once_with(samples, True, True, threads, '', '', None, True, 1)
+
+
+def test_filter_bam_sample_paired_stream(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bam = sample + '.bam'
+    bam_filtered = sample + '-filtered.bam'
+    bam_dedup = sample + '-dedup.bam'
+    fb.filter_mapped = MagicMock()
+    fb.remove_duplicates = MagicMock()
+    fb.filter_bam_sample(sample, True, True, stream=True)
+    fb.filter_mapped.assert_called_with(bam, bam_filtered, True, None, True)
+    fb.remove_duplicates.assert_called_with(bam_filtered, bam_dedup, None, True)
+
+
+def test_filter_mapped_stream_single(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    output = 'POLR2A-out.bam'
+    Pipe.pipe = MagicMock()
+    subprocess.run = MagicMock()
+    fb.filter_mapped(bam, output, False, stream=True)
+    Pipe.pipe.assert_called_once_with([['samtools', 'view', '-u', '-F', '2048', '-F', '4', bam], ['samtools', 'sort', '-o', output, '-']])
+    subprocess.run.assert_not_called()
+
+
+def test_filter_mapped_stream_paired_threads(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    output = 'POLR2A-out.bam'
+    threads = 3
+    Pipe.pipe = MagicMock()
+    fb.filter_mapped(bam, output, True, threads, True)
+    Pipe.pipe.assert_called_once_with([['samtools', 'view', '-u', '-F', '2048', '-f', '2', bam], ['samtools', 'sort', '--threads', str(threads - 1), '-o', output, '-']])
+
+
+def test_remove_duplicates_stream(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    output = 'POLR2A-out.bam'
+    Pipe.pipe = MagicMock()
+    subprocess.run = MagicMock()
+    fb.remove_duplicates(bam, output, stream=True)
+    Pipe.pipe.assert_called_once_with([['samtools', 'sort', '-n', '-u', bam],
+                                       ['samtools', 'fixmate', '-m', '-u', '-', '-'],
+                                       ['samtools', 'sort', '-u', '-'],
+                                       ['samtools', 'markdup', '-r', '-', output]])
+    subprocess.run.assert_not_called()
+
+
+def test_remove_duplicates_stream_threads(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    output = 'POLR2A-out.bam'
+    threads = 16
+    Pipe.pipe = MagicMock()
+    fb.remove_duplicates(bam, output, threads, True)
+    Pipe.pipe.assert_called_once_with([['samtools', 'sort', '-n', '-u', '--threads', '5', bam],
+                                       ['samtools', 'fixmate', '-m', '-u', '--threads', '1', '-', '-'],
+                                       ['samtools', 'sort', '-u', '--threads', '5', '-'],
+                                       ['samtools', 'markdup', '-r', '--threads', '1', '-', output]])
+
+
+def test_remove_duplicates_stream_fewthreads(testdir, mock_testclass):
+    bam = 'POLR2A.bam'
+    output = 'POLR2A-out.bam'
+    Pipe.pipe = MagicMock()
+    fb.remove_duplicates(bam, output, 3, True)
+    Pipe.pipe.assert_called_once_with([['samtools', 'sort', '-n', '-u', bam],
+                                       ['samtools', 'fixmate', '-m', '-u', '-', '-'],
+                                       ['samtools', 'sort', '-u', '-'],
+                                       ['samtools', 'markdup', '-r', '-', output]])
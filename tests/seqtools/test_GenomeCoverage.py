@@ -9,10 +9,13 @@ from unittest.mock import MagicMock, ANY
 import click
 from click.testing import CliRunner
 from more_itertools.more import side_effect
+import numpy as np
+import pyBigWig as pbw
 
 from seqtools import GenomeCoverage as gc
 from seqtools import Split as sb
 from seqtools.bed import Bed
+from seqtools.process import Jobs
 
 BASE_SCALE = 1000000
 
@@ -23,21 +26,29 @@ def mock_testclass():
     sample_splits_genome_coverage = gc.sample_splits_genome_coverage
     genome_coverage = gc.genome_coverage
     coverage = gc.coverage
+    native_coverage = gc.native_coverage
+    sample_splits_native_coverage = gc.sample_splits_native_coverage
     splits = sb.splits
     sort = Bed.sort
     count_bed = Bed.count_bed
     bedgraph_to_bigwig = Bed.bedgraph_to_bigwig
     run = subprocess.run
+    jobs_run = Jobs.run
+    chunk_size = gc.CHUNK_SIZE
     yield
     gc.genome_coverage_samples = genome_coverage_samples
     gc.sample_splits_genome_coverage = sample_splits_genome_coverage
     gc.genome_coverage = genome_coverage
     gc.coverage = coverage
+    gc.native_coverage = native_coverage
+    gc.sample_splits_native_coverage = sample_splits_native_coverage
     sb.splits = splits
     Bed.sort = sort
     Bed.count_bed = count_bed
     Bed.bedgraph_to_bigwig = bedgraph_to_bigwig
     subprocess.run = run
+    Jobs.run = jobs_run
+    gc.CHUNK_SIZE = chunk_size
     
     
 def create_file(*args, **kwargs):
@@ -64,7 +75,7 @@ def test_genomecov(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(gc.genomecov, ['-s', samples])
     assert result.exit_code == 0
-    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, None, '', '-cov', None, None, None, ())
+    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, None, '', '-cov', None, None, None, (), 'bedtools', False, 1)
 
 
 def test_genomecov_five(testdir, mock_testclass):
@@ -75,7 +86,7 @@ def test_genomecov_five(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(gc.genomecov, ['-s', samples, '-5'])
     assert result.exit_code == 0
-    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, None, '', '-cov', None, None, None, ('-5',))
+    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, None, '', '-cov', None, None, None, ('-5',), 'bedtools', False, 1)
 
 
 def test_genomecov_three(testdir, mock_testclass):
@@ -86,7 +97,7 @@ def test_genomecov_three(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(gc.genomecov, ['-s', samples, '-3'])
     assert result.exit_code == 0
-    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, None, '', '-cov', None, None, None, ('-3',))
+    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, None, '', '-cov', None, None, None, ('-3',), 'bedtools', False, 1)
 
 
 def test_genomecov_parameters(testdir, mock_testclass):
@@ -101,7 +112,7 @@ def test_genomecov_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(gc.genomecov, ['-s', samples, '-g', genome, '-scale', scale, '-strand', strand, '--input-suffix', input_suffix, '--output-suffix', output_suffix, '--index', index])
     assert result.exit_code == 0
-    gc.genome_coverage_samples.assert_called_once_with(samples, genome, scale, strand, input_suffix, output_suffix, None, None, index, ())
+    gc.genome_coverage_samples.assert_called_once_with(samples, genome, scale, strand, input_suffix, output_suffix, None, None, index, (), 'bedtools', False, 1)
 
 
 def test_genomecov_parameters_scalesuffixes(testdir, mock_testclass):
@@ -117,7 +128,7 @@ def test_genomecov_parameters_scalesuffixes(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(gc.genomecov, ['-s', samples, '-g', genome, '-strand', strand, '--input-suffix', input_suffix, '--output-suffix', output_suffix, '--spike-suffix', spike_suffix, '--control-suffix', control_suffix, '--index', index])
     assert result.exit_code == 0
-    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, strand, input_suffix, output_suffix, spike_suffix, control_suffix, index, ())
+    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, strand, input_suffix, output_suffix, spike_suffix, control_suffix, index, (), 'bedtools', False, 1)
 
 
 def test_genomecov_scale_and_spikesuffix(testdir, mock_testclass):
@@ -163,7 +174,7 @@ def test_genomecov_onlyoutputsuffix(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(gc.genomecov, ['-s', samples, '-g', genome, '--output-suffix', output_suffix])
     assert result.exit_code == 0
-    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, None, '', output_suffix, None, None, None, ())
+    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, None, '', output_suffix, None, None, None, (), 'bedtools', False, 1)
 
 
 def test_genomecov_samplesnotexists(testdir, mock_testclass):
@@ -193,9 +204,9 @@ def test_genome_coverage_samples(testdir, mock_testclass):
     copyfile(Path(__file__).parent.joinpath('sizes.txt'), genome)
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples)
-    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, None, None, '', '-cov', None, None, ())
-    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, None, None, '', '-cov', None, None, ())
-    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, None, None, '', '-cov', None, None, ())
+    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, None, None, '', '-cov', None, None, (), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, None, None, '', '-cov', None, None, (), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, None, None, '', '-cov', None, None, (), 'bedtools', False)
 
 
 def test_genome_coverage_samples_parameters(testdir, mock_testclass):
@@ -210,9 +221,27 @@ def test_genome_coverage_samples_parameters(testdir, mock_testclass):
     control_suffix = '-input'
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, genomecov_args=('-5',))
-    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',))
-    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',))
-    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',))
+    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',), 'bedtools', False)
+
+
+def test_genome_coverage_samples_jobs(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genome = 'sacCer3.chrom.sizes'
+    splits = {'POLR2A': ['POLR2A-100-110', 'POLR2A-120-130'], 'ASDURF': [], 'POLR1C': []}
+    sb.splits = MagicMock(side_effect=lambda sample: splits[sample])
+    Jobs.run = MagicMock()
+    gc.genome_coverage_samples(samples, genome, jobs=2)
+    Jobs.run.assert_called_once_with(gc.genome_coverage, [(name, genome, None, None, '', '-cov', None, None, (), 'bedtools') for name in ['POLR2A', 'POLR2A-100-110', 'POLR2A-120-130', 'ASDURF', 'POLR1C']], 2)
+
+
+def test_genome_coverage_samples_jobs_singlepass(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genome = 'sacCer3.chrom.sizes'
+    Jobs.run = MagicMock()
+    gc.genome_coverage_samples(samples, genome, engine='native', single_pass=True, jobs=2)
+    Jobs.run.assert_called_once_with(gc.sample_splits_genome_coverage, [(sample, genome, None, None, '', '-cov', None, None, (), 'native', True) for sample in ['POLR2A', 'ASDURF', 'POLR1C']], 2)
 
 
 def test_genome_coverage_samples_all_five(testdir, mock_testclass):
@@ -220,9 +249,9 @@ def test_genome_coverage_samples_all_five(testdir, mock_testclass):
     genome = Path(__file__).parent.joinpath('sizes.txt')
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples, genome, genomecov_args=('-5',))
-    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, None, None, '', '-cov', None, None, ('-5',))
-    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, None, None, '', '-cov', None, None, ('-5',))
-    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, None, None, '', '-cov', None, None, ('-5',))
+    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, None, None, '', '-cov', None, None, ('-5',), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, None, None, '', '-cov', None, None, ('-5',), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, None, None, '', '-cov', None, None, ('-5',), 'bedtools', False)
 
 
 def test_genome_coverage_samples_second_five(testdir, mock_testclass):
@@ -230,7 +259,7 @@ def test_genome_coverage_samples_second_five(testdir, mock_testclass):
     genome = Path(__file__).parent.joinpath('sizes.txt')
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples, genome, index=1, genomecov_args=('-5',))
-    gc.sample_splits_genome_coverage.assert_called_once_with('ASDURF', genome, None, None, '', '-cov', None, None, ('-5',))
+    gc.sample_splits_genome_coverage.assert_called_once_with('ASDURF', genome, None, None, '', '-cov', None, None, ('-5',), 'bedtools', False)
 
 
 def test_genome_coverage_samples_all_three(testdir, mock_testclass):
@@ -238,9 +267,9 @@ def test_genome_coverage_samples_all_three(testdir, mock_testclass):
     genome = Path(__file__).parent.joinpath('sizes.txt')
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples, genome, genomecov_args=('-3',))
-    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, None, None, '', '-cov', None, None, ('-3',))
-    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, None, None, '', '-cov', None, None, ('-3',))
-    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, None, None, '', '-cov', None, None, ('-3',))
+    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, None, None, '', '-cov', None, None, ('-3',), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, None, None, '', '-cov', None, None, ('-3',), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, None, None, '', '-cov', None, None, ('-3',), 'bedtools', False)
 
 
 def test_genome_coverage_samples_second_three(testdir, mock_testclass):
@@ -248,7 +277,7 @@ def test_genome_coverage_samples_second_three(testdir, mock_testclass):
     genome = Path(__file__).parent.joinpath('sizes.txt')
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples, genome, genomecov_args=('-3',), index=1)
-    gc.sample_splits_genome_coverage.assert_called_once_with('ASDURF', genome, None, None, '', '-cov', None, None, ('-3',))
+    gc.sample_splits_genome_coverage.assert_called_once_with('ASDURF', genome, None, None, '', '-cov', None, None, ('-3',), 'bedtools', False)
 
 
 def test_genome_coverage_samples_all_scale(testdir, mock_testclass):
@@ -257,9 +286,9 @@ def test_genome_coverage_samples_all_scale(testdir, mock_testclass):
     scale = 1.5
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples, genome, scale=scale)
-    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, scale, None, '', '-cov', None, None, ())
-    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, scale, None, '', '-cov', None, None, ())
-    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, scale, None, '', '-cov', None, None, ())
+    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, scale, None, '', '-cov', None, None, (), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, scale, None, '', '-cov', None, None, (), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, scale, None, '', '-cov', None, None, (), 'bedtools', False)
 
 
 def test_genome_coverage_samples_second_scale(testdir, mock_testclass):
@@ -268,7 +297,7 @@ def test_genome_coverage_samples_second_scale(testdir, mock_testclass):
     scale = 1.5
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples, genome, scale=scale, index=1)
-    gc.sample_splits_genome_coverage.assert_called_once_with('ASDURF', genome, scale, None, '', '-cov', None, None, ())
+    gc.sample_splits_genome_coverage.assert_called_once_with('ASDURF', genome, scale, None, '', '-cov', None, None, (), 'bedtools', False)
 
 
 def test_genome_coverage_samples_all_scale_negativestrand(testdir, mock_testclass):
@@ -278,9 +307,9 @@ def test_genome_coverage_samples_all_scale_negativestrand(testdir, mock_testclas
     strand = '-'
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples, genome, scale=scale, strand=strand)
-    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, scale, strand, '', '-cov', None, None, ())
-    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, scale, strand, '', '-cov', None, None, ())
-    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, scale, strand, '', '-cov', None, None, ())
+    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, scale, strand, '', '-cov', None, None, (), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, scale, strand, '', '-cov', None, None, (), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, scale, strand, '', '-cov', None, None, (), 'bedtools', False)
 
 
 def test_genome_coverage_samples_second_scale_negativestrand(testdir, mock_testclass):
@@ -290,7 +319,7 @@ def test_genome_coverage_samples_second_scale_negativestrand(testdir, mock_testc
     strand = '-'
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples, genome, scale=scale, strand=strand, index=1)
-    gc.sample_splits_genome_coverage.assert_called_once_with('ASDURF', genome, scale, strand, '', '-cov', None, None, ())
+    gc.sample_splits_genome_coverage.assert_called_once_with('ASDURF', genome, scale, strand, '', '-cov', None, None, (), 'bedtools', False)
 
 
 def test_genome_coverage_samples_all_scale_positivestrand(testdir, mock_testclass):
@@ -300,9 +329,9 @@ def test_genome_coverage_samples_all_scale_positivestrand(testdir, mock_testclas
     strand = '+'
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples, genome, scale=scale, strand=strand)
-    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, scale, strand, '', '-cov', None, None, ())
-    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, scale, strand, '', '-cov', None, None, ())
-    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, scale, strand, '', '-cov', None, None, ())
+    gc.sample_splits_genome_coverage.assert_any_call('POLR2A', genome, scale, strand, '', '-cov', None, None, (), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('ASDURF', genome, scale, strand, '', '-cov', None, None, (), 'bedtools', False)
+    gc.sample_splits_genome_coverage.assert_any_call('POLR1C', genome, scale, strand, '', '-cov', None, None, (), 'bedtools', False)
 
 
 def test_genome_coverage_samples_second_scale_positivestrand(testdir, mock_testclass):
@@ -312,7 +341,7 @@ def test_genome_coverage_samples_second_scale_positivestrand(testdir, mock_testc
     strand = '+'
     gc.sample_splits_genome_coverage = MagicMock()
     gc.genome_coverage_samples(samples, genome, scale=scale, strand=strand, index=1)
-    gc.sample_splits_genome_coverage.assert_called_once_with('ASDURF', genome, scale, strand, '', '-cov', None, None, ())
+    gc.sample_splits_genome_coverage.assert_called_once_with('ASDURF', genome, scale, strand, '', '-cov', None, None, (), 'bedtools', False)
 
     
 def test_sample_splits_genome_coverage(testdir, mock_testclass):
@@ -324,9 +353,9 @@ def test_sample_splits_genome_coverage(testdir, mock_testclass):
     gc.genome_coverage = MagicMock()
     gc.sample_splits_genome_coverage(sample, genome)
     sb.splits.assert_called_once_with(sample)
-    gc.genome_coverage.assert_any_call(sample, genome, None, None, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split1, genome, None, None, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split2, genome, None, None, '', '-cov', None, None, ())
+    gc.genome_coverage.assert_any_call(sample, genome, None, None, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split1, genome, None, None, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split2, genome, None, None, '', '-cov', None, None, (), 'bedtools')
 
 
 def test_sample_splits_genome_coverage_parameters(testdir, mock_testclass):
@@ -344,9 +373,9 @@ def test_sample_splits_genome_coverage_parameters(testdir, mock_testclass):
     gc.genome_coverage = MagicMock()
     gc.sample_splits_genome_coverage(sample, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',))
     sb.splits.assert_called_once_with(sample)
-    gc.genome_coverage.assert_any_call(sample, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',))
-    gc.genome_coverage.assert_any_call(split1, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',))
-    gc.genome_coverage.assert_any_call(split2, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',))
+    gc.genome_coverage.assert_any_call(sample, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',), 'bedtools')
+    gc.genome_coverage.assert_any_call(split1, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',), 'bedtools')
+    gc.genome_coverage.assert_any_call(split2, genome, scale, strand, input_suffix, output_suffix, spike_suffix, control_suffix, ('-5',), 'bedtools')
 
 
 def test_sample_splits_genome_coverage_five(testdir, mock_testclass):
@@ -358,9 +387,9 @@ def test_sample_splits_genome_coverage_five(testdir, mock_testclass):
     gc.genome_coverage = MagicMock()
     gc.sample_splits_genome_coverage(sample, genome, genomecov_args=('-5'))
     sb.splits.assert_called_once_with(sample)
-    gc.genome_coverage.assert_any_call(sample, genome, None, None, '', '-cov', None, None, ('-5'))
-    gc.genome_coverage.assert_any_call(split1, genome, None, None, '', '-cov', None, None, ('-5'))
-    gc.genome_coverage.assert_any_call(split2, genome, None, None, '', '-cov', None, None, ('-5'))
+    gc.genome_coverage.assert_any_call(sample, genome, None, None, '', '-cov', None, None, ('-5'), 'bedtools')
+    gc.genome_coverage.assert_any_call(split1, genome, None, None, '', '-cov', None, None, ('-5'), 'bedtools')
+    gc.genome_coverage.assert_any_call(split2, genome, None, None, '', '-cov', None, None, ('-5'), 'bedtools')
 
 
 def test_sample_splits_genome_coverage_three(testdir, mock_testclass):
@@ -372,9 +401,9 @@ def test_sample_splits_genome_coverage_three(testdir, mock_testclass):
     gc.genome_coverage = MagicMock()
     gc.sample_splits_genome_coverage(sample, genome, genomecov_args=('-3'))
     sb.splits.assert_called_once_with(sample)
-    gc.genome_coverage.assert_any_call(sample, genome, None, None, '', '-cov', None, None, ('-3'))
-    gc.genome_coverage.assert_any_call(split1, genome, None, None, '', '-cov', None, None, ('-3'))
-    gc.genome_coverage.assert_any_call(split2, genome, None, None, '', '-cov', None, None, ('-3'))
+    gc.genome_coverage.assert_any_call(sample, genome, None, None, '', '-cov', None, None, ('-3'), 'bedtools')
+    gc.genome_coverage.assert_any_call(split1, genome, None, None, '', '-cov', None, None, ('-3'), 'bedtools')
+    gc.genome_coverage.assert_any_call(split2, genome, None, None, '', '-cov', None, None, ('-3'), 'bedtools')
 
 
 def test_sample_splits_genome_coverage_scale(testdir, mock_testclass):
@@ -387,9 +416,9 @@ def test_sample_splits_genome_coverage_scale(testdir, mock_testclass):
     gc.genome_coverage = MagicMock()
     gc.sample_splits_genome_coverage(sample, genome, scale)
     sb.splits.assert_called_once_with(sample)
-    gc.genome_coverage.assert_any_call(sample, genome, scale, None, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split1, genome, scale, None, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split2, genome, scale, None, '', '-cov', None, None, ())
+    gc.genome_coverage.assert_any_call(sample, genome, scale, None, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split1, genome, scale, None, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split2, genome, scale, None, '', '-cov', None, None, (), 'bedtools')
 
 
 def test_sample_splits_genome_coverage_negativestrand(testdir, mock_testclass):
@@ -402,9 +431,9 @@ def test_sample_splits_genome_coverage_negativestrand(testdir, mock_testclass):
     gc.genome_coverage = MagicMock()
     gc.sample_splits_genome_coverage(sample, genome, strand=strand)
     sb.splits.assert_called_once_with(sample)
-    gc.genome_coverage.assert_any_call(sample, genome, None, strand, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split1, genome, None, strand, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split2, genome, None, strand, '', '-cov', None, None, ())
+    gc.genome_coverage.assert_any_call(sample, genome, None, strand, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split1, genome, None, strand, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split2, genome, None, strand, '', '-cov', None, None, (), 'bedtools')
 
 
 def test_sample_splits_genome_coverage_scale_negativestrand(testdir, mock_testclass):
@@ -418,9 +447,9 @@ def test_sample_splits_genome_coverage_scale_negativestrand(testdir, mock_testcl
     gc.genome_coverage = MagicMock()
     gc.sample_splits_genome_coverage(sample, genome, scale=scale, strand=strand)
     sb.splits.assert_called_once_with(sample)
-    gc.genome_coverage.assert_any_call(sample, genome, scale, strand, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split1, genome, scale, strand, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split2, genome, scale, strand, '', '-cov', None, None, ())
+    gc.genome_coverage.assert_any_call(sample, genome, scale, strand, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split1, genome, scale, strand, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split2, genome, scale, strand, '', '-cov', None, None, (), 'bedtools')
 
 
 def test_sample_splits_genome_coverage_positivestrand(testdir, mock_testclass):
@@ -433,9 +462,9 @@ def test_sample_splits_genome_coverage_positivestrand(testdir, mock_testclass):
     gc.genome_coverage = MagicMock()
     gc.sample_splits_genome_coverage(sample, genome, strand=strand)
     sb.splits.assert_called_once_with(sample)
-    gc.genome_coverage.assert_any_call(sample, genome, None, strand, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split1, genome, None, strand, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split2, genome, None, strand, '', '-cov', None, None, ())
+    gc.genome_coverage.assert_any_call(sample, genome, None, strand, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split1, genome, None, strand, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split2, genome, None, strand, '', '-cov', None, None, (), 'bedtools')
 
 
 def test_sample_splits_genome_coverage_scale_positivestrand(testdir, mock_testclass):
@@ -449,9 +478,9 @@ def test_sample_splits_genome_coverage_scale_positivestrand(testdir, mock_testcl
     gc.genome_coverage = MagicMock()
     gc.sample_splits_genome_coverage(sample, genome, scale=scale, strand=strand)
     sb.splits.assert_called_once_with(sample)
-    gc.genome_coverage.assert_any_call(sample, genome, scale, strand, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split1, genome, scale, strand, '', '-cov', None, None, ())
-    gc.genome_coverage.assert_any_call(split2, genome, scale, strand, '', '-cov', None, None, ())
+    gc.genome_coverage.assert_any_call(sample, genome, scale, strand, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split1, genome, scale, strand, '', '-cov', None, None, (), 'bedtools')
+    gc.genome_coverage.assert_any_call(split2, genome, scale, strand, '', '-cov', None, None, (), 'bedtools')
 
 
 def test_genome_coverage(testdir, mock_testclass):
@@ -876,3 +905,449 @@ def test_coverage_scale_positivestrand(testdir, mock_testclass):
     with open(output, 'r') as infile:
         assert infile.readline() == 'track type=bedGraph name="' + sample + ' Plus"\n'
         assert infile.readline() == 'test'
+
+
+def write_overlapping_bed(bed, sizes):
+    with open(bed, 'w') as outfile:
+        outfile.write('track name=test\n')
+        outfile.write('chrI\t2\t8\ttest1\t1\t+\n')
+        outfile.write('chrI\t5\t10\ttest2\t1\t-\n')
+        outfile.write('chrI\t5\t10\ttest3\t1\t+\n')
+        outfile.write('chrI\t12\t20\ttest4\t1\t-\n')
+        outfile.write('chrM\t1\t5\ttest5\t1\t+\n')
+    with open(sizes, 'w') as outfile:
+        outfile.write('chrI\t15\n')
+        outfile.write('chrII\t20\n')
+
+
+def test_genomecov_native(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genome = 'sacCer3.chrom.sizes'
+    copyfile(Path(__file__).parent.joinpath('sizes.txt'), genome)
+    gc.genome_coverage_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(gc.genomecov, ['-s', samples, '--engine', 'native', '-5'])
+    assert result.exit_code == 0
+    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, None, '', '-cov', None, None, None, ('-5',), 'native', False, 1)
+
+
+def test_genomecov_singlepass(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genome = 'sacCer3.chrom.sizes'
+    copyfile(Path(__file__).parent.joinpath('sizes.txt'), genome)
+    gc.genome_coverage_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(gc.genomecov, ['-s', samples, '--engine', 'native', '--single-pass'])
+    assert result.exit_code == 0
+    gc.genome_coverage_samples.assert_called_once_with(samples, genome, None, None, '', '-cov', None, None, None, (), 'native', True, 1)
+
+
+def test_genomecov_singlepass_bedtools(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genome = 'sacCer3.chrom.sizes'
+    copyfile(Path(__file__).parent.joinpath('sizes.txt'), genome)
+    gc.genome_coverage_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(gc.genomecov, ['-s', samples, '--single-pass'])
+    assert result.exit_code != 0
+    gc.genome_coverage_samples.assert_not_called()
+
+
+def test_genomecov_singlepass_inputsuffix(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genome = 'sacCer3.chrom.sizes'
+    copyfile(Path(__file__).parent.joinpath('sizes.txt'), genome)
+    gc.genome_coverage_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(gc.genomecov, ['-s', samples, '--engine', 'native', '--single-pass', '-is', '-forcov'])
+    assert result.exit_code != 0
+    assert '--input-suffix' in result.output
+    gc.genome_coverage_samples.assert_not_called()
+
+
+def test_sample_splits_genome_coverage_singlepass(testdir, mock_testclass):
+    sample = 'POLR2A'
+    genome = 'human.sizes'
+    sb.splits = MagicMock(return_value=[sample + '-100-110'])
+    gc.genome_coverage = MagicMock()
+    gc.sample_splits_native_coverage = MagicMock()
+    gc.sample_splits_genome_coverage(sample, genome, engine='native', single_pass=True)
+    gc.sample_splits_native_coverage.assert_called_once_with(sample, genome, None, None, '', '-cov', None, None, ())
+    gc.genome_coverage.assert_not_called()
+
+
+def test_sample_splits_native_coverage(testdir, mock_testclass):
+    sample = 'POLR2A'
+    split1 = sample + '-4-6'
+    split2 = sample + '-6-8'
+    genome = 'sizes.txt'
+    write_overlapping_bed(sample + '.bed', genome)
+    sb.splits = MagicMock(return_value=[split1, split2])
+    gc.sample_splits_native_coverage(sample, genome)
+    sb.splits.assert_called_once_with(sample)
+    with open(sample + '-cov.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + sample + '"\n'
+        assert infile.readline() == 'chrI\t2\t5\t200000\n'
+        assert infile.readline() == 'chrI\t5\t8\t600000\n'
+        assert infile.readline() == 'chrI\t8\t10\t400000\n'
+        assert infile.readline() == 'chrI\t12\t15\t200000\n'
+        assert infile.readline() == ''
+    with open(split1 + '-cov.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + split1 + '"\n'
+        assert infile.readline() == 'chrI\t5\t10\t666667\n'
+        assert infile.readline() == ''
+    with open(split2 + '-cov.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + split2 + '"\n'
+        assert infile.readline() == 'chrI\t2\t8\t1e+06\n'
+        assert infile.readline() == ''
+    bigwig = pbw.open(split2 + '-cov.bw')
+    assert bigwig.intervals('chrI') == ((2, 8, 1000000.0),)
+    bigwig.close()
+
+
+def test_sample_splits_native_coverage_blanklines(testdir, mock_testclass):
+    sample = 'POLR2A'
+    split1 = sample + '-4-6'
+    genome = 'sizes.txt'
+    write_overlapping_bed(sample + '.bed', genome)
+    with open(sample + '.bed', 'a') as outfile:
+        outfile.write('\n')
+        outfile.write('\n')
+    sb.splits = MagicMock(return_value=[split1])
+    gc.sample_splits_native_coverage(sample, genome)
+    with open(sample + '-cov.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + sample + '"\n'
+        assert infile.readline() == 'chrI\t2\t5\t200000\n'
+
+
+def test_sample_splits_native_coverage_inputsuffix(testdir, mock_testclass):
+    sample = 'POLR2A'
+    genome = 'sizes.txt'
+    write_overlapping_bed(sample + '-forcov.bed', genome)
+    sb.splits = MagicMock(return_value=[sample + '-4-6'])
+    with pytest.raises(AssertionError):
+        gc.sample_splits_native_coverage(sample, genome, input_suffix='-forcov')
+    assert not os.path.exists(sample + '-4-6-forcov-cov.bed')
+
+
+def test_bins_native_coverage_center(testdir, mock_testclass):
+    sample = 'POLR2A'
+    split1 = sample + '-4-6'
+    split2 = sample + '-6-8'
+    genome = 'sizes.txt'
+    write_overlapping_bed(sample + '.bed', genome)
+    names = [sample, split1, split2]
+    outputs = [gc.coverage_outputs(name, strand='-') for name in names]
+    gc.bins_native_coverage(sample + '.bed', names, [(4, 6), (6, 8)], outputs, genome, scale=1, strand='-', center=True)
+    with open(sample + '-cov-neg.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + sample + ' Minus"\n'
+        assert infile.readline() == 'chrI\t7\t8\t1\n'
+        assert infile.readline() == ''
+    with open(split1 + '-cov-neg.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + split1 + ' Minus"\n'
+        assert infile.readline() == 'chrI\t7\t8\t1\n'
+        assert infile.readline() == ''
+    with open(split2 + '-cov-neg.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + split2 + ' Minus"\n'
+        assert infile.readline() == ''
+
+
+def test_genome_coverage_native(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    cov = sample + '-cov.bed'
+    bw = sample + '-cov.bw'
+    genome = 'human.sizes'
+    count = 2000000
+    Bed.count_bed = MagicMock(return_value=count)
+    gc.coverage = MagicMock()
+    gc.native_coverage = MagicMock()
+    Bed.bedgraph_to_bigwig = MagicMock()
+    gc.genome_coverage(sample, genome, genomecov_args=('-5',), engine='native')
+    Bed.count_bed.assert_called_once_with(bed)
+    gc.native_coverage.assert_called_once_with(bed, cov, bw, genome, sample, BASE_SCALE / count, None, ('-5',))
+    gc.coverage.assert_not_called()
+    Bed.bedgraph_to_bigwig.assert_not_called()
+
+
+def test_genome_coverage_native_negativestrand(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    cov = sample + '-cov-neg.bed'
+    bw = sample + '-cov-neg.bw'
+    genome = 'human.sizes'
+    scale = 1.5
+    strand = '-'
+    gc.native_coverage = MagicMock()
+    Bed.bedgraph_to_bigwig = MagicMock()
+    gc.genome_coverage(sample, genome, scale, strand, engine='native')
+    gc.native_coverage.assert_called_once_with(bed, cov, bw, genome, sample, scale, strand, ())
+    Bed.bedgraph_to_bigwig.assert_not_called()
+
+
+def test_native_coverage(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = Path(__file__).parent.joinpath('sample-slowsplit.bed')
+    output = sample + '-out.bed'
+    bw = sample + '-out.bw'
+    genome = 'sizes.txt'
+    with open(genome, 'w') as outfile:
+        for i in range(1, 9):
+            outfile.write('chr{}\t1000\n'.format(i))
+    gc.native_coverage(bed, output, bw, genome, sample)
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + sample + '"\n'
+        assert infile.readline() == 'chr1\t100\t229\t1\n'
+        assert infile.readline() == 'chr2\t400\t450\t1\n'
+        assert infile.readline() == 'chr3\t500\t650\t1\n'
+        assert infile.readline() == 'chr4\t800\t900\t1\n'
+        assert infile.readline() == 'chr5\t100\t220\t1\n'
+        assert infile.readline() == 'chr6\t400\t450\t1\n'
+        assert infile.readline() == 'chr7\t500\t650\t1\n'
+        assert infile.readline() == 'chr8\t800\t910\t1\n'
+        assert infile.readline() == ''
+    bigwig = pbw.open(bw)
+    assert bigwig.chroms('chr1') == 1000
+    assert bigwig.intervals('chr1') == ((100, 229, 1.0),)
+    assert bigwig.intervals('chr8') == ((800, 910, 1.0),)
+    bigwig.close()
+
+
+def test_native_coverage_overlapping(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    output = sample + '-out.bed'
+    bw = sample + '-out.bw'
+    genome = 'sizes.txt'
+    write_overlapping_bed(bed, genome)
+    gc.native_coverage(bed, output, bw, genome, sample, 0.5)
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + sample + '"\n'
+        assert infile.readline() == 'chrI\t2\t5\t0.5\n'
+        assert infile.readline() == 'chrI\t5\t8\t1.5\n'
+        assert infile.readline() == 'chrI\t8\t10\t1\n'
+        assert infile.readline() == 'chrI\t12\t15\t0.5\n'
+        assert infile.readline() == ''
+    bigwig = pbw.open(bw)
+    assert bigwig.chroms() == {'chrI': 15, 'chrII': 20}
+    assert bigwig.intervals('chrI') == ((2, 5, 0.5), (5, 8, 1.5), (8, 10, 1.0), (12, 15, 0.5))
+    assert bigwig.intervals('chrII') is None
+    bigwig.close()
+
+
+def test_native_coverage_roundedscale(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    output = sample + '-out.bed'
+    bw = sample + '-out.bw'
+    genome = 'sizes.txt'
+    write_overlapping_bed(bed, genome)
+    gc.native_coverage(bed, output, bw, genome, sample, BASE_SCALE / 3)
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + sample + '"\n'
+        assert infile.readline() == 'chrI\t2\t5\t333333\n'
+        assert infile.readline() == 'chrI\t5\t8\t1e+06\n'
+        assert infile.readline() == 'chrI\t8\t10\t666667\n'
+        assert infile.readline() == 'chrI\t12\t15\t333333\n'
+        assert infile.readline() == ''
+    bigwig = pbw.open(bw)
+    assert bigwig.intervals('chrI') == ((2, 5, 333333.0), (5, 8, 1000000.0), (8, 10, 666667.0), (12, 15, 333333.0))
+    bigwig.close()
+
+
+def test_native_coverage_positivestrand(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    output = sample + '-out.bed'
+    bw = sample + '-out.bw'
+    genome = 'sizes.txt'
+    write_overlapping_bed(bed, genome)
+    gc.native_coverage(bed, output, bw, genome, sample, strand='+')
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + sample + ' Plus"\n'
+        assert infile.readline() == 'chrI\t2\t5\t1\n'
+        assert infile.readline() == 'chrI\t5\t8\t2\n'
+        assert infile.readline() == 'chrI\t8\t10\t1\n'
+        assert infile.readline() == ''
+
+
+def test_native_coverage_negativestrand(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    output = sample + '-out.bed'
+    bw = sample + '-out.bw'
+    genome = 'sizes.txt'
+    write_overlapping_bed(bed, genome)
+    gc.native_coverage(bed, output, bw, genome, sample, strand='-')
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + sample + ' Minus"\n'
+        assert infile.readline() == 'chrI\t5\t10\t1\n'
+        assert infile.readline() == 'chrI\t12\t15\t1\n'
+        assert infile.readline() == ''
+
+
+def test_native_coverage_five(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    output = sample + '-out.bed'
+    bw = sample + '-out.bw'
+    genome = 'sizes.txt'
+    write_overlapping_bed(bed, genome)
+    gc.native_coverage(bed, output, bw, genome, sample, genomecov_args=('-5',))
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + sample + '"\n'
+        assert infile.readline() == 'chrI\t2\t3\t1\n'
+        assert infile.readline() == 'chrI\t5\t6\t1\n'
+        assert infile.readline() == 'chrI\t9\t10\t1\n'
+        assert infile.readline() == ''
+
+
+def test_native_coverage_three(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    output = sample + '-out.bed'
+    bw = sample + '-out.bw'
+    genome = 'sizes.txt'
+    write_overlapping_bed(bed, genome)
+    gc.native_coverage(bed, output, bw, genome, sample, genomecov_args=('-3', '-du'))
+    with open(output, 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="' + sample + '"\n'
+        assert infile.readline() == 'chrI\t5\t6\t1\n'
+        assert infile.readline() == 'chrI\t7\t8\t1\n'
+        assert infile.readline() == 'chrI\t9\t10\t1\n'
+        assert infile.readline() == 'chrI\t12\t13\t1\n'
+        assert infile.readline() == ''
+
+
+def test_native_coverage_nobedgraph(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    bw = sample + '-out.bw'
+    genome = 'sizes.txt'
+    write_overlapping_bed(bed, genome)
+    gc.native_coverage(bed, None, bw, genome, sample)
+    assert not os.path.exists(sample + '-out.bed')
+    bigwig = pbw.open(bw)
+    assert bigwig.intervals('chrI') == ((2, 5, 1.0), (5, 8, 3.0), (8, 10, 2.0), (12, 15, 1.0))
+    bigwig.close()
+
+
+def test_native_coverage_chunks(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = Path(__file__).parent.joinpath('sample-slowsplit.bed')
+    genome = 'sizes.txt'
+    with open(genome, 'w') as outfile:
+        for i in range(1, 9):
+            outfile.write('chr{}\t1000\n'.format(i))
+    gc.native_coverage(bed, 'whole.bed', None, genome, sample, 0.5)
+    gc.CHUNK_SIZE = 3
+    gc.native_coverage(bed, 'chunks.bed', None, genome, sample, 0.5)
+    with open('whole.bed', 'r') as whole, open('chunks.bed', 'r') as chunks:
+        assert chunks.read() == whole.read()
+
+
+def test_sample_splits_native_coverage_chunks(testdir, mock_testclass):
+    sample = 'POLR2A'
+    split1 = sample + '-4-6'
+    split2 = sample + '-6-8'
+    genome = 'sizes.txt'
+    write_overlapping_bed(sample + '.bed', genome)
+    sb.splits = MagicMock(return_value=[split1, split2])
+    gc.sample_splits_native_coverage(sample, genome)
+    whole = {}
+    for name in [sample, split1, split2]:
+        with open(name + '-cov.bed', 'r') as infile:
+            whole[name] = infile.read()
+    os.remove('.' + sample + '-cov.bed.manifest')
+    gc.CHUNK_SIZE = 1
+    gc.sample_splits_native_coverage(sample, genome)
+    for name in [sample, split1, split2]:
+        with open(name + '-cov.bed', 'r') as infile:
+            assert infile.read() == whole[name]
+
+
+def test_difference_array(testdir, mock_testclass):
+    difference = gc.DifferenceArray()
+    difference.add(np.array([2, 5]), np.array([8, 10]))
+    assert difference.positions.tolist() == [2, 5, 8, 10]
+    assert difference.changes.tolist() == [1, 1, -1, -1]
+    difference.add(np.array([8]), np.array([10]))
+    assert difference.pending_size == 2
+    difference.add(np.array([0]), np.array([2]))
+    assert difference.pending_size == 4
+    difference.add(np.array([3]), np.array([3]))
+    assert difference.pending_size == 0
+    assert difference.positions.tolist() == [0, 5, 10]
+    assert difference.changes.tolist() == [1, 1, -2]
+    starts, ends, values = gc.coverage_runs(difference, 0.5)
+    assert starts.tolist() == [0, 5]
+    assert ends.tolist() == [5, 10]
+    assert values.tolist() == [0.5, 1.0]
+
+
+def test_read_bed(testdir, mock_testclass):
+    with open('test.bed', 'w') as outfile:
+        outfile.write('track name=test\n')
+        outfile.write('browser position chrI:1-10\n')
+        outfile.write('chrI\t2\t8\ttest1\t1\t+\n')
+        outfile.write('\n')
+        outfile.write('# comment\n')
+        outfile.write('chrII\t5\t10\ttest2\t1\t-\n')
+        outfile.write('chrI\t12\t20\ttest3\t1\t-\n')
+    chunks = list(gc.read_bed('test.bed', 2))
+    assert len(chunks) == 2
+    chromosomes, starts, ends, strands = [np.concatenate(arrays).tolist() for arrays in zip(*chunks)]
+    assert chromosomes == ['chrI', 'chrII', 'chrI']
+    assert starts == [2, 5, 12]
+    assert ends == [8, 10, 20]
+    assert strands == ['+', '-', '-']
+
+
+def test_read_bed_threecolumns(testdir, mock_testclass):
+    with open('test.bed', 'w') as outfile:
+        outfile.write('chrI\t2\t8\n')
+        outfile.write('chrII\t5\t10\n')
+    chromosomes, starts, ends, strands = next(gc.read_bed('test.bed'))
+    assert chromosomes.tolist() == ['chrI', 'chrII']
+    assert starts.tolist() == [2, 5]
+    assert ends.tolist() == [8, 10]
+    assert strands.tolist() == ['', '']
+
+
+def test_read_bed_empty(testdir, mock_testclass):
+    with open('test.bed', 'w') as outfile:
+        outfile.write('track name=test\n')
+    assert list(gc.read_bed('test.bed')) == []
+
+
+def test_read_bed_invalid(testdir, mock_testclass):
+    with open('test.bed', 'w') as outfile:
+        outfile.write('chrI\t2\t8\n')
+        outfile.write('chrII\tstart\t10\n')
+    with pytest.raises(AssertionError) as exception:
+        list(gc.read_bed('test.bed'))
+    assert 'test.bed' in str(exception.value)
+
+
+def test_formatted_values(testdir, mock_testclass):
+    assert gc.formatted_values(np.array([1.0, BASE_SCALE / 3, 1.0, 0.5])).tolist() == ['1', '333333', '1', '0.5']
+
+
+def test_native_coverage_startgreaterthanend(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = Path(__file__).parent.joinpath('sample.bed')
+    genome = 'sizes.txt'
+    with open(genome, 'w') as outfile:
+        for i in range(1, 9):
+            outfile.write('chr{}\t1000\n'.format(i))
+    with pytest.raises(AssertionError):
+        gc.native_coverage(bed, 'out.bed', 'out.bw', genome, sample)
+
+
+def test_coverage_position(testdir, mock_testclass):
+    assert gc.coverage_position(()) is None
+    assert gc.coverage_position(('-5',)) == '-5'
+    assert gc.coverage_position(('-3', '-du')) == '-3'
+    assert gc.coverage_position(('-fs', '200', '-5')) == '-5'
+    with pytest.raises(AssertionError):
+        gc.coverage_position(('-bga',))
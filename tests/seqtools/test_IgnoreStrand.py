@@ -34,7 +34,7 @@ def test_ignorestrand(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(igs.ignorestrand, ['-s', samples])
     assert result.exit_code == 0
-    igs.ignore_strand_samples.assert_called_once_with(samples, '', '-forcov', None)
+    igs.ignore_strand_samples.assert_called_once_with(samples, '', '-forcov', None, 1)
 
 
 def test_ignorestrand_parameters(testdir, mock_testclass):
@@ -45,7 +45,7 @@ def test_ignorestrand_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(igs.ignorestrand, ['-s', samples, '-is', input_suffix, '-os', output_suffix])
     assert result.exit_code == 0
-    igs.ignore_strand_samples.assert_called_once_with(samples, input_suffix, output_suffix, None)
+    igs.ignore_strand_samples.assert_called_once_with(samples, input_suffix, output_suffix, None, 1)
 
 
 def test_ignorestrand_samesuffix(testdir, mock_testclass):
@@ -65,7 +65,7 @@ def test_ignorestrand_onlyoutputsuffix(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(igs.ignorestrand, ['-s', samples, '-os', output_suffix])
     assert result.exit_code == 0
-    igs.ignore_strand_samples.assert_called_once_with(samples, '', output_suffix, None)
+    igs.ignore_strand_samples.assert_called_once_with(samples, '', output_suffix, None, 1)
 
 
 def test_ignorestrand_second(testdir, mock_testclass):
@@ -75,7 +75,7 @@ def test_ignorestrand_second(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(igs.ignorestrand, ['-s', samples, '-i', index])
     assert result.exit_code == 0
-    igs.ignore_strand_samples.assert_called_once_with(samples, '', '-forcov', index)
+    igs.ignore_strand_samples.assert_called_once_with(samples, '', '-forcov', index, 1)
 
 
 def test_ignorestrand_samplesnotexists(testdir, mock_testclass):
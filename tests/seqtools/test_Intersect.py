@@ -55,7 +55,7 @@ def test_intersect(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(ib.intersect, ['-s', samples, '-a' , annotations])
     assert result.exit_code == 0
-    ib.intersect_samples.assert_called_once_with(samples, annotations, None)
+    ib.intersect_samples.assert_called_once_with(samples, annotations, None, 1)
 
 
 def test_intersect_parameters(testdir, mock_testclass):
@@ -66,7 +66,7 @@ def test_intersect_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(ib.intersect, ['-s', samples, '-a' , annotations, '--index', index])
     assert result.exit_code == 0
-    ib.intersect_samples.assert_called_once_with(samples, annotations, index)
+    ib.intersect_samples.assert_called_once_with(samples, annotations, index, 1)
 
 
 def test_intersect_samples(testdir, mock_testclass):
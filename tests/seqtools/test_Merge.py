@@ -41,7 +41,7 @@ def test_merge(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(mb.merge, ['-d', datasets])
     assert result.exit_code == 0
-    mb.merge_datasets.assert_called_once_with(datasets, None)
+    mb.merge_datasets.assert_called_once_with(datasets, None, 1)
 
 
 def test_merge_parameters(testdir, mock_testclass):
@@ -51,7 +51,7 @@ def test_merge_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(mb.merge, ['-d', datasets, '--index', index])
     assert result.exit_code == 0
-    mb.merge_datasets.assert_called_once_with(datasets, index)
+    mb.merge_datasets.assert_called_once_with(datasets, index, 1)
 
 
 def test_merge_mergenotexists(testdir, mock_testclass):
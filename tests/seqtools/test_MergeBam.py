@@ -38,7 +38,7 @@ def test_mergebam(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(mb.mergebam, ['-d', datasets])
     assert result.exit_code == 0
-    mb.merge_datasets.assert_called_once_with(datasets, '', 1, None)
+    mb.merge_datasets.assert_called_once_with(datasets, '', 1, None, 1)
 
 
 def test_mergebam_parameters(testdir, mock_testclass):
@@ -50,7 +50,7 @@ def test_mergebam_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(mb.mergebam, ['-d', datasets, '--suffix', suffix, '--threads', threads, '--index', index])
     assert result.exit_code == 0
-    mb.merge_datasets.assert_called_once_with(datasets, suffix, threads, index)
+    mb.merge_datasets.assert_called_once_with(datasets, suffix, threads, index, 1)
 
 
 def test_mergebam_mergenotexists(testdir, mock_testclass):
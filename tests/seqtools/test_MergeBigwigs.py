@@ -3,39 +3,25 @@ import math
 import os
 from pathlib import Path
 from shutil import copyfile
-from unittest.mock import MagicMock, ANY
+from unittest.mock import MagicMock
 
 import click
 from click.testing import CliRunner
+import numpy as np
+import pyBigWig as pbw
 import pytest
 
 from seqtools import MergeBigwigs as mb
-from seqtools.bed import Bed
+from seqtools.bigwig import BigWigCache
 
 
 @pytest.fixture
 def mock_testclass():
     merge_datasets = mb.merge_datasets
     merge_dataset = mb.merge_dataset
-    sort = Bed.sort
-    bedgraph_to_bigwig = Bed.bedgraph_to_bigwig
-    remove = os.remove
     yield
     mb.merge_datasets = merge_datasets
     mb.merge_dataset = merge_dataset
-    Bed.sort = sort
-    Bed.bedgraph_to_bigwig = bedgraph_to_bigwig
-    os.remove = remove
-    
-
-def create_file(*args, **kwargs):
-    if 'stdout' in kwargs:
-        outfile = kwargs['stdout']
-        outfile.write('test')
-    elif '-o' in args[0]:
-        output = args[0][args[0].index('-o') + 1]
-        with open(output, 'w') as outfile:
-            outfile.write('test')
 
 
 def test_mergebw(testdir, mock_testclass):
@@ -45,18 +31,20 @@ def test_mergebw(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(mb.mergebw, ['-d', datasets, '--sizes', sizes])
     assert result.exit_code == 0
-    mb.merge_datasets.assert_called_once_with(datasets, sizes, None)
+    mb.merge_datasets.assert_called_once_with(datasets, sizes, None, mb.BLOCK_SIZE, 1, 1)
 
 
 def test_mergebw_parameters(testdir, mock_testclass):
     datasets = Path(__file__).parent.joinpath('dataset.txt')
     sizes = Path(__file__).parent.joinpath('sizes.txt')
+    block_size = 100
+    threads = 2
     index = 1
     mb.merge_datasets = MagicMock()
     runner = CliRunner()
-    result = runner.invoke(mb.mergebw, ['-d', datasets, '--sizes', sizes, '--index', index])
+    result = runner.invoke(mb.mergebw, ['-d', datasets, '--sizes', sizes, '--block-size', block_size, '--threads', threads, '--index', index])
     assert result.exit_code == 0
-    mb.merge_datasets.assert_called_once_with(datasets, sizes, index)
+    mb.merge_datasets.assert_called_once_with(datasets, sizes, index, block_size, threads, 1)
 
 
 def test_mergebw_mergenotexists(testdir, mock_testclass):
@@ -84,9 +72,9 @@ def test_mergebw(testdir, mock_testclass):
     sizes = Path(__file__).parent.joinpath('sizes.txt')
     mb.merge_dataset = MagicMock()
     mb.merge_datasets(datasets, sizes)
-    mb.merge_dataset.assert_any_call('POLR2A', ['POLR2A_1', 'POLR2A_2'], sizes)
-    mb.merge_dataset.assert_any_call('ASDURF', ['ASDURF_1', 'ASDURF_2'], sizes)
-    mb.merge_dataset.assert_any_call('POLR1C', ['POLR1C_1', 'POLR1C_2'], sizes)
+    mb.merge_dataset.assert_any_call('POLR2A', ['POLR2A_1', 'POLR2A_2'], sizes, mb.BLOCK_SIZE, 1)
+    mb.merge_dataset.assert_any_call('ASDURF', ['ASDURF_1', 'ASDURF_2'], sizes, mb.BLOCK_SIZE, 1)
+    mb.merge_dataset.assert_any_call('POLR1C', ['POLR1C_1', 'POLR1C_2'], sizes, mb.BLOCK_SIZE, 1)
 
 
 def test_mergebw_second(testdir, mock_testclass):
@@ -94,7 +82,29 @@ def test_mergebw_second(testdir, mock_testclass):
     sizes = Path(__file__).parent.joinpath('sizes.txt')
     mb.merge_dataset = MagicMock()
     mb.merge_datasets(datasets, sizes, 1)
-    mb.merge_dataset.assert_called_once_with('ASDURF', ['ASDURF_1', 'ASDURF_2'], sizes)
+    mb.merge_dataset.assert_called_once_with('ASDURF', ['ASDURF_1', 'ASDURF_2'], sizes, mb.BLOCK_SIZE, 1)
+
+
+def test_merge_datasets_parameters(testdir, mock_testclass):
+    datasets = Path(__file__).parent.joinpath('dataset.txt')
+    sizes = Path(__file__).parent.joinpath('sizes.txt')
+    block_size = 100
+    threads = 2
+    mb.merge_dataset = MagicMock()
+    mb.merge_datasets(datasets, sizes, block_size=block_size, threads=threads)
+    mb.merge_dataset.assert_any_call('POLR2A', ['POLR2A_1', 'POLR2A_2'], sizes, block_size, threads)
+    mb.merge_dataset.assert_any_call('ASDURF', ['ASDURF_1', 'ASDURF_2'], sizes, block_size, threads)
+    mb.merge_dataset.assert_any_call('POLR1C', ['POLR1C_1', 'POLR1C_2'], sizes, block_size, threads)
+
+
+def assert_merged_intervals(bw):
+    intervals = bw.intervals('chrI')
+    expected = [(0, 2, 0), (2, 3, 0.1), (3, 4, 0.7), (4, 5, 0), (5, 6, 0.7), (6, 8, 0.5), (8, 9, 0), (9, 10, 0.6), (10, 11, 0.8), (11, 12, 0.7), (12, 14, 0.6), (14, 15, 0)]
+    assert len(intervals) == len(expected), intervals
+    for interval, expected_interval in zip(intervals, expected):
+        assert interval[0] == expected_interval[0], intervals
+        assert interval[1] == expected_interval[1], intervals
+        assert math.isclose(interval[2], expected_interval[2], abs_tol=0.001), intervals
 
 
 def test_merge_dataset(testdir, mock_testclass):
@@ -107,62 +117,88 @@ def test_merge_dataset(testdir, mock_testclass):
     sizes = Path(__file__).parent.joinpath('sizes.txt')
     copyfile(Path(__file__).parent.joinpath('sample.bw'), sample1_bw)
     copyfile(Path(__file__).parent.joinpath('sample2.bw'), sample2_bw)
-    Bed.sort = MagicMock()
-    Bed.bedgraph_to_bigwig = MagicMock(side_effect=create_file(['-o', dataset_bw]))
-    os_remove = os.remove
-    os.remove = MagicMock()
     mb.merge_dataset(dataset, [sample1, sample2], sizes)
-    Bed.sort.assert_called_once_with(ANY, ANY)
-    Bed.bedgraph_to_bigwig.assert_called_once_with(ANY, dataset_bw, sizes)
-    assert Bed.sort.call_args.args[1] == Bed.bedgraph_to_bigwig.call_args.args[0]
     assert os.path.exists(dataset_bw)
-    with open(Bed.sort.call_args.args[0], 'r') as infile:
-        assert infile.readline() == 'track type=bedGraph name="POLR2A"\n'
-        assert infile.readline() == 'chrI\t0\t1\t0\n'
-        assert infile.readline() == 'chrI\t1\t2\t0\n'
-        line = infile.readline()
-        assert len(line.split('\t')) == 4
-        assert line.startswith('chrI\t2\t3\t'), line
-        assert math.isclose(float(line.split('\t')[3]), 0.1, abs_tol=0.001), line.split('\t')[3]
-        line = infile.readline()
-        assert len(line.split('\t')) == 4
-        assert line.startswith('chrI\t3\t4\t'), line
-        assert math.isclose(float(line.split('\t')[3]), 0.7, abs_tol=0.001), line.split('\t')[3]
-        assert infile.readline() == 'chrI\t4\t5\t0\n'
-        line = infile.readline()
-        assert len(line.split('\t')) == 4
-        assert line.startswith('chrI\t5\t6\t'), line
-        assert math.isclose(float(line.split('\t')[3]), 0.7, abs_tol=0.001), line.split('\t')[3]
-        line = infile.readline()
-        assert len(line.split('\t')) == 4
-        assert line.startswith('chrI\t6\t7\t'), line
-        assert math.isclose(float(line.split('\t')[3]), 0.5, abs_tol=0.001), line.split('\t')[3]
-        line = infile.readline()
-        assert len(line.split('\t')) == 4
-        assert line.startswith('chrI\t7\t8\t'), line
-        assert math.isclose(float(line.split('\t')[3]), 0.5, abs_tol=0.001), line.split('\t')[3]
-        assert infile.readline() == 'chrI\t8\t9\t0\n'
-        line = infile.readline()
-        assert len(line.split('\t')) == 4
-        assert line.startswith('chrI\t9\t10\t'), line
-        assert math.isclose(float(line.split('\t')[3]), 0.6, abs_tol=0.001), line.split('\t')[3]
-        line = infile.readline()
-        assert len(line.split('\t')) == 4
-        assert line.startswith('chrI\t10\t11\t'), line
-        assert math.isclose(float(line.split('\t')[3]), 0.8, abs_tol=0.001), line.split('\t')[3]
-        line = infile.readline()
-        assert len(line.split('\t')) == 4
-        assert line.startswith('chrI\t11\t12\t'), line
-        assert math.isclose(float(line.split('\t')[3]), 0.7, abs_tol=0.001), line.split('\t')[3]
-        line = infile.readline()
-        assert len(line.split('\t')) == 4
-        assert line.startswith('chrI\t12\t13\t'), line
-        assert math.isclose(float(line.split('\t')[3]), 0.6, abs_tol=0.001), line.split('\t')[3]
-        line = infile.readline()
-        assert len(line.split('\t')) == 4
-        assert line.startswith('chrI\t13\t14\t'), line
-        assert math.isclose(float(line.split('\t')[3]), 0.6, abs_tol=0.001), line.split('\t')[3]
-        assert infile.readline() == 'chrI\t14\t15\t0\n'
-        assert infile.readline() == ''
-    for remove_args in os.remove.call_args_list:
-        os_remove(remove_args.args[0])
+    bw = pbw.open(dataset_bw)
+    assert bw.chroms() == {'chrI': 15}
+    assert_merged_intervals(bw)
+    bw.close()
+
+
+def test_merge_dataset_smallblocks(testdir, mock_testclass):
+    dataset = 'POLR2A'
+    dataset_bw = dataset + '.bw'
+    sample1 = dataset + '_1'
+    sample1_bw = sample1 + '.bw'
+    sample2 = dataset + '_2'
+    sample2_bw = sample2 + '.bw'
+    sizes = Path(__file__).parent.joinpath('sizes.txt')
+    copyfile(Path(__file__).parent.joinpath('sample.bw'), sample1_bw)
+    copyfile(Path(__file__).parent.joinpath('sample2.bw'), sample2_bw)
+    mb.merge_dataset(dataset, [sample1, sample2], sizes, 4)
+    assert os.path.exists(dataset_bw)
+    bw = pbw.open(dataset_bw)
+    assert_merged_intervals(bw)
+    bw.close()
+
+
+def test_merge_dataset_missingchromosome(testdir, mock_testclass):
+    dataset = 'POLR2A'
+    dataset_bw = dataset + '.bw'
+    sample1 = dataset + '_1'
+    sample1_bw = sample1 + '.bw'
+    sizes = 'sizes.txt'
+    with open(sizes, 'w') as outfile:
+        outfile.write('chrI\t15\n')
+        outfile.write('chrII\t10\n')
+    copyfile(Path(__file__).parent.joinpath('sample.bw'), sample1_bw)
+    mb.merge_dataset(dataset, [sample1], sizes)
+    bw = pbw.open(dataset_bw)
+    assert bw.chroms() == {'chrI': 15, 'chrII': 10}
+    assert bw.intervals('chrII') == ((0, 10, 0.0),)
+    bw.close()
+
+
+def test_merge_dataset_threads(testdir, mock_testclass):
+    dataset = 'POLR2A'
+    dataset_bw = dataset + '.bw'
+    sample1 = dataset + '_1'
+    sample1_bw = sample1 + '.bw'
+    sample2 = dataset + '_2'
+    sample2_bw = sample2 + '.bw'
+    sizes = 'sizes.txt'
+    with open(sizes, 'w') as outfile:
+        outfile.write('chrI\t15\n')
+        outfile.write('chrII\t10\n')
+        outfile.write('chrIII\t20\n')
+    copyfile(Path(__file__).parent.joinpath('sample.bw'), sample1_bw)
+    copyfile(Path(__file__).parent.joinpath('sample2.bw'), sample2_bw)
+    mb.merge_dataset(dataset, [sample1, sample2], sizes, 4)
+    serial_bw = 'serial.bw'
+    os.rename(dataset_bw, serial_bw)
+    mb.merge_dataset(dataset, [sample1, sample2], sizes, 4, 3)
+    bw = pbw.open(dataset_bw)
+    assert bw.chroms() == {'chrI': 15, 'chrII': 10, 'chrIII': 20}
+    assert_merged_intervals(bw)
+    bw.close()
+    with open(serial_bw, 'rb') as serial, open(dataset_bw, 'rb') as parallel:
+        assert serial.read() == parallel.read()
+
+
+def test_merge_chromosome_nocache(testdir, mock_testclass):
+    copyfile(Path(__file__).parent.joinpath('sample.bw'), 'sample.bw')
+    copyfile(Path(__file__).parent.joinpath('sample2.bw'), 'sample2.bw')
+    bws = [BigWigCache.BigWigCache('sample.bw'), BigWigCache.BigWigCache('sample2.bw')]
+    chromosome = next(iter(bws[0].chroms()))
+    blocks = list(mb.merge_chromosome(bws, chromosome, bws[0].chroms(chromosome), 4))
+    assert blocks
+    assert not [key for key in BigWigCache.BLOCKS if key[0] in (bws[0].id, bws[1].id)]
+    for bw in bws:
+        bw.close()
+
+
+def test_runs(testdir, mock_testclass):
+    starts, ends, values = mb.runs(np.array([0.0, 0.0, 1.5, 1.5, 1.5, 0.0, 2.0]), 10)
+    assert starts.tolist() == [10, 12, 15, 16]
+    assert ends.tolist() == [12, 15, 16, 17]
+    assert values.tolist() == [0.0, 1.5, 0.0, 2.0]
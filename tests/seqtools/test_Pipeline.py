@@ -0,0 +1,279 @@
+import os
+from pathlib import Path
+from shutil import copyfile
+from unittest.mock import MagicMock, ANY
+
+from click.testing import CliRunner
+import pytest
+
+from seqtools import Bam2Bed, Bowtie2, Bwa, FilterBam, GenomeCoverage
+from seqtools import Pipeline as pl
+from seqtools.bed import Bed
+from seqtools.process import Manifest
+from seqtools.txt import Parser
+
+
+@pytest.fixture
+def mock_testclass():
+    pipeline_samples = pl.pipeline_samples
+    pipeline_sample = pl.pipeline_sample
+    align = pl.align
+    filter_bam = pl.filter_bam
+    split_coverage = pl.split_coverage
+    run_bowtie = Bowtie2.run_bowtie
+    run_bwa = Bwa.run_bwa
+    filter_mapped = FilterBam.filter_mapped
+    remove_duplicates = FilterBam.remove_duplicates
+    bam2bed_stream = Bam2Bed.bam2bed_stream
+    bam2bed_unpaired = Bam2Bed.bam2bed_unpaired
+    first = Parser.first
+    force = Manifest.FORCE
+    slurm_tmpdir = os.environ.pop('SLURM_TMPDIR', None)
+    yield
+    pl.pipeline_samples = pipeline_samples
+    pl.pipeline_sample = pipeline_sample
+    pl.align = align
+    pl.filter_bam = filter_bam
+    pl.split_coverage = split_coverage
+    Bowtie2.run_bowtie = run_bowtie
+    Bwa.run_bwa = run_bwa
+    FilterBam.filter_mapped = filter_mapped
+    FilterBam.remove_duplicates = remove_duplicates
+    Bam2Bed.bam2bed_stream = bam2bed_stream
+    Bam2Bed.bam2bed_unpaired = bam2bed_unpaired
+    Parser.first = first
+    Manifest.FORCE = force
+    if slurm_tmpdir is None:
+        os.environ.pop('SLURM_TMPDIR', None)
+    else:
+        os.environ['SLURM_TMPDIR'] = slurm_tmpdir
+
+
+def create_file(*args, **kwargs):
+    with open(args[1], 'w') as outfile:
+        outfile.write('test')
+
+
+def write_bed(bed):
+    with open(bed, 'w') as outfile:
+        outfile.write('track name=test\n')
+        outfile.write('chrI\t10\t20\ttest1\t1\t+\n')
+        outfile.write('chrI\t12\t27\ttest2\t1\t-\n')
+        outfile.write('chrII\t5\t15\ttest3\t1\t+\n')
+
+
+def write_sizes(sizes):
+    with open(sizes, 'w') as outfile:
+        outfile.write('chrI\t40\n')
+        outfile.write('chrII\t30\n')
+
+
+def test_pipeline(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    copyfile(Path(__file__).parent.joinpath('sizes.txt'), 'sacCer3.chrom.sizes')
+    pl.pipeline_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(pl.pipeline, ['-s', samples, '-x', 'sacCer3.fa.index'])
+    assert result.exit_code == 0
+    pl.pipeline_samples.assert_called_once_with(samples, 'bowtie2', 'sacCer3.fa', True, True, 1, 'sacCer3.chrom.sizes', 'fragment', None, 100, 500, None, False, None, ('-x', 'sacCer3.fa.index'), 1)
+
+
+def test_pipeline_parameters(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genome = Path(__file__).parent.joinpath('sizes.txt')
+    scratch = 'scratch'
+    os.mkdir(scratch)
+    pl.pipeline_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(pl.pipeline, ['-s', samples, '--aligner', 'bwa', '--fasta', 'sacCer3.fa', '-u', '-nd', '-t', 4, '-g', genome, '--coverage', 'center', '-b', 10, '-l', 50, '-L', 200, '--scratch', scratch, '--keep-bam', '--index', 1, '--jobs', 2, '-M'])
+    assert result.exit_code == 0
+    pl.pipeline_samples.assert_called_once_with(samples, 'bwa', 'sacCer3.fa', False, False, 4, genome, 'center', 10, 50, 200, scratch, True, 1, ('-M',), 2)
+
+
+def test_pipeline_slurmtmpdir(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genome = Path(__file__).parent.joinpath('sizes.txt')
+    os.environ['SLURM_TMPDIR'] = 'slurm'
+    pl.pipeline_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(pl.pipeline, ['-s', samples, '-g', genome])
+    assert result.exit_code == 0
+    pl.pipeline_samples.assert_called_once_with(samples, 'bowtie2', 'sacCer3.fa', True, True, 1, genome, 'fragment', None, 100, 500, 'slurm', False, None, (), 1)
+
+
+def test_pipeline_samples(testdir, mock_testclass):
+    samples_file = Path(__file__).parent.joinpath('samples.txt')
+    samples = ['POLR2A', 'ASDURF', 'POLR1C']
+    Parser.first = MagicMock(return_value=samples)
+    pl.pipeline_sample = MagicMock()
+    pl.pipeline_samples(samples_file, threads=2, binlength=10, index=1)
+    Parser.first.assert_called_once_with(samples_file)
+    pl.pipeline_sample.assert_called_once_with('ASDURF', 'bowtie2', 'sacCer3.fa', True, True, 2, 'sacCer3.chrom.sizes', 'fragment', 10, 100, 500, None, False, ())
+
+
+def test_pipeline_sample(testdir, mock_testclass):
+    sample = 'POLR2A'
+    genome = 'sizes.txt'
+    write_sizes(genome)
+    open(sample + '_R1.fastq', 'w').close()
+    open(sample + '_R2.fastq', 'w').close()
+    os.mkdir('scratch')
+    Bowtie2.run_bowtie = MagicMock(side_effect=lambda fastq1, fastq2, bam, *args: create_file(fastq1, bam))
+    FilterBam.filter_mapped = MagicMock(side_effect=create_file)
+    FilterBam.remove_duplicates = MagicMock(side_effect=create_file)
+    Bam2Bed.bam2bed_stream = MagicMock(side_effect=lambda bam, bed, threads: write_bed(bed))
+    pl.pipeline_sample(sample, threads=2, genome=genome, binlength=10, binminlength=10, binmaxlength=20, scratch='scratch', keep_bam=True, aligner_args=('-x', 'index'))
+    Bowtie2.run_bowtie.assert_called_once_with(sample + '_R1.fastq', sample + '_R2.fastq', ANY, 2, ('-x', 'index'), True)
+    bam = Bowtie2.run_bowtie.call_args[0][2]
+    assert bam.startswith('scratch')
+    FilterBam.filter_mapped.assert_called_once_with(bam, ANY, True, 2, True)
+    assert not os.path.exists(bam)
+    assert os.listdir('scratch') == []
+    for output in ['POLR2A-dedup.bam', 'POLR2A.bed', 'POLR2A-10-20.bed', 'POLR2A-cov.bed', 'POLR2A-cov.bw', 'POLR2A-10-20-cov.bed', 'POLR2A-10-20-cov.bw']:
+        assert os.path.isfile(output)
+    assert not os.path.exists('POLR2A-filtered.bam')
+    assert not os.path.exists('POLR2A-20-30.bed')
+    assert Bed.count_bed('POLR2A-10-20.bed') == 3
+    with open('POLR2A-10-20-cov.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="POLR2A-10-20"\n'
+
+
+def test_pipeline_sample_bwa_unpaired(testdir, mock_testclass):
+    sample = 'POLR2A'
+    genome = 'sizes.txt'
+    write_sizes(genome)
+    open(sample + '_R1.fastq', 'w').close()
+    Bwa.run_bwa = MagicMock(side_effect=lambda fastq1, fastq2, fasta, bam, *args: create_file(fastq1, bam))
+    FilterBam.filter_mapped = MagicMock(side_effect=create_file)
+    FilterBam.remove_duplicates = MagicMock()
+    Bam2Bed.bam2bed_unpaired = MagicMock(side_effect=lambda bam, bed: write_bed(bed))
+    pl.pipeline_sample(sample, aligner='bwa', paired=False, dedup=False, genome=genome)
+    Bwa.run_bwa.assert_called_once_with(sample + '_R1.fastq', None, 'sacCer3.fa', ANY, None, (), True)
+    FilterBam.filter_mapped.assert_called_once_with(ANY, ANY, False, None, True)
+    FilterBam.remove_duplicates.assert_not_called()
+    for output in ['POLR2A.bed', 'POLR2A-cov.bed', 'POLR2A-cov.bw']:
+        assert os.path.isfile(output)
+    assert not os.path.exists('POLR2A-filtered.bam')
+
+
+def test_pipeline_sample_uptodate(testdir, mock_testclass):
+    sample = 'POLR2A'
+    genome = 'sizes.txt'
+    write_sizes(genome)
+    open(sample + '_R1.fastq', 'w').close()
+    Bowtie2.run_bowtie = MagicMock(side_effect=lambda fastq1, fastq2, bam, *args: create_file(fastq1, bam))
+    FilterBam.filter_mapped = MagicMock(side_effect=create_file)
+    FilterBam.remove_duplicates = MagicMock(side_effect=create_file)
+    Bam2Bed.bam2bed_unpaired = MagicMock(side_effect=lambda bam, bed: write_bed(bed))
+    pl.pipeline_sample(sample, paired=False, genome=genome, binlength=10, binminlength=10, binmaxlength=20)
+    assert os.path.isfile('.POLR2A.bed.manifest')
+    pl.pipeline_sample(sample, paired=False, genome=genome, binlength=10, binminlength=10, binmaxlength=20)
+    assert Bowtie2.run_bowtie.call_count == 1
+    pl.pipeline_sample(sample, paired=False, genome=genome, binlength=10, binminlength=10, binmaxlength=30)
+    assert Bowtie2.run_bowtie.call_count == 2
+    Manifest.FORCE = True
+    pl.pipeline_sample(sample, paired=False, genome=genome, binlength=10, binminlength=10, binmaxlength=30)
+    assert Bowtie2.run_bowtie.call_count == 3
+
+
+def test_pipeline_sample_outputremoved(testdir, mock_testclass):
+    sample = 'POLR2A'
+    genome = 'sizes.txt'
+    write_sizes(genome)
+    open(sample + '_R1.fastq', 'w').close()
+    Bowtie2.run_bowtie = MagicMock(side_effect=lambda fastq1, fastq2, bam, *args: create_file(fastq1, bam))
+    FilterBam.filter_mapped = MagicMock(side_effect=create_file)
+    FilterBam.remove_duplicates = MagicMock(side_effect=create_file)
+    Bam2Bed.bam2bed_unpaired = MagicMock(side_effect=lambda bam, bed: write_bed(bed))
+    pl.pipeline_sample(sample, paired=False, genome=genome, keep_bam=True)
+    os.remove('POLR2A-dedup.bam')
+    pl.pipeline_sample(sample, paired=False, genome=genome, keep_bam=True)
+    assert Bowtie2.run_bowtie.call_count == 2
+    assert os.path.isfile('POLR2A-dedup.bam')
+
+
+def test_pipeline_outputs(testdir, mock_testclass):
+    assert pl.pipeline_outputs(['POLR2A', 'POLR2A-10-20']) == ['POLR2A.bed', 'POLR2A-10-20.bed', 'POLR2A-cov.bed', 'POLR2A-cov.bw', 'POLR2A-10-20-cov.bed', 'POLR2A-10-20-cov.bw']
+    assert pl.pipeline_outputs(['POLR2A'], False, True) == ['POLR2A.bed', 'POLR2A-cov.bed', 'POLR2A-cov.bw', 'POLR2A-filtered.bam']
+
+
+def test_pipeline_sample_nofastq(testdir, mock_testclass):
+    Bowtie2.run_bowtie = MagicMock()
+    with pytest.raises(AssertionError):
+        pl.pipeline_sample('POLR2A')
+    Bowtie2.run_bowtie.assert_not_called()
+
+
+def test_pipeline_sample_failure(testdir, mock_testclass):
+    sample = 'POLR2A'
+    open(sample + '_R1.fastq', 'w').close()
+    os.mkdir('scratch')
+    Bowtie2.run_bowtie = MagicMock(side_effect=lambda fastq1, fastq2, bam, *args: create_file(fastq1, bam))
+    FilterBam.filter_mapped = MagicMock(side_effect=ValueError('filter failed'))
+    with pytest.raises(ValueError):
+        pl.pipeline_sample(sample, scratch='scratch')
+    assert os.listdir('scratch') == []
+
+
+def test_split_coverage(testdir, mock_testclass):
+    os.mkdir('work')
+    bed = 'work/POLR2A.bed'
+    genome = 'sizes.txt'
+    write_bed(bed)
+    write_sizes(genome)
+    outputs = pl.split_coverage(bed, 'work', ['POLR2A', 'POLR2A-10-15', 'POLR2A-15-20'], [(10, 15), (15, 20)], genome, 'center', 2)
+    assert outputs == ['work/POLR2A-10-15.bed', 'work/POLR2A-15-20.bed', 'work/POLR2A-cov.bed', 'work/POLR2A-cov.bw', 'work/POLR2A-10-15-cov.bed', 'work/POLR2A-10-15-cov.bw', 'work/POLR2A-15-20-cov.bed', 'work/POLR2A-15-20-cov.bw']
+    for output in outputs:
+        assert os.path.isfile(output)
+    with open('work/POLR2A-10-15.bed', 'r') as infile:
+        assert infile.readline() == 'track name=test\n'
+        assert infile.readline() == 'chrI\t10\t20\ttest1\t1\t+\n'
+        assert infile.readline() == 'chrII\t5\t15\ttest3\t1\t+\n'
+        assert infile.readline() == ''
+    with open('work/POLR2A-15-20-cov.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="POLR2A-15-20"\n'
+        assert infile.readline() == 'chrI\t19\t20\t1e+06\n'
+        assert infile.readline() == ''
+    with open('work/POLR2A-cov.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="POLR2A"\n'
+        assert infile.readline() == 'chrI\t15\t16\t333333\n'
+        assert infile.readline() == 'chrI\t19\t20\t333333\n'
+        assert infile.readline() == 'chrII\t10\t11\t333333\n'
+        assert infile.readline() == ''
+
+
+def test_split_coverage_nosplit(testdir, mock_testclass):
+    os.mkdir('work')
+    bed = 'work/POLR2A.bed'
+    genome = 'sizes.txt'
+    write_bed(bed)
+    write_sizes(genome)
+    outputs = pl.split_coverage(bed, 'work', ['POLR2A'], [], genome, '5')
+    assert outputs == ['work/POLR2A-cov.bed', 'work/POLR2A-cov.bw']
+    with open('work/POLR2A-cov.bed', 'r') as infile:
+        assert infile.readline() == 'track type=bedGraph name="POLR2A"\n'
+        assert infile.readline() == 'chrI\t10\t11\t333333\n'
+        assert infile.readline() == 'chrI\t26\t27\t333333\n'
+        assert infile.readline() == 'chrII\t5\t6\t333333\n'
+        assert infile.readline() == ''
+
+
+def test_move_output(testdir, mock_testclass):
+    os.mkdir('work')
+    bed = 'work/POLR2A.bed'
+    write_bed(bed)
+    assert Bed.count_bed(bed) == 3
+    pl.move_output(bed, 'POLR2A.bed')
+    assert not os.path.exists(bed)
+    assert not os.path.exists(Bed.index_file(bed))
+    assert os.path.isfile('POLR2A.bed')
+    assert Bed.read_index('POLR2A.bed')['count'] == 3
+
+
+def test_move_output_noindex(testdir, mock_testclass):
+    os.mkdir('work')
+    bam = 'work/POLR2A.bam'
+    create_file(None, bam)
+    pl.move_output(bam, 'POLR2A.bam')
+    assert not os.path.exists(bam)
+    assert os.path.isfile('POLR2A.bam')
@@ -30,7 +30,7 @@ def test_plot2do(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(p.plot2do, ['-f', samples])
     assert result.exit_code == 0
-    p.plot2do_samples.assert_called_once_with(samples, '', None, ())
+    p.plot2do_samples.assert_called_once_with(samples, '', None, (), 1)
 
 
 def test_plot2do_sample_parameters(testdir, mock_testclass):
@@ -43,7 +43,7 @@ def test_plot2do_sample_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(p.plot2do, ['-f', samples, '-is', input_suffix, '--type', type, '--genome', genome, '--index', index])
     assert result.exit_code == 0
-    p.plot2do_samples.assert_called_once_with(samples, input_suffix, index, ('--type', type, '--genome', genome,))
+    p.plot2do_samples.assert_called_once_with(samples, input_suffix, index, ('--type', type, '--genome', genome,), 1)
 
 
 def test_plot2do_filenotexists(testdir, mock_testclass):
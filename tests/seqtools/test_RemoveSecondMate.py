@@ -29,7 +29,7 @@ def test_removesecondmate(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(rsm.removesecondmate, ['-s', samples])
     assert result.exit_code == 0
-    rsm.removesecondmate_samples.assert_called_once_with(samples, '-dedup', '-mate1', 1, None)
+    rsm.removesecondmate_samples.assert_called_once_with(samples, '-dedup', '-mate1', 1, None, 1)
 
 
 def test_removesecondmate_parameters(testdir, mock_testclass):
@@ -41,7 +41,7 @@ def test_removesecondmate_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(rsm.removesecondmate, ['-s', samples, '-is', input_suffix, '-os', output_suffix, '-t', threads])
     assert result.exit_code == 0
-    rsm.removesecondmate_samples.assert_called_once_with(samples, input_suffix, output_suffix, threads, None)
+    rsm.removesecondmate_samples.assert_called_once_with(samples, input_suffix, output_suffix, threads, None, 1)
 
 
 def test_removesecondmate_second(testdir, mock_testclass):
@@ -51,7 +51,7 @@ def test_removesecondmate_second(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(rsm.removesecondmate, ['-s', samples, '-i', index])
     assert result.exit_code == 0
-    rsm.removesecondmate_samples.assert_called_once_with(samples, '-dedup', '-mate1', 1, index)
+    rsm.removesecondmate_samples.assert_called_once_with(samples, '-dedup', '-mate1', 1, index, 1)
 
 
 def test_removesecondmate_samplesnotexists(testdir, mock_testclass):
@@ -40,7 +40,7 @@ def test_shiftannotations(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(sa.shiftannotations, ['-s', samples])
     assert result.exit_code == 0
-    sa.shift_annotations_samples.assert_called_once_with(samples, '', '-forcov', None, ())
+    sa.shift_annotations_samples.assert_called_once_with(samples, '', '-forcov', None, (), 1)
 
 
 def test_shiftannotations_parameters(testdir, mock_testclass):
@@ -56,7 +56,7 @@ def test_shiftannotations_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(sa.shiftannotations, ['-s', samples, '-is', input_suffix, '-os', output_suffix, '-g', genome, '-m', minus, '-p', plus, '-i', index])
     assert result.exit_code == 0
-    sa.shift_annotations_samples.assert_called_once_with(samples, input_suffix, output_suffix, index, ('-g', genome, '-m', minus, '-p', plus,))
+    sa.shift_annotations_samples.assert_called_once_with(samples, input_suffix, output_suffix, index, ('-g', genome, '-m', minus, '-p', plus,), 1)
 
 
 def test_shiftannotations_samesuffix(testdir, mock_testclass):
@@ -76,7 +76,7 @@ def test_shiftannotations_onlyoutputsuffix(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(sa.shiftannotations, ['-s', samples, '-os', output_suffix])
     assert result.exit_code == 0
-    sa.shift_annotations_samples.assert_called_once_with(samples, '', output_suffix, None, ())
+    sa.shift_annotations_samples.assert_called_once_with(samples, '', output_suffix, None, (), 1)
 
 
 def test_shiftannotations_second(testdir, mock_testclass):
@@ -86,7 +86,7 @@ def test_shiftannotations_second(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(sa.shiftannotations, ['-s', samples, '-i', index])
     assert result.exit_code == 0
-    sa.shift_annotations_samples.assert_called_once_with(samples, '', '-forcov', index, ())
+    sa.shift_annotations_samples.assert_called_once_with(samples, '', '-forcov', index, (), 1)
 
 
 def test_shiftannotations_samplesnotexists(testdir, mock_testclass):
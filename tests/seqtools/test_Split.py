@@ -18,12 +18,14 @@ def mock_testclass():
     split_sample = s.split_sample
     sort_bysize = Bed.sort_bysize
     sort = Bed.sort
+    split_by_length = Bed.split_by_length
     remove = os.remove
     yield
     s.split_samples = split_samples
     s.split_sample = split_sample
     Bed.sort_bysize = sort_bysize
     Bed.sort = sort
+    Bed.split_by_length = split_by_length
     os.remove = remove
    
 
@@ -39,7 +41,7 @@ def test_split(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(s.split, ['-s', samples])
     assert result.exit_code == 0
-    s.split_samples.assert_called_once_with(samples, None, 10, 100, 500)
+    s.split_samples.assert_called_once_with(samples, None, 10, 100, 500, False, 1)
 
 
 def test_split_parameters(testdir, mock_testclass):
@@ -53,7 +55,7 @@ def test_split_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(s.split, ['-s', samples, '--binLength', binlength, '--binMinLength', binminlength, '--binMaxLength', binmaxlength, '--index', index])
     assert result.exit_code == 0
-    s.split_samples.assert_called_once_with(samples, index, binlength, binminlength, binmaxlength)
+    s.split_samples.assert_called_once_with(samples, index, binlength, binminlength, binmaxlength, False, 1)
 
 
 def test_split_samplesnotexists(testdir, mock_testclass):
@@ -69,16 +71,16 @@ def test_split_samples(testdir, mock_testclass):
     samples = Path(__file__).parent.joinpath('samples.txt')
     s.split_sample = MagicMock()
     s.split_samples(samples)
-    s.split_sample.assert_any_call('POLR2A', 10, 100, 500)
-    s.split_sample.assert_any_call('ASDURF', 10, 100, 500)
-    s.split_sample.assert_any_call('POLR1C', 10, 100, 500)
+    s.split_sample.assert_any_call('POLR2A', 10, 100, 500, False)
+    s.split_sample.assert_any_call('ASDURF', 10, 100, 500, False)
+    s.split_sample.assert_any_call('POLR1C', 10, 100, 500, False)
 
 
 def test_split_samples_second(testdir, mock_testclass):
     samples = Path(__file__).parent.joinpath('samples.txt')
     s.split_sample = MagicMock()
     s.split_samples(samples, 1)
-    s.split_sample.assert_called_once_with('ASDURF', 10, 100, 500)
+    s.split_sample.assert_called_once_with('ASDURF', 10, 100, 500, False)
 
 
 def test_split_samples_parameters(testdir, mock_testclass):
@@ -88,9 +90,9 @@ def test_split_samples_parameters(testdir, mock_testclass):
     binminlength = 200
     binmaxlength = 400
     s.split_samples(samples, binlength=binlength, binminlength=binminlength, binmaxlength=binmaxlength)
-    s.split_sample.assert_any_call('POLR2A', binlength, binminlength, binmaxlength)
-    s.split_sample.assert_any_call('ASDURF', binlength, binminlength, binmaxlength)
-    s.split_sample.assert_any_call('POLR1C', binlength, binminlength, binmaxlength)
+    s.split_sample.assert_any_call('POLR2A', binlength, binminlength, binmaxlength, False)
+    s.split_sample.assert_any_call('ASDURF', binlength, binminlength, binmaxlength, False)
+    s.split_sample.assert_any_call('POLR1C', binlength, binminlength, binmaxlength, False)
 
 
 def test_split_samples_second_parameters(testdir, mock_testclass):
@@ -100,7 +102,7 @@ def test_split_samples_second_parameters(testdir, mock_testclass):
     binminlength = 200
     binmaxlength = 400
     s.split_samples(samples, 1, binlength, binminlength, binmaxlength)
-    s.split_sample.assert_called_once_with('ASDURF', binlength, binminlength, binmaxlength)
+    s.split_sample.assert_called_once_with('ASDURF', binlength, binminlength, binmaxlength, False)
 
 
 def test_split_sample(testdir, mock_testclass):
@@ -135,6 +137,44 @@ def test_split_sample(testdir, mock_testclass):
         os_remove(remove_args.args[0])
 
 
+def test_split_stream(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    s.split_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(s.split, ['-s', samples, '--stream'])
+    assert result.exit_code == 0
+    s.split_samples.assert_called_once_with(samples, None, 10, 100, 500, True, 1)
+
+
+def test_split_sample_stream(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    copyfile(Path(__file__).parent.joinpath('sample-slowsplit.bed'), bed)
+    Bed.sort_bysize = MagicMock()
+    Bed.sort = MagicMock()
+    s.split_sample(sample, 10, 100, 130, True)
+    Bed.sort_bysize.assert_not_called()
+    Bed.sort.assert_not_called()
+    with open(sample + '-100-110.bed', 'r') as infile:
+        assert infile.readline() == 'chr4\t800\t900\ttest4\t4\t+\n'
+        assert infile.readline() == ''
+    with open(sample + '-110-120.bed', 'r') as infile:
+        assert infile.readline() == 'chr8\t800\t910\ttest8\t4\t-\n'
+        assert infile.readline() == ''
+    with open(sample + '-120-130.bed', 'r') as infile:
+        assert infile.readline() == 'chr1\t100\t229\ttest1\t1\t+\n'
+        assert infile.readline() == 'chr5\t100\t220\ttest5\t1\t-\n'
+        assert infile.readline() == ''
+
+
+def test_split_sample_stream_shorterlastbin(testdir, mock_testclass):
+    sample = 'POLR2A'
+    bed = sample + '.bed'
+    Bed.split_by_length = MagicMock()
+    s.split_sample(sample, 10, 155, 180, True)
+    Bed.split_by_length.assert_called_once_with(bed, [(sample + '-155-165.bed', 155, 165), (sample + '-165-175.bed', 165, 175), (sample + '-175-180.bed', 175, 180)])
+
+
 def test_annotation_length(testdir, mock_testclass):
     annotation_length = s.annotation_length('chr1\t100\t250\ttest1')
     assert annotation_length == 150
@@ -202,3 +242,13 @@ def test_splitkey_noend(testdir, mock_testclass):
 def test_splitkey_invalid(testdir, mock_testclass):
     with pytest.raises(AttributeError):
         s.splitkey('POLR2A')
+
+
+def test_splitrange(testdir, mock_testclass):
+    splitrange = s.splitrange('POLR2A-120-150')
+    assert splitrange == (120, 150)
+
+
+def test_splitrange_invalid(testdir, mock_testclass):
+    with pytest.raises(AttributeError):
+        s.splitrange('POLR2A-350')
@@ -49,7 +49,7 @@ def test_vap(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(v.vap, ['-s', samples, '-p', parameters])
     assert result.exit_code == 0
-    v.vap_samples.assert_called_once_with(samples, parameters, None, None)
+    v.vap_samples.assert_called_once_with(samples, parameters, None, None, 1)
 
 
 def test_vap_parameters(testdir, mock_testclass):
@@ -61,7 +61,7 @@ def test_vap_parameters(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(v.vap, ['-s', samples, '-p', parameters, '--selection', selection, '-i', index])
     assert result.exit_code == 0
-    v.vap_samples.assert_called_once_with(samples, parameters, selection, index)
+    v.vap_samples.assert_called_once_with(samples, parameters, selection, index, 1)
 
 
 def test_vap_samplesnotexists(testdir, mock_testclass):
@@ -6,7 +6,10 @@ from unittest.mock import MagicMock, ANY
 import click
 from click.testing import CliRunner
 
-from seqtools import seqtools, Bam2Bed, Bowtie2, Bwa, CenterAnnotations, ChipexoQual, Download, FilterBam, Fixmd5, GenomeCoverage, IgnoreStrand, Intersect, Merge, MergeBam, MergeBigwigs, Plot2do, RemoveSecondMate, Rename, ShiftAnnotations, SlowSplit, Split, Statistics, Vap
+from seqtools import seqtools, Bam2Bed, Bowtie2, Bwa, CenterAnnotations, ChipexoQual, Download, FilterBam, Fixmd5, GenomeCoverage, IgnoreStrand, Intersect, Merge, MergeBam, MergeBigwigs, Pipeline, Plot2do, RemoveSecondMate, Rename, ShiftAnnotations, SlowSplit, Split, Statistics, Vap
+from seqtools.bed import Bed
+from seqtools.bigwig import BigWigCache
+from seqtools.process import Manifest
 
 
 @pytest.fixture
@@ -25,6 +28,7 @@ def mock_testclass():
     merge_datasets = Merge.merge_datasets
     merge_datasets_bam = MergeBam.merge_datasets
     merge_datasets_bw = MergeBigwigs.merge_datasets
+    pipeline_samples = Pipeline.pipeline_samples
     plot2do_samples = Plot2do.plot2do_samples
     removesecondmate_samples = RemoveSecondMate.removesecondmate_samples
     rename = Rename.rename_
@@ -33,6 +37,11 @@ def mock_testclass():
     split_samples = Split.split_samples
     statistics_samples = Statistics.statistics_samples
     vap_samples = Vap.vap_samples
+    sort_memory = Bed.SORT_MEMORY
+    sort_threads = Bed.SORT_THREADS
+    sort_tmpdir = Bed.SORT_TMPDIR
+    force = Manifest.FORCE
+    bigwig_memory = BigWigCache.MEMORY
     yield
     Bam2Bed.bam2bed_samples = bam2bed_samples
     Bowtie2.bowtie_samples = bowtie_samples
@@ -48,6 +57,7 @@ def mock_testclass():
     Merge.merge_datasets = merge_datasets
     MergeBam.merge_datasets = merge_datasets_bam
     MergeBigwigs.merge_datasets = merge_datasets_bw
+    Pipeline.pipeline_samples = pipeline_samples
     Plot2do.plot2do_samples = plot2do_samples
     RemoveSecondMate.removesecondmate_samples = removesecondmate_samples
     Rename.rename_ = rename
@@ -56,6 +66,51 @@ def mock_testclass():
     Split.split_samples = split_samples
     Statistics.statistics_samples = statistics_samples
     Vap.vap_samples = vap_samples
+    Bed.SORT_MEMORY = sort_memory
+    Bed.SORT_THREADS = sort_threads
+    Bed.SORT_TMPDIR = sort_tmpdir
+    Manifest.FORCE = force
+    BigWigCache.MEMORY = bigwig_memory
+
+
+def test_seqtools_sort_options(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    Path('tmp').mkdir()
+    Merge.merge_datasets = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(seqtools.seqtools, ['--sort-mem', '2G', '--sort-threads', 3, '--sort-tmpdir', 'tmp', 'merge', '--datasets', samples])
+    assert result.exit_code == 0
+    assert Bed.SORT_MEMORY == 2 * 1024 ** 3
+    assert Bed.SORT_THREADS == 3
+    assert Bed.SORT_TMPDIR == 'tmp'
+    assert Manifest.FORCE == False
+
+
+def test_seqtools_force(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    Merge.merge_datasets = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(seqtools.seqtools, ['--force', 'merge', '--datasets', samples])
+    assert result.exit_code == 0
+    assert Manifest.FORCE == True
+
+
+def test_seqtools_bigwig_memory(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    Merge.merge_datasets = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(seqtools.seqtools, ['--bigwig-mem', '2G', 'merge', '--datasets', samples])
+    assert result.exit_code == 0
+    assert BigWigCache.MEMORY == 2 * 1024 ** 3
+
+
+def test_seqtools_sort_invalidmemory(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    Merge.merge_datasets = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(seqtools.seqtools, ['--sort-mem', '2X', 'merge', '--datasets', samples])
+    assert result.exit_code != 0
+    Merge.merge_datasets.assert_not_called()
 
 
 def test_seqtools_bam2bed(testdir, mock_testclass):
@@ -66,7 +121,7 @@ def test_seqtools_bam2bed(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(seqtools.seqtools, ['bam2bed', '--samples', samples, '--unpaired', '--threads', threads, '--index', index])
     assert result.exit_code == 0
-    Bam2Bed.bam2bed_samples.assert_called_once_with(samples, False, threads, '-dedup', index)
+    Bam2Bed.bam2bed_samples.assert_called_once_with(samples, False, threads, '-dedup', index, False, 'bedtools', 1)
 
 
 def test_seqtools_bowtie2(testdir, mock_testclass):
@@ -77,7 +132,7 @@ def test_seqtools_bowtie2(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(seqtools.seqtools, ['bowtie2', '--samples', samples, '--threads', threads, '--index', index, '-x', 'sacCer3.fa'])
     assert result.exit_code == 0
-    Bowtie2.bowtie_samples.assert_called_once_with(samples, threads, '', index, ('-x', 'sacCer3.fa'))
+    Bowtie2.bowtie_samples.assert_called_once_with(samples, threads, '', index, ('-x', 'sacCer3.fa'), False, 1)
 
 
 def test_seqtools_bwa(testdir, mock_testclass):
@@ -89,7 +144,7 @@ def test_seqtools_bwa(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(seqtools.seqtools, ['bwa', '--samples', samples, '--fasta', fasta, '--threads', threads, '--index', index])
     assert result.exit_code == 0
-    Bwa.bwa_sample.assert_called_once_with('POLR1C', fasta, threads, '', ())
+    Bwa.bwa_sample.assert_called_once_with('POLR1C', fasta, threads, '', (), False)
 
 
 def test_seqtools_centerannotations(testdir, mock_testclass):
@@ -98,7 +153,7 @@ def test_seqtools_centerannotations(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(seqtools.seqtools, ['centerannotations', '--samples', samples])
     assert result.exit_code == 0
-    CenterAnnotations.center_annotations_samples.assert_called_once_with(samples, '', '-forcov', None)
+    CenterAnnotations.center_annotations_samples.assert_called_once_with(samples, '', '-forcov', None, 1)
 
 
 def test_seqtools_chipexoqual(testdir, mock_testclass):
@@ -107,7 +162,7 @@ def test_seqtools_chipexoqual(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(seqtools.seqtools, ['chipexoqual', '--datasets', datasets])
     assert result.exit_code == 0
-    ChipexoQual.chipexoqual_datasets.assert_called_once_with(datasets, '', None, ())
+    ChipexoQual.chipexoqual_datasets.assert_called_once_with(datasets, '', None, (), 1)
 
 
 def test_seqtools_download(testdir, mock_testclass):
@@ -121,7 +176,7 @@ def test_seqtools_download(testdir, mock_testclass):
     result = runner.invoke(seqtools.seqtools, ['download', '--samples', samples, '--slow', '--threads', threads, '--mem', mem, '--index', index])
     logging.warning(result.output)
     assert result.exit_code == 0
-    Download.download_samples.assert_called_once_with(samples, False, threads, mem, index)
+    Download.download_samples.assert_called_once_with(samples, False, threads, mem, index, 1)
 
 
 def test_seqtools_filterbam(testdir, mock_testclass):
@@ -132,7 +187,7 @@ def test_seqtools_filterbam(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(seqtools.seqtools, ['filterbam', '--samples', samples, '--unpaired', '--threads', threads, '--index', index])
     assert result.exit_code == 0
-    FilterBam.filter_bam.assert_called_once_with(samples, False, True, threads, '', '', index)
+    FilterBam.filter_bam.assert_called_once_with(samples, False, True, threads, '', '', index, False, 1)
 
 
 def test_seqtools_fixmd5(testdir, mock_testclass):
@@ -156,7 +211,7 @@ def test_seqtools_genomecov(testdir, mock_testclass):
     result = runner.invoke(seqtools.seqtools, ['genomecov', '--samples', samples, '-g', sizes, '-5', '-scale', scale, '-strand', strand, '-is', input_suffix, '-os', output_suffix, '--index', index])
     logging.warning(result.output)
     assert result.exit_code == 0
-    GenomeCoverage.genome_coverage_samples.assert_called_once_with(samples, sizes, scale, strand, input_suffix, output_suffix, None, None, index, ('-5',))
+    GenomeCoverage.genome_coverage_samples.assert_called_once_with(samples, sizes, scale, strand, input_suffix, output_suffix, None, None, index, ('-5',), 'bedtools', False, 1)
 
 
 def test_seqtools_ignorestrand(testdir, mock_testclass):
@@ -165,7 +220,7 @@ def test_seqtools_ignorestrand(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(seqtools.seqtools, ['ignorestrand', '--samples', samples])
     assert result.exit_code == 0
-    IgnoreStrand.ignore_strand_samples.assert_called_once_with(samples, '', '-forcov', None)
+    IgnoreStrand.ignore_strand_samples.assert_called_once_with(samples, '', '-forcov', None, 1)
 
 
 def test_seqtools_intersect(testdir, mock_testclass):
@@ -176,7 +231,7 @@ def test_seqtools_intersect(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(seqtools.seqtools, ['intersect', '--samples', samples, '--annotations', annotations, '--index', index])
     assert result.exit_code == 0
-    Intersect.intersect_samples.assert_called_once_with(samples, annotations, index)
+    Intersect.intersect_samples.assert_called_once_with(samples, annotations, index, 1)
 
 
 def test_seqtools_merge(testdir, mock_testclass):
@@ -187,7 +242,7 @@ def test_seqtools_merge(testdir, mock_testclass):
     result = runner.invoke(seqtools.seqtools, ['merge', '--datasets', samples, '--index', index])
     logging.warning(result.output)
     assert result.exit_code == 0
-    Merge.merge_datasets.assert_called_once_with(samples, index)
+    Merge.merge_datasets.assert_called_once_with(samples, index, 1)
 
 
 def test_seqtools_mergebam(testdir, mock_testclass):
@@ -198,7 +253,7 @@ def test_seqtools_mergebam(testdir, mock_testclass):
     result = runner.invoke(seqtools.seqtools, ['mergebam', '--datasets', samples])
     logging.warning(result.output)
     assert result.exit_code == 0
-    MergeBam.merge_datasets.assert_called_once_with(samples, '', 1, None)
+    MergeBam.merge_datasets.assert_called_once_with(samples, '', 1, None, 1)
 
 
 def test_seqtools_mergebw(testdir, mock_testclass):
@@ -210,9 +265,20 @@ def test_seqtools_mergebw(testdir, mock_testclass):
     result = runner.invoke(seqtools.seqtools, ['mergebw', '--datasets', samples, '--sizes', sizes, '--index', index])
     logging.warning(result.output)
     assert result.exit_code == 0
-    MergeBigwigs.merge_datasets.assert_called_once_with(samples, sizes, index)
+    MergeBigwigs.merge_datasets.assert_called_once_with(samples, sizes, index, MergeBigwigs.BLOCK_SIZE, 1, 1)
 
  
+def test_seqtools_pipeline(testdir, mock_testclass):
+    samples = Path(__file__).parent.joinpath('samples.txt')
+    genome = Path(__file__).parent.joinpath('sizes.txt')
+    index = 1
+    Pipeline.pipeline_samples = MagicMock()
+    runner = CliRunner()
+    result = runner.invoke(seqtools.seqtools, ['pipeline', '--samples', samples, '--genome', genome, '--index', index, '-x', 'sacCer3.fa.index'])
+    assert result.exit_code == 0
+    Pipeline.pipeline_samples.assert_called_once_with(samples, 'bowtie2', 'sacCer3.fa', True, True, 1, genome, 'fragment', None, 100, 500, ANY, False, index, ('-x', 'sacCer3.fa.index'), 1)
+
+
 def test_seqtools_plot2do(testdir, mock_testclass):
     samples = Path(__file__).parent.joinpath('samples.txt')
     index = 2
@@ -222,7 +288,7 @@ def test_seqtools_plot2do(testdir, mock_testclass):
     result = runner.invoke(seqtools.seqtools, ['plot2do', '--file', samples, '--type', type, '--index', index])
     logging.warning(result.output)
     assert result.exit_code == 0
-    Plot2do.plot2do_samples.assert_called_once_with(samples, '', index, ('--type', type,))
+    Plot2do.plot2do_samples.assert_called_once_with(samples, '', index, ('--type', type,), 1)
 
 
 def test_seqtools_removesecondmate(testdir, mock_testclass):
@@ -231,7 +297,7 @@ def test_seqtools_removesecondmate(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(seqtools.seqtools, ['removesecondmate', '--samples', samples])
     assert result.exit_code == 0
-    RemoveSecondMate.removesecondmate_samples.assert_called_once_with(samples, '-dedup', '-mate1', 1, None)
+    RemoveSecondMate.removesecondmate_samples.assert_called_once_with(samples, '-dedup', '-mate1', 1, None, 1)
 
 
 def test_seqtools_rename(testdir, mock_testclass):
@@ -250,7 +316,7 @@ def test_seqtools_shiftannotations(testdir, mock_testclass):
     runner = CliRunner()
     result = runner.invoke(seqtools.seqtools, ['shiftannotations', '--samples', samples])
     assert result.exit_code == 0
-    ShiftAnnotations.shift_annotations_samples.assert_called_once_with(samples, '', '-forcov', None, ())
+    ShiftAnnotations.shift_annotations_samples.assert_called_once_with(samples, '', '-forcov', None, (), 1)
 
 
 def test_seqtools_slowsplit(testdir, mock_testclass):
@@ -264,7 +330,7 @@ def test_seqtools_slowsplit(testdir, mock_testclass):
     result = runner.invoke(seqtools.seqtools, ['slowsplit', '--samples', samples, '--binLength', binlength, '--binMinLength', binminlength, '--binMaxLength', binmaxlength, '--index', index])
     logging.warning(result.output)
     assert result.exit_code == 0
-    SlowSplit.split_samples.assert_called_once_with(samples, index, binlength, binminlength, binmaxlength)
+    SlowSplit.split_samples.assert_called_once_with(samples, index, binlength, binminlength, binmaxlength, 1)
 
 
 def test_seqtools_split(testdir, mock_testclass):
@@ -278,7 +344,7 @@ def test_seqtools_split(testdir, mock_testclass):
     result = runner.invoke(seqtools.seqtools, ['split', '--samples', samples, '--binLength', binlength, '--binMinLength', binminlength, '--binMaxLength', binmaxlength, '--index', index])
     logging.warning(result.output)
     assert result.exit_code == 0
-    Split.split_samples.assert_called_once_with(samples, index, binlength, binminlength, binmaxlength)
+    Split.split_samples.assert_called_once_with(samples, index, binlength, binminlength, binmaxlength, False, 1)
 
 
 def test_seqtools_statistics(testdir, mock_testclass):
@@ -302,4 +368,4 @@ def test_seqtools_vap(testdir, mock_testclass):
     result = runner.invoke(seqtools.seqtools, ['vap', '--samples', samples, '--parameters', parameters, '--index', index])
     logging.warning(result.output)
     assert result.exit_code == 0
-    Vap.vap_samples.assert_called_once_with(samples, parameters, None, index)
+    Vap.vap_samples.assert_called_once_with(samples, parameters, None, index, 1)